@@ -37,6 +37,26 @@ class NotificationLevel(Enum):
     CRITICAL = "critical"   # 0-3 дня (ежедневно)
     OVERDUE = "overdue"     # просрочено (ежедневно)
 
+# Расписание уведомлений о событии (см. NotificationManager.should_send_notification)
+NOTIFICATION_KEY_DAYS = (90, 30, 7)  # однократно за столько дней до события
+CRITICAL_NOTIFICATION_DAYS = 3       # ежедневно в последние дни до события
+OVERDUE_NOTIFICATION_DAYS = 7        # ежедневно столько дней после просрочки
+
+# Категории событий (колонка employee_events.category)
+class EventCategory(Enum):
+    MEDICAL = "medical"                  # медосмотры
+    TRAINING = "training"                # обучение и инструктажи
+    KNOWLEDGE_CHECK = "knowledge_check"  # проверки знаний и аттестации
+    OTHER = "other"                      # остальные события
+
+# Правила классификации: подстроки типа события в нижнем регистре.
+# Проверяются по порядку, первая совпавшая категория побеждает
+EVENT_CATEGORY_RULES = [
+    (EventCategory.MEDICAL, ('медосмотр', 'медицинск', 'медкомисс')),
+    (EventCategory.TRAINING, ('инструктаж', 'обучени')),
+    (EventCategory.KNOWLEDGE_CHECK, ('проверка знаний', 'аттестац')),
+]
+
 # Доступные должности
 AVAILABLE_POSITIONS = [
     "Плотник",
@@ -19,9 +19,16 @@ class BotConfig:
     
     # База данных
     DB_PATH = os.getenv('DB_PATH', 'periodic_events.db')
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))  # Максимум соединений в пуле
+    DB_POOL_TIMEOUT = 30.0         # Ожидание свободного соединения (сек)
+    CHAT_SETTINGS_CACHE_SIZE = int(os.getenv('CHAT_SETTINGS_CACHE_SIZE', 10000))  # Настроек чатов в памяти
     
     # Безопасность
     SECRET_KEY = os.getenv('SECRET_KEY')
+    NAME_CACHE_SIZE = int(os.getenv('NAME_CACHE_SIZE', 2000))  # Кэш расшифрованных ФИО
+    # Открытый префикс ФИО в employees.sort_key для сортировки списков по алфавиту.
+    # 0 (по умолчанию) - ФИО не хранится в открытом виде, страницы сортируются после расшифровки
+    NAME_SORT_KEY_LENGTH = int(os.getenv('NAME_SORT_KEY_LENGTH', 0))
     
     # Логирование
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
@@ -32,14 +39,43 @@ class BotConfig:
     DEFAULT_NOTIFICATION_DAYS = 90  # Первое уведомление за 90 дней
     NOTIFICATION_TIME_HOUR = 9      # Время отправки уведомлений (UTC)
     BACKUP_TIME_HOUR = 3           # Время резервного копирования (UTC)
+    # Резерв записи журнала уведомлений ('pending') старше этого считается брошенным
+    # (сбой между резервированием и отметкой доставки) и резервируется заново
+    NOTIFICATION_CLAIM_TIMEOUT = int(os.getenv('NOTIFICATION_CLAIM_TIMEOUT', 900))  # Секунды
+    
+    # Рассылка (лимиты Telegram: ~30 сообщений/сек всего, 1/сек в чат, 20/мин в группу)
+    SEND_CONCURRENCY = int(os.getenv('SEND_CONCURRENCY', 8))  # Чатов, обрабатываемых параллельно
+    SEND_GLOBAL_RATE = float(os.getenv('SEND_GLOBAL_RATE', 25))  # Сообщений в секунду всего
+    SEND_PRIVATE_CHAT_RATE = 1.0   # Сообщений в секунду в личный чат
+    SEND_GROUP_CHAT_RATE = 20 / 60  # Сообщений в секунду в группу
+    SEND_MAX_RETRIES = 3           # Повторы при сетевых ошибках и flood control
+    SEND_CHAT_BUCKETS_SIZE = int(os.getenv('SEND_CHAT_BUCKETS_SIZE', 1000))  # Лимитов скорости чатов в памяти
+    
+    # Аналитика
+    ANALYTICS_SNAPSHOT_TTL = int(os.getenv('ANALYTICS_SNAPSHOT_TTL', 600))  # Предельный возраст снимка событий чата (сек)
+    ANALYTICS_SNAPSHOT_CACHE_SIZE = int(os.getenv('ANALYTICS_SNAPSHOT_CACHE_SIZE', 50))  # Снимков событий чатов в памяти
+    SCREEN_CACHE_SIZE = int(os.getenv('SCREEN_CACHE_SIZE', 1000))  # Готовых экранов дашборда, аналитики и отчетов
+    
+    # Экспорт
+    EXPORT_BATCH_SIZE = 500        # Строк, читаемых из курсора за раз
+    EXPORT_SPOOL_MAX_SIZE = 1024 * 1024  # Файл экспорта в памяти до 1 МБ, затем на диске
+    EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS', 2))  # Процессов для экспорта и отчетов
+    EXPORT_JOBS_PER_CHAT = 1       # Одновременных экспортов в одном чате
+    EXPORT_PROGRESS_INTERVAL = 2.0  # Период обновления сообщения о прогрессе (сек)
+    EXPORT_FILE_CACHE_SIZE = 500   # file_id отправленных файлов экспорта
     
     # Пагинация
     EMPLOYEES_PER_PAGE = 10
     SEARCH_RESULTS_LIMIT = 10
+    SEARCH_SESSION_SIZE = int(os.getenv('SEARCH_SESSION_SIZE', 500))  # Сессий текстового поиска в памяти
+    SEARCH_SESSION_TTL = int(os.getenv('SEARCH_SESSION_TTL', 1800))  # Время жизни сессии поиска (сек)
     
     # Telegram API
     POLLING_INTERVAL = 2.0
     TIMEOUT = 20
+    HTTP_POOL_SIZE = SEND_CONCURRENCY + 4  # Соединения для рассылки и обработки апдейтов
+    CALLBACK_STASH_SIZE = int(os.getenv('CALLBACK_STASH_SIZE', 5000))  # Длинных значений callback_data в памяти
+    CALLBACK_INLINE_BYTES = 24  # Строки длиннее передаются через хранилище
     
     @classmethod
     def get_timezone(cls):
@@ -0,0 +1,374 @@
+"""
+Компактный формат callback_data инлайн кнопок
+
+Формат версии 1: "1" + код действия, затем поля через "|" в порядке схемы:
+    create_callback_data("emp_page", page=2, c=-1500)  ->  "1ep|2|-15o"
+Целые числа записываются в base36, пустые поля в конце отбрасываются.
+Строки длиннее CALLBACK_INLINE_BYTES байт (а также содержащие разделитель)
+хранятся на сервере, а в кнопку попадает короткий токен "~xxxxxxxx".
+Действия вне схемы кодируются прежним JSON; старые JSON-кнопки в чатах
+по-прежнему распознаются.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config.settings import BotConfig
+
+logger = logging.getLogger(__name__)
+
+CALLBACK_VERSION = "1"
+SEP = "|"
+STASH_PREFIX = "~"
+
+# Поля, передаваемые целыми числами
+INT_FIELDS = frozenset({'id', 'page', 'p', 'c', 'days', 'event_id', 'emp_id', 'position_index', 'pos_index'})
+
+# Действие -> (код, поля в порядке записи)
+CALLBACK_SCHEMA: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    # Навигация
+    'menu': ('m', ()),
+    'help': ('h', ()),
+    'settings': ('c', ()),
+    'my_events': ('v', ()),
+    'all_events': ('w', ()),
+
+    # Сотрудники
+    'add_employee': ('ea', ()),
+    'list_employees': ('el', ()),
+    'select_employee': ('es', ('id',)),
+    'emp_page': ('ep', ('page', 'c')),
+    'edit_employee': ('ee', ('id',)),
+    'edit_name': ('en', ('id',)),
+    'edit_position': ('eo', ('id',)),
+    'save_position': ('eq', ('id', 'pos_index')),
+    'delete_employee': ('ed', ('id',)),
+    'confirm_delete': ('ec', ('id',)),
+    'add_event': ('ev', ('id',)),
+    'add_event_to_employee': ('ew', ('id',)),
+    'select_position': ('ei', ('position_index',)),
+    'cancel_add_employee': ('ex', ()),
+
+    # Поиск
+    'search_menu': ('s', ()),
+    'search_filter': ('sf', ('status', 'c', 'page')),
+    'search_employees': ('se', ('page',)),
+    'employee_events': ('sv', ('id',)),
+    'search_by_type': ('st', ()),
+    'search_event_type': ('sy', ('type', 'c', 'page')),
+    'export_search': ('sx', ('status',)),
+    'text_search_start': ('ts', ()),
+    'quick_text_search': ('tq', ('q',)),
+    'text_search_page': ('tp', ('q', 'p', 's')),
+    'text_search_filters': ('tf', ('q',)),
+    'text_search_advanced': ('ta', ()),
+
+    # Дашборд
+    'dashboard': ('d', ()),
+    'dashboard_analytics': ('da', ()),
+    'dashboard_employees': ('de', ('page',)),
+    'dashboard_performance': ('dp', ()),
+    'dashboard_alerts': ('dl', ()),
+    'dashboard_timeline': ('dt', ()),
+    'dashboard_yearly': ('dy', ()),
+    'dashboard_trends': ('dr', ()),
+    'dashboard_problem_analysis': ('dq', ()),
+    'dashboard_positions': ('dn', ()),
+    'dashboard_history': ('dh', ()),
+    'dashboard_forecast': ('df', ()),
+    'dashboard_export': ('dx', ()),
+    'dashboard_events': ('dv', ()),
+    'dashboard_emp_details': ('dm', ()),
+    'dashboard_detailed_stats': ('ds', ()),
+    'dashboard_detailed': ('dd', ()),
+    'dashboard_action_plan': ('dc', ()),
+
+    # Аналитика и прогнозы
+    'analytics_menu': ('a', ()),
+    'analytics_trends': ('at', ()),
+    'analytics_timeline': ('ai', ()),
+    'analytics_forecast': ('af', ()),
+    'analytics_efficiency': ('ae', ()),
+    'analytics_summary': ('as', ()),
+    'analytics_export_excel': ('ax', ()),
+    'analytics_monthly_chart': ('am', ()),
+    'analytics_weekly_chart': ('aw', ()),
+    'analytics_daily_chart': ('ad', ()),
+    'analytics_efficiency_history': ('ah', ()),
+    'analytics_detailed_trends': ('ar', ()),
+    'analytics_detailed_forecast': ('ap', ()),
+    'advanced_workload_forecast': ('fa', ()),
+    'forecast_short': ('fs', ()),
+    'forecast_medium': ('fm', ()),
+    'forecast_long': ('fl', ()),
+    'forecast_chart_short': ('gs', ()),
+    'forecast_chart_medium': ('gm', ()),
+    'forecast_chart_long': ('gl', ()),
+
+    # Отчеты
+    'reports_menu': ('r', ()),
+    'reports_settings': ('rs', ()),
+    'request_report': ('rq', ()),
+    'reports_history': ('rh', ()),
+    'test_report': ('rt', ()),
+    'generate_daily': ('rd', ()),
+    'generate_weekly': ('rw', ()),
+    'generate_monthly': ('rm', ()),
+    'generate_full': ('rf', ()),
+    'toggle_daily_reports': ('rD', ()),
+    'toggle_weekly_reports': ('rW', ()),
+    'toggle_monthly_reports': ('rM', ()),
+    'set_report_time': ('rT', ()),
+
+    # Настройки
+    'set_notif_days': ('cn', ()),
+    'set_timezone': ('cz', ()),
+    'save_notif_days': ('cN', ('days',)),
+    'save_timezone': ('cZ', ('tz',)),
+
+    # Экспорт
+    'export_menu': ('xm', ()),
+    'export': ('x', ('format',)),
+    'cancel_export': ('xc', ('job',)),
+
+    # Шаблоны
+    'templates': ('p', ()),
+    'select_template': ('ps', ('key',)),
+    'apply_template': ('pa', ('emp_id',)),
+
+    # Уведомления
+    'mark_completed': ('nc', ('event_id',)),
+    'reschedule': ('nr', ('event_id',)),
+    'contact_employee': ('nt', ('emp_id',)),
+}
+
+# Код -> (действие, поля)
+ACTIONS_BY_CODE: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    code: (action, fields) for action, (code, fields) in CALLBACK_SCHEMA.items()
+}
+if len(ACTIONS_BY_CODE) != len(CALLBACK_SCHEMA):
+    raise ValueError("Коды действий callback_data должны быть уникальны")
+
+_BASE36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+class CallbackStash:
+    """
+    Ограниченное LRU-хранилище длинных строк из callback_data.
+
+    Токен - хэш значения, поэтому одинаковые кнопки получают одинаковый токен
+    и не занимают место повторно. Хранилище живет в памяти процесса: после
+    перезапуска бота кнопки с токенами теряют значение (обработчики сообщают,
+    что параметры не найдены).
+    """
+
+    def __init__(self, max_size: int = None):
+        self.max_size = max_size or BotConfig.CALLBACK_STASH_SIZE
+        self._values: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_token(value: str) -> str:
+        """Возвращает токен значения: 6 байт blake2b в base64url (8 символов)"""
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=6).digest()
+        return base64.urlsafe_b64encode(digest).decode('ascii')
+
+    def put(self, value: str) -> str:
+        """
+        Сохраняет значение
+
+        Args:
+            value: Строка для кнопки
+
+        Returns:
+            Токен для callback_data
+        """
+        token = self.make_token(value)
+        with self._lock:
+            self._values[token] = value
+            self._values.move_to_end(token)
+            while len(self._values) > self.max_size:
+                self._values.popitem(last=False)
+                self.evictions += 1
+        return token
+
+    def get(self, token: str) -> Optional[str]:
+        """Возвращает значение по токену или None"""
+        with self._lock:
+            value = self._values.get(token)
+            if value is None:
+                self.misses += 1
+                return None
+            self._values.move_to_end(token)
+            self.hits += 1
+            return value
+
+    def stats(self) -> Dict:
+        """Возвращает счетчики попаданий и промахов"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._values),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0.0,
+            }
+
+# Общее хранилище длинных значений кнопок
+callback_stash = CallbackStash()
+
+def _to_base36(number: int) -> str:
+    if number < 0:
+        return '-' + _to_base36(-number)
+    digits = ''
+    while True:
+        number, remainder = divmod(number, 36)
+        digits = _BASE36[remainder] + digits
+        if not number:
+            return digits
+
+def _encode_field(name: str, value: Any) -> Optional[str]:
+    """Кодирует значение поля; None - значение не помещается в компактный формат"""
+    if value is None:
+        return ''
+    if name in INT_FIELDS:
+        if type(value) is not int:
+            return None
+        return _to_base36(value)
+    if not isinstance(value, str):
+        return None
+    if (SEP in value or value.startswith(STASH_PREFIX)
+            or len(value.encode('utf-8')) > BotConfig.CALLBACK_INLINE_BYTES):
+        return STASH_PREFIX + callback_stash.put(value)
+    return value
+
+def _encode_json(action: str, kwargs: Dict[str, Any]) -> str:
+    """Прежний формат: JSON с полем action"""
+    data = {"action": action}
+    data.update(kwargs)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+def encode_callback(action: str, **kwargs) -> str:
+    """
+    Кодирует действие и параметры кнопки
+
+    Args:
+        action: Действие
+        **kwargs: Параметры из схемы действия
+
+    Returns:
+        Строка callback_data; JSON для действий и полей вне схемы
+    """
+    entry = CALLBACK_SCHEMA.get(action)
+    if entry is None or not set(kwargs) <= set(entry[1]):
+        return _encode_json(action, kwargs)
+
+    code, fields = entry
+    parts = [CALLBACK_VERSION + code]
+    for name in fields:
+        encoded = _encode_field(name, kwargs.get(name))
+        if encoded is None:
+            return _encode_json(action, kwargs)
+        parts.append(encoded)
+    while len(parts) > 1 and not parts[-1]:
+        parts.pop()
+    return SEP.join(parts)
+
+def decode_callback(data: str) -> Dict[str, Any]:
+    """
+    Декодирует callback_data
+
+    Args:
+        data: Строка из кнопки (компактная или JSON)
+
+    Returns:
+        Словарь {'action': ..., поля...}; пустые поля не включаются
+    """
+    if not isinstance(data, str) or not data:
+        logger.error(f"Error parsing callback data: {data!r}")
+        return {}
+    if data[0] == '{':
+        try:
+            return json.loads(data)
+        except json.JSONDecodeError as e:
+            logger.error(f"Error parsing callback data: {e}")
+            return {}
+    if data[0] != CALLBACK_VERSION:
+        logger.error(f"Unknown callback data version: {data!r}")
+        return {}
+
+    parts = data[1:].split(SEP)
+    entry = ACTIONS_BY_CODE.get(parts[0])
+    if entry is None:
+        logger.error(f"Unknown callback action code: {data!r}")
+        return {}
+
+    action, fields = entry
+    result: Dict[str, Any] = {'action': action}
+    try:
+        for name, value in zip(fields, parts[1:]):
+            if not value:
+                continue
+            if value.startswith(STASH_PREFIX):
+                stashed = callback_stash.get(value[1:])
+                if stashed is None:
+                    logger.warning(f"Callback value expired: {action}.{name}")
+                    continue
+                result[name] = stashed
+            elif name in INT_FIELDS:
+                result[name] = int(value, 36)
+            else:
+                result[name] = value
+    except ValueError as e:
+        logger.error(f"Error parsing callback data: {e}")
+        return {}
+    return result
+
+def callback_code(data: str) -> Optional[str]:
+    """
+    Возвращает код действия без разбора полей
+
+    Args:
+        data: Строка callback_data
+
+    Returns:
+        Код действия или None
+    """
+    if not isinstance(data, str) or not data:
+        return None
+    if data[0] == CALLBACK_VERSION:
+        end = data.find(SEP)
+        return data[1:end] if end != -1 else data[1:]
+    if data[0] == '{':
+        entry = CALLBACK_SCHEMA.get(decode_callback(data).get('action'))
+        return entry[0] if entry else None
+    return None
+
+def callback_action(data: str) -> Optional[str]:
+    """Возвращает имя действия кнопки или None"""
+    if isinstance(data, str) and data[:1] == '{':
+        return decode_callback(data).get('action')
+    entry = ACTIONS_BY_CODE.get(callback_code(data))
+    return entry[0] if entry else None
+
+def callback_pattern(*actions: str) -> Callable[[str], bool]:
+    """
+    Фильтр для CallbackQueryHandler(pattern=...) по именам действий
+
+    Args:
+        *actions: Действия из схемы
+
+    Returns:
+        Функция, проверяющая callback_data по коду действия
+    """
+    codes = frozenset(CALLBACK_SCHEMA[action][0] for action in actions)
+    return lambda data: callback_code(data) in codes
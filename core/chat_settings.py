@@ -0,0 +1,206 @@
+"""
+Реестр настроек чатов: администратор, часовой пояс, дни уведомлений и настройки отчетов
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from config.settings import BotConfig
+
+logger = logging.getLogger(__name__)
+
+# Настройки отчетов, создаваемые при первом обращении
+DEFAULT_REPORT_SETTINGS = {
+    'daily_enabled': True,
+    'weekly_enabled': True,
+    'monthly_enabled': True,
+    'daily_time': '09:00',
+    'weekly_day': 1,  # Понедельник
+    'monthly_day': 1  # Первое число
+}
+
+@dataclass(frozen=True)
+class ChatSettings:
+    """Настройки чата из таблицы chat_settings"""
+    chat_id: int
+    admin_id: int
+    timezone: str
+    notification_days: int
+
+class ChatSettingsRegistry:
+    """
+    Настройки чатов в памяти процесса, загружаемые при первом обращении.
+
+    Проверка прав и чтение настроек после загрузки - поиск в словаре.
+    Словари ограничены LRU: сообщения из множества незнакомых чатов
+    (их отсутствие настроек тоже запоминается) не растят память процесса.
+    Обработчики используют get_async/is_admin_async: при первом обращении
+    к чату настройки читаются в пуле потоков базы, а не в цикле событий.
+    Код, изменяющий chat_settings или report_settings, вызывает invalidate().
+    """
+
+    def __init__(self, db_manager, max_size: int = None):
+        self.db = db_manager
+        self.max_size = max_size or BotConfig.CHAT_SETTINGS_CACHE_SIZE
+        self._settings: "OrderedDict[int, Optional[ChatSettings]]" = OrderedDict()
+        self._report_settings: "OrderedDict[int, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0  # Растет при сбросе: загрузка, начатая до сброса, не сохраняется
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def _cached(self, cache: OrderedDict, chat_id: int) -> bool:
+        """Проверяет наличие чата в кэше и отмечает использование (под блокировкой)"""
+        if chat_id not in cache:
+            return False
+        cache.move_to_end(chat_id)
+        self.hits += 1
+        return True
+
+    def _remember(self, cache: OrderedDict, chat_id: int, value):
+        """Сохраняет значение, вытесняя давно не использованные чаты (под блокировкой)"""
+        cache[chat_id] = value
+        cache.move_to_end(chat_id)
+        while len(cache) > self.max_size:
+            cache.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, chat_id: int) -> Optional[ChatSettings]:
+        """
+        Возвращает настройки чата
+
+        Args:
+            chat_id: ID чата
+
+        Returns:
+            Настройки или None, если чат еще не инициализирован командой /start
+        """
+        with self._lock:
+            if self._cached(self._settings, chat_id):
+                return self._settings[chat_id]
+            generation = self._generation
+
+        row = self.db.execute_with_retry('''
+            SELECT chat_id, admin_id, timezone, notification_days
+            FROM chat_settings WHERE chat_id = ?
+        ''', (chat_id,), fetch="one")
+        settings = None
+        if row:
+            settings = ChatSettings(
+                chat_id=row['chat_id'],
+                admin_id=row['admin_id'],
+                timezone=row['timezone'] or BotConfig.DEFAULT_TIMEZONE,
+                notification_days=row['notification_days'] or BotConfig.DEFAULT_NOTIFICATION_DAYS
+            )
+
+        with self._lock:
+            if generation == self._generation:
+                self._remember(self._settings, chat_id, settings)
+            self.loads += 1
+        return settings
+
+    async def get_async(self, chat_id: int) -> Optional[ChatSettings]:
+        """
+        Асинхронно возвращает настройки чата; при промахе загружает их в пуле потоков базы
+
+        Args:
+            chat_id: ID чата
+
+        Returns:
+            Настройки или None, если чат еще не инициализирован командой /start
+        """
+        with self._lock:
+            if self._cached(self._settings, chat_id):
+                return self._settings[chat_id]
+        return await self.db.run_sync(self.get, chat_id)
+
+    def is_admin(self, chat_id: int, user_id: int) -> bool:
+        """
+        Проверяет, является ли пользователь администратором чата
+
+        Args:
+            chat_id: ID чата
+            user_id: ID пользователя
+
+        Returns:
+            True если пользователь администратор
+        """
+        settings = self.get(chat_id)
+        return settings is not None and settings.admin_id == user_id
+
+    async def is_admin_async(self, chat_id: int, user_id: int) -> bool:
+        """Асинхронная проверка прав администратора (см. get_async)"""
+        settings = await self.get_async(chat_id)
+        return settings is not None and settings.admin_id == user_id
+
+    def get_report_settings(self, chat_id: int) -> Dict:
+        """
+        Возвращает настройки отчетов чата, создавая настройки по умолчанию
+
+        Args:
+            chat_id: ID чата
+
+        Returns:
+            Копия словаря настроек отчетов
+        """
+        with self._lock:
+            if self._cached(self._report_settings, chat_id):
+                return dict(self._report_settings[chat_id])
+            generation = self._generation
+
+        row = self.db.execute_with_retry('''
+            SELECT * FROM report_settings WHERE chat_id = ?
+        ''', (chat_id,), fetch="one")
+
+        if row:
+            settings = dict(row)
+        else:
+            settings = dict(DEFAULT_REPORT_SETTINGS, chat_id=chat_id)
+            self.db.execute_with_retry('''
+                INSERT OR REPLACE INTO report_settings
+                (chat_id, daily_enabled, weekly_enabled, monthly_enabled,
+                 daily_time, weekly_day, monthly_day)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                chat_id, settings['daily_enabled'],
+                settings['weekly_enabled'], settings['monthly_enabled'],
+                settings['daily_time'], settings['weekly_day'],
+                settings['monthly_day']
+            ))
+
+        with self._lock:
+            if generation == self._generation:
+                self._remember(self._report_settings, chat_id, settings)
+            self.loads += 1
+        return dict(settings)
+
+    def invalidate(self, chat_id: int = None):
+        """
+        Сбрасывает настройки чата (или всех чатов) после их изменения
+
+        Args:
+            chat_id: ID чата; None - сбросить все
+        """
+        with self._lock:
+            self._generation += 1
+            if chat_id is None:
+                self._settings.clear()
+                self._report_settings.clear()
+            else:
+                self._settings.pop(chat_id, None)
+                self._report_settings.pop(chat_id, None)
+
+    def stats(self) -> Dict:
+        """Возвращает число чатов в реестре, попаданий, загрузок и вытеснений"""
+        with self._lock:
+            return {
+                'chats': len(self._settings),
+                'report_settings': len(self._report_settings),
+                'hits': self.hits,
+                'loads': self.loads,
+                'evictions': self.evictions,
+            }
@@ -2,24 +2,143 @@
 Менеджер базы данных для Telegram бота управления периодическими событиями
 """
 
+import asyncio
+import functools
 import sqlite3
 import time
-import shutil
 import os
 import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+import pytz
+from config.constants import CRITICAL_NOTIFICATION_DAYS, NOTIFICATION_KEY_DAYS, OVERDUE_NOTIFICATION_DAYS
 from config.settings import BotConfig
+from core.chat_settings import ChatSettingsRegistry
+from core.event_categories import classify_event_type
+from core.security import decrypt_data, name_index_tokens, name_sort_key
+from core.singleflight import run_single_flight, single_flight_key
 
 logger = logging.getLogger(__name__)
 
+# Счетчики chat_event_stats по срокам: колонка -> условие на {d},
+# число дней от stats_date (локальной даты чата) до события
+_STATS_BUCKETS = {
+    'overdue': '{d} < 0',
+    'due_today': '{d} = 0',
+    'due_tomorrow': '{d} = 1',
+    'critical': '{d} BETWEEN 0 AND 3',
+    'urgent': '{d} BETWEEN 4 AND 7',
+    'upcoming': '{d} BETWEEN 8 AND 30',
+    'planned': '{d} > 30',
+}
+
+def _stats_delta_sql(date_expr: str, sign: str) -> str:
+    """SET-часть UPDATE, добавляющая (sign='+') или вычитающая (sign='-') одно событие из счетчиков"""
+    d = f"CAST(julianday({date_expr}) - julianday(stats_date) AS INTEGER)"
+    assignments = [f"total_events = total_events {sign} 1",
+                   f"overdue_days = overdue_days {sign} (CASE WHEN {d} < 0 THEN -{d} ELSE 0 END)"]
+    assignments += [f"{column} = {column} {sign} ({condition.format(d=d)})"
+                    for column, condition in _STATS_BUCKETS.items()]
+    return ",\n".join(assignments)
+
+def _next_send_sql(date_expr: str, from_expr: str) -> str:
+    """
+    Первый день рассылки уведомления о событии с датой date_expr, не раньше from_expr
+
+    Однократные уведомления за NOTIFICATION_KEY_DAYS дней, затем ежедневные - от
+    CRITICAL_NOTIFICATION_DAYS дней до события до OVERDUE_NOTIFICATION_DAYS дней
+    просрочки. NULL - уведомлений о событии больше не будет.
+    """
+    key_days = sorted((days for days in NOTIFICATION_KEY_DAYS if days > CRITICAL_NOTIFICATION_DAYS), reverse=True)
+    whens = [
+        f"WHEN {from_expr} <= date({date_expr}, '-{days} days') THEN date({date_expr}, '-{days} days')"
+        for days in key_days
+    ]
+    whens.append(
+        f"WHEN {from_expr} <= date({date_expr}, '+{OVERDUE_NOTIFICATION_DAYS} days') "
+        f"THEN max({from_expr}, date({date_expr}, '-{CRITICAL_NOTIFICATION_DAYS} days'))"
+    )
+    return f"CASE {' '.join(whens)} END"
+
+# Триггеры версии данных чата: (имя, событие и таблица, выражения chat_id затронутых чатов)
+_employee_chat = "(SELECT chat_id FROM employees WHERE id = {row}.employee_id)"
+_DATA_VERSION_TRIGGERS = [
+    ('employees_insert', 'INSERT ON employees', ['NEW.chat_id']),
+    ('employees_update', 'UPDATE OF full_name, position, user_id, is_active, chat_id ON employees',
+     ['NEW.chat_id', 'OLD.chat_id']),
+    ('employees_delete', 'DELETE ON employees', ['OLD.chat_id']),
+    ('events_insert', 'INSERT ON employee_events', [_employee_chat.format(row='NEW')]),
+    # Категория выводится из типа события - ее заполнение не меняет данные чата
+    ('events_update',
+     'UPDATE OF employee_id, event_type, last_event_date, interval_days, next_notification_date ON employee_events',
+     [_employee_chat.format(row='NEW'), _employee_chat.format(row='OLD')]),
+    ('events_delete', 'DELETE ON employee_events', [_employee_chat.format(row='OLD')]),
+    ('settings_insert', 'INSERT ON chat_settings', ['NEW.chat_id']),
+    ('settings_update', 'UPDATE ON chat_settings', ['NEW.chat_id']),
+    ('report_settings_insert', 'INSERT ON report_settings', ['NEW.chat_id']),
+    ('report_settings_update', 'UPDATE ON report_settings', ['NEW.chat_id']),
+    ('templates_insert', 'INSERT ON custom_templates', ['NEW.chat_id']),
+    ('templates_update', 'UPDATE ON custom_templates', ['NEW.chat_id']),
+    ('templates_delete', 'DELETE ON custom_templates', ['OLD.chat_id']),
+]
+
+# Полнотекстовые индексы FTS5 с внешним содержимым: (индекс, таблица, колонка)
+_FTS_INDEXES = [
+    ('event_type_fts', 'employee_events', 'event_type'),
+    ('position_fts', 'employees', 'position'),
+]
+
+def _data_version_bump_sql(chat_exprs: List[str]) -> str:
+    """Тело триггера: увеличивает версию каждого затронутого чата один раз"""
+    chats = " UNION ".join(f"SELECT {expr} AS chat_id" for expr in chat_exprs)
+    return f'''
+        INSERT INTO chat_data_versions (chat_id, version)
+        SELECT chat_id, 1 FROM ({chats}) WHERE chat_id IS NOT NULL
+        ON CONFLICT(chat_id) DO UPDATE SET version = version + 1;
+    '''
+
 class DatabaseManager:
     """Менеджер базы данных с поддержкой retry и резервного копирования"""
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, max_connections: int = None, read_only: bool = False):
+        """
+        Args:
+            db_path: Путь к базе данных (по умолчанию BotConfig.DB_PATH)
+            max_connections: Размер пула соединений (по умолчанию BotConfig.DB_POOL_SIZE)
+            read_only: Только чтение существующей базы (процессы пула экспорта):
+                без миграций init_db, соединения открываются с mode=ro
+        """
         self.db_path = db_path or BotConfig.DB_PATH
-        self.connection_pool = []
-        self.max_connections = 10
-        self.init_db()
+        self.read_only = read_only
+        self.max_connections = max_connections or BotConfig.DB_POOL_SIZE
+        self.pool_timeout = BotConfig.DB_POOL_TIMEOUT
+        # Свободные соединения (LIFO - самое "теплое" соединение берется первым)
+        self.connection_pool = queue.LifoQueue(maxsize=self.max_connections)
+        self._pool_lock = threading.Lock()
+        self._created_connections = 0
+        self._pool_stats = {
+            'checkouts': 0,
+            'hits': 0,
+            'misses': 0,
+            'waits': 0,
+            'total_wait_time': 0.0,
+            'max_wait_time': 0.0,
+            'health_check_failures': 0,
+        }
+        # Отдельный пул потоков для асинхронного API: запросы не блокируют event loop
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_connections,
+            thread_name_prefix="db-worker"
+        )
+        # Настройки чатов в памяти: проверка прав без запроса к базе
+        self.chat_settings = ChatSettingsRegistry(self)
+        if not read_only:
+            self.init_db()
 
     def init_db(self):
         """Инициализация базы данных с необходимыми таблицами"""
@@ -49,10 +168,15 @@ class DatabaseManager:
                         position TEXT NOT NULL,
                         is_active INTEGER DEFAULT 1,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        sort_key TEXT NOT NULL DEFAULT '',
                         FOREIGN KEY (chat_id) REFERENCES chat_settings(chat_id),
                         UNIQUE(chat_id, full_name)
                     )
                 ''')
+                # Ключ сортировки появился позже - заполняется в _backfill_name_index
+                employee_columns = {row['name'] for row in cursor.execute("PRAGMA table_info(employees)")}
+                if 'sort_key' not in employee_columns:
+                    cursor.execute("ALTER TABLE employees ADD COLUMN sort_key TEXT NOT NULL DEFAULT ''")
 
                 # Таблица событий сотрудников
                 cursor.execute('''
@@ -64,9 +188,19 @@ class DatabaseManager:
                         interval_days INTEGER NOT NULL,
                         next_notification_date DATE NOT NULL,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        category TEXT,
+                        next_send_on DATE,
                         FOREIGN KEY (employee_id) REFERENCES employees(id)
                     )
                 ''')
+                # Категория события появилась позже - заполняется в backfill_event_categories
+                event_columns = {row['name'] for row in cursor.execute("PRAGMA table_info(employee_events)")}
+                if 'category' not in event_columns:
+                    cursor.execute('ALTER TABLE employee_events ADD COLUMN category TEXT')
+                # День следующей рассылки появился позже - заполняется после создания триггеров
+                schedule_missing = 'next_send_on' not in event_columns
+                if schedule_missing:
+                    cursor.execute('ALTER TABLE employee_events ADD COLUMN next_send_on DATE')
 
                 # История уведомлений
                 cursor.execute('''
@@ -76,9 +210,19 @@ class DatabaseManager:
                         notification_type TEXT NOT NULL,
                         sent_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         status TEXT DEFAULT 'sent',
+                        sent_on DATE,
+                        recipient TEXT NOT NULL DEFAULT 'admin',
                         FOREIGN KEY (event_id) REFERENCES employee_events(id)
                     )
                 ''')
+                # Журнал создан до появления колонки дня отправки
+                history_columns = {row['name'] for row in cursor.execute("PRAGMA table_info(notification_history)")}
+                if 'sent_on' not in history_columns:
+                    cursor.execute('ALTER TABLE notification_history ADD COLUMN sent_on DATE')
+                # Доставка отмечается отдельно для администратора и сотрудника;
+                # прежние записи относились к сообщению администратора
+                if 'recipient' not in history_columns:
+                    cursor.execute("ALTER TABLE notification_history ADD COLUMN recipient TEXT NOT NULL DEFAULT 'admin'")
 
                 # Пользовательские шаблоны
                 cursor.execute('''
@@ -110,13 +254,226 @@ class DatabaseManager:
                     )
                 ''')
 
+                # Слепой индекс для поиска по зашифрованным ФИО
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS employee_name_index (
+                        token TEXT NOT NULL,
+                        employee_id INTEGER NOT NULL,
+                        PRIMARY KEY (token, employee_id)
+                    ) WITHOUT ROWID
+                ''')
+                cursor.execute('''
+                    CREATE TRIGGER IF NOT EXISTS trg_employees_delete_name_index
+                    AFTER DELETE ON employees
+                    BEGIN
+                        DELETE FROM employee_name_index WHERE employee_id = OLD.id;
+                    END
+                ''')
+
+                # Полнотекстовый поиск по типам событий и должностям: слова и их начала
+                # ищутся по индексу без учета регистра (включая кириллицу), bm25 для ранжирования.
+                # Индексы хранят только термы, текст читается из исходных таблиц
+                for fts, table, column in _FTS_INDEXES:
+                    exists = cursor.execute(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,)
+                    ).fetchone()
+                    cursor.execute(f'''
+                        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                            {column}, content='{table}', content_rowid='id',
+                            tokenize='unicode61', prefix='2 3'
+                        )
+                    ''')
+                    cursor.execute(f'''
+                        CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert
+                        AFTER INSERT ON {table}
+                        BEGIN
+                            INSERT INTO {fts}(rowid, {column}) VALUES (NEW.id, NEW.{column});
+                        END
+                    ''')
+                    cursor.execute(f'''
+                        CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete
+                        AFTER DELETE ON {table}
+                        BEGIN
+                            INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', OLD.id, OLD.{column});
+                        END
+                    ''')
+                    cursor.execute(f'''
+                        CREATE TRIGGER IF NOT EXISTS trg_{fts}_update
+                        AFTER UPDATE OF {column} ON {table}
+                        BEGIN
+                            INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', OLD.id, OLD.{column});
+                            INSERT INTO {fts}(rowid, {column}) VALUES (NEW.id, NEW.{column});
+                        END
+                    ''')
+                    if not exists:
+                        # База создана до появления индекса - индексируем имеющиеся строки
+                        cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+                # Материализованные счетчики событий чата по срокам. Триггеры поддерживают их
+                # при изменении событий; редкие изменения сотрудников сбрасывают строку чата,
+                # и она пересчитывается при следующем чтении (см. get_chat_event_stats)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS chat_event_stats (
+                        chat_id INTEGER PRIMARY KEY,
+                        stats_date DATE NOT NULL,
+                        total_employees INTEGER NOT NULL DEFAULT 0,
+                        employees_with_events INTEGER NOT NULL DEFAULT 0,
+                        total_events INTEGER NOT NULL DEFAULT 0,
+                        overdue_days INTEGER NOT NULL DEFAULT 0,
+                        overdue INTEGER NOT NULL DEFAULT 0,
+                        due_today INTEGER NOT NULL DEFAULT 0,
+                        due_tomorrow INTEGER NOT NULL DEFAULT 0,
+                        critical INTEGER NOT NULL DEFAULT 0,
+                        urgent INTEGER NOT NULL DEFAULT 0,
+                        upcoming INTEGER NOT NULL DEFAULT 0,
+                        planned INTEGER NOT NULL DEFAULT 0
+                    )
+                ''')
+                event_chat = "(SELECT chat_id FROM employees WHERE id = {row}.employee_id AND is_active = 1)"
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_events_insert_stats
+                    AFTER INSERT ON employee_events
+                    BEGIN
+                        UPDATE chat_event_stats SET
+                            {_stats_delta_sql('NEW.next_notification_date', '+')},
+                            employees_with_events = employees_with_events
+                                + ((SELECT COUNT(*) FROM employee_events WHERE employee_id = NEW.employee_id) = 1)
+                        WHERE chat_id = {event_chat.format(row='NEW')};
+                    END
+                ''')
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_events_delete_stats
+                    AFTER DELETE ON employee_events
+                    BEGIN
+                        UPDATE chat_event_stats SET
+                            {_stats_delta_sql('OLD.next_notification_date', '-')},
+                            employees_with_events = employees_with_events
+                                - (NOT EXISTS (SELECT 1 FROM employee_events WHERE employee_id = OLD.employee_id))
+                        WHERE chat_id = {event_chat.format(row='OLD')};
+                    END
+                ''')
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_events_update_stats
+                    AFTER UPDATE OF next_notification_date ON employee_events
+                    WHEN OLD.employee_id = NEW.employee_id
+                    BEGIN
+                        UPDATE chat_event_stats SET {_stats_delta_sql('OLD.next_notification_date', '-')}
+                        WHERE chat_id = {event_chat.format(row='OLD')};
+                        UPDATE chat_event_stats SET {_stats_delta_sql('NEW.next_notification_date', '+')}
+                        WHERE chat_id = {event_chat.format(row='NEW')};
+                    END
+                ''')
+                cursor.execute('''
+                    CREATE TRIGGER IF NOT EXISTS trg_events_move_stats
+                    AFTER UPDATE OF employee_id ON employee_events
+                    WHEN OLD.employee_id != NEW.employee_id
+                    BEGIN
+                        DELETE FROM chat_event_stats WHERE chat_id IN (
+                            SELECT chat_id FROM employees WHERE id IN (OLD.employee_id, NEW.employee_id)
+                        );
+                    END
+                ''')
+                cursor.execute('''
+                    CREATE TRIGGER IF NOT EXISTS trg_employees_insert_stats
+                    AFTER INSERT ON employees
+                    WHEN NEW.is_active = 1
+                    BEGIN
+                        UPDATE chat_event_stats SET total_employees = total_employees + 1
+                        WHERE chat_id = NEW.chat_id;
+                    END
+                ''')
+                cursor.execute('''
+                    CREATE TRIGGER IF NOT EXISTS trg_employees_delete_stats
+                    AFTER DELETE ON employees
+                    BEGIN
+                        DELETE FROM chat_event_stats WHERE chat_id = OLD.chat_id;
+                    END
+                ''')
+                cursor.execute('''
+                    CREATE TRIGGER IF NOT EXISTS trg_employees_update_stats
+                    AFTER UPDATE OF is_active, chat_id ON employees
+                    WHEN OLD.is_active IS NOT NEW.is_active OR OLD.chat_id IS NOT NEW.chat_id
+                    BEGIN
+                        DELETE FROM chat_event_stats WHERE chat_id IN (OLD.chat_id, NEW.chat_id);
+                    END
+                ''')
+
+                # День следующей рассылки пересчитывается при изменении даты события.
+                # Отсчет с предыдущего дня: часовой пояс сервера может расходиться с UTC,
+                # а ранний день рассылки задача уведомлений просто перенесет вперед
+                next_send = _next_send_sql('NEW.next_notification_date', "date('now', '-1 day')")
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_events_insert_next_send
+                    AFTER INSERT ON employee_events
+                    BEGIN
+                        UPDATE employee_events SET next_send_on = {next_send} WHERE id = NEW.id;
+                    END
+                ''')
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_events_update_next_send
+                    AFTER UPDATE OF next_notification_date ON employee_events
+                    BEGIN
+                        UPDATE employee_events SET next_send_on = {next_send} WHERE id = NEW.id;
+                    END
+                ''')
+                if schedule_missing:
+                    cursor.execute(f'''
+                        UPDATE employee_events
+                        SET next_send_on = {_next_send_sql('next_notification_date', "date('now', '-1 day')")}
+                    ''')
+
+                # Версия данных чата растет при любой записи в сотрудников, события,
+                # настройки и шаблоны чата. Кэши запоминают версию, с которой посчитаны,
+                # и сравнивают ее с текущей вместо сброса по времени
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS chat_data_versions (
+                        chat_id INTEGER PRIMARY KEY,
+                        version INTEGER NOT NULL DEFAULT 0
+                    )
+                ''')
+                for name, event, chat_exprs in _DATA_VERSION_TRIGGERS:
+                    # Пересоздание обновляет условия триггеров в существующей базе
+                    cursor.execute(f'DROP TRIGGER IF EXISTS trg_{name}_data_version')
+                    cursor.execute(f'''
+                        CREATE TRIGGER trg_{name}_data_version
+                        AFTER {event}
+                        BEGIN
+                            {_data_version_bump_sql(chat_exprs)}
+                        END
+                    ''')
+
                 # Создание индексов для оптимизации
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_employees_chat_id ON employees(chat_id)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_employee_id ON employee_events(employee_id)')
+                # Составные индексы покрывают фильтр по чату и диапазоны дат событий сотрудника;
+                # одиночные индексы по chat_id и employee_id становятся их префиксами
+                cursor.execute('DROP INDEX IF EXISTS idx_employees_chat_id')
+                cursor.execute('DROP INDEX IF EXISTS idx_events_employee_id')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_employees_chat_active ON employees(chat_id, is_active, id)')
+                # Постраничный список сотрудников: поиск по ключу (sort_key, id) вместо OFFSET
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_employees_chat_sort ON employees(chat_id, is_active, sort_key)')
+                # Индекс дат событий сотрудника включает категорию: разбивка по категориям
+                # за период читается из индекса, без обращения к строкам событий
+                cursor.execute('DROP INDEX IF EXISTS idx_events_employee_date')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_events_employee_category
+                    ON employee_events(employee_id, next_notification_date, category)
+                ''')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_notification_date ON employee_events(next_notification_date)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_notification_history_event_id ON notification_history(event_id)')
+                # Выборка задачи уведомлений: события с днем рассылки не позже сегодняшнего
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_next_send ON employee_events(next_send_on)')
+                # Одно уведомление каждого уровня по событию в день каждому получателю;
+                # индекс покрывает проверку в запросе рассылки
+                cursor.execute('DROP INDEX IF EXISTS idx_notification_history_event_id')
+                cursor.execute('DROP INDEX IF EXISTS idx_notification_history_ledger')
+                cursor.execute('''
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_notification_history_delivery
+                    ON notification_history(event_id, sent_on, notification_type, recipient)
+                ''')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_custom_templates_chat_id ON custom_templates(chat_id)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_report_settings_chat_id ON report_settings(chat_id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_name_index_employee_id ON employee_name_index(employee_id)')
+
+                self._backfill_name_index(conn)
+                self.backfill_event_categories(conn=conn)
             
                 conn.commit()
                 logger.info("Database initialized successfully")
@@ -125,15 +482,271 @@ class DatabaseManager:
             logger.error(f"Database initialization error: {e}")
             raise
 
-    def get_connection(self):
-        """Возвращает соединение с автоматическим retry"""
+    def _backfill_name_index(self, conn: sqlite3.Connection):
+        """Строит слепой индекс и ключ сортировки для сотрудников, добавленных до их появления"""
+        if BotConfig.NAME_SORT_KEY_LENGTH > 0:
+            missing_sort_key = "OR sort_key = ''"
+        else:
+            # Префиксы ФИО в открытом виде не хранятся: стираем оставшиеся от прежней настройки
+            missing_sort_key = ""
+            conn.execute("UPDATE employees SET sort_key = '' WHERE sort_key != ''")
+        missing = conn.execute(f'''
+            SELECT id, full_name FROM employees
+            WHERE id NOT IN (SELECT DISTINCT employee_id FROM employee_name_index)
+            {missing_sort_key}
+        ''').fetchall()
+
+        indexed = 0
+        for row in missing:
+            try:
+                self.index_employee_name(conn, row['id'], decrypt_data(row['full_name']))
+                indexed += 1
+            except ValueError:
+                logger.warning(f"Cannot build name index for employee {row['id']}: decryption failed")
+
+        if indexed:
+            logger.info(f"Name index built for {indexed} employees")
+
+    def backfill_event_categories(self, conn: sqlite3.Connection = None, reclassify: bool = False) -> int:
+        """
+        Заполняет категории событий, добавленных до появления колонки category
+
+        Args:
+            conn: Соединение с открытой транзакцией; None - отдельная транзакция
+            reclassify: Пересчитать категории всех событий (после изменения правил)
+
+        Returns:
+            Количество событий с измененной категорией
+        """
+        if conn is None:
+            with self.get_connection() as conn:
+                return self.backfill_event_categories(conn, reclassify)
+
+        where = '' if reclassify else 'WHERE category IS NULL'
+        rows = conn.execute(f'SELECT DISTINCT event_type, category FROM employee_events {where}').fetchall()
+        updated = 0
+        for row in rows:
+            category = classify_event_type(row['event_type'])
+            if category == row['category']:
+                continue
+            updated += conn.execute(
+                'UPDATE employee_events SET category = ? WHERE event_type = ? AND category IS ?',
+                (category, row['event_type'], row['category'])
+            ).rowcount
+
+        if updated:
+            logger.info(f"Event categories assigned for {updated} events")
+        return updated
+
+    @staticmethod
+    def _local_date(timezone_name: str = None) -> str:
+        """Текущая дата (YYYY-MM-DD) в часовом поясе чата"""
+        try:
+            tz = pytz.timezone(timezone_name or BotConfig.DEFAULT_TIMEZONE)
+        except pytz.UnknownTimeZoneError:
+            tz = BotConfig.get_timezone()
+        return datetime.now(tz).date().isoformat()
+
+    @staticmethod
+    def _chat_event_stats_select() -> str:
+        """Запрос полного пересчета строки chat_event_stats (параметры :chat_id, :stats_date)"""
+        d = "CAST(julianday(ee.next_notification_date) - julianday(:stats_date) AS INTEGER)"
+        buckets = ",\n".join(
+            f"COALESCE(SUM({condition.format(d=d)}), 0) AS {column}"
+            for column, condition in _STATS_BUCKETS.items()
+        )
+        return f'''
+            SELECT
+                :chat_id AS chat_id, :stats_date AS stats_date,
+                (SELECT COUNT(*) FROM employees WHERE chat_id = :chat_id AND is_active = 1) AS total_employees,
+                COUNT(DISTINCT ee.employee_id) AS employees_with_events,
+                COUNT(ee.id) AS total_events,
+                COALESCE(SUM(CASE WHEN {d} < 0 THEN -{d} ELSE 0 END), 0) AS overdue_days,
+                {buckets}
+            FROM employee_events ee
+            JOIN employees e ON ee.employee_id = e.id
+            WHERE e.chat_id = :chat_id AND e.is_active = 1
+        '''
+
+    def refresh_chat_event_stats(self, conn: sqlite3.Connection, chat_id: int, stats_date: str):
+        """
+        Полностью пересчитывает счетчики chat_event_stats для чата
+
+        Args:
+            conn: Соединение с открытой транзакцией
+            chat_id: ID чата
+            stats_date: Дата, относительно которой считаются сроки
+        """
+        conn.execute(f'''
+            INSERT OR REPLACE INTO chat_event_stats (
+                chat_id, stats_date, total_employees, employees_with_events,
+                total_events, overdue_days, {', '.join(_STATS_BUCKETS)}
+            )
+            {self._chat_event_stats_select()}
+        ''', {'chat_id': chat_id, 'stats_date': stats_date})
+
+    def get_chat_event_stats(self, chat_id: int) -> Dict[str, int]:
+        """
+        Возвращает счетчики событий чата по срокам
+
+        Счетчики поддерживаются триггерами, поэтому чтение - один поиск по ключу.
+        Если строки нет или она рассчитана за прошедший день, она пересчитывается
+        (в режиме только чтения - без сохранения).
+
+        Args:
+            chat_id: ID чата
+
+        Returns:
+            Словарь со счетчиками chat_event_stats
+        """
+        with self.get_connection() as conn:
+            settings = conn.execute(
+                "SELECT timezone FROM chat_settings WHERE chat_id = ?", (chat_id,)
+            ).fetchone()
+            stats_date = self._local_date(settings['timezone'] if settings else None)
+
+            stats = conn.execute("SELECT * FROM chat_event_stats WHERE chat_id = ?", (chat_id,)).fetchone()
+            if stats is None or stats['stats_date'] != stats_date:
+                if self.read_only:
+                    params = {'chat_id': chat_id, 'stats_date': stats_date}
+                    return dict(conn.execute(self._chat_event_stats_select(), params).fetchone())
+                self.refresh_chat_event_stats(conn, chat_id, stats_date)
+                stats = conn.execute("SELECT * FROM chat_event_stats WHERE chat_id = ?", (chat_id,)).fetchone()
+
+            return dict(stats)
+
+    def get_chat_data_version(self, chat_id: int) -> int:
+        """
+        Возвращает версию данных чата
+
+        Версия увеличивается триггерами при каждом изменении сотрудников,
+        событий, настроек и шаблонов чата. Результат, посчитанный при версии N,
+        актуален, пока текущая версия равна N.
+
+        Args:
+            chat_id: ID чата
+
+        Returns:
+            Номер версии (0, если данные чата еще не менялись)
+        """
+        row = self.execute_with_retry(
+            "SELECT version FROM chat_data_versions WHERE chat_id = ?", (chat_id,), fetch="one"
+        )
+        return row[0] if row else 0
+
+    async def fetch_chat_data_version(self, chat_id: int) -> int:
+        """Асинхронно возвращает версию данных чата"""
+        return await self.run_sync(self.get_chat_data_version, chat_id)
+
+    def get_chat_render_stamp(self, chat_id: int) -> Tuple[int, str]:
+        """
+        Возвращает версию данных и текущую дату чата
+
+        Экран, построенный при той же версии в тот же локальный день,
+        совпадает с построенным заново: сроки и статусы считаются от даты.
+        Смена часового пояса меняет настройки чата, а значит и версию.
+
+        Args:
+            chat_id: ID чата
+
+        Returns:
+            Кортеж (версия данных, дата YYYY-MM-DD в часовом поясе чата)
+        """
+        settings = self.chat_settings.get(chat_id)
+        timezone_name = settings.timezone if settings else None
+        return self.get_chat_data_version(chat_id), self._local_date(timezone_name)
+
+    async def fetch_chat_render_stamp(self, chat_id: int) -> Tuple[int, str]:
+        """Асинхронно возвращает версию данных и текущую дату чата"""
+        return await self.run_sync(self.get_chat_render_stamp, chat_id)
+
+    def roll_forward_chat_event_stats(self) -> int:
+        """
+        Пересчитывает счетчики чатов, у которых наступил новый день по их часовому поясу
+
+        Returns:
+            Количество пересчитанных чатов
+        """
+        rolled = 0
+        with self.get_connection() as conn:
+            rows = conn.execute('''
+                SELECT s.chat_id, s.stats_date, cs.timezone
+                FROM chat_event_stats s
+                LEFT JOIN chat_settings cs ON cs.chat_id = s.chat_id
+            ''').fetchall()
+            for row in rows:
+                stats_date = self._local_date(row['timezone'])
+                if row['stats_date'] != stats_date:
+                    self.refresh_chat_event_stats(conn, row['chat_id'], stats_date)
+                    rolled += 1
+
+        if rolled:
+            logger.info(f"Chat event stats rolled forward for {rolled} chats")
+        return rolled
+
+    def refresh_notification_schedule(self, today: str) -> int:
+        """
+        Переносит прошедшие дни рассылки на первый день рассылки не раньше today
+
+        После переноса у событий, о которых сегодня нужно уведомить, next_send_on
+        равен today; повторные запуски в тот же день ничего не меняют.
+
+        Args:
+            today: Дата рассылки (YYYY-MM-DD)
+
+        Returns:
+            Количество событий с перенесенным днем рассылки
+        """
+        with self.get_connection() as conn:
+            moved = conn.execute(
+                f"UPDATE employee_events SET next_send_on = {_next_send_sql('next_notification_date', ':today')} "
+                "WHERE next_send_on < :today",
+                {'today': today}
+            ).rowcount
+
+        if moved:
+            logger.debug(f"Notification schedule moved forward for {moved} events")
+        return moved
+
+    def index_employee_name(self, conn: sqlite3.Connection, employee_id: int, full_name: str):
+        """
+        Обновляет токены слепого индекса и ключ сортировки для ФИО сотрудника
+
+        Вызывается в той же транзакции, что и вставка или переименование сотрудника.
+        Удаление токенов при удалении сотрудника выполняет триггер.
+
+        Args:
+            conn: Соединение с базой данных
+            employee_id: ID сотрудника
+            full_name: ФИО в открытом виде
+        """
+        conn.execute("DELETE FROM employee_name_index WHERE employee_id = ?", (employee_id,))
+        conn.executemany(
+            "INSERT OR IGNORE INTO employee_name_index (token, employee_id) VALUES (?, ?)",
+            [(token, employee_id) for token in name_index_tokens(full_name)]
+        )
+        conn.execute("UPDATE employees SET sort_key = ? WHERE id = ?", (name_sort_key(full_name), employee_id))
+
+    def _create_connection(self) -> sqlite3.Connection:
+        """
+        Создает новое соединение и однократно применяет PRAGMA настройки
+
+        Returns:
+            Настроенное соединение SQLite
+        """
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                conn = sqlite3.connect(self.db_path, timeout=30.0)
+                if self.read_only:
+                    # Режим WAL хранится в файле базы и уже включен основным процессом
+                    uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+                    conn = sqlite3.connect(uri, uri=True, timeout=30.0, check_same_thread=False)
+                else:
+                    conn = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=False)
                 conn.row_factory = sqlite3.Row
                 # Включаем WAL режим для лучшей производительности
-                conn.execute("PRAGMA journal_mode=WAL")
+                if not self.read_only:
+                    conn.execute("PRAGMA journal_mode=WAL")
                 conn.execute("PRAGMA synchronous=NORMAL")
                 conn.execute("PRAGMA cache_size=10000")
                 return conn
@@ -143,6 +756,137 @@ class DatabaseManager:
                     raise
                 time.sleep(0.1 * (2 ** attempt))  # Exponential backoff
 
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        """Проверка работоспособности соединения перед выдачей из пула"""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard_connection(self, conn: sqlite3.Connection):
+        """Закрывает соединение и освобождает место в пуле"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._pool_lock:
+            self._created_connections -= 1
+
+    def _checkout(self) -> sqlite3.Connection:
+        """
+        Берет соединение из пула, при необходимости создает новое
+        или ожидает освобождения существующего
+
+        Returns:
+            Проверенное соединение SQLite
+        """
+        while True:
+            waited = 0.0
+            try:
+                conn = self.connection_pool.get_nowait()
+                hit = True
+            except queue.Empty:
+                with self._pool_lock:
+                    can_create = self._created_connections < self.max_connections
+                    if can_create:
+                        self._created_connections += 1
+
+                if can_create:
+                    try:
+                        conn = self._create_connection()
+                    except Exception:
+                        with self._pool_lock:
+                            self._created_connections -= 1
+                        raise
+                    hit = False
+                else:
+                    # Пул исчерпан - ждем возврата соединения
+                    wait_start = time.monotonic()
+                    try:
+                        conn = self.connection_pool.get(timeout=self.pool_timeout)
+                    except queue.Empty:
+                        raise sqlite3.OperationalError(
+                            f"Connection pool exhausted ({self.max_connections} connections in use)"
+                        )
+                    waited = time.monotonic() - wait_start
+                    hit = True
+
+            if hit and not self._is_healthy(conn):
+                logger.warning("Discarding unhealthy pooled database connection")
+                with self._pool_lock:
+                    self._pool_stats['health_check_failures'] += 1
+                self._discard_connection(conn)
+                continue
+
+            with self._pool_lock:
+                stats = self._pool_stats
+                stats['checkouts'] += 1
+                stats['hits' if hit else 'misses'] += 1
+                if waited:
+                    stats['waits'] += 1
+                    stats['total_wait_time'] += waited
+                    stats['max_wait_time'] = max(stats['max_wait_time'], waited)
+            return conn
+
+    def _checkin(self, conn: sqlite3.Connection):
+        """Возвращает соединение в пул"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self.connection_pool.put_nowait(conn)
+        except (sqlite3.Error, queue.Full):
+            self._discard_connection(conn)
+
+    @contextmanager
+    def get_connection(self):
+        """
+        Выдает соединение из пула на время блока with
+
+        Фиксирует транзакцию при успешном завершении блока, откатывает
+        при исключении и возвращает соединение в пул.
+        """
+        conn = self._checkout()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._checkin(conn)
+
+    def get_pool_stats(self) -> dict:
+        """
+        Возвращает метрики пула соединений
+
+        Returns:
+            Словарь с размером пула, количеством выдач, hit rate и временем ожидания
+        """
+        with self._pool_lock:
+            stats = dict(self._pool_stats)
+            size = self._created_connections
+        checkouts = stats['checkouts']
+        idle = self.connection_pool.qsize()
+        stats.update({
+            'size': size,
+            'max_size': self.max_connections,
+            'idle': idle,
+            'in_use': size - idle,
+            'hit_rate': round(stats['hits'] / checkouts * 100, 1) if checkouts else 0.0,
+            'avg_wait_time': stats['total_wait_time'] / stats['waits'] if stats['waits'] else 0.0,
+        })
+        return stats
+
+    def close_all(self):
+        """Закрывает все свободные соединения пула"""
+        while True:
+            try:
+                conn = self.connection_pool.get_nowait()
+            except queue.Empty:
+                break
+            self._discard_connection(conn)
+
     def execute_with_retry(self, query: str, params: tuple = (), fetch: str = None):
         """Выполнение запроса с автоматическим retry"""
         max_retries = 3
@@ -172,24 +916,135 @@ class DatabaseManager:
                 logger.error(f"Unexpected database error: {e}")
                 raise
 
+    def iter_batches(self, query: str, params: tuple = (), batch_size: int = None) -> Iterator[List[sqlite3.Row]]:
+        """
+        Читает результат запроса пачками, не загружая его целиком в память
+
+        Соединение удерживается, пока генератор не исчерпан или не закрыт,
+        поэтому вызывать его следует из одного блокирующего прохода
+        (например, функции экспорта в run_sync).
+
+        Args:
+            query: SQL-запрос
+            params: Параметры запроса
+            batch_size: Размер пачки (по умолчанию BotConfig.EXPORT_BATCH_SIZE)
+
+        Yields:
+            Списки строк результата
+        """
+        batch_size = batch_size or BotConfig.EXPORT_BATCH_SIZE
+        with self.get_connection() as conn:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+
+    async def run_sync(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Выполняет синхронную функцию в пуле потоков базы данных
+
+        Args:
+            func: Блокирующая функция (запрос, расчет аналитики и т.п.)
+            *args, **kwargs: Аргументы функции
+
+        Returns:
+            Результат выполнения функции
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        key = single_flight_key(func, args, kwargs)
+        if key is not None:
+            # Одинаковые расчеты объединяются в цикле событий: в пул уходит один вызов,
+            # остальные ждут его результат, не занимая потоки
+            return await run_single_flight(key, lambda: loop.run_in_executor(self._executor, call))
+        return await loop.run_in_executor(self._executor, call)
+
+    async def fetch_one(self, query: str, params: tuple = ()):
+        """Асинхронно возвращает первую строку результата запроса"""
+        return await self.run_sync(self.execute_with_retry, query, params, "one")
+
+    async def fetch_all(self, query: str, params: tuple = ()):
+        """Асинхронно возвращает все строки результата запроса"""
+        return await self.run_sync(self.execute_with_retry, query, params, "all")
+
+    async def execute(self, query: str, params: tuple = ()):
+        """
+        Асинхронно выполняет изменяющий запрос
+
+        Returns:
+            lastrowid для INSERT, иначе None
+        """
+        return await self.run_sync(self.execute_with_retry, query, params)
+
+    async def transaction(self, func: Callable, *args) -> Any:
+        """
+        Выполняет несколько операций в одной транзакции
+
+        Args:
+            func: Функция вида func(conn, *args), выполняемая в потоке базы данных
+            *args: Дополнительные аргументы функции
+
+        Returns:
+            Результат функции; при исключении транзакция откатывается
+        """
+        def run_transaction():
+            with self.get_connection() as conn:
+                return func(conn, *args)
+
+        return await self.run_sync(run_transaction)
+
     def create_backup(self):
-        """Создание резервной копии базы данных"""
+        """
+        Создание резервной копии базы данных
+
+        Копия снимается через SQLite backup API с соединения пула: последние
+        транзакции могут находиться в файле -wal, и копия одного файла базы
+        была бы неполной.
+
+        Returns:
+            Путь к резервной копии или None при ошибке
+        """
         try:
             backup_path = f"{self.db_path}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            shutil.copy2(self.db_path, backup_path)
+            target = sqlite3.connect(backup_path)
+            try:
+                with self.get_connection() as conn:
+                    conn.backup(target)
+            finally:
+                target.close()
             logger.info(f"Backup created: {backup_path}")
 
             # Очистка старых бэкапов (оставляем только 7 последних)
-            backup_pattern = f"{self.db_path}.backup_"
-            backups = [f for f in os.listdir('.') if f.startswith(backup_pattern)]
+            backup_dir = os.path.dirname(os.path.abspath(self.db_path))
+            backup_pattern = f"{os.path.basename(self.db_path)}.backup_"
+            backups = [f for f in os.listdir(backup_dir) if f.startswith(backup_pattern)]
             backups.sort(reverse=True)
 
             for old_backup in backups[7:]:
-                os.remove(old_backup)
+                os.remove(os.path.join(backup_dir, old_backup))
                 logger.info(f"Removed old backup: {old_backup}")
+            return backup_path
 
         except Exception as e:
             logger.error(f"Backup creation failed: {e}")
+            return None
+
+# Глобальный экземпляр менеджера базы данных создается при первом обращении
+# (from core.database import db_manager): процессы пула задач импортируют модуль
+# ради DatabaseManager и не открывают базу по умолчанию и пул потоков
+_db_manager_lock = threading.Lock()
+
+def get_db_manager() -> DatabaseManager:
+    """Возвращает глобальный менеджер базы данных, создавая его при первом вызове"""
+    global db_manager
+    with _db_manager_lock:
+        if 'db_manager' not in globals():
+            db_manager = DatabaseManager()
+        return db_manager
 
-# Глобальный экземпляр менеджера базы данных
-db_manager = DatabaseManager()
\ No newline at end of file
+def __getattr__(name: str):
+    if name == 'db_manager':
+        return get_db_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,260 @@
+"""
+Диспетчер исходящих сообщений с ограничением скорости для Telegram бота
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TimedOut
+
+from config.settings import BotConfig
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Асинхронный токен-бакет: не более rate операций в секунду с запасом capacity"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> float:
+        """
+        Ожидает свободный токен
+
+        Returns:
+            Время ожидания в секундах
+        """
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+    def idle(self) -> bool:
+        """Бакет полон и никто не ждет токен: замена новым не ослабит ограничение"""
+        if self._lock.locked():
+            return False
+        self._refill()
+        return self._tokens >= self.capacity
+
+@dataclass
+class OutgoingMessage:
+    """Сообщение для отправки через диспетчер"""
+    chat_id: int
+    text: str
+    parse_mode: Optional[str] = 'HTML'
+    reply_markup: Any = None
+    tag: Any = None  # Произвольная метка отправителя (например, ID события)
+
+@dataclass
+class DispatchStats:
+    """Статистика одного запуска рассылки"""
+    total: int = 0
+    sent: int = 0
+    failed: int = 0
+    retries: int = 0
+    flood_waits: int = 0
+    rate_limit_wait: float = 0.0
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+    delivered_tags: List[Any] = field(default_factory=list)
+
+    @property
+    def duration(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+
+    def as_dict(self) -> Dict:
+        """Возвращает статистику в виде словаря для логов"""
+        duration = self.duration
+        return {
+            'total': self.total,
+            'sent': self.sent,
+            'failed': self.failed,
+            'retries': self.retries,
+            'flood_waits': self.flood_waits,
+            'rate_limit_wait': round(self.rate_limit_wait, 2),
+            'duration': round(duration, 2),
+            'throughput': round(self.sent / duration, 2) if duration > 0 else float(self.sent),
+        }
+
+class MessageDispatcher:
+    """
+    Параллельная отправка сообщений с учетом лимитов Telegram
+
+    Глобальный токен-бакет ограничивает общий поток сообщений, отдельные
+    бакеты - поток в каждый чат (для групп лимит ниже, чем для личных чатов).
+    Сообщения одного чата отправляются по порядку, разные чаты - параллельно
+    в пределах семафора. Бакеты чатов хранятся в LRU: сверх max_chat_buckets
+    удаляются давно не использованные простаивающие бакеты.
+    """
+
+    def __init__(self, bot, max_concurrency: int = None, global_rate: float = None,
+                 private_chat_rate: float = None, group_chat_rate: float = None,
+                 max_retries: int = None, max_chat_buckets: int = None):
+        self.bot = bot
+        self.max_retries = max_retries if max_retries is not None else BotConfig.SEND_MAX_RETRIES
+        self._semaphore = asyncio.Semaphore(max_concurrency or BotConfig.SEND_CONCURRENCY)
+        self._global_bucket = TokenBucket(global_rate or BotConfig.SEND_GLOBAL_RATE)
+        self._private_rate = private_chat_rate or BotConfig.SEND_PRIVATE_CHAT_RATE
+        self._group_rate = group_chat_rate or BotConfig.SEND_GROUP_CHAT_RATE
+        self.max_chat_buckets = max_chat_buckets or BotConfig.SEND_CHAT_BUCKETS_SIZE
+        self._chat_buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self.bucket_evictions = 0
+        self._paused_until = 0.0
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is not None:
+            self._chat_buckets.move_to_end(chat_id)
+            return bucket
+
+        # Отрицательные ID принадлежат группам и каналам
+        rate = self._group_rate if chat_id < 0 else self._private_rate
+        bucket = self._chat_buckets[chat_id] = TokenBucket(rate, capacity=1)
+        self._evict_idle_buckets(keep=chat_id)
+        return bucket
+
+    def _evict_idle_buckets(self, keep: int):
+        """
+        Удаляет бакеты сверх лимита, начиная с давно использованных
+
+        Занятые бакеты пропускаются, поэтому при всплеске активных чатов
+        их может временно оказаться больше лимита.
+
+        Args:
+            keep: Чат, бакет которого только что выдан
+        """
+        excess = len(self._chat_buckets) - self.max_chat_buckets
+        if excess <= 0:
+            return
+        stale = []
+        for chat_id, bucket in self._chat_buckets.items():
+            if len(stale) == excess:
+                break
+            if chat_id != keep and bucket.idle():
+                stale.append(chat_id)
+        for chat_id in stale:
+            del self._chat_buckets[chat_id]
+        self.bucket_evictions += len(stale)
+
+    async def _wait_flood_pause(self):
+        """Ожидает окончания паузы, объявленной Telegram через RetryAfter"""
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def send_message(self, message: OutgoingMessage, stats: DispatchStats = None) -> bool:
+        """
+        Отправляет одно сообщение с ограничением скорости и повторами
+
+        Args:
+            message: Сообщение для отправки
+            stats: Статистика запуска (создается новая, если не передана)
+
+        Returns:
+            True если сообщение доставлено
+        """
+        stats = stats or DispatchStats(total=1)
+
+        for attempt in range(self.max_retries + 1):
+            await self._wait_flood_pause()
+            stats.rate_limit_wait += await self._chat_bucket(message.chat_id).acquire()
+            stats.rate_limit_wait += await self._global_bucket.acquire()
+
+            try:
+                await self.bot.send_message(
+                    chat_id=message.chat_id,
+                    text=message.text,
+                    parse_mode=message.parse_mode,
+                    reply_markup=message.reply_markup
+                )
+                stats.sent += 1
+                if message.tag is not None:
+                    stats.delivered_tags.append(message.tag)
+                return True
+
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                delay = retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else float(retry_after)
+                logger.warning(f"Flood control for chat {message.chat_id}: waiting {delay}s")
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                stats.flood_waits += 1
+            except (Forbidden, BadRequest) as e:
+                # Бот заблокирован или чат недоступен - повтор не поможет
+                logger.warning(f"Message to chat {message.chat_id} rejected: {e}")
+                break
+            except (TimedOut, NetworkError) as e:
+                logger.warning(f"Network error sending to chat {message.chat_id} (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(min(30.0, 0.5 * (2 ** attempt)))
+            except Exception as e:
+                logger.error(f"Unexpected error sending to chat {message.chat_id}: {e}")
+                break
+
+            if attempt < self.max_retries:
+                stats.retries += 1
+
+        stats.failed += 1
+        return False
+
+    async def _send_chat_queue(self, messages: List[OutgoingMessage], stats: DispatchStats):
+        """Последовательно отправляет сообщения одного чата"""
+        async with self._semaphore:
+            for message in messages:
+                await self.send_message(message, stats)
+
+    async def dispatch(self, messages: List[OutgoingMessage]) -> DispatchStats:
+        """
+        Отправляет пакет сообщений
+
+        Args:
+            messages: Список сообщений
+
+        Returns:
+            Статистика запуска
+        """
+        stats = DispatchStats(total=len(messages))
+
+        queues: Dict[int, List[OutgoingMessage]] = {}
+        for message in messages:
+            queues.setdefault(message.chat_id, []).append(message)
+
+        await asyncio.gather(*(self._send_chat_queue(queue, stats) for queue in queues.values()))
+
+        stats.finished_at = time.monotonic()
+        return stats
+
+def get_dispatcher(context) -> MessageDispatcher:
+    """
+    Возвращает общий диспетчер приложения, чтобы лимиты учитывались
+    для всех задач (уведомления, отчеты) одновременно
+
+    Args:
+        context: Контекст бота
+
+    Returns:
+        Экземпляр MessageDispatcher
+    """
+    bot_data = context.application.bot_data
+    dispatcher = bot_data.get('message_dispatcher')
+    if dispatcher is None:
+        dispatcher = bot_data['message_dispatcher'] = MessageDispatcher(context.bot)
+    return dispatcher
@@ -0,0 +1,67 @@
+"""
+Классификация типов событий по категориям (медосмотр, обучение, проверка знаний).
+
+Категория вычисляется один раз при добавлении события и хранится в
+индексированной колонке employee_events.category, поэтому отчеты группируют
+события по категории вместо сравнения подстрок в каждом агрегате.
+
+Пересчет категорий существующих событий:
+    python -m core.event_categories [--all]
+"""
+
+import logging
+import sys
+
+from config.constants import EVENT_CATEGORY_RULES, EventCategory
+
+logger = logging.getLogger(__name__)
+
+class EventCategoryClassifier:
+    """Классификатор по правилам EVENT_CATEGORY_RULES"""
+
+    def __init__(self, rules=None):
+        self.rules = [
+            (category.value, tuple(marker.lower() for marker in markers))
+            for category, markers in (rules if rules is not None else EVENT_CATEGORY_RULES)
+        ]
+
+    @staticmethod
+    def _normalize(event_type: str) -> str:
+        return ' '.join((event_type or '').lower().split())
+
+    def classify(self, event_type: str) -> str:
+        """
+        Определяет категорию типа события
+
+        Args:
+            event_type: Тип события
+
+        Returns:
+            Значение EventCategory
+        """
+        text = self._normalize(event_type)
+        for category, markers in self.rules:
+            if any(marker in text for marker in markers):
+                return category
+        return EventCategory.OTHER.value
+
+# Общий классификатор
+event_classifier = EventCategoryClassifier()
+
+def classify_event_type(event_type: str) -> str:
+    """Категория типа события по общему классификатору"""
+    return event_classifier.classify(event_type)
+
+def main(argv=None) -> int:
+    """Заполняет категории событий: без категории или, с --all, всех"""
+    argv = sys.argv[1:] if argv is None else argv
+    logging.basicConfig(level=logging.INFO)
+
+    from core.database import db_manager
+
+    updated = db_manager.backfill_event_categories(reclassify='--all' in argv)
+    print(f"Категории обновлены: {updated} событий")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
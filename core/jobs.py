@@ -0,0 +1,231 @@
+"""
+Фоновые задачи в пуле процессов: экспорт и отчеты не занимают event loop бота
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import uuid
+from collections import defaultdict
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from config.settings import BotConfig
+
+logger = logging.getLogger(__name__)
+
+class JobCancelled(Exception):
+    """Задача отменена пользователем"""
+
+class JobLimitExceeded(Exception):
+    """В чате уже выполняется максимум задач"""
+
+class JobControl:
+    """
+    Передается функции задачи первым аргументом: через него задача
+    сообщает прогресс и узнает об отмене. Состояние хранится в словарях
+    multiprocessing.Manager, поэтому объект можно передать в процесс пула.
+    """
+
+    def __init__(self, job_id: str, progress, cancelled):
+        self.job_id = job_id
+        self._progress = progress
+        self._cancelled = cancelled
+        self._last_percent = None
+
+    def check(self):
+        """Прерывает задачу, если пользователь ее отменил"""
+        if self._cancelled.get(self.job_id):
+            raise JobCancelled(self.job_id)
+
+    def report(self, percent: int):
+        """
+        Сообщает процент выполнения и проверяет отмену
+
+        Args:
+            percent: Процент выполнения (0-100)
+        """
+        self.check()
+        if percent != self._last_percent:
+            self._last_percent = percent
+            self._progress[self.job_id] = percent
+
+@dataclass
+class Job:
+    """Задача, отправленная в пул"""
+    job_id: str
+    chat_id: int
+    process_future: Future
+    future: asyncio.Future
+
+class JobRunner:
+    """
+    Пул процессов для тяжелых задач с ограничением числа задач на чат.
+
+    Процессы запускаются методом spawn: дочерний процесс не наследует
+    открытые соединения SQLite и пулы потоков родителя.
+    """
+
+    def __init__(self, max_workers: int = None, per_chat: int = None):
+        self.max_workers = max_workers or BotConfig.EXPORT_WORKERS
+        self.per_chat = per_chat or BotConfig.EXPORT_JOBS_PER_CHAT
+        self._context = multiprocessing.get_context('spawn')
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._progress = None
+        self._cancelled = None
+        self._jobs: Dict[str, Job] = {}
+        self._chat_jobs: Dict[int, Set[str]] = defaultdict(set)
+        self.stats = {'submitted': 0, 'completed': 0, 'cancelled': 0, 'failed': 0, 'rejected': 0}
+
+    def _start(self):
+        """Запускает пул и общее состояние при первой задаче"""
+        if self._executor is None:
+            self._manager = self._context.Manager()
+            self._progress = self._manager.dict()
+            self._cancelled = self._manager.dict()
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._context)
+            logger.info(f"Пул задач запущен: {self.max_workers} процессов")
+
+    def submit(self, chat_id: int, func: Callable, *args) -> Job:
+        """
+        Отправляет задачу в пул
+
+        Args:
+            chat_id: ID чата, для которого выполняется задача
+            func: Функция уровня модуля; первым аргументом получает JobControl
+            *args: Аргументы функции (должны сериализоваться pickle)
+
+        Returns:
+            Отправленная задача
+
+        Raises:
+            JobLimitExceeded: В чате уже выполняется per_chat задач
+        """
+        if len(self._chat_jobs[chat_id]) >= self.per_chat:
+            self.stats['rejected'] += 1
+            raise JobLimitExceeded(chat_id)
+
+        self._start()
+        job_id = uuid.uuid4().hex[:12]
+        self._progress[job_id] = 0
+        control = JobControl(job_id, self._progress, self._cancelled)
+        process_future = self._executor.submit(func, control, *args)
+
+        job = Job(job_id=job_id, chat_id=chat_id, process_future=process_future,
+                  future=asyncio.wrap_future(process_future))
+        self._jobs[job_id] = job
+        self._chat_jobs[chat_id].add(job_id)
+        self.stats['submitted'] += 1
+        return job
+
+    def progress(self, job_id: str) -> int:
+        """Последний сообщенный задачей процент выполнения"""
+        if self._progress is None:
+            return 0
+        return self._progress.get(job_id, 0)
+
+    def cancel(self, job_id: str, chat_id: int) -> bool:
+        """
+        Отменяет задачу чата: ожидающая в очереди снимается сразу,
+        выполняющаяся прерывается при следующем отчете о прогрессе.
+        Задача, успевшая завершиться, возвращает результат как обычно.
+
+        Args:
+            job_id: ID задачи
+            chat_id: ID чата, из которого пришла отмена
+
+        Returns:
+            True, если задача найдена и отмена запрошена
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.chat_id != chat_id:
+            return False
+        self._cancelled[job_id] = True
+        job.process_future.cancel()
+        return True
+
+    def active_jobs(self, chat_id: int) -> int:
+        """Количество выполняющихся задач чата"""
+        return len(self._chat_jobs.get(chat_id, ()))
+
+    async def wait(self, job: Job, on_progress: Callable[[int], Awaitable[None]] = None,
+                   interval: float = None) -> Any:
+        """
+        Ожидает результат задачи, периодически сообщая прогресс
+
+        Args:
+            job: Задача из submit
+            on_progress: Корутина, получающая новый процент выполнения
+            interval: Период опроса прогресса (по умолчанию BotConfig.EXPORT_PROGRESS_INTERVAL)
+
+        Returns:
+            Результат функции задачи
+
+        Raises:
+            JobCancelled: Задача отменена
+        """
+        interval = interval or BotConfig.EXPORT_PROGRESS_INTERVAL
+        last_percent = None
+        try:
+            while True:
+                done, _ = await asyncio.wait({job.future}, timeout=interval)
+                if done:
+                    break
+                percent = self.progress(job.job_id)
+                if on_progress and percent != last_percent:
+                    last_percent = percent
+                    await on_progress(percent)
+
+            try:
+                result = job.future.result()
+            except (CancelledError, asyncio.CancelledError):
+                raise JobCancelled(job.job_id)
+            self.stats['completed'] += 1
+            return result
+        except JobCancelled:
+            self.stats['cancelled'] += 1
+            raise
+        except Exception:
+            self.stats['failed'] += 1
+            raise
+        finally:
+            self._forget(job)
+
+    def _forget(self, job: Job):
+        """Освобождает место задачи в лимите чата"""
+        self._jobs.pop(job.job_id, None)
+        chat_jobs = self._chat_jobs.get(job.chat_id)
+        if chat_jobs is not None:
+            chat_jobs.discard(job.job_id)
+            if not chat_jobs:
+                del self._chat_jobs[job.chat_id]
+        if self._progress is not None:
+            self._progress.pop(job.job_id, None)
+            self._cancelled.pop(job.job_id, None)
+
+    def shutdown(self):
+        """Останавливает пул процессов"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._manager.shutdown()
+            self._executor = None
+            self._manager = None
+
+def get_job_runner(context) -> JobRunner:
+    """
+    Возвращает общий пул задач приложения, чтобы лимиты на чат
+    учитывались для всех обработчиков
+
+    Args:
+        context: Контекст бота
+
+    Returns:
+        Экземпляр JobRunner
+    """
+    bot_data = context.application.bot_data
+    runner = bot_data.get('job_runner')
+    if runner is None:
+        runner = bot_data['job_runner'] = JobRunner()
+    return runner
@@ -0,0 +1,134 @@
+"""
+Кэш готовых экранов дашборда, аналитики и отчетов
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from telegram import InlineKeyboardMarkup
+
+from config.settings import BotConfig
+from core.database import db_manager
+
+logger = logging.getLogger(__name__)
+
+Screen = Tuple[str, InlineKeyboardMarkup]
+
+class ScreenCache:
+    """
+    Ограниченный LRU-кэш отрисованных экранов: (текст, клавиатура).
+
+    Ключ - (чат, экран, параметры, версия данных чата, локальная дата чата):
+    пока данные чата не изменились и не наступил новый день, повторный
+    переход на экран не выполняет ни запросов аналитики, ни отрисовки.
+    InlineKeyboardMarkup неизменяем, поэтому один объект отдается всем.
+    """
+
+    def __init__(self, db_manager, max_size: int = None):
+        self.db = db_manager
+        self.max_size = max_size or BotConfig.SCREEN_CACHE_SIZE
+        self._screens: "OrderedDict[Tuple, Screen]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def key(self, chat_id: int, screen: str, **params) -> Tuple:
+        """
+        Ключ кэша для текущего состояния данных чата
+
+        Args:
+            chat_id: ID чата
+            screen: Имя экрана
+            **params: Параметры экрана (страница, период)
+
+        Returns:
+            Кортеж ключа
+        """
+        version, local_date = await self.db.fetch_chat_render_stamp(chat_id)
+        return (chat_id, screen, tuple(sorted(params.items())), version, local_date)
+
+    def get(self, key: Tuple) -> Optional[Screen]:
+        """Возвращает экран из кэша или None"""
+        with self._lock:
+            screen = self._screens.get(key)
+            if screen is None:
+                self.misses += 1
+                return None
+            self._screens.move_to_end(key)
+            self.hits += 1
+            return screen
+
+    def put(self, key: Tuple, screen: Screen):
+        """
+        Сохраняет отрисованный экран, вытесняя самые старые записи
+
+        Args:
+            key: Ключ из key()
+            screen: Кортеж (текст, клавиатура)
+        """
+        with self._lock:
+            # Экраны устаревших версий и прошлых дней больше не понадобятся
+            for stale in [k for k in self._screens if k[:3] == key[:3] and k != key]:
+                del self._screens[stale]
+            self._screens[key] = screen
+            self._screens.move_to_end(key)
+            while len(self._screens) > self.max_size:
+                self._screens.popitem(last=False)
+                self.evictions += 1
+
+    async def render(self, chat_id: int, screen: str,
+                     build: Callable[..., Awaitable[Screen]], **params) -> Screen:
+        """
+        Возвращает экран из кэша или строит и запоминает его
+
+        Args:
+            chat_id: ID чата
+            screen: Имя экрана
+            build: Корутина build(chat_id, **params), возвращающая (текст, клавиатура)
+            **params: Параметры экрана
+
+        Returns:
+            Кортеж (текст, клавиатура)
+        """
+        # Версия читается до построения: запись между ними только вызовет лишнюю перерисовку
+        key = await self.key(chat_id, screen, **params)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        rendered = await build(chat_id, **params)
+        self.put(key, rendered)
+        return rendered
+
+    def invalidate(self, chat_id: int = None):
+        """
+        Сбрасывает экраны чата (или все экраны)
+
+        Args:
+            chat_id: ID чата; None - сбросить все
+        """
+        with self._lock:
+            if chat_id is None:
+                self._screens.clear()
+            else:
+                for key in [key for key in self._screens if key[0] == chat_id]:
+                    del self._screens[key]
+
+    def stats(self) -> Dict:
+        """Возвращает счетчики попаданий и промахов"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._screens),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0.0,
+            }
+
+# Общий кэш экранов всех обработчиков
+screen_cache = ScreenCache(db_manager)
@@ -0,0 +1,132 @@
+"""
+Сессии текстового поиска: упорядоченный список найденных событий для перелистывания страниц
+"""
+
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from config.settings import BotConfig
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class SearchSession:
+    """Результат текстового поиска: ID событий в порядке релевантности"""
+    session_id: str
+    chat_id: int
+    query: str
+    event_ids: Tuple[int, ...]
+    suggestions: Tuple[str, ...]
+    data_version: int  # Версия данных чата, при которой выполнен поиск
+    created_at: float = field(default_factory=time.monotonic)
+
+class SearchSessionStore:
+    """
+    Ограниченное LRU-хранилище сессий поиска с временем жизни.
+
+    Поиск выполняется один раз; следующая и предыдущая страницы читают из базы
+    только события своей страницы по сохраненным ID. Кнопки страниц содержат
+    короткий ID сессии.
+    """
+
+    def __init__(self, max_size: int = None, ttl: float = None):
+        self.max_size = max_size or BotConfig.SEARCH_SESSION_SIZE
+        self.ttl = ttl or BotConfig.SEARCH_SESSION_TTL
+        self._sessions: "OrderedDict[str, SearchSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def create(self, chat_id: int, query: str, event_ids, suggestions, data_version: int) -> SearchSession:
+        """
+        Сохраняет результат поиска
+
+        Args:
+            chat_id: ID чата
+            query: Поисковый запрос
+            event_ids: ID найденных событий в порядке вывода
+            suggestions: Подсказки для пустого результата
+            data_version: Версия данных чата на момент поиска
+
+        Returns:
+            Новая сессия
+        """
+        session = SearchSession(
+            session_id=secrets.token_urlsafe(6),
+            chat_id=chat_id,
+            query=query,
+            event_ids=tuple(event_ids),
+            suggestions=tuple(suggestions),
+            data_version=data_version
+        )
+        with self._lock:
+            self._sessions[session.session_id] = session
+            while len(self._sessions) > self.max_size:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+        return session
+
+    def get(self, session_id: str, chat_id: int) -> Optional[SearchSession]:
+        """
+        Возвращает действующую сессию чата
+
+        Args:
+            session_id: ID сессии из кнопки
+            chat_id: ID чата, в котором нажата кнопка
+
+        Returns:
+            Сессия или None, если она истекла, вытеснена или принадлежит другому чату
+        """
+        with self._lock:
+            session = self._sessions.get(session_id) if session_id else None
+            if session is not None and time.monotonic() - session.created_at > self.ttl:
+                del self._sessions[session_id]
+                session = None
+            if session is None or session.chat_id != chat_id:
+                self.misses += 1
+                return None
+            self._sessions.move_to_end(session_id)
+            self.hits += 1
+            return session
+
+    def discard(self, session_id: str):
+        """Удаляет сессию (например, устаревшую после изменения данных)"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def invalidate(self, chat_id: int = None):
+        """
+        Удаляет сессии чата (или все сессии)
+
+        Args:
+            chat_id: ID чата; None - удалить все
+        """
+        with self._lock:
+            if chat_id is None:
+                self._sessions.clear()
+            else:
+                for session_id in [key for key, value in self._sessions.items() if value.chat_id == chat_id]:
+                    del self._sessions[session_id]
+
+    def stats(self) -> Dict:
+        """Возвращает счетчики попаданий и промахов"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._sessions),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0.0,
+            }
+
+# Общее хранилище сессий поиска
+search_sessions = SearchSessionStore()
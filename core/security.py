@@ -2,11 +2,23 @@
 Модуль безопасности и шифрования для Telegram бота
 """
 
+import hashlib
+import hmac
 import logging
-from config.settings import encryption_manager
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from config.settings import BotConfig, encryption_manager
 
 logger = logging.getLogger(__name__)
 
+# Ключ слепого индекса выводится из SECRET_KEY и не совпадает с ключом шифрования
+_NAME_INDEX_KEY = hmac.new(
+    (BotConfig.SECRET_KEY or '').encode(), b"employee-name-blind-index", hashlib.sha256
+).digest()
+_WORD_SPLIT_RE = re.compile(r"[^\w]+", re.UNICODE)
+
 def encrypt_data(data: str) -> str:
     """
     Шифрует строку с использованием Fernet
@@ -39,7 +51,194 @@ def decrypt_data(encrypted_data: str) -> str:
         logger.error(f"Decryption failed: {e}")
         raise ValueError("Decryption error")
 
-def is_admin(chat_id: int, user_id: int) -> bool:
+class DecryptedNameCache:
+    """
+    Ограниченный LRU-кэш расшифрованных ФИО: ID сотрудника -> имя
+    
+    Вместе с именем хранится шифртекст, из которого оно получено:
+    если в базе шифртекст изменился, запись считается устаревшей.
+    """
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, employee_id: int, encrypted_name: str) -> Optional[str]:
+        """Возвращает имя из кэша или None"""
+        with self._lock:
+            entry = self._entries.get(employee_id)
+            if entry is not None and entry[0] == encrypted_name:
+                self._entries.move_to_end(employee_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+    
+    def put(self, employee_id: int, encrypted_name: str, full_name: str):
+        """Сохраняет расшифрованное имя, вытесняя самые старые записи"""
+        with self._lock:
+            self._entries[employee_id] = (encrypted_name, full_name)
+            self._entries.move_to_end(employee_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, employee_id: int):
+        """Удаляет имя сотрудника из кэша"""
+        with self._lock:
+            self._entries.pop(employee_id, None)
+    
+    def clear(self):
+        """Полностью очищает кэш"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict:
+        """Возвращает счетчики попаданий и промахов"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0.0,
+            }
+
+# Глобальный кэш расшифрованных ФИО
+name_cache = DecryptedNameCache(BotConfig.NAME_CACHE_SIZE)
+
+def decrypt_employee_name(employee_id: int, encrypted_name: str) -> str:
+    """
+    Дешифрует ФИО сотрудника с использованием кэша
+    
+    Args:
+        employee_id: ID сотрудника
+        encrypted_name: Зашифрованное ФИО из базы
+        
+    Returns:
+        Расшифрованное ФИО
+    """
+    full_name = name_cache.get(employee_id, encrypted_name)
+    if full_name is None:
+        full_name = decrypt_data(encrypted_name)
+        name_cache.put(employee_id, encrypted_name, full_name)
+    return full_name
+
+def invalidate_employee_name(employee_id: int):
+    """
+    Сбрасывает кэшированное ФИО сотрудника (переименование, удаление)
+    
+    Args:
+        employee_id: ID сотрудника
+    """
+    name_cache.invalidate(employee_id)
+
+def _normalize_name_words(text: str) -> List[str]:
+    """Приводит текст к нижнему регистру и разбивает на слова"""
+    text = text.lower().replace('ё', 'е')
+    return [word for word in _WORD_SPLIT_RE.split(text) if word]
+
+def _blind_token(kind: str, value: str) -> str:
+    """Вычисляет HMAC-токен для фрагмента имени"""
+    digest = hmac.new(_NAME_INDEX_KEY, f"{kind}:{value}".encode(), hashlib.sha256)
+    return digest.hexdigest()[:32]
+
+def name_index_tokens(full_name: str) -> List[str]:
+    """
+    Строит токены слепого индекса для ФИО сотрудника
+    
+    Для каждого слова индексируются префиксы длиной 1-2 символа
+    и все триграммы, что позволяет искать по подстроке без расшифровки.
+    
+    Args:
+        full_name: ФИО в открытом виде
+        
+    Returns:
+        Список уникальных токенов
+    """
+    tokens = set()
+    for word in _normalize_name_words(full_name):
+        for length in (1, 2):
+            if len(word) >= length:
+                tokens.add(_blind_token('p', word[:length]))
+        for i in range(len(word) - 2):
+            tokens.add(_blind_token('g', word[i:i + 3]))
+    return sorted(tokens)
+
+def name_query_tokens(query: str) -> List[str]:
+    """
+    Строит токены поискового запроса по ФИО
+    
+    Слова из 1-2 символов ищутся как префикс слова, более длинные -
+    как подстрока (все триграммы должны присутствовать в имени).
+    
+    Args:
+        query: Поисковый запрос
+        
+    Returns:
+        Список уникальных токенов (пустой, если искать нечего)
+    """
+    tokens = set()
+    for word in _normalize_name_words(query):
+        if len(word) < 3:
+            tokens.add(_blind_token('p', word))
+        else:
+            for i in range(len(word) - 2):
+                tokens.add(_blind_token('g', word[i:i + 3]))
+    return sorted(tokens)
+
+def name_matches(full_name: str, query: str) -> bool:
+    """
+    Проверяет расшифрованное ФИО на совпадение с запросом по тем же правилам,
+    что и name_query_tokens
+    
+    Слепой индекс находит кандидатов с ложными срабатываниями: триграммы слова
+    запроса могут встретиться в разных словах ФИО или не подряд. Совпадение -
+    каждое слово запроса из 1-2 символов является префиксом, а более длинное -
+    подстрокой какого-либо слова ФИО (без учета регистра).
+    
+    Args:
+        full_name: ФИО в открытом виде
+        query: Поисковый запрос
+        
+    Returns:
+        True если ФИО соответствует запросу
+    """
+    name_words = [word.casefold() for word in _normalize_name_words(full_name)]
+    query_words = [word.casefold() for word in _normalize_name_words(query)]
+    if not query_words:
+        return False
+    return all(
+        any(name_word.startswith(word) if len(word) < 3 else word in name_word for name_word in name_words)
+        for word in query_words
+    )
+
+def name_sort_key(full_name: str) -> str:
+    """
+    Строит ключ сортировки ФИО для постраничных списков
+    
+    Ключ хранится в открытом виде и раскрывает начало ФИО, поэтому включается
+    явно (NAME_SORT_KEY_LENGTH > 0): список упорядочен по алфавиту с точностью
+    до NAME_SORT_KEY_LENGTH символов, внутри префикса - по ID. По умолчанию
+    ключ пустой, страницы идут по ID и сортируются после расшифровки.
+    
+    Args:
+        full_name: ФИО в открытом виде
+        
+    Returns:
+        Префикс для колонки employees.sort_key (пустой, если префикс не хранится)
+    """
+    if BotConfig.NAME_SORT_KEY_LENGTH <= 0:
+        return ""
+    return " ".join(_normalize_name_words(full_name))[:BotConfig.NAME_SORT_KEY_LENGTH]
+
+async def is_admin(chat_id: int, user_id: int) -> bool:
     """
     Проверяет, является ли пользователь администратором
     
@@ -52,20 +251,10 @@ def is_admin(chat_id: int, user_id: int) -> bool:
     """
     from core.database import db_manager
     
-    logger.info(f"🔒 is_admin: проверяем chat_id={chat_id}, user_id={user_id}")
-    
     try:
-        admin_data = db_manager.execute_with_retry(
-            "SELECT admin_id FROM chat_settings WHERE chat_id = ?",
-            (chat_id,),
-            fetch="one"
-        )
-        logger.info(f"📄 Данные из chat_settings: {admin_data}")
-        
-        result = admin_data and admin_data['admin_id'] == user_id
-        logger.info(f"✅ Результат проверки админа: {result}")
-        
-        return result
+        # Поиск в реестре настроек; база читается только при первом обращении к чату,
+        # в пуле потоков базы данных
+        return await db_manager.chat_settings.is_admin_async(chat_id, user_id)
     except Exception as e:
         logger.error(f"Error checking admin status: {e}")
         return False
\ No newline at end of file
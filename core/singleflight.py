@@ -0,0 +1,192 @@
+"""
+Объединение одновременных одинаковых вызовов (single-flight) для тяжелых расчетов
+"""
+
+import asyncio
+import copy
+import functools
+import logging
+import threading
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+class _Call:
+    """Выполняющийся вызов, результат которого ждут повторные запросы"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Пока вызов с ключом выполняется, повторные вызовы с тем же ключом
+    не запускают расчет заново, а ждут и получают его результат
+    """
+
+    def __init__(self, copy_results: bool = True):
+        self.copy_results = copy_results
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.stats = {'executed': 0, 'shared': 0}
+
+    def do(self, key: Hashable, func: Callable, *args, **kwargs) -> Any:
+        """
+        Выполняет функцию или присоединяется к уже выполняющемуся вызову
+
+        Args:
+            key: Ключ вызова
+            func: Функция расчета
+            *args, **kwargs: Аргументы функции
+
+        Returns:
+            Результат функции; ожидающие получают его копию (если copy_results)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.stats['shared'] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.stats['executed'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Копия, чтобы обработчики не изменяли общий результат
+            return copy.deepcopy(call.result) if self.copy_results else call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            if call.waiters:
+                logger.debug(f"Результат {key!r} передан ожидающим вызовам: {call.waiters}")
+            call.done.set()
+
+    def in_flight(self) -> int:
+        """Количество выполняющихся вызовов"""
+        with self._lock:
+            return len(self._calls)
+
+class AsyncSingleFlight:
+    """
+    Объединение одновременных вызовов в цикле событий: повторные вызовы
+    ждут общий Future и не занимают потоки пула базы данных
+    """
+
+    def __init__(self, copy_results: bool = True):
+        self.copy_results = copy_results
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+        self.stats = {'executed': 0, 'shared': 0}
+
+    async def do(self, key: Hashable, start: Callable[[], Awaitable]) -> Any:
+        """
+        Запускает расчет или присоединяется к уже выполняющемуся
+
+        Args:
+            key: Ключ вызова
+            start: Фабрика корутины/Future расчета, вызывается только первым запросом
+
+        Returns:
+            Результат расчета; каждый вызов получает свою копию (если copy_results)
+        """
+        # Future привязан к своему циклу событий, поэтому цикл входит в ключ
+        key = (id(asyncio.get_running_loop()), key)
+        future = self._futures.get(key)
+        if future is not None:
+            self.stats['shared'] += 1
+        else:
+            self.stats['executed'] += 1
+            future = self._futures[key] = asyncio.ensure_future(start())
+            future.add_done_callback(lambda done: self._release(key, done))
+
+        # shield: отмена одного обработчика не отменяет расчет для остальных
+        result = await asyncio.shield(future)
+        return copy.deepcopy(result) if self.copy_results else result
+
+    def _release(self, key: Hashable, future: asyncio.Future):
+        if self._futures.get(key) is future:
+            del self._futures[key]
+        if not future.cancelled() and future.exception() is not None:
+            logger.debug(f"Ошибка расчета {key!r} передана ожидающим: {future.exception()}")
+
+    def in_flight(self) -> int:
+        """Количество выполняющихся вызовов"""
+        return len(self._futures)
+
+def _freeze(value: Any) -> Hashable:
+    """Приводит аргументы вызова к хешируемому виду для ключа"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _flight_key(method: Callable, instance: Any, args: tuple, kwargs: dict) -> Hashable:
+    """Ключ вызова: метод, база, аргументы и текущий день"""
+    return (
+        method.__qualname__, id(instance.db), _freeze(args), _freeze(kwargs), date.today().isoformat()
+    )
+
+_flights = SingleFlight()
+_async_flights = AsyncSingleFlight()
+
+def single_flight(method: Callable) -> Callable:
+    """
+    Декоратор метода менеджера: одновременные вызовы с одинаковыми
+    (база, метод, аргументы, день) выполняют один расчет
+
+    Args:
+        method: Метод менеджера с атрибутом db
+
+    Returns:
+        Обернутый метод
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return _flights.do(_flight_key(method, self, args, kwargs), method, self, *args, **kwargs)
+    wrapper.flight_key = functools.partial(_flight_key, method)
+    return wrapper
+
+def single_flight_key(func: Callable, args: tuple, kwargs: dict) -> Optional[Hashable]:
+    """
+    Ключ объединения для связанного метода с @single_flight
+
+    Args:
+        func: Вызываемая функция
+        args, kwargs: Аргументы вызова
+
+    Returns:
+        Ключ вызова или None, если функция не объединяется
+    """
+    key_func = getattr(func, 'flight_key', None)
+    instance = getattr(func, '__self__', None)
+    if key_func is None or instance is None:
+        return None
+    return key_func(instance, args, kwargs)
+
+async def run_single_flight(key: Hashable, start: Callable[[], Awaitable]) -> Any:
+    """Объединяет одновременные асинхронные вызовы с одинаковым ключом"""
+    return await _async_flights.do(key, start)
+
+def get_single_flight_stats() -> Dict[str, int]:
+    """Счетчики выполненных и объединенных вызовов (в потоках и в цикле событий)"""
+    return {
+        'executed': _flights.stats['executed'],
+        'shared': _flights.stats['shared'] + _async_flights.stats['shared'],
+        'shared_async': _async_flights.stats['shared'],
+        'in_flight': _flights.in_flight() + _async_flights.in_flight(),
+    }
@@ -2,7 +2,6 @@
 Вспомогательные функции для Telegram бота
 """
 
-import json
 import re
 import logging
 import os
@@ -11,8 +10,9 @@ import platform
 import fcntl
 import time
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 from config.constants import VALIDATION_RULES
+from core.callback_codec import decode_callback, encode_callback
 
 logger = logging.getLogger(__name__)
 
@@ -25,27 +25,48 @@ def create_callback_data(action: str, **kwargs) -> str:
         **kwargs: Дополнительные параметры
         
     Returns:
-        JSON строка для callback_data
+        Компактная строка callback_data (см. core.callback_codec)
     """
-    data = {"action": action}
-    data.update(kwargs)
-    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return encode_callback(action, **kwargs)
 
 def parse_callback_data(callback_data: str) -> Dict[str, Any]:
     """
     Парсит callback_data
     
     Args:
-        callback_data: JSON строка
+        callback_data: Компактная строка или JSON старых кнопок
         
     Returns:
         Словарь с данными
     """
-    try:
-        return json.loads(callback_data)
-    except (json.JSONDecodeError, TypeError) as e:
-        logger.error(f"Error parsing callback data: {e}")
-        return {}
+    return decode_callback(callback_data)
+
+def make_page_cursor(row_id: int, forward: bool = True) -> int:
+    """
+    Кодирует курсор постраничной навигации для callback_data
+    
+    Args:
+        row_id: ID последней (forward) или первой (назад) строки текущей страницы
+        forward: Направление: вперед - строки после row_id, назад - до row_id
+        
+    Returns:
+        Число со знаком: положительное - вперед, отрицательное - назад
+    """
+    return row_id if forward else -row_id
+
+def parse_page_cursor(cursor: Optional[int]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Декодирует курсор постраничной навигации
+    
+    Args:
+        cursor: Значение из callback_data (или None для первой страницы)
+        
+    Returns:
+        Кортеж (after_id, before_id), не более одного значения задано
+    """
+    if not isinstance(cursor, int) or cursor == 0:
+        return None, None
+    return (cursor, None) if cursor > 0 else (None, -cursor)
 
 def validate_name(name: str) -> bool:
     """
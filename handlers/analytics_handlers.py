@@ -11,12 +11,13 @@ from telegram.ext import ContextTypes
 from core.utils import create_callback_data, parse_callback_data
 from core.security import is_admin
 from managers.advanced_analytics_manager import AdvancedAnalyticsManager
-from managers.export_manager import ExportManager
+from managers.export_jobs import analytics_report_job
 from core.database import db_manager
+from core.screen_cache import Screen, screen_cache
+from handlers.export_handlers import export_file_cache, start_export_job
 
 # Инициализируем менеджер расширенной аналитики
 advanced_analytics_manager = AdvancedAnalyticsManager(db_manager)
-export_manager = ExportManager(db_manager)
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +29,7 @@ async def analytics_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
     
-    if not is_admin(chat_id, user_id):
+    if not await is_admin(chat_id, user_id):
         # Отправляем новое сообщение вместо редактирования
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
@@ -74,15 +75,10 @@ async def analytics_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE
         parse_mode='HTML'
     )
 
-async def analytics_trends(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Анализ трендов событий"""
-    query = update.callback_query
-    await query.answer()
-    
-    chat_id = update.effective_chat.id
-    
+async def _render_analytics_trends(chat_id: int) -> Screen:
+    """Экран анализа трендов"""
     # Получаем трендовый анализ
-    trends = advanced_analytics_manager.get_trends_analysis(chat_id, 6)
+    trends = await db_manager.run_sync(advanced_analytics_manager.get_trends_analysis, chat_id, 6)
     
     if trends.get('trend') == 'no_data':
         text = (
@@ -137,23 +133,29 @@ async def analytics_trends(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         ]
     ]
     
+    return text, InlineKeyboardMarkup(keyboard)
+
+async def analytics_trends(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Анализ трендов событий"""
+    query = update.callback_query
+    await query.answer()
+    
+    chat_id = update.effective_chat.id
+    
+    text, reply_markup = await screen_cache.render(chat_id, "analytics_trends", _render_analytics_trends)
+    
     # Отправляем новое сообщение вместо редактирования
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text=text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=reply_markup,
         parse_mode='HTML'
     )
 
-async def analytics_timeline(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Временной анализ событий"""
-    query = update.callback_query
-    await query.answer()
-    
-    chat_id = update.effective_chat.id
-    
+async def _render_analytics_timeline(chat_id: int) -> Screen:
+    """Экран недельной статистики"""
     # Получаем недельную аналитику
-    weekly_stats = advanced_analytics_manager.get_weekly_analysis(chat_id, 8)
+    weekly_stats = await db_manager.run_sync(advanced_analytics_manager.get_weekly_analysis, chat_id, 8)
     
     text_lines = [
         "⏰ <b>Временной анализ</b>",
@@ -230,23 +232,29 @@ async def analytics_timeline(update: Update, context: ContextTypes.DEFAULT_TYPE)
         ]
     ]
     
+    return text, InlineKeyboardMarkup(keyboard)
+
+async def analytics_timeline(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Временной анализ событий"""
+    query = update.callback_query
+    await query.answer()
+    
+    chat_id = update.effective_chat.id
+    
+    text, reply_markup = await screen_cache.render(chat_id, "analytics_timeline", _render_analytics_timeline)
+    
     # Отправляем новое сообщение вместо редактирования
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text=text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=reply_markup,
         parse_mode='HTML'
     )
 
-async def analytics_forecast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Прогноз рабочей нагрузки"""
-    query = update.callback_query
-    await query.answer()
-    
-    chat_id = update.effective_chat.id
-    
+async def _render_analytics_forecast(chat_id: int) -> Screen:
+    """Экран прогноза нагрузки на 30 дней"""
     # Получаем прогноз на 30 дней
-    forecast = advanced_analytics_manager.get_workload_forecast(chat_id, 30)
+    forecast = await db_manager.run_sync(advanced_analytics_manager.get_workload_forecast, chat_id, 30)
     
     daily_forecast = forecast.get('daily_forecast', [])
     summary = forecast.get('summary', {})
@@ -323,23 +331,29 @@ async def analytics_forecast(update: Update, context: ContextTypes.DEFAULT_TYPE)
         ]
     ]
     
+    return text, InlineKeyboardMarkup(keyboard)
+
+async def analytics_forecast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Прогноз рабочей нагрузки"""
+    query = update.callback_query
+    await query.answer()
+    
+    chat_id = update.effective_chat.id
+    
+    text, reply_markup = await screen_cache.render(chat_id, "analytics_forecast", _render_analytics_forecast)
+    
     # Отправляем новое сообщение вместо редактирования
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text=text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=reply_markup,
         parse_mode='HTML'
     )
 
-async def analytics_efficiency(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Анализ эффективности работы с событиями"""
-    query = update.callback_query
-    await query.answer()
-    
-    chat_id = update.effective_chat.id
-    
+async def _render_analytics_efficiency(chat_id: int) -> Screen:
+    """Экран метрик эффективности"""
     # Получаем метрики эффективности
-    efficiency = advanced_analytics_manager.get_efficiency_metrics(chat_id)
+    efficiency = await db_manager.run_sync(advanced_analytics_manager.get_efficiency_metrics, chat_id)
     
     text_lines = [
         "⚡ <b>Анализ эффективности</b>",
@@ -391,25 +405,31 @@ async def analytics_efficiency(update: Update, context: ContextTypes.DEFAULT_TYP
         ]
     ]
     
+    return text, InlineKeyboardMarkup(keyboard)
+
+async def analytics_efficiency(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Анализ эффективности работы с событиями"""
+    query = update.callback_query
+    await query.answer()
+    
+    chat_id = update.effective_chat.id
+    
+    text, reply_markup = await screen_cache.render(chat_id, "analytics_efficiency", _render_analytics_efficiency)
+    
     # Отправляем новое сообщение вместо редактирования
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text=text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=reply_markup,
         parse_mode='HTML'
     )
 
-async def analytics_summary(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Сводный аналитический отчет"""
-    query = update.callback_query
-    await query.answer()
-    
-    chat_id = update.effective_chat.id
-    
+async def _render_analytics_summary(chat_id: int) -> Screen:
+    """Экран сводного отчета"""
     # Получаем все необходимые данные
-    trends = advanced_analytics_manager.get_trends_analysis(chat_id, 3)
-    efficiency = advanced_analytics_manager.get_efficiency_metrics(chat_id)
-    forecast = advanced_analytics_manager.get_workload_forecast(chat_id, 14)
+    trends = await db_manager.run_sync(advanced_analytics_manager.get_trends_analysis, chat_id, 3)
+    efficiency = await db_manager.run_sync(advanced_analytics_manager.get_efficiency_metrics, chat_id)
+    forecast = await db_manager.run_sync(advanced_analytics_manager.get_workload_forecast, chat_id, 14)
     
     text_lines = [
         "📊 <b>Сводный аналитический отчет</b>",
@@ -500,23 +520,29 @@ async def analytics_summary(update: Update, context: ContextTypes.DEFAULT_TYPE)
         ]
     ]
     
+    return text, InlineKeyboardMarkup(keyboard)
+
+async def analytics_summary(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Сводный аналитический отчет"""
+    query = update.callback_query
+    await query.answer()
+    
+    chat_id = update.effective_chat.id
+    
+    text, reply_markup = await screen_cache.render(chat_id, "analytics_summary", _render_analytics_summary)
+    
     # Отправляем новое сообщение вместо редактирования
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text=text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=reply_markup,
         parse_mode='HTML'
     )
 
-async def show_monthly_chart(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Показать месячную диаграмму событий"""
-    query = update.callback_query
-    await query.answer()
-    
-    chat_id = update.effective_chat.id
-    
+async def _render_monthly_chart(chat_id: int) -> Screen:
+    """Экран месячной диаграммы"""
     # Получаем детальные временные диаграммы
-    charts = advanced_analytics_manager.get_detailed_timeline_charts(chat_id)
+    charts = await db_manager.run_sync(advanced_analytics_manager.get_detailed_timeline_charts, chat_id)
     monthly_data = charts.get('monthly', {})
     
     text_lines = [
@@ -552,23 +578,29 @@ async def show_monthly_chart(update: Update, context: ContextTypes.DEFAULT_TYPE)
         ]
     ]
     
+    return text, InlineKeyboardMarkup(keyboard)
+
+async def show_monthly_chart(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Показать месячную диаграмму событий"""
+    query = update.callback_query
+    await query.answer()
+    
+    chat_id = update.effective_chat.id
+    
+    text, reply_markup = await screen_cache.render(chat_id, "monthly_chart", _render_monthly_chart)
+    
     # Отправляем новое сообщение вместо редактирования
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text=text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=reply_markup,
         parse_mode='HTML'
     )
 
-async def show_weekly_chart(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Показать недельную диаграмму событий"""
-    query = update.callback_query
-    await query.answer()
-    
-    chat_id = update.effective_chat.id
-    
+async def _render_weekly_chart(chat_id: int) -> Screen:
+    """Экран недельной диаграммы"""
     # Получаем детальные временные диаграммы
-    charts = advanced_analytics_manager.get_detailed_timeline_charts(chat_id)
+    charts = await db_manager.run_sync(advanced_analytics_manager.get_detailed_timeline_charts, chat_id)
     weekly_data = charts.get('weekly', {})
     
     text_lines = [
@@ -604,23 +636,29 @@ async def show_weekly_chart(update: Update, context: ContextTypes.DEFAULT_TYPE)
         ]
     ]
     
+    return text, InlineKeyboardMarkup(keyboard)
+
+async def show_weekly_chart(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Показать недельную диаграмму событий"""
+    query = update.callback_query
+    await query.answer()
+    
+    chat_id = update.effective_chat.id
+    
+    text, reply_markup = await screen_cache.render(chat_id, "weekly_chart", _render_weekly_chart)
+    
     # Отправляем новое сообщение вместо редактирования
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text=text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=reply_markup,
         parse_mode='HTML'
     )
 
-async def show_daily_chart(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Показать дневную диаграмму событий"""
-    query = update.callback_query
-    await query.answer()
-    
-    chat_id = update.effective_chat.id
-    
+async def _render_daily_chart(chat_id: int) -> Screen:
+    """Экран дневной диаграммы"""
     # Получаем детальные временные диаграммы
-    charts = advanced_analytics_manager.get_detailed_timeline_charts(chat_id)
+    charts = await db_manager.run_sync(advanced_analytics_manager.get_detailed_timeline_charts, chat_id)
     daily_data = charts.get('daily', {})
     
     text_lines = [
@@ -658,24 +696,30 @@ async def show_daily_chart(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         ]
     ]
     
+    return text, InlineKeyboardMarkup(keyboard)
+
+async def show_daily_chart(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Показать дневную диаграмму событий"""
+    query = update.callback_query
+    await query.answer()
+    
+    chat_id = update.effective_chat.id
+    
+    text, reply_markup = await screen_cache.render(chat_id, "daily_chart", _render_daily_chart)
+    
     # Отправляем новое сообщение вместо редактирования
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text=text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=reply_markup,
         parse_mode='HTML'
     )
 
-async def advanced_workload_forecast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Расширенный прогноз рабочей нагрузки"""
-    query = update.callback_query
-    await query.answer()
-    
-    chat_id = update.effective_chat.id
-    
+async def _render_advanced_workload_forecast(chat_id: int) -> Screen:
+    """Экран прогнозов по периодам"""
     # Получаем расширенный прогноз на разные периоды
     periods = {'short': 7, 'medium': 30, 'long': 90}
-    advanced_forecast = advanced_analytics_manager.get_advanced_workload_forecast(chat_id, periods)
+    advanced_forecast = await db_manager.run_sync(advanced_analytics_manager.get_advanced_workload_forecast, chat_id, periods)
     
     forecasts = advanced_forecast.get('forecasts', {})
     analysis = advanced_forecast.get('comparative_analysis', {})
@@ -749,21 +793,27 @@ async def advanced_workload_forecast(update: Update, context: ContextTypes.DEFAU
         ]
     ]
     
+    return text, InlineKeyboardMarkup(keyboard)
+
+async def advanced_workload_forecast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Расширенный прогноз рабочей нагрузки"""
+    query = update.callback_query
+    await query.answer()
+    
+    chat_id = update.effective_chat.id
+    
+    text, reply_markup = await screen_cache.render(chat_id, "advanced_workload_forecast", _render_advanced_workload_forecast)
+    
     # Отправляем новое сообщение вместо редактирования
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text=text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=reply_markup,
         parse_mode='HTML'
     )
 
-async def show_detailed_forecast(update: Update, context: ContextTypes.DEFAULT_TYPE, period: str) -> None:
-    """Показать детальный прогноз для определенного периода"""
-    query = update.callback_query
-    await query.answer()
-    
-    chat_id = update.effective_chat.id
-    
+async def _render_detailed_forecast(chat_id: int, period: str) -> Screen:
+    """Экран детального прогноза на период"""
     # Определяем количество дней
     period_days = {
         'short': 7,
@@ -781,7 +831,7 @@ async def show_detailed_forecast(update: Update, context: ContextTypes.DEFAULT_T
     period_name = period_names.get(period, period)
     
     # Получаем детальный прогноз
-    forecast = advanced_analytics_manager.get_workload_forecast(chat_id, days)
+    forecast = await db_manager.run_sync(advanced_analytics_manager.get_workload_forecast, chat_id, days)
     
     summary = forecast.get('summary', {})
     metrics = forecast.get('workload_metrics', {})
@@ -851,11 +901,22 @@ async def show_detailed_forecast(update: Update, context: ContextTypes.DEFAULT_T
         ]
     ]
     
+    return text, InlineKeyboardMarkup(keyboard)
+
+async def show_detailed_forecast(update: Update, context: ContextTypes.DEFAULT_TYPE, period: str) -> None:
+    """Показать детальный прогноз для определенного периода"""
+    query = update.callback_query
+    await query.answer()
+    
+    chat_id = update.effective_chat.id
+    
+    text, reply_markup = await screen_cache.render(chat_id, "detailed_forecast", _render_detailed_forecast, period=period)
+    
     # Отправляем новое сообщение вместо редактирования
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text=text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=reply_markup,
         parse_mode='HTML'
     )
 
@@ -881,7 +942,7 @@ async def analytics_export_excel(update: Update, context: ContextTypes.DEFAULT_T
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
     
-    if not is_admin(chat_id, user_id):
+    if not await is_admin(chat_id, user_id):
         # Отправляем новое сообщение вместо редактирования
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
@@ -890,16 +951,13 @@ async def analytics_export_excel(update: Update, context: ContextTypes.DEFAULT_T
         return
     
     try:
-        # Генерируем полный аналитический отчет
-        excel_buffer = await export_manager.export_analytics_report(chat_id, "full")
-        
         # Создаем имя файла с датой
         filename = f"analytics_report_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
         
-        # Отправляем файл пользователю
-        await context.bot.send_document(
-            chat_id=user_id,
-            document=excel_buffer,
+        # Отчет строится в пуле процессов, файл отправляется пользователю
+        await start_export_job(
+            update, context, analytics_report_job, (db_manager.db_path, chat_id, "full"),
+            send_to=user_id,
             filename=filename,
             caption="📊 <b>Полный аналитический отчет</b>\n\n"
                    "Включает:\n"
@@ -908,18 +966,13 @@ async def analytics_export_excel(update: Update, context: ContextTypes.DEFAULT_T
                    "• Показатели эффективности\n"
                    "• Временные диаграммы\n"
                    "• Расширенное прогнозирование",
-            parse_mode='HTML'
-        )
-        
-        # Отправляем новое сообщение вместо редактирования
-        await context.bot.send_message(
-            chat_id=update.effective_chat.id,
-            text="✅ <b>Excel отчет создан и отправлен!</b>\n\n"
-                 "📄 Проверьте ваши файлы",
+            done_text="✅ <b>Excel отчет создан и отправлен!</b>\n\n"
+                      "📄 Проверьте ваши файлы",
             parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup([[
                 InlineKeyboardButton("🔙 К аналитике", callback_data=create_callback_data("analytics_menu"))
-            ]])
+            ]]),
+            cache_key=await export_file_cache.key(chat_id, "analytics", "xlsx")
         )
         
     except Exception as e:
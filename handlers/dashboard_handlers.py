@@ -11,32 +11,19 @@ from core.utils import create_callback_data, parse_callback_data
 from core.security import is_admin
 from managers.dashboard_manager import DashboardManager
 from core.database import db_manager
+from core.screen_cache import Screen, screen_cache
 
 # Инициализируем менеджер дашборда
 dashboard_manager = DashboardManager(db_manager)
 
 logger = logging.getLogger(__name__)
 
-async def dashboard_main(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Главная страница дашборда администратора"""
-    query = update.callback_query
-    await query.answer()
-    
-    chat_id = update.effective_chat.id
-    user_id = update.effective_user.id
-    
-    if not is_admin(chat_id, user_id):
-        # Отправляем новое сообщение вместо редактирования
-        await context.bot.send_message(
-            chat_id=update.effective_chat.id,
-            text="❌ Только администратор может просматривать дашборд"
-        )
-        return
-    
+async def _render_dashboard_main(chat_id: int) -> Screen:
+    """Главный экран дашборда"""
     # Получаем общую статистику
-    stats = dashboard_manager.get_overview_statistics(chat_id)
-    performance = dashboard_manager.get_performance_metrics(chat_id)
-    alerts = dashboard_manager.get_alerts_and_recommendations(chat_id)
+    stats = await db_manager.run_sync(dashboard_manager.get_overview_statistics, chat_id)
+    performance = await db_manager.run_sync(dashboard_manager.get_performance_metrics, chat_id)
+    alerts = await db_manager.run_sync(dashboard_manager.get_alerts_and_recommendations, chat_id)
     
     main_stats = stats.get('main', {})
     
@@ -115,21 +102,37 @@ async def dashboard_main(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         [InlineKeyboardButton("🔙 Главное меню", callback_data=create_callback_data("menu"))]
     ]
     
+    return text, InlineKeyboardMarkup(keyboard)
+
+async def dashboard_main(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Главная страница дашборда администратора"""
+    query = update.callback_query
+    await query.answer()
+    
+    chat_id = update.effective_chat.id
+    user_id = update.effective_user.id
+    
+    if not await is_admin(chat_id, user_id):
+        # Отправляем новое сообщение вместо редактирования
+        await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            text="❌ Только администратор может просматривать дашборд"
+        )
+        return
+    
+    text, reply_markup = await screen_cache.render(chat_id, "dashboard_main", _render_dashboard_main)
+    
     # Отправляем новое сообщение вместо редактирования
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text=text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=reply_markup,
         parse_mode='HTML'
     )
 
-async def dashboard_analytics(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Раздел аналитики с диаграммами"""
-    query = update.callback_query
-    await query.answer()
-    
-    chat_id = update.effective_chat.id
-    stats = dashboard_manager.get_overview_statistics(chat_id)
+async def _render_dashboard_analytics(chat_id: int) -> Screen:
+    """Экран аналитики с диаграммами по должностям и типам событий"""
+    stats = await db_manager.run_sync(dashboard_manager.get_overview_statistics, chat_id)
     
     text_lines = [
         "📊 <b>Аналитический обзор</b>",
@@ -167,23 +170,27 @@ async def dashboard_analytics(update: Update, context: ContextTypes.DEFAULT_TYPE
         [InlineKeyboardButton("🔙 К дашборду", callback_data=create_callback_data("dashboard"))]
     ]
     
+    return text, InlineKeyboardMarkup(keyboard)
+
+async def dashboard_analytics(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Раздел аналитики с диаграммами"""
+    query = update.callback_query
+    await query.answer()
+    
+    chat_id = update.effective_chat.id
+    text, reply_markup = await screen_cache.render(chat_id, "dashboard_analytics", _render_dashboard_analytics)
+    
     # Отправляем новое сообщение вместо редактирования
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text=text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=reply_markup,
         parse_mode='HTML'
     )
 
-async def dashboard_employees(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Анализ по сотрудникам - кто требует внимания"""
-    query = update.callback_query
-    await query.answer()
-    
-    chat_id = update.effective_chat.id
-    page = parse_callback_data(query.data).get('page', 0)
-    
-    employees = dashboard_manager.get_employee_analysis(chat_id)
+async def _render_dashboard_employees(chat_id: int, page: int) -> Screen:
+    """Страница рейтинга сотрудников по уровню внимания"""
+    employees = await db_manager.run_sync(dashboard_manager.get_employee_analysis, chat_id)
     
     # Пагинация
     per_page = 8
@@ -237,21 +244,29 @@ async def dashboard_employees(update: Update, context: ContextTypes.DEFAULT_TYPE
         [InlineKeyboardButton("🔙 К дашборду", callback_data=create_callback_data("dashboard"))]
     ])
     
+    return text, InlineKeyboardMarkup(keyboard)
+
+async def dashboard_employees(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Анализ по сотрудникам - кто требует внимания"""
+    query = update.callback_query
+    await query.answer()
+    
+    chat_id = update.effective_chat.id
+    page = parse_callback_data(query.data).get('page', 0)
+    
+    text, reply_markup = await screen_cache.render(chat_id, "dashboard_employees", _render_dashboard_employees, page=page)
+    
     # Отправляем новое сообщение вместо редактирования
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text=text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=reply_markup,
         parse_mode='HTML'
     )
 
-async def dashboard_performance(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Метрики производительности системы"""
-    query = update.callback_query
-    await query.answer()
-    
-    chat_id = update.effective_chat.id
-    performance = dashboard_manager.get_performance_metrics(chat_id)
+async def _render_dashboard_performance(chat_id: int) -> Screen:
+    """Экран метрик производительности"""
+    performance = await db_manager.run_sync(dashboard_manager.get_performance_metrics, chat_id)
     
     general = performance.get('general', {})
     overdue = performance.get('overdue', {})
@@ -303,21 +318,27 @@ async def dashboard_performance(update: Update, context: ContextTypes.DEFAULT_TY
         [InlineKeyboardButton("🔙 К дашборду", callback_data=create_callback_data("dashboard"))]
     ]
     
+    return text, InlineKeyboardMarkup(keyboard)
+
+async def dashboard_performance(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Метрики производительности системы"""
+    query = update.callback_query
+    await query.answer()
+    
+    chat_id = update.effective_chat.id
+    text, reply_markup = await screen_cache.render(chat_id, "dashboard_performance", _render_dashboard_performance)
+    
     # Отправляем новое сообщение вместо редактирования
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text=text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=reply_markup,
         parse_mode='HTML'
     )
 
-async def dashboard_alerts(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Предупреждения и рекомендации"""
-    query = update.callback_query
-    await query.answer()
-    
-    chat_id = update.effective_chat.id
-    alerts = dashboard_manager.get_alerts_and_recommendations(chat_id)
+async def _render_dashboard_alerts(chat_id: int) -> Screen:
+    """Экран предупреждений и рекомендаций"""
+    alerts = await db_manager.run_sync(dashboard_manager.get_alerts_and_recommendations, chat_id)
     
     text_lines = [
         "🚨 <b>Предупреждения и рекомендации</b>",
@@ -377,21 +398,27 @@ async def dashboard_alerts(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         [InlineKeyboardButton("🔙 К дашборду", callback_data=create_callback_data("dashboard"))]
     ]
     
+    return text, InlineKeyboardMarkup(keyboard)
+
+async def dashboard_alerts(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Предупреждения и рекомендации"""
+    query = update.callback_query
+    await query.answer()
+    
+    chat_id = update.effective_chat.id
+    text, reply_markup = await screen_cache.render(chat_id, "dashboard_alerts", _render_dashboard_alerts)
+    
     # Отправляем новое сообщение вместо редактирования
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text=text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=reply_markup,
         parse_mode='HTML'
     )
 
-async def dashboard_timeline(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Временной анализ событий"""
-    query = update.callback_query
-    await query.answer()
-    
-    chat_id = update.effective_chat.id
-    timeline = dashboard_manager.get_timeline_analysis(chat_id, 12)
+async def _render_dashboard_timeline(chat_id: int) -> Screen:
+    """Экран временного анализа"""
+    timeline = await db_manager.run_sync(dashboard_manager.get_timeline_analysis, chat_id, 12)
     
     text_lines = [
         "📈 <b>Временной анализ</b>",
@@ -437,10 +464,20 @@ async def dashboard_timeline(update: Update, context: ContextTypes.DEFAULT_TYPE)
         [InlineKeyboardButton("🔙 К дашборду", callback_data=create_callback_data("dashboard"))]
     ]
     
+    return text, InlineKeyboardMarkup(keyboard)
+
+async def dashboard_timeline(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Временной анализ событий"""
+    query = update.callback_query
+    await query.answer()
+    
+    chat_id = update.effective_chat.id
+    text, reply_markup = await screen_cache.render(chat_id, "dashboard_timeline", _render_dashboard_timeline)
+    
     # Отправляем новое сообщение вместо редактирования
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text=text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=reply_markup,
         parse_mode='HTML'
     )
\ No newline at end of file
@@ -10,8 +10,12 @@ from telegram.ext import ContextTypes, ConversationHandler, CallbackQueryHandler
 
 from config.constants import ConversationStates, AVAILABLE_POSITIONS
 from core.database import db_manager
-from core.security import encrypt_data, decrypt_data, is_admin
-from core.utils import create_callback_data, parse_callback_data, validate_name, validate_event_type, validate_date, validate_interval
+from core.event_categories import classify_event_type
+from core.security import encrypt_data, decrypt_employee_name, invalidate_employee_name, is_admin
+from core.utils import (
+    create_callback_data, parse_callback_data, make_page_cursor, parse_page_cursor,
+    validate_name, validate_event_type, validate_date, validate_interval
+)
 from managers.template_manager import TemplateManager
 
 # Инициализируем template_manager
@@ -41,7 +45,7 @@ async def add_employee_start(update: Update, context: ContextTypes.DEFAULT_TYPE)
     user_id = update.effective_user.id
     logger.info(f"👤 Chat ID: {chat_id}, User ID: {user_id}")
 
-    if not is_admin(chat_id, user_id):
+    if not await is_admin(chat_id, user_id):
         logger.warning(f"❌ Пользователь {user_id} не является администратором")
         if query:
             await context.bot.send_message(
@@ -220,6 +224,22 @@ async def show_position_selection(update: Update, context: ContextTypes.DEFAULT_
         logger.error(f"❌ Update details: {update}")
         logger.error(f"❌ Context user data: {context.user_data}")
 
+def _insert_employee(conn, chat_id: int, user_id: int, encrypted_name: str, full_name: str, position: str) -> int:
+    """
+    Добавляет сотрудника и строит токены поиска по ФИО
+    
+    Returns:
+        ID нового сотрудника
+    """
+    cursor = conn.execute(
+        '''INSERT INTO employees (chat_id, user_id, full_name, position)
+           VALUES (?, ?, ?, ?)''',
+        (chat_id, user_id, encrypted_name, position)
+    )
+    employee_id = cursor.lastrowid
+    db_manager.index_employee_name(conn, employee_id, full_name)
+    return employee_id
+
 async def handle_position_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработка выбора должности из списка"""
     logger.info("📥 handle_position_selection called!")
@@ -299,17 +319,11 @@ async def handle_position_selection(update: Update, context: ContextTypes.DEFAUL
     logger.info("✅ Name encrypted")
 
     try:
-        with db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                '''INSERT INTO employees (chat_id, user_id, full_name, position)
-                   VALUES (?, ?, ?, ?)''',
-                (chat_id, user_id, encrypted_name, position)
-            )
-            # Сохраняем ID нового сотрудника
-            user_data['new_employee_id'] = cursor.lastrowid
-            conn.commit()
-            logger.info(f"✅ Employee inserted with ID: {cursor.lastrowid}")
+        # Сохраняем ID нового сотрудника
+        user_data['new_employee_id'] = await db_manager.transaction(
+            _insert_employee, chat_id, user_id, encrypted_name, full_name, position
+        )
+        logger.info(f"✅ Employee inserted with ID: {user_data['new_employee_id']}")
 
         # Автоматически применяем шаблон для выбранной должности
         employee_id = user_data['new_employee_id']
@@ -454,14 +468,11 @@ async def handle_past_event_date_input(update: Update, context: ContextTypes.DEF
         next_date = last_date + timedelta(days=interval_days)
         
         # Обновляем событие в базе данных
-        with db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE employee_events 
-                SET last_event_date = ?, next_notification_date = ?
-                WHERE employee_id = ? AND event_type = ?
-            ''', (last_date.isoformat(), next_date.isoformat(), employee_id, event_type))
-            conn.commit()
+        await db_manager.execute('''
+            UPDATE employee_events 
+            SET last_event_date = ?, next_notification_date = ?
+            WHERE employee_id = ? AND event_type = ?
+        ''', (last_date.isoformat(), next_date.isoformat(), employee_id, event_type))
         
         # Добавляем событие в список завершенных
         completed_events = user_data.get('completed_events', [])
@@ -576,16 +587,14 @@ async def add_interval(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     next_date = last_date + timedelta(days=interval)
 
     try:
-        with db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                '''INSERT INTO employee_events 
-                   (employee_id, event_type, last_event_date, interval_days, next_notification_date)
-                   VALUES (?, ?, ?, ?, ?)''',
-                (user_data['new_employee_id'], user_data['event_type'],
-                 user_data['last_date'], interval, next_date.isoformat())
-            )
-            conn.commit()
+        await db_manager.execute(
+            '''INSERT INTO employee_events 
+               (employee_id, event_type, last_event_date, interval_days, next_notification_date, category)
+               VALUES (?, ?, ?, ?, ?, ?)''',
+            (user_data['new_employee_id'], user_data['event_type'],
+             user_data['last_date'], interval, next_date.isoformat(),
+             classify_event_type(user_data['event_type']))
+        )
 
         # Завершаем процесс
         await context.bot.send_message(
@@ -631,13 +640,60 @@ async def cancel_add_employee(update: Update, context: ContextTypes.DEFAULT_TYPE
     await show_menu(update, context)
     return ConversationHandler.END
 
+async def _fetch_employee_page(chat_id: int, cursor: int, limit: int):
+    """
+    Выбирает страницу активных сотрудников по ключу (sort_key, id) от курсора
+    
+    Без открытого префикса ФИО (NAME_SORT_KEY_LENGTH = 0) ключ пустой и страницы
+    идут по ID; по алфавиту сотрудников упорядочивает вызывающий после расшифровки.
+    
+    Args:
+        chat_id: ID чата
+        cursor: Курсор из make_page_cursor (None - первая страница)
+        limit: Размер страницы
+        
+    Returns:
+        Кортеж (сотрудники, есть следующая, есть предыдущая, страница выбрана по курсору)
+    """
+    after_id, before_id = parse_page_cursor(cursor)
+    anchor = None
+    if after_id or before_id:
+        anchor = await db_manager.fetch_one(
+            "SELECT id, sort_key FROM employees WHERE id = ? AND chat_id = ?",
+            (after_id or before_id, chat_id)
+        )
+
+    backwards = bool(anchor) and before_id is not None
+    keyset_condition = ""
+    params = [chat_id]
+    if anchor:
+        keyset_condition = "AND (sort_key, id) < (?, ?)" if backwards else "AND (sort_key, id) > (?, ?)"
+        params.extend([anchor['sort_key'], anchor['id']])
+    order = "DESC" if backwards else "ASC"
+
+    # На одну строку больше - признак следующей страницы
+    employees = await db_manager.fetch_all(
+        f'''SELECT id, full_name, position 
+           FROM employees 
+           WHERE chat_id = ? AND is_active = 1 {keyset_condition}
+           ORDER BY sort_key {order}, id {order}
+           LIMIT ?''',
+        tuple(params + [limit + 1])
+    )
+    has_more = len(employees) > limit
+    employees = list(employees[:limit])
+    if backwards:
+        employees.reverse()
+        return employees, True, has_more, True
+    return employees, has_more, anchor is not None, anchor is not None
+
 async def list_employees(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Показывает список сотрудников с пагинацией"""
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
 
     # Проверка прав администратора
-    if not is_admin(chat_id, user_id):
+    if not await is_admin(chat_id, user_id):
         if update.callback_query:
             await update.callback_query.answer()
             await context.bot.send_message(
@@ -649,29 +705,19 @@ async def list_employees(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     from config.settings import BotConfig
     page = context.user_data.get('employee_page', 0)
     limit = BotConfig.EMPLOYEES_PER_PAGE
-    offset = page * limit
 
     try:
-        with db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Подсчитываем общее количество
-            cursor.execute(
-                "SELECT COUNT(*) as count FROM employees WHERE chat_id = ? AND is_active = 1",
-                (chat_id,)
-            )
-            total_count = cursor.fetchone()['count']
-
-            # Получаем сотрудников для текущей страницы
-            cursor.execute(
-                '''SELECT id, full_name, position 
-                   FROM employees 
-                   WHERE chat_id = ? AND is_active = 1 
-                   ORDER BY full_name 
-                   LIMIT ? OFFSET ?''',
-                (chat_id, limit, offset)
-            )
-            employees = cursor.fetchall()
+        # Подсчитываем общее количество
+        total_count = (await db_manager.fetch_one(
+            "SELECT COUNT(*) as count FROM employees WHERE chat_id = ? AND is_active = 1",
+            (chat_id,)
+        ))['count']
+
+        employees, has_next, has_prev, from_cursor = await _fetch_employee_page(
+            chat_id, context.user_data.get('employee_cursor'), limit
+        )
+        if not from_cursor:
+            page = 0
 
         if not employees and page == 0:
             response = "ℹ️ Список сотрудников пуст. Добавьте первого сотрудника!"
@@ -684,22 +730,26 @@ async def list_employees(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                 )
             return
 
-        # Формирование сообщения
-        response = [f"📋 <b>Список сотрудников (страница {page + 1}/{((total_count - 1) // limit) + 1}):</b>"]
+        # Курсоры страниц - по границам выборки, до сортировки для вывода
+        first_id, last_id = (employees[0]['id'], employees[-1]['id']) if employees else (None, None)
+
+        # ФИО расшифровываются для страницы, внутри нее сотрудники идут по алфавиту
+        names = {}
         for emp in employees:
             try:
-                decrypted_name = decrypt_data(emp['full_name'])
+                names[emp['id']] = decrypt_employee_name(emp['id'], emp['full_name'])
             except ValueError:
-                decrypted_name = "Ошибка дешифрации"
-            response.append(f"• {decrypted_name} ({emp['position']})")
+                names[emp['id']] = "Ошибка дешифрации"
+        employees.sort(key=lambda emp: (names[emp['id']].casefold(), emp['id']))
 
-        # Создание кнопок для каждого сотрудника
+        # Формирование сообщения
+        response = [f"📋 <b>Список сотрудников (страница {page + 1}/{((total_count - 1) // limit) + 1}):</b>"]
         keyboard = []
         for emp in employees:
-            try:
-                decrypted_name = decrypt_data(emp['full_name'])
-            except ValueError:
-                decrypted_name = "Ошибка дешифрации"
+            decrypted_name = names[emp['id']]
+            response.append(f"• {decrypted_name} ({emp['position']})")
+
+            # Кнопка для каждого сотрудника
             keyboard.append([
                 InlineKeyboardButton(
                     f"{decrypted_name}",
@@ -709,15 +759,17 @@ async def list_employees(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
         # Кнопки навигации
         nav_buttons = []
-        if page > 0:
+        if has_prev and employees:
             nav_buttons.append(InlineKeyboardButton(
                 "⬅️ Назад",
-                callback_data=create_callback_data("emp_page", page=page - 1)
+                callback_data=create_callback_data(
+                    "emp_page", page=page - 1, c=make_page_cursor(first_id, forward=False)
+                )
             ))
-        if (page + 1) * limit < total_count:
+        if has_next and employees:
             nav_buttons.append(InlineKeyboardButton(
                 "Вперед ➡️",
-                callback_data=create_callback_data("emp_page", page=page + 1)
+                callback_data=create_callback_data("emp_page", page=page + 1, c=make_page_cursor(last_id))
             ))
 
         if nav_buttons:
@@ -748,8 +800,10 @@ async def list_employees(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                 parse_mode='HTML'
             )
 
-        # Сохранение номера страницы
+        # Сохранение номера страницы и курсора, по которому она выбрана
         context.user_data['employee_page'] = page
+        if not from_cursor:
+            context.user_data['employee_cursor'] = None
 
     except Exception as e:
         logger.error(f"Error in list_employees: {e}")
@@ -787,9 +841,9 @@ async def edit_employee_start(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
     
     # Получаем данные сотрудника
-    employee = db_manager.execute_with_retry('''
+    employee = await db_manager.fetch_one('''
         SELECT id, full_name, position FROM employees WHERE id = ?
-    ''', (employee_id,), fetch="one")
+    ''', (employee_id,))
     
     if not employee:
         # Отправляем новое сообщение вместо редактирования
@@ -800,7 +854,7 @@ async def edit_employee_start(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
     
     try:
-        decrypted_name = decrypt_data(employee['full_name'])
+        decrypted_name = decrypt_employee_name(employee_id, employee['full_name'])
     except ValueError:
         decrypted_name = "Ошибка дешифрации"
     
@@ -844,9 +898,9 @@ async def edit_employee_name(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return ConversationHandler.END
     
     # Получаем текущие данные
-    employee = db_manager.execute_with_retry('''
+    employee = await db_manager.fetch_one('''
         SELECT full_name, position FROM employees WHERE id = ?
-    ''', (employee_id,), fetch="one")
+    ''', (employee_id,))
     
     if not employee:
         # Отправляем новое сообщение поверх главного меню
@@ -857,7 +911,7 @@ async def edit_employee_name(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return ConversationHandler.END
     
     try:
-        current_name = decrypt_data(employee['full_name'])
+        current_name = decrypt_employee_name(employee_id, employee['full_name'])
     except ValueError:
         current_name = "Ошибка дешифрации"
     
@@ -885,6 +939,12 @@ async def edit_employee_name(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     return ConversationStates.EDIT_NAME
 
+def _rename_employee(conn, employee_id: int, encrypted_name: str, new_name: str):
+    """Сохраняет новое ФИО сотрудника и обновляет токены поиска"""
+    conn.execute("UPDATE employees SET full_name = ? WHERE id = ?", (encrypted_name, employee_id))
+    db_manager.index_employee_name(conn, employee_id, new_name)
+    invalidate_employee_name(employee_id)
+
 async def save_employee_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Сохранение нового имени сотрудника"""
     new_name = update.message.text
@@ -917,9 +977,9 @@ async def save_employee_name(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     try:
         # Получаем старое имя для логирования
-        employee = db_manager.execute_with_retry('''
+        employee = await db_manager.fetch_one('''
             SELECT full_name, position FROM employees WHERE id = ?
-        ''', (employee_id,), fetch="one")
+        ''', (employee_id,))
         
         if not employee:
             await context.bot.send_message(
@@ -930,7 +990,7 @@ async def save_employee_name(update: Update, context: ContextTypes.DEFAULT_TYPE)
             return ConversationHandler.END
         
         try:
-            old_name = decrypt_data(employee['full_name'])
+            old_name = decrypt_employee_name(employee_id, employee['full_name'])
         except ValueError:
             old_name = "Ошибка дешифрации"
         
@@ -950,10 +1010,8 @@ async def save_employee_name(update: Update, context: ContextTypes.DEFAULT_TYPE)
         # Шифруем новое имя
         encrypted_name = encrypt_data(new_name)
         
-        # Обновляем имя в базе
-        db_manager.execute_with_retry('''
-            UPDATE employees SET full_name = ? WHERE id = ?
-        ''', (encrypted_name, employee_id))
+        # Обновляем имя и поисковый индекс в базе
+        await db_manager.transaction(_rename_employee, employee_id, encrypted_name, new_name)
         
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
@@ -1020,9 +1078,9 @@ async def edit_employee_position(update: Update, context: ContextTypes.DEFAULT_T
         return
     
     # Получаем текущие данные сотрудника
-    employee = db_manager.execute_with_retry('''
+    employee = await db_manager.fetch_one('''
         SELECT full_name, position FROM employees WHERE id = ?
-    ''', (employee_id,), fetch="one")
+    ''', (employee_id,))
     
     if not employee:
         # Отправляем новое сообщение вместо редактирования
@@ -1033,7 +1091,7 @@ async def edit_employee_position(update: Update, context: ContextTypes.DEFAULT_T
         return
     
     try:
-        decrypted_name = decrypt_data(employee['full_name'])
+        decrypted_name = decrypt_employee_name(employee_id, employee['full_name'])
     except ValueError:
         decrypted_name = "Ошибка дешифрации"
     
@@ -1094,9 +1152,9 @@ async def save_employee_position(update: Update, context: ContextTypes.DEFAULT_T
     
     try:
         # Получаем текущие данные сотрудника
-        employee = db_manager.execute_with_retry('''
+        employee = await db_manager.fetch_one('''
             SELECT full_name, position FROM employees WHERE id = ?
-        ''', (employee_id,), fetch="one")
+        ''', (employee_id,))
         
         if not employee:
             # Отправляем новое сообщение вместо редактирования
@@ -1109,7 +1167,7 @@ async def save_employee_position(update: Update, context: ContextTypes.DEFAULT_T
         old_position = employee['position']
         
         try:
-            decrypted_name = decrypt_data(employee['full_name'])
+            decrypted_name = decrypt_employee_name(employee_id, employee['full_name'])
         except ValueError:
             decrypted_name = "Ошибка дешифрации"
         
@@ -1127,7 +1185,7 @@ async def save_employee_position(update: Update, context: ContextTypes.DEFAULT_T
             return
         
         # Обновляем должность
-        db_manager.execute_with_retry('''
+        await db_manager.execute('''
             UPDATE employees SET position = ? WHERE id = ?
         ''', (new_position, employee_id))
         
@@ -1293,16 +1351,14 @@ async def add_event_to_employee_interval(update: Update, context: ContextTypes.D
     try:
         employee_id = user_data['current_employee_id']
         
-        with db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                '''INSERT INTO employee_events 
-                   (employee_id, event_type, last_event_date, interval_days, next_notification_date)
-                   VALUES (?, ?, ?, ?, ?)''',
-                (employee_id, user_data['new_event_type'],
-                 user_data['new_event_last_date'], interval, next_date.isoformat())
-            )
-            conn.commit()
+        await db_manager.execute(
+            '''INSERT INTO employee_events 
+               (employee_id, event_type, last_event_date, interval_days, next_notification_date, category)
+               VALUES (?, ?, ?, ?, ?, ?)''',
+            (employee_id, user_data['new_event_type'],
+             user_data['new_event_last_date'], interval, next_date.isoformat(),
+             classify_event_type(user_data['new_event_type']))
+        )
 
         # Завершаем процесс
         await context.bot.send_message(
@@ -1366,9 +1422,9 @@ async def delete_employee(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return
     
     # Получаем данные сотрудника
-    employee = db_manager.execute_with_retry('''
+    employee = await db_manager.fetch_one('''
         SELECT full_name, position FROM employees WHERE id = ?
-    ''', (employee_id,), fetch="one")
+    ''', (employee_id,))
     
     if not employee:
         # Отправляем новое сообщение вместо редактирования
@@ -1379,14 +1435,14 @@ async def delete_employee(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return
     
     try:
-        decrypted_name = decrypt_data(employee['full_name'])
+        decrypted_name = decrypt_employee_name(employee_id, employee['full_name'])
     except ValueError:
         decrypted_name = "Ошибка дешифрации"
     
     # Подсчитываем количество событий
-    events_count = db_manager.execute_with_retry('''
+    events_count = (await db_manager.fetch_one('''
         SELECT COUNT(*) as count FROM employee_events WHERE employee_id = ?
-    ''', (employee_id,), fetch="one")['count']
+    ''', (employee_id,)))['count']
     
     keyboard = [
         [InlineKeyboardButton("🗑️ Да, удалить", callback_data=create_callback_data("confirm_delete", id=employee_id))],
@@ -1414,6 +1470,24 @@ async def delete_employee(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         parse_mode='HTML'
     )
 
+def _delete_employee_with_events(conn, employee_id: int) -> int:
+    """
+    Удаляет сотрудника вместе со всеми его событиями
+    
+    Args:
+        conn: Соединение с базой данных (внутри транзакции)
+        employee_id: ID сотрудника
+        
+    Returns:
+        Количество удаленных событий
+    """
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM employee_events WHERE employee_id = ?", (employee_id,))
+    events_count = cursor.rowcount
+    cursor.execute("DELETE FROM employees WHERE id = ?", (employee_id,))
+    invalidate_employee_name(employee_id)
+    return events_count
+
 async def confirm_delete_employee(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Окончательное удаление сотрудника и всех его событий"""
     query = update.callback_query
@@ -1431,9 +1505,9 @@ async def confirm_delete_employee(update: Update, context: ContextTypes.DEFAULT_
         return
     
     # Получаем данные сотрудника для логирования
-    employee = db_manager.execute_with_retry('''
+    employee = await db_manager.fetch_one('''
         SELECT full_name, position FROM employees WHERE id = ?
-    ''', (employee_id,), fetch="one")
+    ''', (employee_id,))
     
     if not employee:
         # Отправляем новое сообщение вместо редактирования
@@ -1444,25 +1518,13 @@ async def confirm_delete_employee(update: Update, context: ContextTypes.DEFAULT_
         return
     
     try:
-        decrypted_name = decrypt_data(employee['full_name'])
+        decrypted_name = decrypt_employee_name(employee_id, employee['full_name'])
     except ValueError:
         decrypted_name = "Ошибка дешифрации"
     
     try:
-        # Подсчитываем количество событий перед удалением
-        events_count = db_manager.execute_with_retry('''
-            SELECT COUNT(*) as count FROM employee_events WHERE employee_id = ?
-        ''', (employee_id,), fetch="one")['count']
-        
-        # Удаляем все события сотрудника
-        events_deleted = db_manager.execute_with_retry('''
-            DELETE FROM employee_events WHERE employee_id = ?
-        ''', (employee_id,))
-        
-        # Удаляем самого сотрудника
-        employee_deleted = db_manager.execute_with_retry('''
-            DELETE FROM employees WHERE id = ?
-        ''', (employee_id,))
+        # Удаляем события и сотрудника одной транзакцией
+        events_count = await db_manager.transaction(_delete_employee_with_events, employee_id)
         
         # Отправляем новое сообщение вместо редактирования
         await context.bot.send_message(
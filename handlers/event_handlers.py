@@ -8,7 +8,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
 from core.database import db_manager
-from core.security import decrypt_data, is_admin
+from core.security import decrypt_employee_name, is_admin
 from core.utils import create_callback_data
 
 logger = logging.getLogger(__name__)
@@ -19,48 +19,43 @@ async def my_events(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user_id = update.effective_user.id
 
     try:
-        with db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-
-            # Поиск сотрудника по user_id
-            cursor.execute(
-                '''SELECT e.id, e.full_name, e.position 
-                   FROM employees e 
-                   WHERE e.chat_id = ? AND e.user_id = ? AND e.is_active = 1''',
-                (chat_id, user_id)
-            )
-            employee = cursor.fetchone()
-
-            if not employee:
-                response = "ℹ️ У вас нет записей в базе сотрудников."
-                keyboard = [[InlineKeyboardButton("🔙 Главное меню", callback_data=create_callback_data("menu"))]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                if update.message:
-                    await update.message.reply_text(response, reply_markup=reply_markup)
-                else:
-                    query = update.callback_query
-                    # Отправляем новое сообщение вместо редактирования
-                    await context.bot.send_message(
-                        chat_id=update.effective_chat.id,
-                        text=response,
-                        reply_markup=reply_markup
-                    )
-                return
+        # Поиск сотрудника по user_id
+        employee = await db_manager.fetch_one(
+            '''SELECT e.id, e.full_name, e.position 
+               FROM employees e 
+               WHERE e.chat_id = ? AND e.user_id = ? AND e.is_active = 1''',
+            (chat_id, user_id)
+        )
 
-            # Получаем события сотрудника
-            cursor.execute(
-                '''SELECT event_type, next_notification_date, interval_days 
-                   FROM employee_events 
-                   WHERE employee_id = ? 
-                   ORDER BY next_notification_date''',
-                (employee['id'],)
-            )
-            events = cursor.fetchall()
+        if not employee:
+            response = "ℹ️ У вас нет записей в базе сотрудников."
+            keyboard = [[InlineKeyboardButton("🔙 Главное меню", callback_data=create_callback_data("menu"))]]
+            reply_markup = InlineKeyboardMarkup(keyboard)
+            
+            if update.message:
+                await update.message.reply_text(response, reply_markup=reply_markup)
+            else:
+                query = update.callback_query
+                # Отправляем новое сообщение вместо редактирования
+                await context.bot.send_message(
+                    chat_id=update.effective_chat.id,
+                    text=response,
+                    reply_markup=reply_markup
+                )
+            return
+
+        # Получаем события сотрудника
+        events = await db_manager.fetch_all(
+            '''SELECT event_type, next_notification_date, interval_days 
+               FROM employee_events 
+               WHERE employee_id = ? 
+               ORDER BY next_notification_date''',
+            (employee['id'],)
+        )
 
         # Расшифровка имени
         try:
-            decrypted_name = decrypt_data(employee['full_name'])
+            decrypted_name = decrypt_employee_name(employee['id'], employee['full_name'])
         except ValueError:
             decrypted_name = "Ошибка дешифрации"
 
@@ -137,7 +132,7 @@ async def all_events(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
 
-    if not is_admin(chat_id, user_id):
+    if not await is_admin(chat_id, user_id):
         query = update.callback_query
         await query.answer()
         # Отправляем новое сообщение вместо редактирования
@@ -149,8 +144,9 @@ async def all_events(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
 
     try:
         # Получаем все события чата
-        events = db_manager.execute_with_retry('''
+        events = await db_manager.fetch_all('''
             SELECT 
+                e.id as employee_id,
                 e.full_name,
                 e.position,
                 ee.event_type,
@@ -161,7 +157,7 @@ async def all_events(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
             WHERE e.chat_id = ? AND e.is_active = 1
             ORDER BY ee.next_notification_date
             LIMIT 20
-        ''', (chat_id,), fetch="all")
+        ''', (chat_id,))
 
         if not events:
             response = "ℹ️ В системе нет событий"
@@ -170,7 +166,7 @@ async def all_events(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
             
             for event in events:
                 try:
-                    decrypted_name = decrypt_data(event['full_name'])
+                    decrypted_name = decrypt_employee_name(event['employee_id'], event['full_name'])
                 except ValueError:
                     decrypted_name = "Ошибка дешифрации"
                 
@@ -253,37 +249,32 @@ async def view_employee_details(update: Update, context: ContextTypes.DEFAULT_TY
     employee_id = context.user_data.get('selected_employee')
 
     try:
-        with db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-
-            # Получение информации о сотруднике
-            cursor.execute(
-                "SELECT full_name, position FROM employees WHERE id = ?",
-                (employee_id,)
-            )
-            employee = cursor.fetchone()
-
-            if not employee:
-                # Отправляем новое сообщение вместо редактирования
-                await context.bot.send_message(
-                    chat_id=update.effective_chat.id,
-                    text="❌ Сотрудник не найден"
-                )
-                return
+        # Получение информации о сотруднике
+        employee = await db_manager.fetch_one(
+            "SELECT full_name, position FROM employees WHERE id = ?",
+            (employee_id,)
+        )
 
-            # Получение событий сотрудника
-            cursor.execute(
-                '''SELECT event_type, next_notification_date, interval_days
-                   FROM employee_events 
-                   WHERE employee_id = ? 
-                   ORDER BY next_notification_date''',
-                (employee_id,)
+        if not employee:
+            # Отправляем новое сообщение вместо редактирования
+            await context.bot.send_message(
+                chat_id=update.effective_chat.id,
+                text="❌ Сотрудник не найден"
             )
-            events = cursor.fetchall()
+            return
+
+        # Получение событий сотрудника
+        events = await db_manager.fetch_all(
+            '''SELECT event_type, next_notification_date, interval_days
+               FROM employee_events 
+               WHERE employee_id = ? 
+               ORDER BY next_notification_date''',
+            (employee_id,)
+        )
 
         # Расшифровка имени
         try:
-            decrypted_name = decrypt_data(employee['full_name'])
+            decrypted_name = decrypt_employee_name(employee_id, employee['full_name'])
         except ValueError:
             decrypted_name = "Ошибка дешифрации"
 
@@ -3,17 +3,22 @@
 """
 
 import logging
+import os
 from datetime import datetime
+from typing import Callable, Optional, Tuple
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import TelegramError
 from telegram.ext import ContextTypes
 
+from core.jobs import Job, JobCancelled, JobLimitExceeded, get_job_runner
 from core.security import is_admin
 from core.utils import create_callback_data, parse_callback_data
-from managers.export_manager import ExportManager
+from managers.export_jobs import export_events_job
+from managers.export_manager import ExportFileCache
 from core.database import db_manager
 
-# Initialize export manager
-excel_exporter = ExportManager(db_manager)
+# file_id уже отправленных файлов экспорта
+export_file_cache = ExportFileCache(db_manager)
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +30,7 @@ async def export_menu_start(update: Update, context: ContextTypes.DEFAULT_TYPE)
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
     
-    if not is_admin(chat_id, user_id):
+    if not await is_admin(chat_id, user_id):
         # Отправляем новое сообщение вместо редактирования
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
@@ -64,40 +69,161 @@ async def handle_export(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     file_format = data.get('format', 'xlsx')
     chat_id = update.effective_chat.id
     
-    # Отправляем новое сообщение вместо редактирования
-    await context.bot.send_message(
-        chat_id=update.effective_chat.id,
-        text="⏳ Подготавливаю файл для экспорта..."
+    # Формируем имя файла
+    current_date = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"events_report_{current_date}.{file_format}"
+    
+    await start_export_job(
+        update, context, export_events_job, (db_manager.db_path, chat_id, file_format),
+        send_to=chat_id,
+        filename=filename,
+        caption=f"📊 Отчет по событиям от {datetime.now().strftime('%d.%m.%Y %H:%M')}",
+        done_text="✅ Файл успешно сформирован и отправлен!",
+        cache_key=await export_file_cache.key(chat_id, "events", file_format)
     )
+
+def _progress_text(percent: int) -> str:
+    """Текст сообщения о прогрессе экспорта"""
+    filled = percent // 10
+    return (
+        f"⏳ Подготавливаю файл для экспорта... {percent}%\n"
+        f"{'▓' * filled}{'░' * (10 - filled)}"
+    )
+
+def _cancel_keyboard(job: Job) -> InlineKeyboardMarkup:
+    """Кнопка отмены задачи экспорта"""
+    return InlineKeyboardMarkup([[
+        InlineKeyboardButton("❌ Отменить", callback_data=create_callback_data("cancel_export", job=job.job_id))
+    ]])
+
+async def start_export_job(update: Update, context: ContextTypes.DEFAULT_TYPE, func: Callable, args: tuple,
+                           send_to: int, filename: str, caption: str, done_text: str,
+                           parse_mode: Optional[str] = None, reply_markup=None,
+                           cache_key: Optional[Tuple] = None) -> None:
+    """
+    Запускает экспорт в пуле процессов и показывает его прогресс
+    
+    Обработчик возвращается сразу: ожидание и отправка файла идут в фоновой
+    задаче приложения, поэтому бот продолжает отвечать, а экспорт можно отменить.
+    
+    Args:
+        update: Обновление Telegram
+        context: Контекст бота
+        func: Задача экспорта (см. managers.export_jobs), возвращает путь к файлу
+        args: Аргументы задачи после JobControl
+        send_to: ID чата, в который отправляется файл
+        filename: Имя файла для пользователя
+        caption: Подпись к файлу
+        done_text: Текст сообщения о прогрессе после отправки
+        parse_mode: Режим разметки подписи и итогового сообщения
+        reply_markup: Клавиатура итогового сообщения
+        cache_key: Ключ export_file_cache; если файл с этим ключом уже отправлялся,
+            он пересылается по file_id без генерации
+    """
+    chat_id = update.effective_chat.id
+    
+    file_id = export_file_cache.get(cache_key) if cache_key is not None else None
+    if file_id is not None:
+        try:
+            # Данные не изменились: отправляем уже загруженный в Telegram файл
+            await context.bot.send_document(
+                chat_id=send_to,
+                document=file_id,
+                caption=caption,
+                parse_mode=parse_mode
+            )
+            await context.bot.send_message(
+                chat_id=chat_id,
+                text=done_text,
+                parse_mode=parse_mode,
+                reply_markup=reply_markup
+            )
+            return
+        except TelegramError as e:
+            logger.warning(f"Cached export file_id rejected, regenerating: {e}")
+    
+    runner = get_job_runner(context)
     
     try:
-        # Экспортируем данные
-        file_buffer = await excel_exporter.export_all_events(chat_id, file_format)
-        
-        # Формируем имя файла
-        current_date = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"events_report_{current_date}.{file_format}"
-        
-        # Отправляем файл
-        await context.bot.send_document(
+        job = runner.submit(chat_id, func, *args)
+    except JobLimitExceeded:
+        # Отправляем новое сообщение вместо редактирования
+        await context.bot.send_message(
             chat_id=chat_id,
-            document=file_buffer,
-            filename=filename,
-            caption=f"📊 Отчет по событиям от {datetime.now().strftime('%d.%m.%Y %H:%M')}"
+            text="⏳ Экспорт в этом чате уже выполняется. Дождитесь его завершения или отмените его."
         )
+        return
+    
+    message = await context.bot.send_message(
+        chat_id=chat_id,
+        text=_progress_text(0),
+        reply_markup=_cancel_keyboard(job)
+    )
+    
+    async def show_progress(percent: int):
+        try:
+            await message.edit_text(_progress_text(percent), reply_markup=_cancel_keyboard(job))
+        except TelegramError as e:
+            logger.debug(f"Export progress update skipped: {e}")
+    
+    async def deliver():
+        try:
+            path = await runner.wait(job, show_progress)
+        except JobCancelled:
+            await message.edit_text("🚫 Экспорт отменен")
+            return
+        except Exception as e:
+            logger.error(f"Export error: {e}")
+            await message.edit_text("❌ Ошибка при экспорте данных")
+            return
+        
+        # Отправляем файл и удаляем временный файл экспорта
+        try:
+            with open(path, 'rb') as document:
+                sent = await context.bot.send_document(
+                    chat_id=send_to,
+                    document=document,
+                    filename=filename,
+                    caption=caption,
+                    parse_mode=parse_mode
+                )
+        except TelegramError as e:
+            logger.error(f"Export delivery error: {e}")
+            await message.edit_text("❌ Не удалось отправить файл экспорта")
+            return
+        finally:
+            os.remove(path)
         
+        if cache_key is not None and sent.document:
+            export_file_cache.put(cache_key, sent.document.file_id)
+        await message.edit_text(done_text, parse_mode=parse_mode, reply_markup=reply_markup)
+    
+    context.application.create_task(deliver(), update=update)
+
+async def handle_cancel_export(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Отмена выполняющегося экспорта по кнопке в сообщении о прогрессе"""
+    query = update.callback_query
+    await query.answer()
+    
+    data = parse_callback_data(query.data)
+    chat_id = update.effective_chat.id
+    user_id = update.effective_user.id
+    
+    if not await is_admin(chat_id, user_id):
         # Отправляем новое сообщение вместо редактирования
         await context.bot.send_message(
             chat_id=chat_id,
-            text="✅ Файл успешно сформирован и отправлен!"
+            text="❌ Только администратор может отменить экспорт"
         )
-        
-    except Exception as e:
-        logger.error(f"Export error: {e}")
-        # Отправляем новое сообщение вместо редактирования
+        return
+    
+    if get_job_runner(context).cancel(data.get('job'), chat_id):
+        # Сообщение о прогрессе обновит фоновая задача, когда экспорт остановится
+        await query.edit_message_text("⏹ Отменяю экспорт...")
+    else:
         await context.bot.send_message(
             chat_id=chat_id,
-            text="❌ Ошибка при экспорте данных"
+            text="ℹ️ Экспорт уже завершен"
         )
 
 # Alias for backward compatibility
@@ -3,9 +3,12 @@
 """
 
 import logging
+from typing import Awaitable, Callable, Dict
+
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
+from core.callback_codec import CALLBACK_SCHEMA, callback_code
 from core.utils import create_callback_data, parse_callback_data
 from core.security import is_admin
 from core.database import db_manager
@@ -13,13 +16,15 @@ from core.database import db_manager
 # Setup logging
 logger = logging.getLogger(__name__)
 
+Handler = Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[None]]
+
 async def show_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Показывает главное меню бота"""
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
     
     # Проверяем права администратора
-    user_is_admin = is_admin(chat_id, user_id)
+    user_is_admin = await is_admin(chat_id, user_id)
     
     # Создаем клавиатуру меню
     keyboard = [
@@ -81,31 +86,138 @@ async def show_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     )
 
 
+async def select_employee(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Открывает карточку сотрудника из списка"""
+    employee_id = parse_callback_data(update.callback_query.data).get('id')
+    if employee_id:
+        context.user_data['selected_employee'] = employee_id
+        from handlers.employee_handlers import view_employee_details
+        await view_employee_details(update, context)
+
+async def employees_page(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Переключает страницу списка сотрудников"""
+    data = parse_callback_data(update.callback_query.data)
+    context.user_data['employee_page'] = data.get('page', 0)
+    context.user_data['employee_cursor'] = data.get('c')
+    from handlers.employee_handlers import list_employees
+    await list_employees(update, context)
+
+# Код действия -> обработчик; заполняется при первом callback-запросе
+_ROUTES: Dict[str, Handler] = {}
+
+def _build_routes() -> Dict[str, Handler]:
+    """Собирает таблицу обработчиков (импорт здесь - чтобы избежать циклических импортов)"""
+    from handlers import (
+        analytics_handlers, dashboard_handlers, employee_handlers, event_handlers,
+        export_handlers, reports_handlers, search_handlers, settings_handlers, template_handlers
+    )
+
+    handlers_by_action = {
+        'menu': show_menu,
+        'help': help_command,
+        'settings': settings_menu,
+        'my_events': event_handlers.my_events,
+        'all_events': event_handlers.all_events,
+
+        # Сотрудники
+        'add_employee': employee_handlers.add_employee_start,
+        'list_employees': employee_handlers.list_employees,
+        'select_employee': select_employee,
+        'emp_page': employees_page,
+        'edit_employee': employee_handlers.edit_employee_start,
+        'edit_name': employee_handlers.edit_employee_name,
+        'edit_position': employee_handlers.edit_employee_position,
+        'save_position': employee_handlers.save_employee_position,
+        'add_event_to_employee': employee_handlers.add_event_to_employee,
+        'delete_employee': employee_handlers.delete_employee,
+        'confirm_delete': employee_handlers.confirm_delete_employee,
+
+        # Поиск
+        'search_menu': search_handlers.search_menu_start,
+        'search_filter': search_handlers.search_by_filter,
+        'search_employees': search_handlers.search_employees,
+        'employee_events': search_handlers.show_employee_events,
+        'search_by_type': search_handlers.search_by_event_type,
+        'search_event_type': search_handlers.search_events_by_type,
+        'text_search_start': search_handlers.text_search_start,
+        'quick_text_search': search_handlers.quick_text_search,
+        'text_search_page': search_handlers.text_search_page,
+
+        # Дашборд
+        'dashboard': dashboard_handlers.dashboard_main,
+        'dashboard_analytics': dashboard_handlers.dashboard_analytics,
+        'dashboard_employees': dashboard_handlers.dashboard_employees,
+        'dashboard_performance': dashboard_handlers.dashboard_performance,
+        'dashboard_alerts': dashboard_handlers.dashboard_alerts,
+        'dashboard_timeline': dashboard_handlers.dashboard_timeline,
+
+        # Расширенная аналитика и прогнозы
+        'analytics_menu': analytics_handlers.analytics_main_menu,
+        'analytics_trends': analytics_handlers.analytics_trends,
+        'analytics_timeline': analytics_handlers.analytics_timeline,
+        'analytics_forecast': analytics_handlers.analytics_forecast,
+        'analytics_efficiency': analytics_handlers.analytics_efficiency,
+        'analytics_summary': analytics_handlers.analytics_summary,
+        'analytics_export_excel': analytics_handlers.analytics_export_excel,
+        'analytics_monthly_chart': analytics_handlers.show_monthly_chart,
+        'analytics_weekly_chart': analytics_handlers.show_weekly_chart,
+        'analytics_daily_chart': analytics_handlers.show_daily_chart,
+        'advanced_workload_forecast': analytics_handlers.advanced_workload_forecast,
+        'forecast_short': analytics_handlers.forecast_short,
+        'forecast_medium': analytics_handlers.forecast_medium,
+        'forecast_long': analytics_handlers.forecast_long,
+
+        # Автоматические отчеты
+        'reports_menu': reports_handlers.reports_main_menu,
+        'reports_settings': reports_handlers.reports_settings,
+        'request_report': reports_handlers.request_report,
+        'generate_daily': reports_handlers.generate_daily_report,
+        'generate_weekly': reports_handlers.generate_weekly_report,
+        'generate_monthly': reports_handlers.generate_monthly_report,
+        'generate_full': reports_handlers.generate_full_report,
+        'toggle_daily_reports': reports_handlers.toggle_daily_reports,
+        'toggle_weekly_reports': reports_handlers.toggle_weekly_reports,
+        'toggle_monthly_reports': reports_handlers.toggle_monthly_reports,
+        'test_report': reports_handlers.test_report,
+
+        # Настройки
+        'set_notif_days': settings_handlers.set_notification_days,
+        'set_timezone': settings_handlers.set_timezone,
+        'save_notif_days': settings_handlers.save_notification_days,
+        'save_timezone': settings_handlers.save_timezone,
+
+        # Экспорт
+        'export_menu': export_handlers.export_menu_start,
+        'export': export_handlers.handle_export,
+        'cancel_export': export_handlers.handle_cancel_export,
+
+        # Шаблоны
+        'templates': template_handlers.templates_menu,
+        'select_template': template_handlers.select_employee_for_template,
+        'apply_template': template_handlers.apply_template_to_employee,
+    }
+    return {CALLBACK_SCHEMA[action][0]: handler for action, handler in handlers_by_action.items()}
+
 async def menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Основной обработчик callback-запросов меню"""
-    logger.info(f"📥 Получен callback запрос: {update.callback_query.data if update.callback_query else 'None'}")
-    
-    # Additional logging to debug the issue
-    logger.info(f"🔍 Update type: {type(update)}")
-    logger.info(f"🔍 Callback query: {update.callback_query if update.callback_query else 'No callback query'}")
-    
     query = update.callback_query
+    logger.debug(f"📥 Получен callback запрос: {query.data}")
     
     # Обработка таймаутов при ответе на callback
     try:
         await query.answer()
-        logger.info("✅ Ответ на callback запрос отправлен")
     except Exception as e:
         logger.warning(f"Failed to answer callback query (network timeout): {e}")
         # Продолжаем выполнение несмотря на таймаут
     
     try:
-        data = parse_callback_data(query.data)
-        logger.info(f"📝 Распарсенные данные: {data}")
-        action = data.get('action')
+        if not _ROUTES:
+            _ROUTES.update(_build_routes())
         
-        if not action:
-            logger.warning("❌ Не найдено действие в callback данных")
+        # Поиск обработчика по коду действия - без разбора параметров кнопки
+        handler = _ROUTES.get(callback_code(query.data))
+        if handler is None:
+            logger.warning(f"❌ Неизвестное действие: {query.data}")
             # Отправляем новое сообщение вместо редактирования
             await context.bot.send_message(
                 chat_id=update.effective_chat.id,
@@ -113,303 +225,11 @@ async def menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             )
             return
         
-        logger.info(f"🎯 Выполняется действие: {action}")
-        
-        # Импортируем обработчики по мере необходимости, чтобы избежать циклических импортов
-        if action == "menu":
-            await show_menu(update, context)
-            
-        elif action == "help":
-            await help_command(update, context)
-            
-        elif action == "my_events":
-            from handlers.event_handlers import my_events
-            await my_events(update, context)
-            
-        elif action == "add_employee":
-            from handlers.employee_handlers import add_employee_start
-            await add_employee_start(update, context)
-            
-        elif action == "list_employees":
-            from handlers.employee_handlers import list_employees
-            await list_employees(update, context)
-            
-        elif action == "all_events":
-            from handlers.event_handlers import all_events
-            await all_events(update, context)
-            
-        elif action == "search_menu":
-            from handlers.search_handlers import search_menu_start
-            await search_menu_start(update, context)
-            
-        elif action == "export_menu":
-            from handlers.export_handlers import export_menu_start
-            await export_menu_start(update, context)
-            
-        elif action == "templates":
-            from handlers.template_handlers import templates_menu
-            await templates_menu(update, context)
-            
-        elif action == "settings":
-            await settings_menu(update, context)
-            
-        # Обработка действий с параметрами
-        elif action == "select_employee":
-            employee_id = data.get('id')
-            if employee_id:
-                context.user_data['selected_employee'] = employee_id
-                from handlers.employee_handlers import view_employee_details
-                await view_employee_details(update, context)
-                
-        elif action == "emp_page":
-            page = data.get('page', 0)
-            context.user_data['employee_page'] = page
-            from handlers.employee_handlers import list_employees
-            await list_employees(update, context)
-            
-        # Новые обработчики поиска
-        elif action == "search_filter":
-            from handlers.search_handlers import search_by_filter
-            await search_by_filter(update, context)
-            
-        elif action == "search_employees":
-            from handlers.search_handlers import search_employees
-            await search_employees(update, context)
-            
-        elif action == "employee_events":
-            from handlers.search_handlers import show_employee_events
-            await show_employee_events(update, context)
-            
-        elif action == "search_by_type":
-            from handlers.search_handlers import search_by_event_type
-            await search_by_event_type(update, context)
-            
-        elif action == "search_event_type":
-            from handlers.search_handlers import search_events_by_type
-            await search_events_by_type(update, context)
-            
-        # Обработчики дашборда
-        elif action == "dashboard":
-            from handlers.dashboard_handlers import dashboard_main
-            await dashboard_main(update, context)
-            
-        elif action == "dashboard_analytics":
-            from handlers.dashboard_handlers import dashboard_analytics
-            await dashboard_analytics(update, context)
-            
-        elif action == "dashboard_employees":
-            from handlers.dashboard_handlers import dashboard_employees
-            await dashboard_employees(update, context)
-            
-        elif action == "dashboard_performance":
-            from handlers.dashboard_handlers import dashboard_performance
-            await dashboard_performance(update, context)
-            
-        elif action == "dashboard_alerts":
-            from handlers.dashboard_handlers import dashboard_alerts
-            await dashboard_alerts(update, context)
-            
-        elif action == "dashboard_timeline":
-            from handlers.dashboard_handlers import dashboard_timeline
-            await dashboard_timeline(update, context)
-            
-        # Обработчики текстового поиска
-        elif action == "text_search_start":
-            from handlers.search_handlers import text_search_start
-            await text_search_start(update, context)
-            
-        elif action == "quick_text_search":
-            from handlers.search_handlers import quick_text_search
-            await quick_text_search(update, context)
-            
-        elif action == "text_search_page":
-            from handlers.search_handlers import text_search_page
-            await text_search_page(update, context)
-            
-        # Обработчики расширенной аналитики
-        elif action == "analytics_menu":
-            from handlers.analytics_handlers import analytics_main_menu
-            await analytics_main_menu(update, context)
-            
-        elif action == "analytics_trends":
-            from handlers.analytics_handlers import analytics_trends
-            await analytics_trends(update, context)
-            
-        elif action == "analytics_timeline":
-            from handlers.analytics_handlers import analytics_timeline
-            await analytics_timeline(update, context)
-            
-        elif action == "analytics_forecast":
-            from handlers.analytics_handlers import analytics_forecast
-            await analytics_forecast(update, context)
-            
-        elif action == "analytics_efficiency":
-            from handlers.analytics_handlers import analytics_efficiency
-            await analytics_efficiency(update, context)
-            
-        elif action == "analytics_summary":
-            from handlers.analytics_handlers import analytics_summary
-            await analytics_summary(update, context)
-            
-        elif action == "analytics_export_excel":
-            from handlers.analytics_handlers import analytics_export_excel
-            await analytics_export_excel(update, context)
-            
-        # Обработчики детальных временных диаграмм
-        elif action == "analytics_monthly_chart":
-            from handlers.analytics_handlers import show_monthly_chart
-            await show_monthly_chart(update, context)
-            
-        elif action == "analytics_weekly_chart":
-            from handlers.analytics_handlers import show_weekly_chart
-            await show_weekly_chart(update, context)
-            
-        elif action == "analytics_daily_chart":
-            from handlers.analytics_handlers import show_daily_chart
-            await show_daily_chart(update, context)
-            
-        # Обработчики автоматических отчетов
-        elif action == "reports_menu":
-            from handlers.reports_handlers import reports_main_menu
-            await reports_main_menu(update, context)
-            
-        elif action == "reports_settings":
-            from handlers.reports_handlers import reports_settings
-            await reports_settings(update, context)
-            
-        elif action == "request_report":
-            from handlers.reports_handlers import request_report
-            await request_report(update, context)
-            
-        elif action == "generate_daily":
-            from handlers.reports_handlers import generate_daily_report
-            await generate_daily_report(update, context)
-            
-        elif action == "generate_weekly":
-            from handlers.reports_handlers import generate_weekly_report
-            await generate_weekly_report(update, context)
-            
-        elif action == "generate_monthly":
-            from handlers.reports_handlers import generate_monthly_report
-            await generate_monthly_report(update, context)
-            
-        elif action == "generate_full":
-            from handlers.reports_handlers import generate_full_report
-            await generate_full_report(update, context)
-            
-        elif action == "toggle_daily_reports":
-            from handlers.reports_handlers import toggle_daily_reports
-            await toggle_daily_reports(update, context)
-            
-        elif action == "toggle_weekly_reports":
-            from handlers.reports_handlers import toggle_weekly_reports
-            await toggle_weekly_reports(update, context)
-            
-        elif action == "toggle_monthly_reports":
-            from handlers.reports_handlers import toggle_monthly_reports
-            await toggle_monthly_reports(update, context)
-            
-        elif action == "test_report":
-            from handlers.reports_handlers import test_report
-            await test_report(update, context)
-            
-        # Обработчики расширенного прогнозирования
-        elif action == "advanced_workload_forecast":
-            from handlers.analytics_handlers import advanced_workload_forecast
-            await advanced_workload_forecast(update, context)
-            
-        elif action == "forecast_short":
-            from handlers.analytics_handlers import forecast_short
-            await forecast_short(update, context)
-            
-        elif action == "forecast_medium":
-            from handlers.analytics_handlers import forecast_medium
-            await forecast_medium(update, context)
-            
-        elif action == "forecast_long":
-            from handlers.analytics_handlers import forecast_long
-            await forecast_long(update, context)
-            
-        # Обработчики настроек
-        elif action == "set_notif_days":
-            from handlers.settings_handlers import set_notification_days
-            await set_notification_days(update, context)
-            
-        elif action == "set_timezone":
-            from handlers.settings_handlers import set_timezone
-            await set_timezone(update, context)
-            
-        # Обработчики экспорта
-        elif action == "export":
-            from handlers.export_handlers import handle_export
-            await handle_export(update, context)
-            
-        # Обработчики шаблонов
-        elif action == "select_template":
-            from handlers.template_handlers import select_employee_for_template
-            await select_employee_for_template(update, context)
-            
-        elif action == "apply_template":
-            from handlers.template_handlers import apply_template_to_employee
-            await apply_template_to_employee(update, context)
-            
-        # Обработчики редактирования сотрудников
-        elif action == "edit_employee":
-            from handlers.employee_handlers import edit_employee_start
-            await edit_employee_start(update, context)
-            
-        # Обработчики сохранения настроек
-        elif action == "save_notif_days":
-            from handlers.settings_handlers import save_notification_days
-            await save_notification_days(update, context)
-            
-        elif action == "save_timezone":
-            from handlers.settings_handlers import save_timezone
-            await save_timezone(update, context)
-            
-        # Обработчики редактирования сотрудников
-        elif action == "edit_employee":
-            from handlers.employee_handlers import edit_employee_start
-            await edit_employee_start(update, context)
-            
-        elif action == "edit_name":
-            from handlers.employee_handlers import edit_employee_name
-            await edit_employee_name(update, context)
-            
-        elif action == "edit_position":
-            from handlers.employee_handlers import edit_employee_position
-            await edit_employee_position(update, context)
-            
-        elif action == "save_position":
-            from handlers.employee_handlers import save_employee_position
-            await save_employee_position(update, context)
-            
-        # Обработчики добавления событий к сотруднику
-        elif action == "add_event_to_employee":
-            from handlers.employee_handlers import add_event_to_employee
-            await add_event_to_employee(update, context)
-            
-        # Обработчики удаления сотрудника
-        elif action == "delete_employee":
-            from handlers.employee_handlers import delete_employee
-            await delete_employee(update, context)
-            
-        elif action == "confirm_delete":
-            from handlers.employee_handlers import confirm_delete_employee
-            await confirm_delete_employee(update, context)
-            
-        else:
-            logger.warning(f"❌ Неизвестное действие: {action}")
-            # Отправляем новое сообщение вместо редактирования
-            await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text="❌ Неизвестная команда"
-            )
+        await handler(update, context)
             
     except Exception as e:
         logger.error(f"Error in menu_handler: {e}", exc_info=True)
         logger.error(f"Update details: {update}")
-        logger.error(f"Context details: {context}")
         # Отправляем новое сообщение вместо редактирования
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
@@ -497,7 +317,7 @@ async def settings_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
 
-    if not is_admin(chat_id, user_id):
+    if not await is_admin(chat_id, user_id):
         # Отправляем новое сообщение вместо редактирования
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
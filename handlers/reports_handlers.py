@@ -12,30 +12,17 @@ from core.utils import create_callback_data, parse_callback_data
 from core.security import is_admin
 from managers.automated_reports_manager import AutomatedReportsManager
 from core.database import db_manager
+from core.screen_cache import Screen, screen_cache
 
 # Инициализируем менеджер автоматических отчетов
 automated_reports_manager = AutomatedReportsManager(db_manager)
 
 logger = logging.getLogger(__name__)
 
-async def reports_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Главное меню автоматических отчетов"""
-    query = update.callback_query
-    await query.answer()
-    
-    chat_id = update.effective_chat.id
-    user_id = update.effective_user.id
-    
-    if not is_admin(chat_id, user_id):
-        # Отправляем новое сообщение вместо редактирования
-        await context.bot.send_message(
-            chat_id=update.effective_chat.id,
-            text="❌ Только администратор может управлять отчетами"
-        )
-        return
-    
+async def _render_reports_main_menu(chat_id: int) -> Screen:
+    """Экран автоматических отчетов с текущими настройками"""
     # Получаем текущие настройки
-    settings = automated_reports_manager.get_report_settings(chat_id)
+    settings = await db_manager.run_sync(automated_reports_manager.get_report_settings, chat_id)
     
     text_lines = [
         "📊 <b>Автоматические отчеты</b>",
@@ -69,23 +56,38 @@ async def reports_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE)
         ]
     ]
     
+    return text, InlineKeyboardMarkup(keyboard)
+
+async def reports_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Главное меню автоматических отчетов"""
+    query = update.callback_query
+    await query.answer()
+    
+    chat_id = update.effective_chat.id
+    user_id = update.effective_user.id
+    
+    if not await is_admin(chat_id, user_id):
+        # Отправляем новое сообщение вместо редактирования
+        await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            text="❌ Только администратор может управлять отчетами"
+        )
+        return
+    
+    text, reply_markup = await screen_cache.render(chat_id, "reports_main_menu", _render_reports_main_menu)
+    
     # Отправляем новое сообщение вместо редактирования
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text=text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=reply_markup,
         parse_mode='HTML'
     )
 
-async def reports_settings(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Настройки автоматических отчетов"""
-    query = update.callback_query
-    await query.answer()
-    
-    chat_id = update.effective_chat.id
-    
+async def _render_reports_settings(chat_id: int) -> Screen:
+    """Экран настроек автоматических отчетов"""
     # Получаем текущие настройки
-    settings = automated_reports_manager.get_report_settings(chat_id)
+    settings = await db_manager.run_sync(automated_reports_manager.get_report_settings, chat_id)
     
     text_lines = [
         "⚙️ <b>Настройки автоматических отчетов</b>",
@@ -134,11 +136,22 @@ async def reports_settings(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         ]
     ]
     
+    return text, InlineKeyboardMarkup(keyboard)
+
+async def reports_settings(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Настройки автоматических отчетов"""
+    query = update.callback_query
+    await query.answer()
+    
+    chat_id = update.effective_chat.id
+    
+    text, reply_markup = await screen_cache.render(chat_id, "reports_settings", _render_reports_settings)
+    
     # Отправляем новое сообщение вместо редактирования
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text=text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=reply_markup,
         parse_mode='HTML'
     )
 
@@ -336,11 +349,11 @@ async def toggle_daily_reports(update: Update, context: ContextTypes.DEFAULT_TYP
     
     try:
         # Получаем текущие настройки
-        settings = automated_reports_manager.get_report_settings(chat_id)
+        settings = await db_manager.run_sync(automated_reports_manager.get_report_settings, chat_id)
         new_status = not settings.get('daily_enabled', True)
         
         # Обновляем настройки
-        db_manager.execute_with_retry('''
+        await db_manager.execute('''
             INSERT OR REPLACE INTO report_settings 
             (chat_id, daily_enabled, weekly_enabled, monthly_enabled, daily_time, weekly_day, monthly_day)
             VALUES (?, ?, ?, ?, ?, ?, ?)
@@ -349,6 +362,7 @@ async def toggle_daily_reports(update: Update, context: ContextTypes.DEFAULT_TYP
             settings.get('monthly_enabled', True), settings.get('daily_time', '09:00'),
             settings.get('weekly_day', 1), settings.get('monthly_day', 1)
         ))
+        db_manager.chat_settings.invalidate(chat_id)
         
         status_text = "включены" if new_status else "отключены"
         await query.answer(f"📅 Ежедневные отчеты {status_text}")
@@ -368,10 +382,10 @@ async def toggle_weekly_reports(update: Update, context: ContextTypes.DEFAULT_TY
     chat_id = update.effective_chat.id
     
     try:
-        settings = automated_reports_manager.get_report_settings(chat_id)
+        settings = await db_manager.run_sync(automated_reports_manager.get_report_settings, chat_id)
         new_status = not settings.get('weekly_enabled', True)
         
-        db_manager.execute_with_retry('''
+        await db_manager.execute('''
             INSERT OR REPLACE INTO report_settings 
             (chat_id, daily_enabled, weekly_enabled, monthly_enabled, daily_time, weekly_day, monthly_day)
             VALUES (?, ?, ?, ?, ?, ?, ?)
@@ -380,6 +394,7 @@ async def toggle_weekly_reports(update: Update, context: ContextTypes.DEFAULT_TY
             settings.get('monthly_enabled', True), settings.get('daily_time', '09:00'),
             settings.get('weekly_day', 1), settings.get('monthly_day', 1)
         ))
+        db_manager.chat_settings.invalidate(chat_id)
         
         status_text = "включены" if new_status else "отключены"
         await query.answer(f"📊 Еженедельные отчеты {status_text}")
@@ -398,10 +413,10 @@ async def toggle_monthly_reports(update: Update, context: ContextTypes.DEFAULT_T
     chat_id = update.effective_chat.id
     
     try:
-        settings = automated_reports_manager.get_report_settings(chat_id)
+        settings = await db_manager.run_sync(automated_reports_manager.get_report_settings, chat_id)
         new_status = not settings.get('monthly_enabled', True)
         
-        db_manager.execute_with_retry('''
+        await db_manager.execute('''
             INSERT OR REPLACE INTO report_settings 
             (chat_id, daily_enabled, weekly_enabled, monthly_enabled, daily_time, weekly_day, monthly_day)
             VALUES (?, ?, ?, ?, ?, ?, ?)
@@ -410,6 +425,7 @@ async def toggle_monthly_reports(update: Update, context: ContextTypes.DEFAULT_T
             new_status, settings.get('daily_time', '09:00'),
             settings.get('weekly_day', 1), settings.get('monthly_day', 1)
         ))
+        db_manager.chat_settings.invalidate(chat_id)
         
         status_text = "включены" if new_status else "отключены"
         await query.answer(f"📈 Месячные отчеты {status_text}")
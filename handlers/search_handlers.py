@@ -11,7 +11,7 @@ from core.utils import create_callback_data, parse_callback_data
 from core.security import is_admin
 from managers.search_manager import SearchManager
 from core.database import db_manager
-from core.security import decrypt_data
+from core.security import decrypt_employee_name
 
 # Инициализируем менеджер поиска
 search_manager = SearchManager(db_manager)
@@ -26,7 +26,7 @@ async def search_menu_start(update: Update, context: ContextTypes.DEFAULT_TYPE)
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
     
-    if not is_admin(chat_id, user_id):
+    if not await is_admin(chat_id, user_id):
         # Отправляем новое сообщение вместо редактирования
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
@@ -35,7 +35,7 @@ async def search_menu_start(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
     
     # Получаем статистику
-    stats = search_manager.get_events_statistics(chat_id)
+    stats = await db_manager.run_sync(search_manager.get_events_statistics, chat_id)
     
     text = (
         "🔍 <b>Расширенный поиск событий</b>\n\n"
@@ -83,6 +83,7 @@ async def search_by_filter(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     data = parse_callback_data(query.data)
     status = data.get('status')
     page = data.get('page', 0)
+    cursor = data.get('c')
     
     chat_id = update.effective_chat.id
     
@@ -110,7 +111,8 @@ async def search_by_filter(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         query="",
         filters=config['filters'],
         page=page,
-        per_page=5
+        per_page=5,
+        cursor=cursor
     )
     
     await display_search_results(update, context, results, config['title'], status, page)
@@ -154,12 +156,14 @@ async def display_search_results(update: Update, context: ContextTypes.DEFAULT_T
         if pagination['has_prev']:
             pagination_buttons.append(
                 InlineKeyboardButton("⬅️ Пред", 
-                    callback_data=create_callback_data("search_filter", status=search_type, page=page-1))
+                    callback_data=create_callback_data("search_filter", status=search_type,
+                                                       page=pagination['current_page'] - 1, c=pagination['prev_cursor']))
             )
         if pagination['has_next']:
             pagination_buttons.append(
                 InlineKeyboardButton("След ➡️", 
-                    callback_data=create_callback_data("search_filter", status=search_type, page=page+1))
+                    callback_data=create_callback_data("search_filter", status=search_type,
+                                                       page=pagination['current_page'] + 1, c=pagination['next_cursor']))
             )
         
         if pagination_buttons:
@@ -188,7 +192,7 @@ async def search_employees(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     page = parse_callback_data(query.data).get('page', 0)
     
     # Получаем всех сотрудников
-    employees = search_manager.search_employees(chat_id)
+    employees = await db_manager.run_sync(search_manager.search_employees, chat_id)
     
     if not employees:
         text = "👥 <b>Поиск сотрудников</b>\n\n❌ Сотрудники не найдены"
@@ -267,9 +271,9 @@ async def show_employee_events(update: Update, context: ContextTypes.DEFAULT_TYP
         return
     
     # Получаем информацию о сотруднике и его событиях
-    employee = db_manager.execute_with_retry('''
+    employee = await db_manager.fetch_one('''
         SELECT full_name, position FROM employees WHERE id = ?
-    ''', (employee_id,), fetch="one")
+    ''', (employee_id,))
     
     if not employee:
         # Отправляем новое сообщение вместо редактирования
@@ -280,17 +284,17 @@ async def show_employee_events(update: Update, context: ContextTypes.DEFAULT_TYP
         return
     
     try:
-        decrypted_name = decrypt_data(employee['full_name'])
+        decrypted_name = decrypt_employee_name(employee_id, employee['full_name'])
     except ValueError:
         decrypted_name = "Ошибка дешифрации"
     
     # Получаем события сотрудника
-    events = db_manager.execute_with_retry('''
+    events = await db_manager.fetch_all('''
         SELECT event_type, next_notification_date, interval_days
         FROM employee_events 
         WHERE employee_id = ? 
         ORDER BY next_notification_date
-    ''', (employee_id,), fetch="all")
+    ''', (employee_id,))
     
     # Формируем текст ответа
     text_lines = [
@@ -346,7 +350,7 @@ async def search_by_event_type(update: Update, context: ContextTypes.DEFAULT_TYP
     chat_id = update.effective_chat.id
     
     # Получаем все типы событий
-    event_types = search_manager.get_all_event_types(chat_id)
+    event_types = await db_manager.run_sync(search_manager.get_all_event_types, chat_id)
     
     if not event_types:
         text = "📋 <b>Поиск по типу события</b>\n\n❌ Типы событий не найдены"
@@ -385,6 +389,7 @@ async def search_events_by_type(update: Update, context: ContextTypes.DEFAULT_TY
     data = parse_callback_data(query.data)
     event_type = data.get('type')
     page = data.get('page', 0)
+    cursor = data.get('c')
     
     if not event_type:
         # Отправляем новое сообщение вместо редактирования
@@ -402,7 +407,8 @@ async def search_events_by_type(update: Update, context: ContextTypes.DEFAULT_TY
         query="",
         filters={'event_type': event_type},
         page=page,
-        per_page=5
+        per_page=5,
+        cursor=cursor
     )
     
     await display_search_results(update, context, results, f"События типа: {event_type}", f"type_{event_type}", page)
@@ -415,7 +421,7 @@ async def text_search_start(update: Update, context: ContextTypes.DEFAULT_TYPE)
     chat_id = update.effective_chat.id
     
     # Получаем популярные поисковые запросы
-    popular_searches = search_manager.get_popular_searches(chat_id, limit=8)
+    popular_searches = await db_manager.run_sync(search_manager.get_popular_searches, chat_id, limit=8)
     
     text_lines = [
         "🔤 <b>Текстовый поиск</b>",
@@ -504,13 +510,9 @@ async def perform_text_search(update: Update, context: ContextTypes.DEFAULT_TYPE
         search_msg = await update.message.reply_text("🔍 Поиск...")
     
     try:
-        # Выполняем умный поиск
-        results = await search_manager.smart_text_search(
-            chat_id=chat_id,
-            query=search_query,
-            page=page,
-            per_page=5
-        )
+        # Выполняем поиск один раз: следующие страницы читаются из сессии
+        session = await search_manager.open_text_search(chat_id, search_query)
+        results = await search_manager.get_text_search_page(session, page, per_page=5)
         
         await display_text_search_results(update, context, results, search_query, page)
         
@@ -531,6 +533,7 @@ async def display_text_search_results(update: Update, context: ContextTypes.DEFA
     events = results.get('results', [])
     pagination = results.get('pagination', {})
     suggestions = results.get('search_suggestions', [])
+    session_id = results.get('session_id')
     
     if not events:
         text_lines = [
@@ -595,12 +598,12 @@ async def display_text_search_results(update: Update, context: ContextTypes.DEFA
         if pagination.get('has_prev'):
             pagination_buttons.append(
                 InlineKeyboardButton("⬅️ Пред", 
-                    callback_data=create_callback_data("text_search_page", q=query, p=page-1))
+                    callback_data=create_callback_data("text_search_page", q=query, p=page-1, s=session_id))
             )
         if pagination.get('has_next'):
             pagination_buttons.append(
                 InlineKeyboardButton("След ➡️", 
-                    callback_data=create_callback_data("text_search_page", q=query, p=page+1))
+                    callback_data=create_callback_data("text_search_page", q=query, p=page+1, s=session_id))
             )
         
         if pagination_buttons:
@@ -632,7 +635,13 @@ async def text_search_page(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     search_query = data.get('q', '')
     page = data.get('p', 0)
     
-    if search_query:
+    # Страница из сессии поиска - без повторного поиска по всем событиям чата
+    session = await search_manager.resume_text_search(update.effective_chat.id, data.get('s'))
+    if session:
+        results = await search_manager.get_text_search_page(session, page, per_page=5)
+        await display_text_search_results(update, context, results, session.query, page)
+    elif search_query:
+        # Сессия истекла или данные изменились - ищем заново
         await perform_text_search(update, context, search_query, page)
     else:
         # Отправляем новое сообщение вместо редактирования
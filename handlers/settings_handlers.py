@@ -21,7 +21,7 @@ async def set_notification_days(update: Update, context: ContextTypes.DEFAULT_TY
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
     
-    if not is_admin(chat_id, user_id):
+    if not await is_admin(chat_id, user_id):
         # Отправляем новое сообщение вместо редактирования
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
@@ -30,11 +30,9 @@ async def set_notification_days(update: Update, context: ContextTypes.DEFAULT_TY
         return
     
     # Получаем текущие настройки
-    current_settings = db_manager.execute_with_retry('''
-        SELECT notification_days FROM chat_settings WHERE chat_id = ?
-    ''', (chat_id,), fetch="one")
+    current_settings = await db_manager.chat_settings.get_async(chat_id)
     
-    current_days = current_settings['notification_days'] if current_settings else 90
+    current_days = current_settings.notification_days if current_settings else 90
     
     keyboard = [
         [InlineKeyboardButton("30 дней", callback_data=create_callback_data("save_notif_days", days=30))],
@@ -77,11 +75,12 @@ async def save_notification_days(update: Update, context: ContextTypes.DEFAULT_T
         return
     
     try:
-        db_manager.execute_with_retry('''
+        await db_manager.execute('''
             UPDATE chat_settings 
             SET notification_days = ? 
             WHERE chat_id = ?
         ''', (days, chat_id))
+        db_manager.chat_settings.invalidate(chat_id)
         
         # Отправляем новое сообщение вместо редактирования
         await context.bot.send_message(
@@ -108,7 +107,7 @@ async def set_timezone(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
     
-    if not is_admin(chat_id, user_id):
+    if not await is_admin(chat_id, user_id):
         # Отправляем новое сообщение вместо редактирования
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
@@ -117,11 +116,9 @@ async def set_timezone(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         return
     
     # Получаем текущие настройки
-    current_settings = db_manager.execute_with_retry('''
-        SELECT timezone FROM chat_settings WHERE chat_id = ?
-    ''', (chat_id,), fetch="one")
+    current_settings = await db_manager.chat_settings.get_async(chat_id)
     
-    current_tz = current_settings['timezone'] if current_settings else 'Europe/Moscow'
+    current_tz = current_settings.timezone if current_settings else 'Europe/Moscow'
     
     keyboard = [
         [InlineKeyboardButton("🇷🇺 Москва (Europe/Moscow)", callback_data=create_callback_data("save_timezone", tz="Europe/Moscow"))],
@@ -164,11 +161,12 @@ async def save_timezone(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         return
     
     try:
-        db_manager.execute_with_retry('''
+        await db_manager.execute('''
             UPDATE chat_settings 
             SET timezone = ? 
             WHERE chat_id = ?
         ''', (timezone, chat_id))
+        db_manager.chat_settings.invalidate(chat_id)
         
         # Отправляем новое сообщение вместо редактирования
         await context.bot.send_message(
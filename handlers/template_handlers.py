@@ -6,7 +6,7 @@ import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
-from core.security import is_admin, decrypt_data
+from core.security import is_admin, decrypt_employee_name
 from core.utils import create_callback_data, parse_callback_data
 from core.database import db_manager
 from managers.template_manager import TemplateManager
@@ -24,7 +24,7 @@ async def templates_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
     
-    if not is_admin(chat_id, user_id):
+    if not await is_admin(chat_id, user_id):
         # Отправляем новое сообщение вместо редактирования
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
@@ -95,16 +95,13 @@ async def select_employee_for_template(update: Update, context: ContextTypes.DEF
     
     try:
         # Получаем список сотрудников
-        with db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                '''SELECT id, full_name, position 
-                   FROM employees 
-                   WHERE chat_id = ? AND is_active = 1 
-                   ORDER BY full_name''',
-                (chat_id,)
-            )
-            employees = cursor.fetchall()
+        employees = await db_manager.fetch_all(
+            '''SELECT id, full_name, position 
+               FROM employees 
+               WHERE chat_id = ? AND is_active = 1 
+               ORDER BY full_name''',
+            (chat_id,)
+        )
         
         if not employees:
             # Отправляем новое сообщение вместо редактирования
@@ -123,7 +120,7 @@ async def select_employee_for_template(update: Update, context: ContextTypes.DEF
         keyboard = []
         for emp in employees:
             try:
-                decrypted_name = decrypt_data(emp['full_name'])
+                decrypted_name = decrypt_employee_name(emp['id'], emp['full_name'])
             except ValueError:
                 decrypted_name = "Ошибка дешифрации"
             
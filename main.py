@@ -9,7 +9,7 @@ import logging
 import platform
 import traceback
 import fcntl
-from datetime import time as dt_time, timedelta
+from datetime import datetime, time as dt_time, timedelta
 
 import pytz
 from telegram.ext import (
@@ -21,7 +21,10 @@ from telegram import Update
 # Импорты модулей
 from config.settings import BotConfig
 from config.constants import ConversationStates
+from core.callback_codec import callback_pattern
 from core.database import db_manager
+from core.dispatcher import OutgoingMessage, get_dispatcher
+from core.security import decrypt_employee_name
 from core.utils import singleton_lock
 from managers import init_managers
 from handlers import (
@@ -92,30 +95,24 @@ async def start(update, context):
     logger = logging.getLogger(__name__)
 
     try:
-        with db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT admin_id FROM chat_settings WHERE chat_id = ?",
-                (chat_id,)
+        settings = await db_manager.run_sync(db_manager.chat_settings.get, chat_id)
+
+        if not settings:
+            # Первый запуск - создаем настройки
+            await db_manager.execute(
+                '''INSERT INTO chat_settings (chat_id, admin_id, timezone, notification_days)
+                   VALUES (?, ?, ?, ?)''',
+                (chat_id, user_id, BotConfig.DEFAULT_TIMEZONE, BotConfig.DEFAULT_NOTIFICATION_DAYS)
+            )
+            db_manager.chat_settings.invalidate(chat_id)
+            await update.message.reply_text(
+                "🎉 Привет! Я бот для учета периодических событий. "
+                "Вы назначены администратором этого чата."
+            )
+        else:
+            await update.message.reply_text(
+                "👋 Привет! Я бот для учета периодических событий."
             )
-            settings = cursor.fetchone()
-
-            if not settings:
-                # Первый запуск - создаем настройки
-                cursor.execute(
-                    '''INSERT INTO chat_settings (chat_id, admin_id, timezone, notification_days)
-                       VALUES (?, ?, ?, ?)''',
-                    (chat_id, user_id, BotConfig.DEFAULT_TIMEZONE, BotConfig.DEFAULT_NOTIFICATION_DAYS)
-                )
-                conn.commit()
-                await update.message.reply_text(
-                    "🎉 Привет! Я бот для учета периодических событий. "
-                    "Вы назначены администратором этого чата."
-                )
-            else:
-                await update.message.reply_text(
-                    "👋 Привет! Я бот для учета периодических событий."
-                )
     except Exception as e:
         logger.error(f"Error in start command: {e}")
         await update.message.reply_text(
@@ -133,7 +130,19 @@ async def enhanced_send_notifications(context):
         (notification_manager, excel_exporter, search_manager, template_manager, 
          dashboard_manager, advanced_analytics_manager, automated_reports_manager) = init_managers()
         
-        notifications = db_manager.execute_with_retry('''
+        today = datetime.now().date()
+        sent_on = today.isoformat()
+
+        # Прошедшие дни рассылки переносятся вперед: сегодняшний день рассылки
+        # остается только у событий, о которых сегодня нужно уведомить
+        await db_manager.run_sync(db_manager.refresh_notification_schedule, sent_on)
+
+        # Уже отправленные сегодня (или отправляемые параллельным запуском) события
+        # отсекаются журналом notification_history прямо в выборке: событие пропускается,
+        # когда каждому получателю (администратору и сотруднику с user_id) уведомление
+        # доставлено или зарезервировано недавно. Брошенные резервы выбираются снова
+        stale_after = f"-{BotConfig.NOTIFICATION_CLAIM_TIMEOUT} seconds"
+        notifications = await db_manager.fetch_all('''
             SELECT 
                 ee.id, e.chat_id, e.user_id, e.full_name, e.position,
                 ee.event_type, ee.next_notification_date, ee.interval_days,
@@ -142,76 +151,121 @@ async def enhanced_send_notifications(context):
             FROM employee_events ee
             JOIN employees e ON ee.employee_id = e.id
             JOIN chat_settings cs ON e.chat_id = cs.chat_id
-            WHERE e.is_active = 1 
-            AND date(ee.next_notification_date) BETWEEN date('now', '-7 days')
-            AND date('now', '+' || cs.notification_days || ' days')
+            WHERE ee.next_send_on = ? AND e.is_active = 1 
+            AND ee.next_notification_date <= date(?, '+' || cs.notification_days || ' days')
+            AND (
+                SELECT COUNT(*) FROM notification_history nh
+                WHERE nh.event_id = ee.id AND nh.sent_on = ?
+                AND (nh.status = 'sent' OR (nh.status = 'pending' AND nh.sent_date >= datetime('now', ?)))
+            ) < 1 + (e.user_id IS NOT NULL)
             ORDER BY ee.next_notification_date
-        ''', fetch="all")
+        ''', (sent_on, sent_on, sent_on, stale_after))
 
         if not notifications:
             logger.info("No notifications to send")
             return
 
-        notifications_sent = 0
-        escalations_sent = 0
-
+        due = []
         for notification in notifications:
             try:
                 # Определяем дни до события
-                from datetime import datetime
                 event_date = datetime.fromisoformat(notification['next_notification_date']).date()
-                days_until = (event_date - datetime.now().date()).days
+                days_until = (event_date - today).days
 
                 # Определяем уровень уведомления
                 level = notification_manager.get_notification_level(days_until)
                 
                 # Проверяем, нужно ли отправлять уведомление сегодня
-                if not notification_manager.should_send_notification(level, days_until):
-                    continue
+                if notification_manager.should_send_notification(level, days_until):
+                    due.append((notification, level))
+
+            except Exception as e:
+                logger.error(f"Error processing notification {notification['id']}: {e}")
 
-                # Формируем сообщение
-                message = notification_manager.format_notification_message(notification, level)
+        # Резервируем записи журнала по каждому получателю: параллельный запуск
+        # не отправит их повторно, а сбой одной доставки не повторяет другую.
+        # О критичных событиях администратор узнает из сводки - ее запись имеет свой тип
+        admin, employee = notification_manager.RECIPIENT_ADMIN, notification_manager.RECIPIENT_EMPLOYEE
+        candidates = []
+        for notification, level in due:
+            candidates.append((notification['id'], notification_manager.admin_notification_type(level), admin))
+            if notification['user_id']:
+                candidates.append((notification['id'], level.value, employee))
+        claimed = await notification_manager.claim_notifications(candidates, sent_on)
+
+        outgoing = []
+        escalations = []
+
+        for notification, level in due:
+            admin_key = (notification['id'], notification_manager.admin_notification_type(level), admin)
+            employee_key = (notification['id'], level.value, employee)
+            if admin_key not in claimed and employee_key not in claimed:
+                continue
+
+            try:
+                # Формируем сообщение (ФИО расшифровывается один раз и для сводки эскалаций)
+                full_name = decrypt_employee_name(notification['employee_id'], notification['full_name'])
+                message = notification_manager.format_notification_message(notification, level, full_name)
                 keyboard = notification_manager.create_action_keyboard(notification)
 
-                # Отправляем сотруднику
-                if notification['user_id']:
-                    try:
-                        await context.bot.send_message(
-                            chat_id=notification['user_id'],
-                            text=message,
-                            parse_mode='HTML',
-                            reply_markup=keyboard
-                        )
-                    except Exception as e:
-                        logger.warning(f"Failed to send to user {notification['user_id']}: {e}")
-
-                # Отправляем администратору
-                try:
-                    admin_message = f"[👨‍💼 ADMIN] {message}"
-                    await context.bot.send_message(
-                        chat_id=notification['admin_id'],
-                        text=admin_message,
-                        parse_mode='HTML',
-                        reply_markup=keyboard
-                    )
-                    notifications_sent += 1
-                except Exception as e:
-                    logger.error(f"Failed to send to admin {notification['admin_id']}: {e}")
-
-                # Эскалация для критичных случаев
-                from config.constants import NotificationLevel
-                if level in [NotificationLevel.CRITICAL, NotificationLevel.OVERDUE]:
-                    await notification_manager.send_escalated_notifications(context, notification, level)
-                    escalations_sent += 1
+                # Сотруднику
+                if employee_key in claimed:
+                    outgoing.append(OutgoingMessage(
+                        chat_id=notification['user_id'], text=message, reply_markup=keyboard,
+                        tag=employee_key
+                    ))
+
+                if admin_key in claimed:
+                    if level in notification_manager.ESCALATION_LEVELS:
+                        # Критичные случаи - только в сводке эскалаций
+                        escalations.append((notification, level, full_name))
+                    else:
+                        # Администратору
+                        outgoing.append(OutgoingMessage(
+                            chat_id=notification['admin_id'],
+                            text=f"[👨‍💼 ADMIN] {message}",
+                            reply_markup=keyboard,
+                            tag=admin_key
+                        ))
 
             except Exception as e:
                 logger.error(f"Error processing notification {notification['id']}: {e}")
 
-        logger.info(f"Enhanced notifications: {notifications_sent} sent, {escalations_sent} escalated")
+        # Одна сводка эскалаций на чат; в очереди администратора она идет после уведомлений
+        outgoing.extend(await notification_manager.build_escalation_digests(escalations))
+
+        # Один диспетчер на приложение: лимиты общие для всех запусков задачи
+        dispatcher = get_dispatcher(context)
+        stats = await dispatcher.dispatch(outgoing)
+
+        delivered = notification_manager.delivered_keys(outgoing, stats.delivered_tags)
+        await notification_manager.record_deliveries(sent_on, delivered, claimed - delivered)
+
+        logger.info(
+            f"Enhanced notifications: {len(stats.delivered_tags)} sent, {len(escalations)} escalated, "
+            f"dispatch stats: {stats.as_dict()}"
+        )
 
     except Exception as e:
         logger.error(f"Critical error in enhanced_send_notifications: {e}")
 
+async def roll_forward_chat_stats(context):
+    """Пересчет счетчиков событий после полуночи в часовом поясе каждого чата"""
+    logger = logging.getLogger(__name__)
+    
+    try:
+        await db_manager.run_sync(db_manager.roll_forward_chat_event_stats)
+    except Exception as e:
+        logger.error(f"Error rolling forward chat event stats: {e}")
+
+async def post_shutdown(application):
+    """Остановка пула процессов экспорта и закрытие соединений с базой при завершении бота"""
+    runner = application.bot_data.get('job_runner')
+    if runner is not None:
+        runner.shutdown()
+    # Закрытие последнего соединения переносит WAL в базу и удаляет файлы -wal/-shm
+    db_manager.close_all()
+
 def main():
     """Главная функция запуска бота"""
     # Защита от дублирующих запусков
@@ -236,14 +290,20 @@ def main():
         # Настройки для более устойчивого соединения
         from telegram.request import HTTPXRequest
         request = HTTPXRequest(
-            connection_pool_size=1,
+            connection_pool_size=BotConfig.HTTP_POOL_SIZE,
             connect_timeout=30.0,
             pool_timeout=30.0,
             read_timeout=30.0,
             write_timeout=30.0
         )
         
-        application = Application.builder().token(BotConfig.BOT_TOKEN).request(request).build()
+        application = (
+            Application.builder()
+            .token(BotConfig.BOT_TOKEN)
+            .request(request)
+            .post_shutdown(post_shutdown)
+            .build()
+        )
         
         # Регистрация основных команд
         application.add_handler(CommandHandler('start', start))
@@ -255,7 +315,7 @@ def main():
             entry_points=[
                 CallbackQueryHandler(
                     add_employee_start,
-                    pattern=r'.*"action":"add_employee".*'
+                    pattern=callback_pattern("add_employee")
                 )
             ],
             states={
@@ -265,8 +325,8 @@ def main():
                     MessageHandler(filters.TEXT & ~filters.COMMAND, add_employee_name)
                 ],
                 ConversationStates.ADD_POSITION: [
-                    CallbackQueryHandler(handle_position_selection, pattern=r'.*"action":"select_position".*'),
-                    CallbackQueryHandler(cancel_add_employee, pattern=r'.*"action":"cancel_add_employee".*')
+                    CallbackQueryHandler(handle_position_selection, pattern=callback_pattern("select_position")),
+                    CallbackQueryHandler(cancel_add_employee, pattern=callback_pattern("cancel_add_employee"))
                 ],
                 ConversationStates.ADD_EVENT_TYPE: [
                     MessageHandler(filters.TEXT & ~filters.COMMAND, add_event_type)
@@ -298,7 +358,7 @@ def main():
             entry_points=[
                 CallbackQueryHandler(
                     edit_employee_name,
-                    pattern=r'.*"action"\s*:\s*"edit_name".*'
+                    pattern=callback_pattern("edit_name")
                 )
             ],
             states={
@@ -322,7 +382,7 @@ def main():
             entry_points=[
                 CallbackQueryHandler(
                     add_event_to_employee,
-                    pattern=r'.*"action"\s*:\s*"add_event".*'
+                    pattern=callback_pattern("add_event")
                 )
             ],
             states={
@@ -371,6 +431,13 @@ def main():
                 first=timedelta(minutes=1)
             )
             
+            # Счетчики событий чатов: каждый час проверяем, у каких чатов наступила полночь
+            job_queue.run_repeating(
+                roll_forward_chat_stats,
+                interval=timedelta(hours=1),
+                first=timedelta(seconds=30)
+            )
+            
             # Автоматические отчеты
             # Ежедневный сводный отчет в 9:00
             job_queue.run_daily(
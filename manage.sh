@@ -253,6 +253,21 @@ test_bot() {
     fi
 }
 
+# Функция заполнения категорий событий
+backfill_categories() {
+    log_info "Заполнение категорий событий..."
+    
+    activate_venv
+    
+    # --all пересчитывает категории всех событий (после изменения правил)
+    if $PYTHON_CMD -m core.event_categories "$@"; then
+        log_success "Категории событий заполнены"
+    else
+        log_error "Ошибка заполнения категорий событий"
+        return 1
+    fi
+}
+
 # Функция очистки
 cleanup() {
     log_info "Очистка временных файлов..."
@@ -320,6 +335,7 @@ show_help() {
     install             Установка зависимостей
     test               Запуск тестов и проверки синтаксиса
     cleanup            Очистка временных файлов
+    categories [--all] Заполнение категорий событий (--all - пересчет всех)
     info               Отображение информации о проекте
     help               Показать эту справку
 
@@ -333,6 +349,7 @@ show_help() {
     ./manage.sh logs -n 100           # Показать последние 100 строк логов
     ./manage.sh restart               # Перезапуск бота
     ./manage.sh cleanup               # Очистка временных файлов
+    ./manage.sh categories --all      # Пересчет категорий событий
 
 ФАЙЛЫ:
     $BOT_SCRIPT          Основной файл бота
@@ -374,6 +391,9 @@ case "$1" in
     cleanup)
         cleanup
         ;;
+    categories)
+        backfill_categories "${@:2}"
+        ;;
     info)
         show_status
         ;;
@@ -385,7 +405,7 @@ case "$1" in
         echo ""
         echo "Используйте './manage.sh help' для получения справки"
         echo ""
-        echo "Доступные команды: start, stop, restart, status, logs, install, test, cleanup, info, help"
+        echo "Доступные команды: start, stop, restart, status, logs, install, test, cleanup, categories, info, help"
         exit 1
         ;;
 esac
\ No newline at end of file
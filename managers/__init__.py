@@ -2,7 +2,7 @@
 Инициализация всех менеджеров для Telegram бота
 """
 
-from core.database import db_manager
+from core.database import get_db_manager
 from managers.notification_manager import NotificationManager
 from managers.export_manager import ExportManager
 from managers.search_manager import SearchManager
@@ -18,6 +18,7 @@ def init_managers():
     Returns:
         Кортеж с инициализированными менеджерами
     """
+    db_manager = get_db_manager()
     notification_manager = NotificationManager(db_manager)
     excel_exporter = ExportManager(db_manager)
     search_manager = SearchManager(db_manager)
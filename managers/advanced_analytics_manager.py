@@ -9,6 +9,8 @@ from typing import List, Dict, Tuple, Optional
 from collections import Counter, defaultdict
 import statistics
 from core.security import decrypt_data
+from core.singleflight import single_flight
+from managers.analytics_snapshot import AnalyticsSnapshot, shift_months, snapshot_cache
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +20,11 @@ class AdvancedAnalyticsManager:
     def __init__(self, db_manager):
         self.db = db_manager
     
+    def _snapshot(self, chat_id: int) -> AnalyticsSnapshot:
+        """Снимок событий чата: все представления аналитики считаются из одной выборки"""
+        return snapshot_cache.get(self.db, chat_id)
+    
+    @single_flight
     def get_trends_analysis(self, chat_id: int, period_months: int = 6) -> Dict:
         """
         Анализ трендов событий за указанный период
@@ -29,23 +36,13 @@ class AdvancedAnalyticsManager:
         Returns:
             Словарь с трендовой аналитикой
         """
-        # Получаем данные по месяцам для трендового анализа
-        monthly_data = self.db.execute_with_retry('''
-            SELECT 
-                strftime('%Y-%m', ee.next_notification_date) as month,
-                COUNT(*) as total_events,
-                COUNT(CASE WHEN date(ee.next_notification_date) < date('now') THEN 1 END) as overdue_events,
-                COUNT(CASE WHEN ee.event_type LIKE '%медосмотр%' OR ee.event_type LIKE '%медицинский%' THEN 1 END) as medical_events,
-                COUNT(CASE WHEN ee.event_type LIKE '%инструктаж%' OR ee.event_type LIKE '%обучение%' THEN 1 END) as training_events,
-                AVG(ee.interval_days) as avg_interval
-            FROM employee_events ee
-            JOIN employees e ON ee.employee_id = e.id
-            WHERE e.chat_id = ? AND e.is_active = 1
-            AND date(ee.next_notification_date) >= date('now', '-{} months')
-            AND date(ee.next_notification_date) <= date('now', '+{} months')
-            GROUP BY strftime('%Y-%m', ee.next_notification_date)
-            ORDER BY month
-        '''.format(period_months, period_months), (chat_id,), fetch="all")
+        # Данные по месяцам для трендового анализа - из снимка событий
+        snapshot = self._snapshot(chat_id)
+        monthly_data = snapshot.histogram(
+            shift_months(snapshot.today, -period_months),
+            shift_months(snapshot.today, period_months),
+            lambda day: day.strftime('%Y-%m')
+        )
         
         if not monthly_data:
             return {'trend': 'no_data', 'monthly_stats': [], 'predictions': {}}
@@ -56,7 +53,14 @@ class AdvancedAnalyticsManager:
         overdue_trend = []
         
         for row in monthly_data:
-            month_data = dict(row)
+            month_data = {
+                'month': row['period'],
+                'total_events': row['total_events'],
+                'overdue_events': row['overdue_events'],
+                'medical_events': row['medical_events'],
+                'training_events': row['training_events'],
+                'avg_interval': row['interval_sum'] / row['total_events']
+            }
             monthly_stats.append(month_data)
             total_events_trend.append(month_data['total_events'])
             overdue_trend.append(month_data['overdue_events'])
@@ -140,6 +144,7 @@ class AdvancedAnalyticsManager:
         
         return predictions
     
+    @single_flight
     def get_weekly_analysis(self, chat_id: int, weeks: int = 8) -> Dict:
         """
         Недельный анализ событий
@@ -151,40 +156,28 @@ class AdvancedAnalyticsManager:
         Returns:
             Недельная аналитика
         """
-        weekly_data = self.db.execute_with_retry('''
-            SELECT 
-                strftime('%Y-W%W', ee.next_notification_date) as week,
-                strftime('%w', ee.next_notification_date) as day_of_week,
-                COUNT(*) as events_count,
-                COUNT(CASE WHEN date(ee.next_notification_date) < date('now') THEN 1 END) as overdue_count
-            FROM employee_events ee
-            JOIN employees e ON ee.employee_id = e.id
-            WHERE e.chat_id = ? AND e.is_active = 1
-            AND date(ee.next_notification_date) >= date('now', '-{} days')
-            AND date(ee.next_notification_date) <= date('now', '+{} days')
-            GROUP BY strftime('%Y-W%W', ee.next_notification_date), strftime('%w', ee.next_notification_date)
-            ORDER BY week, day_of_week
-        '''.format(weeks * 7, weeks * 7), (chat_id,), fetch="all")
+        snapshot = self._snapshot(chat_id)
+        window = timedelta(days=weeks * 7)
         
         # Группируем по неделям
         weekly_stats = defaultdict(lambda: {'total': 0, 'overdue': 0, 'days': defaultdict(int)})
         day_names = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс']
         
-        for row in weekly_data:
-            week = row['week']
-            day_num = int(row['day_of_week'])
-            # Корректируем воскресенье (0) в понедельник (0)
-            day_index = (day_num + 6) % 7
+        for day, rows in snapshot.daily(snapshot.today - window, snapshot.today + window):
+            week = day.strftime('%Y-W%W')
             
-            weekly_stats[week]['total'] += row['events_count']
-            weekly_stats[week]['overdue'] += row['overdue_count']
-            weekly_stats[week]['days'][day_names[day_index]] += row['events_count']
+            weekly_stats[week]['total'] += len(rows)
+            if day < snapshot.today:
+                weekly_stats[week]['overdue'] += len(rows)
+            weekly_stats[week]['days'][day_names[day.weekday()]] += len(rows)
         
         return dict(weekly_stats)
     
+    @single_flight
     def get_workload_forecast(self, chat_id: int, forecast_days: int = 30) -> Dict:
         """
-        Прогноз рабочей нагрузки на указанное количество дней
+        Прогноз рабочей нагрузки на указанное количество дней.
+        Учитывает все повторения событий в горизонте, а не только ближайшую дату.
         
         Args:
             chat_id: ID чата
@@ -193,20 +186,9 @@ class AdvancedAnalyticsManager:
         Returns:
             Прогноз нагрузки
         """
-        # Получаем предстоящие события
-        upcoming_events = self.db.execute_with_retry('''
-            SELECT 
-                date(ee.next_notification_date) as event_date,
-                COUNT(*) as events_count,
-                GROUP_CONCAT(ee.event_type, ', ') as event_types,
-                GROUP_CONCAT(e.position, ', ') as positions
-            FROM employee_events ee
-            JOIN employees e ON ee.employee_id = e.id
-            WHERE e.chat_id = ? AND e.is_active = 1
-            AND date(ee.next_notification_date) BETWEEN date('now') AND date('now', '+{} days')
-            GROUP BY date(ee.next_notification_date)
-            ORDER BY event_date
-        '''.format(forecast_days), (chat_id,), fetch="all")
+        # Повторения событий в горизонте прогноза - из снимка событий
+        snapshot = self._snapshot(chat_id)
+        projection = snapshot.project_occurrences(snapshot.today, snapshot.today + timedelta(days=forecast_days))
         
         # Анализируем загрузку по дням
         daily_forecast = []
@@ -216,8 +198,13 @@ class AdvancedAnalyticsManager:
         weekly_distribution = [0] * 7  # По дням недели
         monthly_projection = {}
         
-        for row in upcoming_events:
-            day_data = dict(row)
+        for day, events_count, event_types, positions in projection.days():
+            day_data = {
+                'event_date': day.isoformat(),
+                'events_count': events_count,
+                'event_types': ', '.join(event_types),
+                'positions': ', '.join(positions)
+            }
             total_events += day_data['events_count']
             
             if day_data['events_count'] > peak_count:
@@ -243,13 +230,10 @@ class AdvancedAnalyticsManager:
                 day_data['priority'] = 'low'
             
             # Анализ по дням недели
-            from datetime import datetime
-            event_date_obj = datetime.strptime(day_data['event_date'], '%Y-%m-%d')
-            weekday = event_date_obj.weekday()
-            weekly_distribution[weekday] += day_data['events_count']
+            weekly_distribution[day.weekday()] += day_data['events_count']
             
             # Месячная проекция
-            month_key = event_date_obj.strftime('%Y-%m')
+            month_key = day.strftime('%Y-%m')
             if month_key not in monthly_projection:
                 monthly_projection[month_key] = {'events': 0, 'days': set()}
             monthly_projection[month_key]['events'] += day_data['events_count']
@@ -272,10 +256,12 @@ class AdvancedAnalyticsManager:
                 'forecast_period': forecast_days
             },
             'weekly_distribution': weekly_distribution,
+            'weekly_load': projection.weekly(),
             'monthly_projection': monthly_projection,
             'workload_metrics': workload_metrics
         }
     
+    @single_flight
     def get_efficiency_metrics(self, chat_id: int) -> Dict:
         """
         Метрики эффективности работы с событиями
@@ -286,30 +272,19 @@ class AdvancedAnalyticsManager:
         Returns:
             Метрики эффективности
         """
-        # Анализ соблюдения сроков
-        compliance_data = self.db.execute_with_retry('''
-            SELECT 
-                COUNT(*) as total_events,
-                COUNT(CASE WHEN date(ee.next_notification_date) >= date('now') THEN 1 END) as on_time_events,
-                COUNT(CASE WHEN date(ee.next_notification_date) < date('now') THEN 1 END) as overdue_events,
-                AVG(CASE WHEN date(ee.next_notification_date) < date('now') 
-                    THEN julianday('now') - julianday(ee.next_notification_date) 
-                    ELSE 0 END) as avg_overdue_days
-            FROM employee_events ee
-            JOIN employees e ON ee.employee_id = e.id
-            WHERE e.chat_id = ? AND e.is_active = 1
-        ''', (chat_id,), fetch="one")
-        
-        if not compliance_data or compliance_data['total_events'] == 0:
+        # Анализ соблюдения сроков по счетчикам chat_event_stats
+        stats = self.db.get_chat_event_stats(chat_id)
+        
+        if stats['total_events'] == 0:
             return {'compliance_rate': 0, 'efficiency_grade': 'N/A', 'recommendations': []}
         
         # Вычисляем показатели
-        total = compliance_data['total_events']
-        on_time = compliance_data['on_time_events']
-        overdue = compliance_data['overdue_events']
+        total = stats['total_events']
+        overdue = stats['overdue']
+        on_time = total - overdue
         
         compliance_rate = (on_time / total) * 100 if total > 0 else 0
-        avg_overdue = compliance_data['avg_overdue_days'] or 0
+        avg_overdue = stats['overdue_days'] / total
         
         # Определяем оценку эффективности
         if compliance_rate >= 95 and avg_overdue <= 1:
@@ -421,6 +396,7 @@ class AdvancedAnalyticsManager:
         
         return "\n".join(lines)
     
+    @single_flight
     def get_detailed_timeline_charts(self, chat_id: int) -> Dict:
         """
         Создает детальные временные диаграммы
@@ -432,55 +408,33 @@ class AdvancedAnalyticsManager:
         Returns:
             Словарь с различными временными диаграммами
         """
-        # Данные для месячной диаграммы (включая будущие события)
-        monthly_chart_data = self.db.execute_with_retry('''
-            SELECT 
-                strftime('%Y-%m', ee.next_notification_date) as month,
-                COUNT(*) as total_events,
-                COUNT(CASE WHEN date(ee.next_notification_date) < date('now') THEN 1 END) as overdue_events
-            FROM employee_events ee
-            JOIN employees e ON ee.employee_id = e.id
-            WHERE e.chat_id = ? AND e.is_active = 1
-            AND date(ee.next_notification_date) >= date('now', '-6 months')
-            AND date(ee.next_notification_date) <= date('now', '+12 months')
-            GROUP BY strftime('%Y-%m', ee.next_notification_date)
-            ORDER BY month
-        ''', (chat_id,), fetch="all")
-        
-        # Данные для недельной диаграммы (включая будущие события)
-        weekly_chart_data = self.db.execute_with_retry('''
-            SELECT 
-                strftime('%Y-W%W', ee.next_notification_date) as week,
-                COUNT(*) as total_events,
-                COUNT(CASE WHEN date(ee.next_notification_date) < date('now') THEN 1 END) as overdue_events
-            FROM employee_events ee
-            JOIN employees e ON ee.employee_id = e.id
-            WHERE e.chat_id = ? AND e.is_active = 1
-            AND date(ee.next_notification_date) >= date('now', '-4 weeks')
-            AND date(ee.next_notification_date) <= date('now', '+8 weeks')
-            GROUP BY strftime('%Y-W%W', ee.next_notification_date)
-            ORDER BY week
-        ''', (chat_id,), fetch="all")
-        
-        # Данные для дневной диаграммы (включая будущие события)
-        daily_chart_data = self.db.execute_with_retry('''
-            SELECT 
-                date(ee.next_notification_date) as day,
-                COUNT(*) as total_events,
-                COUNT(CASE WHEN date(ee.next_notification_date) < date('now') THEN 1 END) as overdue_events
-            FROM employee_events ee
-            JOIN employees e ON ee.employee_id = e.id
-            WHERE e.chat_id = ? AND e.is_active = 1
-            AND date(ee.next_notification_date) >= date('now', '-7 days')
-            AND date(ee.next_notification_date) <= date('now', '+30 days')
-            GROUP BY date(ee.next_notification_date)
-            ORDER BY day
-        ''', (chat_id,), fetch="all")
+        # Месячная, недельная и дневная диаграммы - из одного снимка событий
+        snapshot = self._snapshot(chat_id)
+        today = snapshot.today
+        
+        monthly_chart_data = [
+            {'month': row['period'], 'total_events': row['total_events'], 'overdue_events': row['overdue_events']}
+            for row in snapshot.histogram(
+                shift_months(today, -6), shift_months(today, 12), lambda day: day.strftime('%Y-%m')
+            )
+        ]
+        weekly_chart_data = [
+            {'week': row['period'], 'total_events': row['total_events'], 'overdue_events': row['overdue_events']}
+            for row in snapshot.histogram(
+                today - timedelta(weeks=4), today + timedelta(weeks=8), lambda day: day.strftime('%Y-W%W')
+            )
+        ]
+        daily_chart_data = [
+            {'day': row['period'], 'total_events': row['total_events'], 'overdue_events': row['overdue_events']}
+            for row in snapshot.histogram(
+                today - timedelta(days=7), today + timedelta(days=30), lambda day: day.isoformat()
+            )
+        ]
         
         return {
-            'monthly': self._create_monthly_chart([dict(row) for row in monthly_chart_data]),
-            'weekly': self._create_weekly_chart([dict(row) for row in weekly_chart_data]),
-            'daily': self._create_daily_chart([dict(row) for row in daily_chart_data])
+            'monthly': self._create_monthly_chart(monthly_chart_data),
+            'weekly': self._create_weekly_chart(weekly_chart_data),
+            'daily': self._create_daily_chart(daily_chart_data)
         }
     
     def _create_monthly_chart(self, monthly_data: List[Dict]) -> Dict:
@@ -763,6 +717,7 @@ class AdvancedAnalyticsManager:
         
         return recommendations
     
+    @single_flight
     def get_advanced_workload_forecast(self, chat_id: int, periods: Dict[str, int] = None) -> Dict:
         """
         Получает расширенный прогноз нагрузки на разные периоды
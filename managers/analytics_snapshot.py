@@ -0,0 +1,362 @@
+"""
+Снимок событий чата для аналитики: одна выборка, из которой считаются
+тренды, временные диаграммы и прогнозы нагрузки
+"""
+
+import logging
+import operator
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from config.constants import EventCategory
+from config.settings import BotConfig
+from core.event_categories import classify_event_type
+from core.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+MEDICAL = EventCategory.MEDICAL.value
+TRAINING = EventCategory.TRAINING.value
+
+def shift_months(day: date, months: int) -> date:
+    """
+    Сдвигает дату на месяцы как date(..., '+N months') в SQLite:
+    несуществующий день переносится на следующий месяц
+
+    Args:
+        day: Исходная дата
+        months: Количество месяцев (может быть отрицательным)
+
+    Returns:
+        Сдвинутая дата
+    """
+    month_index = day.year * 12 + day.month - 1 + months
+    first = date(month_index // 12, month_index % 12 + 1, 1)
+    return first + timedelta(days=day.day - 1)
+
+class RecurrenceProjection:
+    """
+    Все повторения событий в горизонте прогноза: нагрузка по дням и неделям.
+
+    События разворачиваются по интервалам, а не по одному: для интервала
+    step колонки по дням первого повторения (число событий, битовые маски
+    типов и должностей) накапливаются вдоль цепочек day, day + step, ...
+    Стоимость - проход по событиям плюс число интервалов на длину горизонта.
+    """
+
+    def __init__(self, start: date, end: date, event_types: List[str], positions: List[str]):
+        self.start = start
+        self.end = end
+        self.daily: List[int] = [0] * max(0, (end - start).days + 1)
+        self._type_masks: List[int] = [0] * len(self.daily)
+        self._position_masks: List[int] = [0] * len(self.daily)
+        self._event_types = event_types  # Бит i маски - event_types[i]
+        self._positions = positions
+
+    def add_interval(self, step: int, counts: List[int], type_masks: List[int], position_masks: List[int]):
+        """
+        Добавляет события с общим интервалом повторения
+
+        Колонки индексируются смещением первого повторения от начала горизонта
+        и изменяются на месте.
+
+        Args:
+            step: Интервал повторения (дни); 0 - без повторений
+            counts: Количество событий по дню первого повторения
+            type_masks: Маски типов событий по дню первого повторения
+            position_masks: Маски должностей по дню первого повторения
+        """
+        for offset in range(step, len(self.daily) if step else 0):
+            counts[offset] += counts[offset - step]
+            type_masks[offset] |= type_masks[offset - step]
+            position_masks[offset] |= position_masks[offset - step]
+        self.daily = list(map(operator.add, self.daily, counts))
+        self._type_masks = list(map(operator.or_, self._type_masks, type_masks))
+        self._position_masks = list(map(operator.or_, self._position_masks, position_masks))
+
+    @property
+    def total(self) -> int:
+        """Всего повторений в горизонте"""
+        return sum(self.daily)
+
+    def days(self) -> Iterator[Tuple[date, int, List[str], List[str]]]:
+        """
+        Дни с нагрузкой по возрастанию даты
+
+        Returns:
+            Итератор (дата, количество повторений, типы событий, должности)
+        """
+        names: Dict[Tuple[int, int], List[str]] = {}  # Маски разных дней часто совпадают
+
+        def decode(mask: int, values: List[str]) -> List[str]:
+            key = (id(values), mask)
+            if key not in names:
+                names[key] = sorted(values[bit] for bit in range(mask.bit_length()) if mask >> bit & 1)
+            return names[key]
+
+        for offset, count in enumerate(self.daily):
+            if count:
+                yield (
+                    self.start + timedelta(days=offset),
+                    count,
+                    decode(self._type_masks[offset], self._event_types),
+                    decode(self._position_masks[offset], self._positions)
+                )
+
+    def weekly(self) -> List[Dict]:
+        """
+        Нагрузка по календарным неделям (с понедельника)
+
+        Returns:
+            Список {'week_start', 'events_count'} по возрастанию недели
+        """
+        weeks: Dict[date, int] = {}
+        for offset, count in enumerate(self.daily):
+            if count:
+                day = self.start + timedelta(days=offset)
+                week_start = day - timedelta(days=day.weekday())
+                weeks[week_start] = weeks.get(week_start, 0) + count
+        return [
+            {'week_start': week_start.isoformat(), 'events_count': count}
+            for week_start, count in sorted(weeks.items())
+        ]
+
+class AnalyticsSnapshot:
+    """
+    Колоночный снимок активных событий чата, отсортированный по дате.
+
+    Колонки (параллельные списки): dates и last_dates - порядковые номера
+    дат, intervals, event_types, positions, categories. Для каждого дня с событиями
+    хранится смещение его первой строки, поэтому выборка по диапазону дат -
+    два бинарных поиска, а группировка - проход по дням, а не по событиям.
+    """
+
+    def __init__(self, chat_id: int, today: date, rows: List[Tuple], version: int = 0):
+        self.chat_id = chat_id
+        self.today = today
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+        self.dates: List[int] = []
+        self.last_dates: List[Optional[int]] = []
+        self.intervals: List[int] = []
+        self.event_types: List[str] = []
+        self.positions: List[str] = []
+        self.categories: List[str] = []
+        for next_date, last_date, interval_days, event_type, position, *category in rows:
+            self.dates.append(date.fromisoformat(next_date).toordinal())
+            self.last_dates.append(date.fromisoformat(last_date).toordinal() if last_date else None)
+            self.intervals.append(interval_days)
+            self.event_types.append(event_type or '')
+            self.positions.append(position or '')
+            # Событие без категории (до заполнения колонки) классифицируется здесь
+            self.categories.append((category and category[0]) or classify_event_type(event_type))
+
+        # Уникальные дни и смещения их первых строк
+        self.days: List[int] = []
+        self.day_offsets: List[int] = []
+        for index, ordinal in enumerate(self.dates):
+            if not self.days or self.days[-1] != ordinal:
+                self.days.append(ordinal)
+                self.day_offsets.append(index)
+        self.day_offsets.append(len(self.dates))
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def _day_range(self, start: date, end: date) -> range:
+        """Индексы уникальных дней в диапазоне [start, end]"""
+        return range(bisect_left(self.days, start.toordinal()), bisect_right(self.days, end.toordinal()))
+
+    def day_rows(self, day_index: int) -> range:
+        """Индексы событий дня в колонках"""
+        return range(self.day_offsets[day_index], self.day_offsets[day_index + 1])
+
+    def daily(self, start: date, end: date) -> List[Tuple[date, range]]:
+        """
+        Дни с событиями в диапазоне
+
+        Args:
+            start: Начало диапазона (включительно)
+            end: Конец диапазона (включительно)
+
+        Returns:
+            Список (дата, индексы событий дня) по возрастанию даты
+        """
+        return [
+            (date.fromordinal(self.days[i]), self.day_rows(i))
+            for i in self._day_range(start, end)
+        ]
+
+    def histogram(self, start: date, end: date, key: Callable[[date], str]) -> List[Dict]:
+        """
+        Группирует события диапазона по ключу даты (месяц, неделя, день)
+
+        Args:
+            start: Начало диапазона (включительно)
+            end: Конец диапазона (включительно)
+            key: Функция, возвращающая ключ группы для даты
+
+        Returns:
+            Группы по возрастанию ключа: period, total_events, overdue_events,
+            medical_events, training_events, interval_sum
+        """
+        today = self.today.toordinal()
+        bins: Dict[str, Dict] = {}
+        for day, rows in self.daily(start, end):
+            period = key(day)
+            bucket = bins.get(period)
+            if bucket is None:
+                bucket = bins[period] = {
+                    'period': period, 'total_events': 0, 'overdue_events': 0,
+                    'medical_events': 0, 'training_events': 0, 'interval_sum': 0
+                }
+            count = len(rows)
+            bucket['total_events'] += count
+            if day.toordinal() < today:
+                bucket['overdue_events'] += count
+            for row in rows:
+                category = self.categories[row]
+                if category == MEDICAL:
+                    bucket['medical_events'] += 1
+                elif category == TRAINING:
+                    bucket['training_events'] += 1
+                bucket['interval_sum'] += self.intervals[row]
+        return [bins[period] for period in sorted(bins)]
+
+    def project_occurrences(self, start: date, end: date) -> RecurrenceProjection:
+        """
+        Разворачивает повторения событий в горизонте [start, end].
+
+        Повторения идут от next_notification_date с шагом interval_days:
+        просроченное событие попадает в горизонт следующими повторениями,
+        событие с интервалом 0 - только своей датой.
+
+        Args:
+            start: Начало горизонта (включительно)
+            end: Конец горизонта (включительно)
+
+        Returns:
+            Проекция нагрузки по дням и неделям
+        """
+        start_ordinal = start.toordinal()
+        length = max(0, (end - start).days + 1)
+        type_bits: Dict[str, int] = {}
+        position_bits: Dict[str, int] = {}
+        # Интервал -> колонки (события, маски типов, маски должностей) по дню первого повторения
+        intervals: Dict[int, Tuple[List[int], List[int], List[int]]] = {}
+
+        for next_ordinal, step, event_type, position in zip(
+                self.dates, self.intervals, self.event_types, self.positions):
+            step = step if step and step > 0 else 0
+            if next_ordinal < start_ordinal:
+                if not step:
+                    continue
+                # Первое повторение, попадающее в горизонт
+                next_ordinal += -(-(start_ordinal - next_ordinal) // step) * step
+            first = next_ordinal - start_ordinal
+            if first >= length:
+                continue
+            columns = intervals.get(step)
+            if columns is None:
+                columns = intervals[step] = ([0] * length, [0] * length, [0] * length)
+            columns[0][first] += 1
+            columns[1][first] |= type_bits.setdefault(event_type, 1 << len(type_bits))
+            columns[2][first] |= position_bits.setdefault(position, 1 << len(position_bits))
+
+        projection = RecurrenceProjection(start, end, list(type_bits), list(position_bits))
+        for step, columns in intervals.items():
+            projection.add_interval(step, *columns)
+        return projection
+
+def _utc_today() -> date:
+    """Текущая дата как date('now') в SQLite"""
+    return datetime.now(timezone.utc).date()
+
+class AnalyticsSnapshotCache:
+    """
+    Ограниченный LRU-кэш снимков по чатам. Снимок актуален, пока не изменилась
+    версия данных чата (см. DatabaseManager.get_chat_data_version) и не наступил
+    новый день; BotConfig.ANALYTICS_SNAPSHOT_TTL ограничивает его возраст сверху.
+    Устаревший снимок удаляется при обращении, сверх max_size вытесняются
+    давно не использованные. Одновременные загрузки одного чата выполняют одну выборку.
+    """
+
+    def __init__(self, ttl: float = None, max_size: int = None):
+        self.ttl = BotConfig.ANALYTICS_SNAPSHOT_TTL if ttl is None else ttl
+        self.max_size = max_size or BotConfig.ANALYTICS_SNAPSHOT_CACHE_SIZE
+        self._lock = threading.Lock()
+        self._snapshots: "OrderedDict[Tuple[str, int], AnalyticsSnapshot]" = OrderedDict()
+        self._flights = SingleFlight(copy_results=False)  # Снимок только читается
+        self.stats = {'hits': 0, 'loads': 0, 'expired': 0, 'evictions': 0}
+
+    def get(self, db_manager, chat_id: int) -> AnalyticsSnapshot:
+        """
+        Возвращает актуальный снимок чата, при необходимости загружая его
+
+        Args:
+            db_manager: Менеджер базы данных
+            chat_id: ID чата
+
+        Returns:
+            Снимок событий чата
+        """
+        key = (db_manager.db_path, chat_id)
+        today = _utc_today()
+        version = db_manager.get_chat_data_version(chat_id)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                if (snapshot.today == today and snapshot.version == version
+                        and time.monotonic() - snapshot.loaded_at < self.ttl):
+                    self._snapshots.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return snapshot
+                # Устаревший снимок не держит память до перезагрузки
+                del self._snapshots[key]
+                self.stats['expired'] += 1
+
+        return self._flights.do((key, version), self._load, db_manager, chat_id, key, today, version)
+
+    def _load(self, db_manager, chat_id: int, key: Tuple[str, int], today: date,
+              version: int) -> AnalyticsSnapshot:
+        # Версия прочитана до выборки: запись между ними только вызовет лишнюю перезагрузку
+        rows = db_manager.execute_with_retry('''
+            SELECT ee.next_notification_date, ee.last_event_date, ee.interval_days,
+                   ee.event_type, e.position, ee.category
+            FROM employee_events ee
+            JOIN employees e ON ee.employee_id = e.id
+            WHERE e.chat_id = ? AND e.is_active = 1
+            ORDER BY ee.next_notification_date
+        ''', (chat_id,), fetch="all")
+
+        snapshot = AnalyticsSnapshot(chat_id, today, [tuple(row) for row in rows], version)
+        with self._lock:
+            self._snapshots[key] = snapshot
+            self._snapshots.move_to_end(key)
+            self.stats['loads'] += 1
+            while len(self._snapshots) > self.max_size:
+                self._snapshots.popitem(last=False)
+                self.stats['evictions'] += 1
+        logger.debug(f"Снимок аналитики чата {chat_id}: {len(snapshot)} событий")
+        return snapshot
+
+    def invalidate(self, chat_id: int = None):
+        """
+        Сбрасывает снимки чата (или все снимки)
+
+        Args:
+            chat_id: ID чата; None - сбросить все
+        """
+        with self._lock:
+            if chat_id is None:
+                self._snapshots.clear()
+            else:
+                for key in [key for key in self._snapshots if key[1] == chat_id]:
+                    del self._snapshots[key]
+
+snapshot_cache = AnalyticsSnapshotCache()
@@ -9,6 +9,7 @@ from typing import Dict, List, Optional
 from telegram import Bot
 from telegram.ext import ContextTypes
 
+from config.constants import EventCategory
 from core.security import decrypt_data, is_admin
 from core.utils import create_callback_data
 from managers.advanced_analytics_manager import AdvancedAnalyticsManager
@@ -62,11 +63,11 @@ class AutomatedReportsManager:
         
         try:
             # Получаем все активные чаты
-            chats = self.db.execute_with_retry('''
+            chats = await self.db.fetch_all('''
                 SELECT DISTINCT chat_id, admin_id, timezone 
                 FROM chat_settings 
                 WHERE admin_id IS NOT NULL
-            ''', fetch="all")
+            ''')
             
             for chat in chats:
                 chat_id = chat['chat_id']
@@ -99,11 +100,11 @@ class AutomatedReportsManager:
         logger.info("Generating weekly analytics reports")
         
         try:
-            chats = self.db.execute_with_retry('''
+            chats = await self.db.fetch_all('''
                 SELECT DISTINCT chat_id, admin_id, timezone 
                 FROM chat_settings 
                 WHERE admin_id IS NOT NULL
-            ''', fetch="all")
+            ''')
             
             for chat in chats:
                 chat_id = chat['chat_id']
@@ -136,11 +137,11 @@ class AutomatedReportsManager:
         logger.info("Generating monthly reports")
         
         try:
-            chats = self.db.execute_with_retry('''
+            chats = await self.db.fetch_all('''
                 SELECT DISTINCT chat_id, admin_id, timezone 
                 FROM chat_settings 
                 WHERE admin_id IS NOT NULL
-            ''', fetch="all")
+            ''')
             
             for chat in chats:
                 chat_id = chat['chat_id']
@@ -177,42 +178,12 @@ class AutomatedReportsManager:
             # Получаем данные на сегодня и ближайшие дни
             today = datetime.now().date()
             
-            # Статистика на сегодня
-            today_events = self.db.execute_with_retry('''
-                SELECT COUNT(*) as count
-                FROM employee_events ee
-                JOIN employees e ON ee.employee_id = e.id
-                WHERE e.chat_id = ? AND e.is_active = 1
-                AND date(ee.next_notification_date) = date('now')
-            ''', (chat_id,), fetch="one")
-            
-            # Просроченные события
-            overdue_events = self.db.execute_with_retry('''
-                SELECT COUNT(*) as count
-                FROM employee_events ee
-                JOIN employees e ON ee.employee_id = e.id
-                WHERE e.chat_id = ? AND e.is_active = 1
-                AND date(ee.next_notification_date) < date('now')
-            ''', (chat_id,), fetch="one")
-            
-            # События на завтра
-            tomorrow_events = self.db.execute_with_retry('''
-                SELECT COUNT(*) as count
-                FROM employee_events ee
-                JOIN employees e ON ee.employee_id = e.id
-                WHERE e.chat_id = ? AND e.is_active = 1
-                AND date(ee.next_notification_date) = date('now', '+1 day')
-            ''', (chat_id,), fetch="one")
-            
-            # События на эту неделю
-            week_events = self.db.execute_with_retry('''
-                SELECT COUNT(*) as count
-                FROM employee_events ee
-                JOIN employees e ON ee.employee_id = e.id
-                WHERE e.chat_id = ? AND e.is_active = 1
-                AND date(ee.next_notification_date) BETWEEN date('now') 
-                AND date('now', '+7 days')
-            ''', (chat_id,), fetch="one")
+            # Счетчики событий чата по срокам (chat_event_stats)
+            stats = await self.db.run_sync(self.db.get_chat_event_stats, chat_id)
+            today_events = {'count': stats['due_today']}
+            overdue_events = {'count': stats['overdue']}
+            tomorrow_events = {'count': stats['due_tomorrow']}
+            week_events = {'count': stats['critical'] + stats['urgent']}
             
             # Если нет данных, не отправляем отчет
             if not any([today_events['count'], overdue_events['count'], tomorrow_events['count']]):
@@ -286,9 +257,9 @@ class AutomatedReportsManager:
         """
         try:
             # Получаем аналитику за неделю
-            weekly_stats = self.analytics_manager.get_weekly_analysis(chat_id, 1)
-            trends = self.analytics_manager.get_trends_analysis(chat_id, 3)
-            efficiency = self.analytics_manager.get_efficiency_metrics(chat_id)
+            weekly_stats = await self.db.run_sync(self.analytics_manager.get_weekly_analysis, chat_id, 1)
+            trends = await self.db.run_sync(self.analytics_manager.get_trends_analysis, chat_id, 3)
+            efficiency = await self.db.run_sync(self.analytics_manager.get_efficiency_metrics, chat_id)
             
             if not weekly_stats and efficiency.get('total_events', 0) == 0:
                 return None
@@ -332,7 +303,7 @@ class AutomatedReportsManager:
                     ])
             
             # Прогноз
-            forecast = self.analytics_manager.get_workload_forecast(chat_id, 7)
+            forecast = await self.db.run_sync(self.analytics_manager.get_workload_forecast, chat_id, 7)
             forecast_summary = forecast.get('summary', {})
             if forecast_summary.get('total_events', 0) > 0:
                 report_lines.extend([
@@ -377,24 +348,33 @@ class AutomatedReportsManager:
         """
         try:
             # Получаем данные за месяц
-            trends = self.analytics_manager.get_trends_analysis(chat_id, 1)
-            efficiency = self.analytics_manager.get_efficiency_metrics(chat_id)
+            trends = await self.db.run_sync(self.analytics_manager.get_trends_analysis, chat_id, 1)
+            efficiency = await self.db.run_sync(self.analytics_manager.get_efficiency_metrics, chat_id)
             
             # Статистика за прошлый месяц
             last_month = datetime.now().replace(day=1) - timedelta(days=1)
-            month_stats = self.db.execute_with_retry('''
+            # Разбивка по категориям - группировка по индексу idx_events_employee_category
+            category_rows = await self.db.fetch_all('''
                 SELECT 
+                    ee.category,
                     COUNT(*) as total_events,
-                    COUNT(CASE WHEN date(ee.next_notification_date) < date('now') THEN 1 END) as overdue_events,
-                    COUNT(CASE WHEN ee.event_type LIKE '%медосмотр%' OR ee.event_type LIKE '%медицинский%' THEN 1 END) as medical_events,
-                    COUNT(CASE WHEN ee.event_type LIKE '%инструктаж%' OR ee.event_type LIKE '%обучение%' THEN 1 END) as training_events
+                    COUNT(CASE WHEN ee.next_notification_date < date('now') THEN 1 END) as overdue_events
                 FROM employee_events ee
                 JOIN employees e ON ee.employee_id = e.id
                 WHERE e.chat_id = ? AND e.is_active = 1
-                AND strftime('%Y-%m', ee.next_notification_date) = ?
-            ''', (chat_id, last_month.strftime('%Y-%m')), fetch="one")
+                AND ee.next_notification_date >= ? AND ee.next_notification_date < ?
+                GROUP BY ee.category
+            ''', (chat_id, last_month.replace(day=1).strftime('%Y-%m-%d'), datetime.now().replace(day=1).strftime('%Y-%m-%d')))
+            
+            by_category = {row['category']: row['total_events'] for row in category_rows}
+            month_stats = {
+                'total_events': sum(row['total_events'] for row in category_rows),
+                'overdue_events': sum(row['overdue_events'] for row in category_rows),
+                'medical_events': by_category.get(EventCategory.MEDICAL.value, 0),
+                'training_events': by_category.get(EventCategory.TRAINING.value, 0)
+            }
             
-            if not month_stats or month_stats['total_events'] == 0:
+            if month_stats['total_events'] == 0:
                 return None
             
             report_lines = [
@@ -433,7 +413,7 @@ class AutomatedReportsManager:
                     ])
             
             # Прогноз на следующий месяц
-            forecast = self.analytics_manager.get_workload_forecast(chat_id, 30)
+            forecast = await self.db.run_sync(self.analytics_manager.get_workload_forecast, chat_id, 30)
             forecast_summary = forecast.get('summary', {})
             if forecast_summary.get('total_events', 0) > 0:
                 report_lines.extend([
@@ -516,38 +496,7 @@ class AutomatedReportsManager:
             Словарь с настройками отчетов
         """
         try:
-            settings = self.db.execute_with_retry('''
-                SELECT * FROM report_settings WHERE chat_id = ?
-            ''', (chat_id,), fetch="one")
-            
-            if not settings:
-                # Создаем настройки по умолчанию
-                default_settings = {
-                    'chat_id': chat_id,
-                    'daily_enabled': True,
-                    'weekly_enabled': True,
-                    'monthly_enabled': True,
-                    'daily_time': '09:00',
-                    'weekly_day': 1,  # Понедельник
-                    'monthly_day': 1  # Первое число
-                }
-                
-                self.db.execute_with_retry('''
-                    INSERT OR REPLACE INTO report_settings 
-                    (chat_id, daily_enabled, weekly_enabled, monthly_enabled, 
-                     daily_time, weekly_day, monthly_day)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    chat_id, default_settings['daily_enabled'],
-                    default_settings['weekly_enabled'], default_settings['monthly_enabled'],
-                    default_settings['daily_time'], default_settings['weekly_day'],
-                    default_settings['monthly_day']
-                ))
-                
-                return default_settings
-            
-            return dict(settings)
-            
+            return self.db.chat_settings.get_report_settings(chat_id)
         except Exception as e:
             logger.error(f"Error getting report settings for chat {chat_id}: {e}")
             return {}
\ No newline at end of file
@@ -6,7 +6,8 @@ import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Tuple
 from collections import Counter, defaultdict
-from core.security import decrypt_data
+from core.security import decrypt_employee_name
+from core.singleflight import single_flight
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +17,7 @@ class DashboardManager:
     def __init__(self, db_manager):
         self.db = db_manager
     
+    @single_flight
     def get_overview_statistics(self, chat_id: int) -> Dict:
         """
         Получает общую статистику для главной страницы дашборда
@@ -26,20 +28,12 @@ class DashboardManager:
         Returns:
             Словарь с общей статистикой
         """
-        # Основная статистика
-        main_stats = self.db.execute_with_retry('''
-            SELECT 
-                COUNT(DISTINCT e.id) as total_employees,
-                COUNT(ee.id) as total_events,
-                COUNT(CASE WHEN date(ee.next_notification_date) < date('now') THEN 1 END) as overdue,
-                COUNT(CASE WHEN date(ee.next_notification_date) BETWEEN date('now') AND date('now', '+3 days') THEN 1 END) as critical,
-                COUNT(CASE WHEN date(ee.next_notification_date) BETWEEN date('now', '+4 days') AND date('now', '+7 days') THEN 1 END) as urgent,
-                COUNT(CASE WHEN date(ee.next_notification_date) BETWEEN date('now', '+8 days') AND date('now', '+30 days') THEN 1 END) as upcoming,
-                COUNT(CASE WHEN date(ee.next_notification_date) > date('now', '+30 days') THEN 1 END) as planned
-            FROM employees e
-            LEFT JOIN employee_events ee ON e.id = ee.employee_id
-            WHERE e.chat_id = ? AND e.is_active = 1
-        ''', (chat_id,), fetch="one")
+        # Основная статистика - из счетчиков chat_event_stats
+        stats = self.db.get_chat_event_stats(chat_id)
+        main_stats = {
+            key: stats[key]
+            for key in ('total_employees', 'total_events', 'overdue', 'critical', 'urgent', 'upcoming', 'planned')
+        }
         
         # Статистика по должностям
         positions_stats = self.db.execute_with_retry('''
@@ -47,7 +41,7 @@ class DashboardManager:
                 e.position,
                 COUNT(DISTINCT e.id) as employee_count,
                 COUNT(ee.id) as event_count,
-                COUNT(CASE WHEN date(ee.next_notification_date) < date('now') THEN 1 END) as overdue_count
+                COUNT(CASE WHEN ee.next_notification_date < date('now') THEN 1 END) as overdue_count
             FROM employees e
             LEFT JOIN employee_events ee ON e.id = ee.employee_id
             WHERE e.chat_id = ? AND e.is_active = 1
@@ -60,7 +54,7 @@ class DashboardManager:
             SELECT 
                 ee.event_type,
                 COUNT(*) as count,
-                COUNT(CASE WHEN date(ee.next_notification_date) < date('now') THEN 1 END) as overdue_count,
+                COUNT(CASE WHEN ee.next_notification_date < date('now') THEN 1 END) as overdue_count,
                 AVG(ee.interval_days) as avg_interval
             FROM employee_events ee
             JOIN employees e ON ee.employee_id = e.id
@@ -70,11 +64,12 @@ class DashboardManager:
         ''', (chat_id,), fetch="all")
         
         return {
-            'main': dict(main_stats) if main_stats else {},
+            'main': main_stats,
             'positions': [dict(row) for row in positions_stats] if positions_stats else [],
             'event_types': [dict(row) for row in event_types_stats] if event_types_stats else []
         }
     
+    @single_flight
     def get_timeline_analysis(self, chat_id: int, months: int = 12) -> Dict:
         """
         Анализ событий по времени (помесячно)
@@ -91,13 +86,13 @@ class DashboardManager:
             SELECT 
                 strftime('%Y-%m', ee.next_notification_date) as month,
                 COUNT(*) as events_count,
-                COUNT(CASE WHEN date(ee.next_notification_date) < date('now') THEN 1 END) as overdue_count,
+                COUNT(CASE WHEN ee.next_notification_date < date('now') THEN 1 END) as overdue_count,
                 ee.event_type
             FROM employee_events ee
             JOIN employees e ON ee.employee_id = e.id
             WHERE e.chat_id = ? AND e.is_active = 1
-            AND date(ee.next_notification_date) >= date('now', '-{} months')
-            AND date(ee.next_notification_date) <= date('now', '+{} months')
+            AND ee.next_notification_date >= date('now', '-{} months')
+            AND ee.next_notification_date <= date('now', '+{} months')
             GROUP BY strftime('%Y-%m', ee.next_notification_date), ee.event_type
             ORDER BY month
         '''.format(months // 2, months // 2), (chat_id,), fetch="all")
@@ -113,6 +108,7 @@ class DashboardManager:
         
         return dict(monthly_stats)
     
+    @single_flight
     def get_employee_analysis(self, chat_id: int) -> List[Dict]:
         """
         Анализ по сотрудникам - кто требует больше внимания
@@ -129,8 +125,8 @@ class DashboardManager:
                 e.full_name,
                 e.position,
                 COUNT(ee.id) as total_events,
-                COUNT(CASE WHEN date(ee.next_notification_date) < date('now') THEN 1 END) as overdue_events,
-                COUNT(CASE WHEN date(ee.next_notification_date) BETWEEN date('now') AND date('now', '+7 days') THEN 1 END) as urgent_events,
+                COUNT(CASE WHEN ee.next_notification_date < date('now') THEN 1 END) as overdue_events,
+                COUNT(CASE WHEN ee.next_notification_date BETWEEN date('now') AND date('now', '+7 days') THEN 1 END) as urgent_events,
                 MIN(julianday(ee.next_notification_date) - julianday('now')) as days_to_next_event
             FROM employees e
             LEFT JOIN employee_events ee ON e.id = ee.employee_id
@@ -144,7 +140,7 @@ class DashboardManager:
         for row in employee_stats:
             employee = dict(row)
             try:
-                employee['full_name'] = decrypt_data(employee['full_name'])
+                employee['full_name'] = decrypt_employee_name(employee['id'], employee['full_name'])
             except ValueError:
                 employee['full_name'] = "Ошибка дешифрации"
             
@@ -173,6 +169,7 @@ class DashboardManager:
         
         return processed_employees
     
+    @single_flight
     def get_performance_metrics(self, chat_id: int) -> Dict:
         """
         Метрики производительности системы
@@ -189,8 +186,8 @@ class DashboardManager:
                 COUNT(DISTINCT e.id) as active_employees,
                 COUNT(ee.id) as total_events,
                 AVG(ee.interval_days) as avg_interval,
-                MIN(date(ee.next_notification_date)) as earliest_event,
-                MAX(date(ee.next_notification_date)) as latest_event
+                MIN(ee.next_notification_date) as earliest_event,
+                MAX(ee.next_notification_date) as latest_event
             FROM employees e
             LEFT JOIN employee_events ee ON e.id = ee.employee_id
             WHERE e.chat_id = ? AND e.is_active = 1
@@ -205,7 +202,7 @@ class DashboardManager:
             FROM employee_events ee
             JOIN employees e ON ee.employee_id = e.id
             WHERE e.chat_id = ? AND e.is_active = 1
-            AND date(ee.next_notification_date) < date('now')
+            AND ee.next_notification_date < date('now')
         ''', (chat_id,), fetch="one")
         
         # Вычисляем процент соблюдения
@@ -282,6 +279,7 @@ class DashboardManager:
         else:
             return "➡️ стабильно"
     
+    @single_flight
     def get_alerts_and_recommendations(self, chat_id: int) -> List[Dict]:
         """
         Генерирует предупреждения и рекомендации
@@ -300,7 +298,7 @@ class DashboardManager:
             FROM employee_events ee
             JOIN employees e ON ee.employee_id = e.id
             WHERE e.chat_id = ? AND e.is_active = 1
-            AND julianday('now') - julianday(ee.next_notification_date) > 30
+            AND ee.next_notification_date <= date('now', '-30 days')
         ''', (chat_id,), fetch="one")
         
         if critical_overdue and critical_overdue['count'] > 0:
@@ -314,11 +312,11 @@ class DashboardManager:
         
         # Проверяем сотрудников с множественными просрочками  
         multiple_overdue = self.db.execute_with_retry('''
-            SELECT e.full_name, COUNT(*) as overdue_count
+            SELECT e.id, e.full_name, COUNT(*) as overdue_count
             FROM employee_events ee
             JOIN employees e ON ee.employee_id = e.id
             WHERE e.chat_id = ? AND e.is_active = 1
-            AND date(ee.next_notification_date) < date('now')
+            AND ee.next_notification_date < date('now')
             GROUP BY e.id, e.full_name
             HAVING COUNT(*) >= 3
         ''', (chat_id,), fetch="all")
@@ -326,7 +324,7 @@ class DashboardManager:
         if multiple_overdue:
             for emp in multiple_overdue[:3]:  # Показываем топ-3
                 try:
-                    name = decrypt_data(emp['full_name'])
+                    name = decrypt_employee_name(emp['id'], emp['full_name'])
                 except ValueError:
                     name = "Сотрудник"
                 
@@ -344,7 +342,7 @@ class DashboardManager:
             FROM employee_events ee
             JOIN employees e ON ee.employee_id = e.id
             WHERE e.chat_id = ? AND e.is_active = 1
-            AND date(ee.next_notification_date) BETWEEN date('now') AND date('now', '+7 days')
+            AND ee.next_notification_date BETWEEN date('now') AND date('now', '+7 days')
         ''', (chat_id,), fetch="one")
         
         if upcoming_week and upcoming_week['count'] > 10:
@@ -0,0 +1,84 @@
+"""
+Задачи экспорта и отчетов, выполняемые в процессах пула JobRunner
+"""
+
+import asyncio
+import logging
+import shutil
+import tempfile
+from typing import BinaryIO, Dict
+
+from core.database import DatabaseManager
+from core.jobs import JobControl
+from managers.export_manager import ExportManager
+
+logger = logging.getLogger(__name__)
+
+# Менеджеры баз данных процесса пула, по пути к базе
+_databases: Dict[str, DatabaseManager] = {}
+
+def _get_exporter(db_path: str) -> ExportManager:
+    """
+    Менеджер экспорта процесса пула; соединения переиспользуются между задачами.
+    База открывается только на чтение: миграции выполняет процесс бота
+    """
+    db = _databases.get(db_path)
+    if db is None:
+        db = _databases[db_path] = DatabaseManager(db_path, read_only=True)
+    return ExportManager(db)
+
+def _save(file: BinaryIO, suffix: str) -> str:
+    """
+    Переносит файл экспорта в именованный временный файл,
+    который бот отправит и удалит
+
+    Args:
+        file: Файл результата экспорта
+        suffix: Расширение файла
+
+    Returns:
+        Путь к файлу
+    """
+    with file, tempfile.NamedTemporaryFile(prefix='export_', suffix=f'.{suffix}', delete=False) as target:
+        shutil.copyfileobj(file, target)
+        return target.name
+
+def export_events_job(control: JobControl, db_path: str, chat_id: int,
+                      file_format: str = "xlsx", overdue: bool = False) -> str:
+    """
+    Экспорт событий чата в файл
+
+    Args:
+        control: Прогресс и отмена задачи
+        db_path: Путь к базе данных
+        chat_id: ID чата
+        file_format: Формат файла ('xlsx' или 'csv')
+        overdue: Только просроченные события
+
+    Returns:
+        Путь к готовому файлу
+    """
+    exporter = _get_exporter(db_path)
+    export = exporter.export_overdue_events if overdue else exporter.export_all_events
+    file = asyncio.run(export(chat_id, file_format, on_progress=control.report))
+    control.report(100)
+    return _save(file, file_format)
+
+def analytics_report_job(control: JobControl, db_path: str, chat_id: int,
+                         report_type: str = "full") -> str:
+    """
+    Аналитический отчет чата в Excel
+
+    Args:
+        control: Прогресс и отмена задачи
+        db_path: Путь к базе данных
+        chat_id: ID чата
+        report_type: Тип отчета ('trends', 'forecast', 'efficiency', 'full')
+
+    Returns:
+        Путь к готовому файлу
+    """
+    exporter = _get_exporter(db_path)
+    file = asyncio.run(exporter.export_analytics_report(chat_id, report_type, on_progress=control.report))
+    control.report(100)
+    return _save(file, 'xlsx')
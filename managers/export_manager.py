@@ -4,17 +4,63 @@
 
 import io
 import csv
+import tempfile
+import threading
 import xlsxwriter
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-from collections import Counter
-from core.security import decrypt_data
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Dict, Optional, Tuple
+from collections import Counter, OrderedDict
+from config.settings import BotConfig
+from core.security import decrypt_employee_name
 from managers.advanced_analytics_manager import AdvancedAnalyticsManager
 from managers.automated_reports_manager import AutomatedReportsManager
 
 logger = logging.getLogger(__name__)
 
+# Все активные события чата со статусом срочности
+EVENTS_EXPORT_QUERY = '''
+    SELECT 
+        e.id as employee_id,
+        e.full_name,
+        e.position,
+        ee.event_type,
+        ee.last_event_date,
+        ee.next_notification_date,
+        ee.interval_days,
+        CASE 
+            WHEN ee.next_notification_date < date('now') THEN 'Просрочено'
+            WHEN ee.next_notification_date <= date('now', '+7 days') THEN 'Критично'
+            WHEN ee.next_notification_date <= date('now', '+14 days') THEN 'Срочно'
+            WHEN ee.next_notification_date <= date('now', '+30 days') THEN 'Внимание'
+            ELSE 'Плановое'
+        END as status,
+        (julianday(ee.next_notification_date) - julianday('now')) as days_until
+    FROM employee_events ee
+    JOIN employees e ON ee.employee_id = e.id
+    WHERE e.chat_id = ? AND e.is_active = 1
+    ORDER BY ee.next_notification_date
+'''
+
+# Только просроченные события чата
+OVERDUE_EXPORT_QUERY = '''
+    SELECT 
+        e.id as employee_id,
+        e.full_name,
+        e.position,
+        ee.event_type,
+        ee.last_event_date,
+        ee.next_notification_date,
+        ee.interval_days,
+        'Просрочено' as status,
+        (julianday('now') - julianday(ee.next_notification_date)) as days_overdue
+    FROM employee_events ee
+    JOIN employees e ON ee.employee_id = e.id
+    WHERE e.chat_id = ? AND e.is_active = 1
+    AND ee.next_notification_date < date('now')
+    ORDER BY ee.next_notification_date
+'''
+
 class ExportManager:
     """Менеджер экспорта данных в Excel и CSV форматы"""
     
@@ -23,103 +69,179 @@ class ExportManager:
         self.analytics_manager = AdvancedAnalyticsManager(db_manager)
         self.reports_manager = AutomatedReportsManager(db_manager)
     
-    async def export_all_events(self, chat_id: int, file_format: str = "xlsx") -> io.BytesIO:
+    async def export_all_events(self, chat_id: int, file_format: str = "xlsx",
+                                on_progress: Optional[Callable[[int], None]] = None) -> BinaryIO:
         """
         Экспортирует все события в Excel с форматированием
         
         Args:
             chat_id: ID чата
             file_format: Формат файла ('xlsx' или 'csv')
+            on_progress: Вызывается с процентом выгруженных строк после каждой пачки
             
         Returns:
-            BytesIO буфер с файлом
-        """
-        # Получаем данные
-        events_data = self.db.execute_with_retry('''
-            SELECT 
-                e.full_name,
-                e.position,
-                ee.event_type,
-                ee.last_event_date,
-                ee.next_notification_date,
-                ee.interval_days,
-                CASE 
-                    WHEN date(ee.next_notification_date) < date('now') THEN 'Просрочено'
-                    WHEN date(ee.next_notification_date) <= date('now', '+7 days') THEN 'Критично'
-                    WHEN date(ee.next_notification_date) <= date('now', '+14 days') THEN 'Срочно'
-                    WHEN date(ee.next_notification_date) <= date('now', '+30 days') THEN 'Внимание'
-                    ELSE 'Плановое'
-                END as status,
-                (julianday(ee.next_notification_date) - julianday('now')) as days_until
-            FROM employee_events ee
-            JOIN employees e ON ee.employee_id = e.id
-            WHERE e.chat_id = ? AND e.is_active = 1
-            ORDER BY ee.next_notification_date
-        ''', (chat_id,), fetch="all")
-        
+            Файловый объект, готовый к отправке (вызывающий закрывает его)
+        """
+        # Файл пишется потоково: курсор читается пачками прямо в файл
+        batches = self._iter_batches(EVENTS_EXPORT_QUERY, chat_id, on_progress)
         if file_format == "csv":
-            return self._export_to_csv(events_data)
-        else:
-            return self._export_to_xlsx(events_data)
+            return await self.db.run_sync(self._export_to_csv, batches)
+        return await self.db.run_sync(self._export_to_xlsx, batches)
     
-    def _export_to_csv(self, events_data: List) -> io.BytesIO:
+    def _iter_batches(self, query: str, chat_id: int,
+                      on_progress: Optional[Callable[[int], None]] = None) -> Iterator[List]:
         """
-        Экспорт в CSV формат
+        Пачки строк экспорта с отчетом о прогрессе
         
         Args:
-            events_data: Данные событий
+            query: Запрос экспорта с параметром chat_id
+            chat_id: ID чата
+            on_progress: Функция, получающая процент выгруженных строк (0-99);
+                ее исключение прерывает экспорт
             
         Returns:
-            BytesIO буфер с CSV файлом
+            Итератор пачек строк
         """
-        output = io.BytesIO()
-        output_str = io.StringIO()
+        batches = self.db.iter_batches(query, (chat_id,))
+        if on_progress is None:
+            return batches
+        return self._track_progress(batches, query, chat_id, on_progress)
+    
+    def _track_progress(self, batches: Iterator[List], query: str, chat_id: int,
+                        on_progress: Callable[[int], None]) -> Iterator[List]:
+        done = 0
+        try:
+            total = self.db.execute_with_retry(
+                f"SELECT COUNT(*) FROM ({query})", (chat_id,), fetch="one"
+            )[0]
+            on_progress(0)
+            for batch in batches:
+                yield batch
+                done += len(batch)
+                # 100% - только когда файл дописан, а не когда прочитаны строки
+                on_progress(min(99, done * 100 // max(total, 1)))
+        finally:
+            batches.close()
+    
+    @staticmethod
+    def _decrypt_names(batch: List) -> Dict[int, str]:
+        """
+        Расшифровывает ФИО пачки строк, каждого сотрудника - один раз
         
-        writer = csv.writer(output_str, delimiter=';')
+        Args:
+            batch: Строки с employee_id и full_name
+            
+        Returns:
+            Словарь ID сотрудника -> ФИО
+        """
+        names = {}
+        for event in batch:
+            employee_id = event['employee_id']
+            if employee_id not in names:
+                try:
+                    names[employee_id] = decrypt_employee_name(employee_id, event['full_name'])
+                except ValueError:
+                    names[employee_id] = "Ошибка дешифрации"
+        return names
+    
+    @staticmethod
+    def _open_workbook():
+        """
+        Создает книгу Excel в режиме constant_memory
         
-        # Заголовки
-        headers = [
-            'ФИО', 'Должность', 'Тип события', 'Последнее событие', 
-            'Следующее событие', 'Интервал (дни)', 'Статус', 'Дней до события'
-        ]
-        writer.writerow(headers)
+        Строки каждого листа сбрасываются во временный файл по мере записи,
+        поэтому листы нужно заполнять строго сверху вниз. Готовая книга
+        пишется в файл, который держится в памяти до
+        BotConfig.EXPORT_SPOOL_MAX_SIZE и затем переносится на диск.
         
-        # Данные
-        for event in events_data:
-            try:
-                decrypted_name = decrypt_data(event['full_name'])
-            except ValueError:
-                decrypted_name = "Ошибка дешифрации"
-                
-            row = [
-                decrypted_name,
-                event['position'],
-                event['event_type'],
-                event['last_event_date'],
-                event['next_notification_date'],
-                event['interval_days'],
-                event['status'],
-                int(event['days_until']) if event['days_until'] else 0
-            ]
-            writer.writerow(row)
+        Returns:
+            Кортеж (файл результата, книга)
+        """
+        output = tempfile.SpooledTemporaryFile(max_size=BotConfig.EXPORT_SPOOL_MAX_SIZE, mode='w+b')
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+        return output, workbook
+    
+    @staticmethod
+    def _close_workbook(workbook, output) -> BinaryIO:
+        """Завершает книгу и возвращает файл, готовый к отправке"""
+        workbook.close()
+        output.seek(0)
+        return output
+    
+    def _write_csv(self, batches: Iterable[List], headers: List[str],
+                   make_row: Callable[[Dict, str], List]) -> BinaryIO:
+        """
+        Потоково записывает CSV во временный файл
         
-        # Конвертируем в BytesIO
-        output.write(output_str.getvalue().encode('utf-8-sig'))
+        Строки кодируются сразу при записи; файл держится в памяти
+        до BotConfig.EXPORT_SPOOL_MAX_SIZE и затем переносится на диск.
+        
+        Args:
+            batches: Пачки строк результата запроса
+            headers: Заголовки столбцов
+            make_row: Функция (строка, ФИО) -> значения столбцов
+            
+        Returns:
+            Временный файл с CSV, позиция в начале
+        """
+        output = tempfile.SpooledTemporaryFile(max_size=BotConfig.EXPORT_SPOOL_MAX_SIZE, mode='w+b')
+        text = io.TextIOWrapper(output, encoding='utf-8-sig', newline='')
+        try:
+            writer = csv.writer(text, delimiter=';')
+            writer.writerow(headers)
+            for batch in batches:
+                names = self._decrypt_names(batch)
+                writer.writerows(make_row(event, names[event['employee_id']]) for event in batch)
+            text.flush()
+        except Exception:
+            output.close()
+            raise
+        finally:
+            # Возвращаем соединение в пул, даже если запись прервалась
+            if hasattr(batches, 'close'):
+                batches.close()
+        text.detach()
         output.seek(0)
         return output
     
-    def _export_to_xlsx(self, events_data: List) -> io.BytesIO:
+    def _export_to_csv(self, batches: Iterable[List]) -> BinaryIO:
+        """
+        Экспорт в CSV формат
+        
+        Args:
+            batches: Пачки строк событий
+            
+        Returns:
+            Временный файл с CSV
+        """
+        headers = [
+            'ФИО', 'Должность', 'Тип события', 'Последнее событие', 
+            'Следующее событие', 'Интервал (дни)', 'Статус', 'Дней до события'
+        ]
+        return self._write_csv(batches, headers, lambda event, decrypted_name: [
+            decrypted_name,
+            event['position'],
+            event['event_type'],
+            event['last_event_date'],
+            event['next_notification_date'],
+            event['interval_days'],
+            event['status'],
+            int(event['days_until']) if event['days_until'] else 0
+        ])
+    
+    def _export_to_xlsx(self, batches: Iterable[List]) -> BinaryIO:
         """
         Экспорт в Excel с форматированием
         
+        Статистика считается в том же проходе по строкам, что и лист событий.
+        
         Args:
-            events_data: Данные событий
+            batches: Пачки строк событий
             
         Returns:
-            BytesIO буфер с Excel файлом
+            Временный файл с Excel
         """
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+        output, workbook = self._open_workbook()
         
         # Создаем листы
         events_sheet = workbook.add_worksheet('События')
@@ -160,25 +282,36 @@ class ExportManager:
         for col, header in enumerate(headers):
             events_sheet.write(0, col, header, header_format)
         
+        # Статистика копится по ходу записи строк
+        stats = {'total': 0, 'employees': set(), 'status_counts': Counter(), 'event_type_counts': Counter()}
+        
         # Записываем данные
-        for row, event in enumerate(events_data, 1):
-            try:
-                decrypted_name = decrypt_data(event['full_name'])
-            except ValueError:
-                decrypted_name = "Ошибка дешифрации"
-            
-            events_sheet.write(row, 0, decrypted_name, default_format)
-            events_sheet.write(row, 1, event['position'], default_format)
-            events_sheet.write(row, 2, event['event_type'], default_format)
-            events_sheet.write_datetime(row, 3, datetime.fromisoformat(event['last_event_date']), date_format)
-            events_sheet.write_datetime(row, 4, datetime.fromisoformat(event['next_notification_date']), date_format)
-            events_sheet.write(row, 5, event['interval_days'], default_format)
-            
-            # Статус с цветовым кодированием
-            status = event['status']
-            status_format = status_formats.get(status, default_format)
-            events_sheet.write(row, 6, status, status_format)
-            events_sheet.write(row, 7, int(event['days_until']) if event['days_until'] else 0, default_format)
+        row = 0
+        try:
+            for batch in batches:
+                names = self._decrypt_names(batch)
+                for event in batch:
+                    row += 1
+                    events_sheet.write(row, 0, names[event['employee_id']], default_format)
+                    events_sheet.write(row, 1, event['position'], default_format)
+                    events_sheet.write(row, 2, event['event_type'], default_format)
+                    events_sheet.write_datetime(row, 3, datetime.fromisoformat(event['last_event_date']), date_format)
+                    events_sheet.write_datetime(row, 4, datetime.fromisoformat(event['next_notification_date']), date_format)
+                    events_sheet.write(row, 5, event['interval_days'], default_format)
+                    
+                    # Статус с цветовым кодированием
+                    status = event['status']
+                    status_format = status_formats.get(status, default_format)
+                    events_sheet.write(row, 6, status, status_format)
+                    events_sheet.write(row, 7, int(event['days_until']) if event['days_until'] else 0, default_format)
+                    
+                    stats['total'] += 1
+                    stats['employees'].add(event['employee_id'])
+                    stats['status_counts'][status] += 1
+                    stats['event_type_counts'][event['event_type']] += 1
+        finally:
+            if hasattr(batches, 'close'):
+                batches.close()
         
         # Настройка ширины колонок
         events_sheet.set_column('A:A', 25)  # ФИО
@@ -190,19 +323,17 @@ class ExportManager:
         events_sheet.set_column('H:H', 15)  # Дней до события
         
         # === ЛИСТ СТАТИСТИКИ ===
-        self._add_statistics_sheet(stats_sheet, events_data, workbook)
+        self._add_statistics_sheet(stats_sheet, stats, workbook)
         
-        workbook.close()
-        output.seek(0)
-        return output
+        return self._close_workbook(workbook, output)
     
-    def _add_statistics_sheet(self, sheet, events_data: List, workbook):
+    def _add_statistics_sheet(self, sheet, stats: Dict, workbook):
         """
         Добавляет лист со статистикой
         
         Args:
             sheet: Лист Excel
-            events_data: Данные событий
+            stats: Итоги прохода по событиям (total, employees, status_counts, event_type_counts)
             workbook: Рабочая книга Excel
         """
         # Форматы
@@ -217,9 +348,8 @@ class ExportManager:
         
         data_format = workbook.add_format({'border': 1, 'align': 'center'})
         
-        # Подсчет статистики
-        status_counts = Counter(event['status'] for event in events_data)
-        event_type_counts = Counter(event['event_type'] for event in events_data)
+        status_counts = stats['status_counts']
+        event_type_counts = stats['event_type_counts']
         
         row = 0
         
@@ -231,12 +361,11 @@ class ExportManager:
         sheet.write(row, 0, 'Общая статистика:', subtitle_format)
         row += 1
         sheet.write(row, 0, 'Всего событий:', data_format)
-        sheet.write(row, 1, len(events_data), data_format)
+        sheet.write(row, 1, stats['total'], data_format)
         row += 1
         
         sheet.write(row, 0, 'Уникальных сотрудников:', data_format)
-        unique_employees = len(set(event['full_name'] for event in events_data))
-        sheet.write(row, 1, unique_employees, data_format)
+        sheet.write(row, 1, len(stats['employees']), data_format)
         row += 2
         
         # Статистика по статусам
@@ -246,7 +375,7 @@ class ExportManager:
         for status, count in status_counts.items():
             sheet.write(row, 0, status, data_format)
             sheet.write(row, 1, count, data_format)
-            percentage = (count / len(events_data)) * 100
+            percentage = (count / stats['total']) * 100
             sheet.write(row, 2, f"{percentage:.1f}%", data_format)
             row += 1
         
@@ -266,41 +395,46 @@ class ExportManager:
         sheet.set_column('B:B', 15)
         sheet.set_column('C:C', 15)
     
-    async def export_analytics_report(self, chat_id: int, report_type: str = "full") -> io.BytesIO:
+    async def export_analytics_report(self, chat_id: int, report_type: str = "full",
+                                      on_progress: Optional[Callable[[int], None]] = None) -> BinaryIO:
         """
         Экспортирует аналитический отчет в Excel
         
         Args:
             chat_id: ID чата
             report_type: Тип отчета ('trends', 'forecast', 'efficiency', 'full')
+            on_progress: Вызывается с процентом готовых листов перед каждым листом
             
         Returns:
-            BytesIO буфер с Excel файлом
+            Временный файл с Excel (вызывающий закрывает его)
         """
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+        sheets = []
+        if report_type == "full" or report_type == "trends":
+            sheets.append(self._add_trends_sheet)
+        
+        if report_type == "full" or report_type == "forecast":
+            sheets.append(self._add_forecast_sheet)
+        
+        if report_type == "full" or report_type == "efficiency":
+            sheets.append(self._add_efficiency_sheet)
+        
+        if report_type == "full":
+            sheets.extend([self._add_timeline_charts_sheet, self._add_advanced_forecast_sheet])
+        
+        output, workbook = self._open_workbook()
         
         try:
-            if report_type == "full" or report_type == "trends":
-                await self._add_trends_sheet(workbook, chat_id)
-            
-            if report_type == "full" or report_type == "forecast":
-                await self._add_forecast_sheet(workbook, chat_id)
-            
-            if report_type == "full" or report_type == "efficiency":
-                await self._add_efficiency_sheet(workbook, chat_id)
+            for step, add_sheet in enumerate(sheets):
+                if on_progress:
+                    on_progress(step * 100 // len(sheets))
+                await add_sheet(workbook, chat_id)
             
-            if report_type == "full":
-                await self._add_timeline_charts_sheet(workbook, chat_id)
-                await self._add_advanced_forecast_sheet(workbook, chat_id)
-            
-            workbook.close()
-            output.seek(0)
-            return output
+            return await self.db.run_sync(self._close_workbook, workbook, output)
             
         except Exception as e:
             logger.error(f"Error exporting analytics report: {e}")
             workbook.close()
+            output.close()
             raise
     
     async def _add_trends_sheet(self, workbook, chat_id: int):
@@ -323,7 +457,7 @@ class ExportManager:
         data_format = workbook.add_format({'border': 1, 'align': 'left'})
         
         # Получаем данные трендов
-        trends = self.analytics_manager.get_trends_analysis(chat_id, 6)
+        trends = await self.db.run_sync(self.analytics_manager.get_trends_analysis, chat_id, 6)
         
         row = 0
         
@@ -382,7 +516,7 @@ class ExportManager:
         date_format = workbook.add_format({'border': 1, 'num_format': 'dd.mm.yyyy'})
         
         # Получаем прогноз на 30 дней
-        forecast = self.analytics_manager.get_workload_forecast(chat_id, 30)
+        forecast = await self.db.run_sync(self.analytics_manager.get_workload_forecast, chat_id, 30)
         
         row = 0
         
@@ -431,7 +565,7 @@ class ExportManager:
         data_format = workbook.add_format({'border': 1})
         
         # Получаем метрики эффективности
-        efficiency = self.analytics_manager.get_efficiency_metrics(chat_id)
+        efficiency = await self.db.run_sync(self.analytics_manager.get_efficiency_metrics, chat_id)
         
         row = 0
         
@@ -489,7 +623,7 @@ class ExportManager:
         data_format = workbook.add_format({'border': 1, 'font_family': 'Courier New'})
         
         # Получаем детальные временные диаграммы
-        charts = self.analytics_manager.get_detailed_timeline_charts(chat_id)
+        charts = await self.db.run_sync(self.analytics_manager.get_detailed_timeline_charts, chat_id)
         
         row = 0
         
@@ -534,7 +668,7 @@ class ExportManager:
         
         # Получаем расширенный прогноз
         periods = {'short': 7, 'medium': 30, 'long': 90}
-        advanced_forecast = self.analytics_manager.get_advanced_workload_forecast(chat_id, periods)
+        advanced_forecast = await self.db.run_sync(self.analytics_manager.get_advanced_workload_forecast, chat_id, periods)
         
         row = 0
         
@@ -577,7 +711,7 @@ class ExportManager:
         sheet.set_column('A:A', 25)
         sheet.set_column('B:B', 50)
     
-    async def export_automated_report(self, chat_id: int, report_type: str) -> Optional[io.BytesIO]:
+    async def export_automated_report(self, chat_id: int, report_type: str) -> Optional[BinaryIO]:
         """
         Экспортирует автоматический отчет в Excel
         
@@ -586,12 +720,9 @@ class ExportManager:
             report_type: Тип отчета ('daily', 'weekly', 'monthly')
             
         Returns:
-            BytesIO буфер с Excel файлом или None
+            Временный файл с Excel или None
         """
         try:
-            output = io.BytesIO()
-            workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-            
             # Генерируем отчет
             if report_type == 'daily':
                 report_content = await self.reports_manager._generate_daily_summary(chat_id)
@@ -608,6 +739,8 @@ class ExportManager:
             if not report_content:
                 return None
             
+            output, workbook = self._open_workbook()
+            
             # Создаем лист отчета
             sheet = workbook.add_worksheet(sheet_name)
             
@@ -624,105 +757,65 @@ class ExportManager:
             # Настройка ширины колонки
             sheet.set_column('A:A', 80)
             
-            workbook.close()
-            output.seek(0)
-            return output
+            return self._close_workbook(workbook, output)
             
         except Exception as e:
             logger.error(f"Error exporting automated report: {e}")
             return None
     
-    async def export_overdue_events(self, chat_id: int, file_format: str = "xlsx") -> io.BytesIO:
+    async def export_overdue_events(self, chat_id: int, file_format: str = "xlsx",
+                                    on_progress: Optional[Callable[[int], None]] = None) -> BinaryIO:
         """
         Экспортирует только просроченные события
         
         Args:
             chat_id: ID чата
             file_format: Формат файла ('xlsx' или 'csv')
+            on_progress: Вызывается с процентом выгруженных строк после каждой пачки
             
         Returns:
-            BytesIO буфер с файлом
-        """
-        # Получаем только просроченные события
-        overdue_events = self.db.execute_with_retry('''
-            SELECT 
-                e.full_name,
-                e.position,
-                ee.event_type,
-                ee.last_event_date,
-                ee.next_notification_date,
-                ee.interval_days,
-                'Просрочено' as status,
-                (julianday('now') - julianday(ee.next_notification_date)) as days_overdue
-            FROM employee_events ee
-            JOIN employees e ON ee.employee_id = e.id
-            WHERE e.chat_id = ? AND e.is_active = 1
-            AND date(ee.next_notification_date) < date('now')
-            ORDER BY ee.next_notification_date
-        ''', (chat_id,), fetch="all")
-        
+            Файловый объект, готовый к отправке (вызывающий закрывает его)
+        """
+        batches = self._iter_batches(OVERDUE_EXPORT_QUERY, chat_id, on_progress)
         if file_format == "csv":
-            return self._export_overdue_to_csv(overdue_events)
-        else:
-            return self._export_overdue_to_xlsx(overdue_events)
+            return await self.db.run_sync(self._export_overdue_to_csv, batches)
+        return await self.db.run_sync(self._export_overdue_to_xlsx, batches)
     
-    def _export_overdue_to_csv(self, overdue_events: List) -> io.BytesIO:
+    def _export_overdue_to_csv(self, batches: Iterable[List]) -> BinaryIO:
         """
         Экспорт просроченных событий в CSV
         
         Args:
-            overdue_events: Данные просроченных событий
+            batches: Пачки строк просроченных событий
             
         Returns:
-            BytesIO буфер с CSV файлом
+            Временный файл с CSV
         """
-        output = io.BytesIO()
-        output_str = io.StringIO()
-        
-        writer = csv.writer(output_str, delimiter=';')
-        
-        # Заголовки
         headers = [
             'ФИО', 'Должность', 'Тип события', 'Последнее событие',
             'Дата просрочки', 'Интервал (дни)', 'Дней просрочено'
         ]
-        writer.writerow(headers)
-        
-        # Данные
-        for event in overdue_events:
-            try:
-                decrypted_name = decrypt_data(event['full_name'])
-            except ValueError:
-                decrypted_name = "Ошибка дешифрации"
-                
-            row = [
-                decrypted_name,
-                event['position'],
-                event['event_type'],
-                event['last_event_date'],
-                event['next_notification_date'],
-                event['interval_days'],
-                int(event['days_overdue']) if event['days_overdue'] else 0
-            ]
-            writer.writerow(row)
-        
-        # Конвертируем в BytesIO
-        output.write(output_str.getvalue().encode('utf-8-sig'))
-        output.seek(0)
-        return output
+        return self._write_csv(batches, headers, lambda event, decrypted_name: [
+            decrypted_name,
+            event['position'],
+            event['event_type'],
+            event['last_event_date'],
+            event['next_notification_date'],
+            event['interval_days'],
+            int(event['days_overdue']) if event['days_overdue'] else 0
+        ])
     
-    def _export_overdue_to_xlsx(self, overdue_events: List) -> io.BytesIO:
+    def _export_overdue_to_xlsx(self, batches: Iterable[List]) -> BinaryIO:
         """
         Экспорт просроченных событий в Excel с выделением
         
         Args:
-            overdue_events: Данные просроченных событий
+            batches: Пачки строк просроченных событий
             
         Returns:
-            BytesIO буфер с Excel файлом
+            Временный файл с Excel
         """
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+        output, workbook = self._open_workbook()
         
         sheet = workbook.add_worksheet('Просроченные события')
         
@@ -764,24 +857,27 @@ class ExportManager:
             sheet.write(0, col, header, header_format)
         
         # Данные
-        for row, event in enumerate(overdue_events, 1):
-            try:
-                decrypted_name = decrypt_data(event['full_name'])
-            except ValueError:
-                decrypted_name = "Ошибка дешифрации"
-            
-            days_overdue = int(event['days_overdue']) if event['days_overdue'] else 0
-            
-            # Выбираем формат в зависимости от критичности просрочки
-            cell_format = critical_format if days_overdue > 30 else overdue_format
-            
-            sheet.write(row, 0, decrypted_name, cell_format)
-            sheet.write(row, 1, event['position'], cell_format)
-            sheet.write(row, 2, event['event_type'], cell_format)
-            sheet.write_datetime(row, 3, datetime.fromisoformat(event['last_event_date']), date_format)
-            sheet.write_datetime(row, 4, datetime.fromisoformat(event['next_notification_date']), date_format)
-            sheet.write(row, 5, event['interval_days'], cell_format)
-            sheet.write(row, 6, days_overdue, cell_format)
+        row = 0
+        try:
+            for batch in batches:
+                names = self._decrypt_names(batch)
+                for event in batch:
+                    row += 1
+                    days_overdue = int(event['days_overdue']) if event['days_overdue'] else 0
+                    
+                    # Выбираем формат в зависимости от критичности просрочки
+                    cell_format = critical_format if days_overdue > 30 else overdue_format
+                    
+                    sheet.write(row, 0, names[event['employee_id']], cell_format)
+                    sheet.write(row, 1, event['position'], cell_format)
+                    sheet.write(row, 2, event['event_type'], cell_format)
+                    sheet.write_datetime(row, 3, datetime.fromisoformat(event['last_event_date']), date_format)
+                    sheet.write_datetime(row, 4, datetime.fromisoformat(event['next_notification_date']), date_format)
+                    sheet.write(row, 5, event['interval_days'], cell_format)
+                    sheet.write(row, 6, days_overdue, cell_format)
+        finally:
+            if hasattr(batches, 'close'):
+                batches.close()
         
         # Настройка ширины колонок
         sheet.set_column('A:A', 25)  # ФИО
@@ -799,12 +895,71 @@ class ExportManager:
             'border': 1
         })
         
-        note_row = len(overdue_events) + 2
+        note_row = row + 2
         sheet.merge_range(note_row, 0, note_row, 6, 
                          f'Отчет сгенерирован {datetime.now().strftime("%d.%m.%Y %H:%M")}. '
-                         f'Всего просроченных событий: {len(overdue_events)}',
+                         f'Всего просроченных событий: {row}',
                          note_format)
         
-        workbook.close()
-        output.seek(0)
-        return output
\ No newline at end of file
+        return self._close_workbook(workbook, output)
+
+class ExportFileCache:
+    """
+    file_id файлов экспорта, уже отправленных в Telegram.
+    
+    Ключ - (чат, вид экспорта, формат, версия данных, день): пока данные чата
+    не изменились, повторный запрос отправляется по file_id без генерации
+    и повторной загрузки файла. День входит в ключ, потому что статусы
+    и прогнозы считаются от текущей даты.
+    """
+    
+    def __init__(self, db_manager, max_size: int = None):
+        self.db = db_manager
+        self.max_size = max_size or BotConfig.EXPORT_FILE_CACHE_SIZE
+        self._file_ids: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+    
+    async def key(self, chat_id: int, kind: str, file_format: str) -> Tuple:
+        """
+        Ключ кэша для текущего состояния данных чата
+        
+        Args:
+            chat_id: ID чата
+            kind: Вид экспорта ('events', 'overdue', 'analytics')
+            file_format: Формат файла
+            
+        Returns:
+            Кортеж ключа
+        """
+        version = await self.db.fetch_chat_data_version(chat_id)
+        today = datetime.now(timezone.utc).date().isoformat()
+        return (chat_id, kind, file_format, version, today)
+    
+    def get(self, key: Tuple) -> Optional[str]:
+        """file_id ранее отправленного файла или None"""
+        with self._lock:
+            file_id = self._file_ids.get(key)
+            if file_id is None:
+                self.stats['misses'] += 1
+                return None
+            self._file_ids.move_to_end(key)
+            self.stats['hits'] += 1
+            return file_id
+    
+    def put(self, key: Tuple, file_id: str):
+        """
+        Запоминает file_id отправленного файла
+        
+        Args:
+            key: Ключ из key()
+            file_id: file_id документа из ответа send_document
+        """
+        with self._lock:
+            # Файлы устаревших версий этого экспорта больше не понадобятся
+            for stale in [k for k in self._file_ids if k[:3] == key[:3] and k != key]:
+                del self._file_ids[stale]
+            self._file_ids[key] = file_id
+            self._file_ids.move_to_end(key)
+            while len(self._file_ids) > self.max_size:
+                self._file_ids.popitem(last=False)
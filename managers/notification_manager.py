@@ -3,10 +3,14 @@
 """
 
 import logging
+from collections import Counter
 from datetime import datetime
+from typing import Any, Iterable, List, Set, Tuple
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from config.constants import NotificationLevel
-from core.security import decrypt_data
+from config.settings import BotConfig
+from core.dispatcher import OutgoingMessage
+from core.security import decrypt_employee_name
 from core.utils import create_callback_data
 
 logger = logging.getLogger(__name__)
@@ -14,6 +18,16 @@ logger = logging.getLogger(__name__)
 class NotificationManager:
     """Менеджер многоуровневых уведомлений"""
     
+    MAX_MESSAGE_LENGTH = 4096  # Лимит длины сообщения Telegram
+    
+    # Получатели уведомления в журнале notification_history
+    RECIPIENT_ADMIN = 'admin'
+    RECIPIENT_EMPLOYEE = 'employee'
+    
+    # Тип записи журнала для события, о котором администратор узнает из сводки эскалаций
+    NOTIFICATION_TYPE_DIGEST = 'admin_digest'
+    ESCALATION_LEVELS = (NotificationLevel.CRITICAL, NotificationLevel.OVERDUE)
+    
     def __init__(self, db_manager):
         self.db = db_manager
         
@@ -71,18 +85,117 @@ class NotificationManager:
         
         return False
     
-    def format_notification_message(self, notification: dict, level: NotificationLevel) -> str:
+    def admin_notification_type(self, level: NotificationLevel) -> str:
+        """
+        Тип записи журнала для уведомления администратора
+        
+        Критичные и просроченные события администратор получает только
+        в сводке эскалаций чата, без отдельного сообщения по каждому событию
+        
+        Args:
+            level: Уровень уведомления
+            
+        Returns:
+            Значение уровня или NOTIFICATION_TYPE_DIGEST
+        """
+        return self.NOTIFICATION_TYPE_DIGEST if level in self.ESCALATION_LEVELS else level.value
+    
+    async def claim_notifications(self, candidates: List[Tuple[int, str, str]],
+                                  sent_on: str) -> Set[Tuple[int, str, str]]:
+        """
+        Резервирует записи в журнале уведомлений перед отправкой
+        
+        Уникальность (событие, день, тип, получатель) гарантирует, что
+        повторный или параллельный запуск рассылки не отправит то же уведомление
+        еще раз. Повторно резервируются неудачные отправки и брошенные резервы
+        старше NOTIFICATION_CLAIM_TIMEOUT (запуск прервался до отметки доставки).
+        
+        Args:
+            candidates: Тройки (ID события, тип уведомления, получатель);
+                тип - значение уровня или NOTIFICATION_TYPE_DIGEST
+            sent_on: День отправки (YYYY-MM-DD)
+            
+        Returns:
+            Множество зарезервированных троек (ID события, тип уведомления, получатель)
+        """
+        stale_after = f"-{BotConfig.NOTIFICATION_CLAIM_TIMEOUT} seconds"
+
+        def claim(conn):
+            claimed = set()
+            for event_id, notification_type, recipient in candidates:
+                cursor = conn.execute(
+                    '''INSERT INTO notification_history (event_id, notification_type, status, sent_on, recipient)
+                       VALUES (?, ?, 'pending', ?, ?)
+                       ON CONFLICT(event_id, sent_on, notification_type, recipient) DO UPDATE
+                       SET status = 'pending', sent_date = CURRENT_TIMESTAMP
+                       WHERE status = 'failed' OR (status = 'pending' AND sent_date < datetime('now', ?))
+                    ''',
+                    (event_id, notification_type, sent_on, recipient, stale_after)
+                )
+                if cursor.rowcount == 1:
+                    claimed.add((event_id, notification_type, recipient))
+            return claimed
+
+        return await self.db.transaction(claim)
+
+    async def record_deliveries(self, sent_on: str, delivered: Iterable[Tuple[int, str, str]],
+                                failed: Iterable[Tuple[int, str, str]]):
+        """
+        Отмечает в журнале результат отправки зарезервированных уведомлений
+        
+        Args:
+            sent_on: День отправки (YYYY-MM-DD)
+            delivered: Доставленные тройки (ID события, тип уведомления, получатель)
+            failed: Недоставленные тройки (ID события, тип уведомления, получатель)
+        """
+        def record(conn):
+            for status, keys in (('sent', delivered), ('failed', failed)):
+                conn.executemany(
+                    '''UPDATE notification_history SET status = ?, sent_date = CURRENT_TIMESTAMP
+                       WHERE event_id = ? AND sent_on = ? AND notification_type = ? AND recipient = ?''',
+                    [(status, event_id, sent_on, level, recipient) for event_id, level, recipient in keys]
+                )
+
+        await self.db.transaction(record)
+
+    @staticmethod
+    def delivered_keys(outgoing: List[OutgoingMessage], delivered_tags: Iterable[Any]) -> Set[Tuple[int, str, str]]:
+        """
+        Доставленные записи журнала по меткам отправленных сообщений
+        
+        Сводка эскалаций помечена множеством записей своих событий и может
+        состоять из нескольких частей: записи доставлены, только если
+        доставлены все части сводки
+        
+        Args:
+            outgoing: Сообщения рассылки
+            delivered_tags: Метки доставленных сообщений (DispatchStats.delivered_tags)
+            
+        Returns:
+            Множество доставленных троек (ID события, тип уведомления, получатель)
+        """
+        sent = Counter(delivered_tags)
+        delivered = set()
+        for tag, parts in Counter(message.tag for message in outgoing if message.tag is not None).items():
+            if sent[tag] == parts:
+                delivered.update(tag if isinstance(tag, frozenset) else (tag,))
+        return delivered
+
+    def format_notification_message(self, notification: dict, level: NotificationLevel,
+                                    full_name: str = None) -> str:
         """
         Форматирует сообщение в зависимости от уровня срочности
         
         Args:
             notification: Данные уведомления
             level: Уровень срочности
+            full_name: Уже расшифрованное ФИО (иначе расшифровывается из notification)
             
         Returns:
             Отформатированное сообщение
         """
-        full_name = decrypt_data(notification['full_name'])
+        if full_name is None:
+            full_name = decrypt_employee_name(notification['employee_id'], notification['full_name'])
         event_date = datetime.fromisoformat(notification['next_notification_date']).date()
         days_until = (event_date - datetime.now().date()).days
         
@@ -140,46 +253,90 @@ class NotificationManager:
         
         return message
 
-    async def send_escalated_notifications(self, context, notification: dict, level: NotificationLevel):
+    def format_escalation_digest(self, escalations: List[Tuple[dict, NotificationLevel, str]]) -> List[str]:
         """
-        Отправляет эскалированные уведомления для критичных случаев
+        Формирует сводку эскалаций чата: одна строка на критичное событие
         
         Args:
-            context: Контекст бота
-            notification: Данные уведомления
-            level: Уровень срочности
-        """
-        if level not in [NotificationLevel.CRITICAL, NotificationLevel.OVERDUE]:
-            return
+            escalations: Тройки (данные уведомления, уровень, расшифрованное ФИО)
             
-        try:
-            # Получаем всех администраторов чата
-            admins = self.db.execute_with_retry(
-                "SELECT admin_id FROM chat_settings WHERE chat_id = ?",
-                (notification['chat_id'],),
-                fetch="all"
+        Returns:
+            Тексты сообщений (длинная сводка делится на части по лимиту Telegram)
+        """
+        today = datetime.now().date()
+        header = (
+            f"🚨 <b>ЭСКАЛАЦИЯ</b>: {len(escalations)} критичных событий\n"
+            f"⚡ Сводка направлена всем администраторам\n"
+        )
+        
+        lines = []
+        for notification, level, full_name in escalations:
+            event_date = datetime.fromisoformat(notification['next_notification_date']).date()
+            days_until = (event_date - today).days
+            if level == NotificationLevel.OVERDUE:
+                emoji, urgency = "💀", f"просрочено на {abs(days_until)} дн."
+            else:
+                emoji, urgency = "🔴", "сегодня" if days_until <= 0 else f"через {days_until} дн."
+            lines.append(
+                f"{emoji} <b>{notification['event_type']}</b> - {full_name}, "
+                f"{event_date.strftime('%d.%m.%Y')} ({urgency})"
             )
+        
+        messages = []
+        current = header
+        for line in lines:
+            if len(current) + len(line) + 1 > self.MAX_MESSAGE_LENGTH:
+                messages.append(current)
+                current = header
+            current += f"\n{line}"
+        messages.append(current)
+        return messages
+
+    async def build_escalation_digests(self, escalations: List[Tuple[dict, NotificationLevel, str]]
+                                       ) -> List[OutgoingMessage]:
+        """
+        Группирует критичные уведомления по чатам и готовит по одной сводке
+        каждому администратору чата. Сводка заменяет отдельные сообщения
+        администратору и помечена записями журнала NOTIFICATION_TYPE_DIGEST
+        своих событий (см. delivered_keys)
+        
+        Args:
+            escalations: Тройки (данные уведомления, уровень, расшифрованное ФИО)
             
-            escalation_message = (
-                f"🚨 <b>ЭСКАЛАЦИЯ</b>\n"
-                f"{self.format_notification_message(notification, level)}\n\n"
-                f"⚡ Уведомление направлено всем администраторам"
+        Returns:
+            Сообщения для отправки через MessageDispatcher
+        """
+        by_chat = {}
+        for escalation in escalations:
+            notification, level, _ = escalation
+            if level in self.ESCALATION_LEVELS:
+                by_chat.setdefault(notification['chat_id'], []).append(escalation)
+        
+        if not by_chat:
+            return []
+        
+        # Администраторы всех чатов - одним запросом
+        chat_ids = list(by_chat)
+        placeholders = ', '.join('?' * len(chat_ids))
+        rows = await self.db.fetch_all(
+            f"SELECT chat_id, admin_id FROM chat_settings WHERE chat_id IN ({placeholders})",
+            tuple(chat_ids)
+        )
+        admins = {}
+        for row in rows:
+            admins.setdefault(row['chat_id'], []).append(row['admin_id'])
+        
+        messages = []
+        for chat_id, chat_escalations in by_chat.items():
+            tag = frozenset(
+                (notification['id'], self.NOTIFICATION_TYPE_DIGEST, self.RECIPIENT_ADMIN)
+                for notification, _, _ in chat_escalations
             )
-            
-            # Отправляем всем админам
-            for admin in admins:
-                try:
-                    await context.bot.send_message(
-                        chat_id=admin['admin_id'],
-                        text=escalation_message,
-                        parse_mode='HTML',
-                        reply_markup=self.create_action_keyboard(notification)
-                    )
-                except Exception as e:
-                    logger.warning(f"Failed to send escalation to admin {admin['admin_id']}: {e}")
-                    
-        except Exception as e:
-            logger.error(f"Error in escalated notifications: {e}")
+            for text in self.format_escalation_digest(chat_escalations):
+                messages.extend(
+                    OutgoingMessage(chat_id=admin_id, text=text, tag=tag) for admin_id in admins.get(chat_id, [])
+                )
+        return messages
 
     def create_action_keyboard(self, notification: dict):
         """
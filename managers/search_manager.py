@@ -3,32 +3,147 @@
 """
 
 import logging
+import re
 from typing import List, Dict, Optional
-from core.security import decrypt_data
+from core.search_sessions import SearchSession, search_sessions
+from core.security import decrypt_employee_name, name_matches, name_query_tokens
+from core.utils import make_page_cursor, parse_page_cursor
 
 logger = logging.getLogger(__name__)
 
+def _words(text: str) -> List[str]:
+    """Слова текста в нижнем регистре - как их разбивает токенизатор unicode61 индекса FTS5"""
+    return re.findall(r'\w+', (text or "").lower())
+
 class SearchManager:
     """Менеджер поиска и фильтрации событий"""
     
     def __init__(self, db_manager):
         self.db = db_manager
     
-    async def search_events(self, chat_id: int, query: str, filters: Dict = None, page: int = 0, per_page: int = 10) -> Dict:
+    def _name_match_ids(self, chat_id: int, query: str) -> List[int]:
+        """
+        Находит сотрудников чата по ФИО через слепой индекс
+        
+        Кандидаты из индекса проверяются после расшифровки (name_matches):
+        совпадение всех триграмм еще не означает совпадения подстроки.
+        Расшифровываются только кандидаты, а не все ФИО чата.
+        
+        Args:
+            chat_id: ID чата
+            query: Поисковый запрос
+            
+        Returns:
+            ID сотрудников, ФИО которых соответствует запросу
+        """
+        tokens = name_query_tokens(query or "")
+        if not tokens:
+            return []
+        
+        placeholders = ", ".join("?" for _ in tokens)
+        candidates = self.db.execute_with_retry(f'''
+            SELECT id, full_name FROM employees
+            WHERE chat_id = ? AND id IN (
+                SELECT employee_id FROM employee_name_index
+                WHERE token IN ({placeholders})
+                GROUP BY employee_id
+                HAVING COUNT(*) = ?
+            )
+        ''', tuple([chat_id] + tokens + [len(tokens)]), fetch="all")
+        
+        matched = []
+        for candidate in candidates:
+            try:
+                full_name = decrypt_employee_name(candidate['id'], candidate['full_name'])
+            except ValueError:
+                continue
+            if name_matches(full_name, query):
+                matched.append(candidate['id'])
+        return matched
+    
+    def _name_match_clause(self, chat_id: int, query: str, column: str = "e.id") -> tuple:
+        """
+        Строит SQL-условие поиска по ФИО (проверенные совпадения слепого индекса)
+        
+        Args:
+            chat_id: ID чата
+            query: Поисковый запрос
+            column: Колонка с ID сотрудника
+            
+        Returns:
+            Кортеж (SQL-условие, параметры)
+        """
+        employee_ids = self._name_match_ids(chat_id, query)
+        if not employee_ids:
+            return "0", []
+        placeholders = ", ".join("?" for _ in employee_ids)
+        return f"{column} IN ({placeholders})", employee_ids
+    
+    async def _name_match_clause_async(self, chat_id: int, query: str, column: str = "e.id") -> tuple:
+        """Строит условие поиска по ФИО в пуле потоков базы (см. _name_match_clause)"""
+        return await self.db.run_sync(self._name_match_clause, chat_id, query, column)
+    
+    @staticmethod
+    def _fts_query(query: str) -> Optional[str]:
+        """
+        Строит запрос FTS5: каждое слово ищется как начало слова, нужны все слова
+        
+        Args:
+            query: Поисковый запрос
+            
+        Returns:
+            Выражение для MATCH или None, если в запросе нет слов
+        """
+        words = _words(query)
+        if not words:
+            return None
+        # Слова в кавычках: символы запроса не разбираются как синтаксис FTS5
+        return " ".join(f'"{word}"*' for word in words)
+    
+    def _fts_match_clause(self, query: str, fts: str, column: str) -> tuple:
         """
-        Универсальный поиск по событиям с пагинацией
+        Строит SQL-условие поиска по полнотекстовому индексу
+        
+        Args:
+            query: Поисковый запрос
+            fts: Индекс (position_fts - ID сотрудника, event_type_fts - ID события)
+            column: Колонка с ID строки индексируемой таблицы
+            
+        Returns:
+            Кортеж (SQL-условие, параметры)
+        """
+        fts_query = self._fts_query(query)
+        if fts_query is None:
+            return "0", []
+        return f"{column} IN (SELECT rowid FROM {fts} WHERE {fts} MATCH ?)", [fts_query]
+    
+    async def search_events(self, chat_id: int, query: str, filters: Dict = None, page: int = 0, per_page: int = 10,
+                            cursor: int = None) -> Dict:
+        """
+        Универсальный поиск по событиям с пагинацией по ключу
+        
+        Результаты упорядочены по (дата события, ID события); страница
+        выбирается от курсора, а не через OFFSET, поэтому дальние страницы
+        стоят столько же, сколько первая.
         
         Args:
             chat_id: ID чата
             query: Поисковый запрос
             filters: Дополнительные фильтры
-            page: Номер страницы (начиная с 0)
+            page: Номер страницы (начиная с 0), на которую ведет курсор; передается
+                вызывающим (кнопка хранит его рядом с курсором), база его не считает
             per_page: Количество результатов на страницу
+            cursor: Курсор из make_page_cursor (None - первая страница)
             
         Returns:
             Словарь с результатами и метаинформацией
         """
         base_query = '''
+            FROM employee_events ee
+            JOIN employees e ON ee.employee_id = e.id
+            WHERE e.chat_id = ? AND e.is_active = 1
+        '''
+        select_clause = '''
             SELECT 
                 e.id as employee_id,
                 e.full_name,
@@ -38,9 +153,6 @@ class SearchManager:
                 ee.next_notification_date,
                 ee.interval_days,
                 (julianday(ee.next_notification_date) - julianday('now')) as days_until
-            FROM employee_events ee
-            JOIN employees e ON ee.employee_id = e.id
-            WHERE e.chat_id = ? AND e.is_active = 1
         '''
         
         params = [chat_id]
@@ -48,65 +160,88 @@ class SearchManager:
         
         # Текстовый поиск
         if query and query.strip():
-            search_condition = '''
-                (LOWER(e.full_name) LIKE LOWER(?) OR 
-                 LOWER(e.position) LIKE LOWER(?) OR 
-                 LOWER(ee.event_type) LIKE LOWER(?))
-            '''
-            conditions.append(search_condition)
-            search_term = f"%{query.strip()}%"
-            params.extend([search_term, search_term, search_term])
+            name_clause, name_params = await self._name_match_clause_async(chat_id, query)
+            position_clause, position_params = self._fts_match_clause(query, 'position_fts', 'e.id')
+            type_clause, type_params = self._fts_match_clause(query, 'event_type_fts', 'ee.id')
+            conditions.append(f"({name_clause} OR {position_clause} OR {type_clause})")
+            params.extend(name_params + position_params + type_params)
         
         # Фильтры
         if filters:
             if filters.get('status'):
                 status = filters['status']
                 if status == 'overdue':
-                    conditions.append("date(ee.next_notification_date) < date('now')")
+                    conditions.append("ee.next_notification_date < date('now')")
                 elif status == 'urgent':
-                    conditions.append("date(ee.next_notification_date) BETWEEN date('now') AND date('now', '+7 days')")
+                    conditions.append("ee.next_notification_date BETWEEN date('now') AND date('now', '+7 days')")
                 elif status == 'upcoming':
-                    conditions.append("date(ee.next_notification_date) BETWEEN date('now', '+8 days') AND date('now', '+30 days')")
+                    conditions.append("ee.next_notification_date BETWEEN date('now', '+8 days') AND date('now', '+30 days')")
             
             if filters.get('event_type'):
                 conditions.append("ee.event_type = ?")
                 params.append(filters['event_type'])
             
             if filters.get('date_from'):
-                conditions.append("date(ee.next_notification_date) >= date(?)")
+                conditions.append("ee.next_notification_date >= date(?)")
                 params.append(filters['date_from'])
             
             if filters.get('date_to'):
-                conditions.append("date(ee.next_notification_date) <= date(?)")
+                conditions.append("ee.next_notification_date <= date(?)")
                 params.append(filters['date_to'])
         
         # Собираем финальный запрос
         if conditions:
-            final_query = base_query + " AND " + " AND ".join(conditions)
+            where_query = base_query + " AND " + " AND ".join(conditions)
         else:
-            final_query = base_query
-            
-        final_query += " ORDER BY ee.next_notification_date"
+            where_query = base_query
         
         # Получаем общее количество результатов
-        count_query = final_query.replace(
-            "SELECT e.id as employee_id, e.full_name, e.position, ee.id as event_id, ee.event_type, ee.next_notification_date, ee.interval_days, (julianday(ee.next_notification_date) - julianday('now')) as days_until",
-            "SELECT COUNT(*)"
-        )
-        total_results = self.db.execute_with_retry(count_query, tuple(params), fetch="one")
-        total_count = total_results[0] if total_results else 0
-        
-        # Добавляем пагинацию
-        final_query += f" LIMIT {per_page} OFFSET {page * per_page}"
+        total_results = await self.db.fetch_one(f"SELECT COUNT(*) as count {where_query}", tuple(params))
+        total_count = total_results['count'] if total_results else 0
+        
+        # Страница от курсора: строки после последней или до первой строки предыдущей страницы
+        after_id, before_id = parse_page_cursor(cursor)
+        anchor = None
+        if after_id or before_id:
+            anchor = await self.db.fetch_one(
+                "SELECT id, next_notification_date FROM employee_events WHERE id = ?",
+                (after_id or before_id,)
+            )
+        
+        page_params = list(params)
+        backwards = False
+        if anchor:
+            backwards = before_id is not None
+            where_query += " AND (ee.next_notification_date, ee.id) " + ("< (?, ?)" if backwards else "> (?, ?)")
+            page_params.extend([anchor['next_notification_date'], anchor['id']])
+            order = "DESC" if backwards else "ASC"
+            page_query = f"{select_clause} {where_query} ORDER BY ee.next_notification_date {order}, ee.id {order} LIMIT ?"
+            page_params.append(per_page + 1)
+        else:
+            # Первая страница (или строка курсора удалена - начинаем сначала)
+            page = 0
+            page_query = f"{select_clause} {where_query} ORDER BY ee.next_notification_date, ee.id LIMIT ?"
+            page_params.append(per_page + 1)
+        
+        results = await self.db.fetch_all(page_query, tuple(page_params))
+        has_more = len(results) > per_page
+        results = list(results[:per_page])
+        if backwards:
+            results.reverse()
+            has_next, has_prev = True, has_more
+        else:
+            has_next, has_prev = has_more, anchor is not None
         
-        results = self.db.execute_with_retry(final_query, tuple(params), fetch="all")
+        if not has_prev:
+            # Перед страницей строк нет - это первая страница, какой бы номер ни пришел
+            page = 0
         
         # Расшифровываем имена и добавляем статусы
         decrypted_results = []
         for result in results:
             result_dict = dict(result)
             try:
-                result_dict['full_name'] = decrypt_data(result_dict['full_name'])
+                result_dict['full_name'] = decrypt_employee_name(result_dict['employee_id'], result_dict['full_name'])
             except ValueError:
                 result_dict['full_name'] = "Ошибка дешифрации"
             
@@ -143,8 +278,10 @@ class SearchManager:
                 'per_page': per_page,
                 'total_count': total_count,
                 'total_pages': (total_count + per_page - 1) // per_page,
-                'has_next': (page + 1) * per_page < total_count,
-                'has_prev': page > 0
+                'has_next': has_next,
+                'has_prev': has_prev,
+                'next_cursor': make_page_cursor(decrypted_results[-1]['event_id']) if decrypted_results else None,
+                'prev_cursor': make_page_cursor(decrypted_results[0]['event_id'], forward=False) if decrypted_results else None
             }
         }
 
@@ -178,42 +315,18 @@ class SearchManager:
         Returns:
             Словарь со статистикой
         """
-        stats_query = '''
-            SELECT 
-                COUNT(*) as total_events,
-                COUNT(CASE WHEN date(ee.next_notification_date) < date('now') THEN 1 END) as overdue,
-                COUNT(CASE WHEN date(ee.next_notification_date) BETWEEN date('now') AND date('now', '+3 days') THEN 1 END) as critical,
-                COUNT(CASE WHEN date(ee.next_notification_date) BETWEEN date('now', '+4 days') AND date('now', '+7 days') THEN 1 END) as urgent,
-                COUNT(CASE WHEN date(ee.next_notification_date) BETWEEN date('now', '+8 days') AND date('now', '+30 days') THEN 1 END) as upcoming,
-                COUNT(CASE WHEN date(ee.next_notification_date) > date('now', '+30 days') THEN 1 END) as planned,
-                COUNT(DISTINCT e.id) as total_employees
-            FROM employee_events ee
-            JOIN employees e ON ee.employee_id = e.id
-            WHERE e.chat_id = ? AND e.is_active = 1
-        '''
+        # Счетчики поддерживаются базой инкрементально (таблица chat_event_stats)
+        stats = self.db.get_chat_event_stats(chat_id)
         
-        result = self.db.execute_with_retry(stats_query, (chat_id,), fetch="one")
-        
-        if result:
-            return {
-                'total_events': result['total_events'],
-                'total_employees': result['total_employees'],
-                'overdue': result['overdue'],
-                'critical': result['critical'], 
-                'urgent': result['urgent'],
-                'upcoming': result['upcoming'],
-                'planned': result['planned']
-            }
-        else:
-            return {
-                'total_events': 0,
-                'total_employees': 0,
-                'overdue': 0,
-                'critical': 0,
-                'urgent': 0,
-                'upcoming': 0,
-                'planned': 0
-            }
+        return {
+            'total_events': stats['total_events'],
+            'total_employees': stats['employees_with_events'],
+            'overdue': stats['overdue'],
+            'critical': stats['critical'], 
+            'urgent': stats['urgent'],
+            'upcoming': stats['upcoming'],
+            'planned': stats['planned']
+        }
     
     def search_employees(self, chat_id: int, query: str = None) -> List[Dict]:
         """
@@ -235,24 +348,24 @@ class SearchManager:
         params = [chat_id]
         
         if query and query.strip():
-            base_query += " AND (LOWER(full_name) LIKE LOWER(?) OR LOWER(position) LIKE LOWER(?))"
-            search_term = f"%{query.strip()}%"
-            params.extend([search_term, search_term])
-        
-        base_query += " ORDER BY full_name"
+            name_clause, name_params = self._name_match_clause(chat_id, query, column="id")
+            position_clause, position_params = self._fts_match_clause(query, 'position_fts', 'id')
+            base_query += f" AND ({name_clause} OR {position_clause})"
+            params.extend(name_params + position_params)
         
         results = self.db.execute_with_retry(base_query, tuple(params), fetch="all")
         
-        # Расшифровываем имена
+        # Расшифровываем имена; ФИО хранится зашифрованным, поэтому сортировка - после расшифровки
         decrypted_results = []
         for result in results:
             result_dict = dict(result)
             try:
-                result_dict['full_name'] = decrypt_data(result_dict['full_name'])
+                result_dict['full_name'] = decrypt_employee_name(result_dict['id'], result_dict['full_name'])
             except ValueError:
                 result_dict['full_name'] = "Ошибка дешифрации"
             decrypted_results.append(result_dict)
         
+        decrypted_results.sort(key=lambda employee: (employee['full_name'].casefold(), employee['id']))
         return decrypted_results
     
     async def smart_text_search(self, chat_id: int, query: str, additional_filters: Dict = None, page: int = 0, per_page: int = 10) -> Dict:
@@ -274,24 +387,125 @@ class SearchManager:
             return {'results': [], 'pagination': {'total_count': 0, 'current_page': 0, 'total_pages': 0}}
         
         query = query.strip().lower()
+        event_ids = await self._find_text_search_ids(chat_id, query, additional_filters)
+        results = await self._fetch_text_search_page(chat_id, query, event_ids, page, per_page)
+        results['search_suggestions'] = await self.db.run_sync(self._get_search_suggestions, chat_id, query)
+        return results
+    
+    async def open_text_search(self, chat_id: int, query: str, additional_filters: Dict = None) -> SearchSession:
+        """
+        Выполняет текстовый поиск и сохраняет найденные события в сессии
         
-        # Получаем все события (без текстового фильтра в SQL)
-        base_query = '''
-            SELECT 
-                e.id as employee_id,
-                e.full_name,
-                e.position,
-                ee.id as event_id,
-                ee.event_type,
-                ee.next_notification_date,
-                ee.interval_days,
-                (julianday(ee.next_notification_date) - julianday('now')) as days_until
+        Args:
+            chat_id: ID чата
+            query: Поисковый запрос
+            additional_filters: Дополнительные фильтры
+            
+        Returns:
+            Сессия поиска для постраничного вывода через get_text_search_page()
+        """
+        query = (query or "").strip()
+        # Версия читается до поиска: запись между ними только вызовет повторный поиск
+        data_version = await self.db.fetch_chat_data_version(chat_id)
+        event_ids = await self._find_text_search_ids(chat_id, query.lower(), additional_filters) if query else []
+        
+        # Подсказки показываются только при пустом результате
+        suggestions = []
+        if query and not event_ids:
+            suggestions = await self.db.run_sync(self._get_search_suggestions, chat_id, query.lower())
+        
+        return search_sessions.create(chat_id, query, event_ids, suggestions, data_version)
+    
+    async def resume_text_search(self, chat_id: int, session_id: str) -> Optional[SearchSession]:
+        """
+        Возвращает сессию поиска, если она не истекла и данные чата не менялись
+        
+        Args:
+            chat_id: ID чата
+            session_id: ID сессии из кнопки
+            
+        Returns:
+            Сессия или None - тогда поиск нужно выполнить заново
+        """
+        session = search_sessions.get(session_id, chat_id)
+        if session is None:
+            return None
+        
+        if session.data_version != await self.db.fetch_chat_data_version(chat_id):
+            search_sessions.discard(session_id)
+            return None
+        return session
+    
+    async def get_text_search_page(self, session: SearchSession, page: int = 0, per_page: int = 10) -> Dict:
+        """
+        Возвращает страницу результатов сессии поиска
+        
+        Args:
+            session: Сессия из open_text_search() или resume_text_search()
+            page: Номер страницы
+            per_page: Количество результатов на страницу
+            
+        Returns:
+            Результаты в формате smart_text_search() и ID сессии
+        """
+        results = await self._fetch_text_search_page(
+            session.chat_id, session.query.lower(), session.event_ids, page, per_page
+        )
+        results['search_suggestions'] = list(session.suggestions)
+        results['session_id'] = session.session_id
+        return results
+    
+    async def _find_text_search_ids(self, chat_id: int, query: str, additional_filters: Dict = None) -> List[int]:
+        """
+        Находит события по тексту запроса
+        
+        Args:
+            chat_id: ID чата
+            query: Поисковый запрос в нижнем регистре
+            additional_filters: Дополнительные фильтры
+            
+        Returns:
+            ID событий в порядке релевантности и близости даты
+        """
+        # ФИО ищется через слепой индекс, должность и тип события - через FTS5
+        name_clause, name_params = await self._name_match_clause_async(chat_id, query)
+        fts_query = self._fts_query(query)
+        if fts_query is not None:
+            fts_hits = '''
+                position_hits AS (
+                    SELECT rowid AS employee_id, bm25(position_fts) AS rank
+                    FROM position_fts WHERE position_fts MATCH ?
+                ),
+                type_hits AS (
+                    SELECT rowid AS event_id, bm25(event_type_fts) AS rank
+                    FROM event_type_fts WHERE event_type_fts MATCH ?
+                )
+            '''
+            fts_params = [fts_query, fts_query]
+        else:
+            fts_hits = '''
+                position_hits AS (SELECT NULL AS employee_id, 0 AS rank WHERE 0),
+                type_hits AS (SELECT NULL AS event_id, 0 AS rank WHERE 0)
+            '''
+            fts_params = []
+        
+        base_query = f'''
+            WITH name_hits AS (
+                SELECT id AS employee_id FROM employees e
+                WHERE e.chat_id = ? AND {name_clause}
+            ),
+            {fts_hits}
+            SELECT ee.id as event_id
             FROM employee_events ee
             JOIN employees e ON ee.employee_id = e.id
+            LEFT JOIN name_hits nh ON nh.employee_id = e.id
+            LEFT JOIN position_hits ph ON ph.employee_id = e.id
+            LEFT JOIN type_hits th ON th.event_id = ee.id
             WHERE e.chat_id = ? AND e.is_active = 1
+            AND (nh.employee_id IS NOT NULL OR ph.employee_id IS NOT NULL OR th.event_id IS NOT NULL)
         '''
         
-        params = [chat_id]
+        params = [chat_id] + name_params + fts_params + [chat_id]
         conditions = []
         
         # Дополнительные фильтры (не текстовые)
@@ -299,13 +513,13 @@ class SearchManager:
             if additional_filters.get('status'):
                 status = additional_filters['status']
                 if status == 'overdue':
-                    conditions.append("date(ee.next_notification_date) < date('now')")
+                    conditions.append("ee.next_notification_date < date('now')")
                 elif status == 'critical':
-                    conditions.append("date(ee.next_notification_date) BETWEEN date('now') AND date('now', '+3 days')")
+                    conditions.append("ee.next_notification_date BETWEEN date('now') AND date('now', '+3 days')")
                 elif status == 'urgent':
-                    conditions.append("date(ee.next_notification_date) BETWEEN date('now', '+4 days') AND date('now', '+7 days')")
+                    conditions.append("ee.next_notification_date BETWEEN date('now', '+4 days') AND date('now', '+7 days')")
                 elif status == 'upcoming':
-                    conditions.append("date(ee.next_notification_date) BETWEEN date('now', '+8 days') AND date('now', '+30 days')")
+                    conditions.append("ee.next_notification_date BETWEEN date('now', '+8 days') AND date('now', '+30 days')")
             
             if additional_filters.get('position'):
                 conditions.append("e.position = ?")
@@ -316,78 +530,99 @@ class SearchManager:
             final_query = base_query + " AND " + " AND ".join(conditions)
         else:
             final_query = base_query
-            
-        final_query += " ORDER BY ee.next_notification_date ASC"
         
-        # Получаем все результаты
-        all_results = self.db.execute_with_retry(final_query, tuple(params), fetch="all")
+        # ФИО, затем должность, затем тип события; внутри группы - по bm25 (меньше - лучше)
+        # и по близости даты
+        final_query += '''
+            ORDER BY CASE
+                WHEN nh.employee_id IS NOT NULL THEN 10
+                WHEN ph.employee_id IS NOT NULL THEN 8
+                ELSE 6
+            END DESC, COALESCE(ph.rank, 0) + COALESCE(th.rank, 0) ASC, ee.next_notification_date ASC
+        '''
+        rows = await self.db.fetch_all(final_query, tuple(params))
+        return [row['event_id'] for row in rows]
+    
+    async def _fetch_text_search_page(self, chat_id: int, query: str, event_ids, page: int, per_page: int) -> Dict:
+        """
+        Загружает события одной страницы результатов по их ID
         
-        # Расшифровываем и фильтруем по тексту
-        matching_results = []
-        for result in all_results:
+        Args:
+            chat_id: ID чата
+            query: Поисковый запрос в нижнем регистре (для подсветки совпадений)
+            event_ids: ID всех найденных событий в порядке вывода
+            page: Номер страницы
+            per_page: Количество результатов на страницу
+            
+        Returns:
+            Результаты страницы и пагинация
+        """
+        total_count = len(event_ids)
+        page_ids = list(event_ids[page * per_page:(page + 1) * per_page])
+        
+        rows = []
+        if page_ids:
+            name_clause, name_params = await self._name_match_clause_async(chat_id, query)
+            position_clause, position_params = self._fts_match_clause(query, 'position_fts', 'e.id')
+            placeholders = ", ".join("?" for _ in page_ids)
+            rows = await self.db.fetch_all(f'''
+                SELECT 
+                    e.id as employee_id,
+                    e.full_name,
+                    e.position,
+                    ee.id as event_id,
+                    ee.event_type,
+                    ee.next_notification_date,
+                    ee.interval_days,
+                    (julianday(ee.next_notification_date) - julianday('now')) as days_until,
+                    CASE
+                        WHEN {name_clause} THEN 10
+                        WHEN {position_clause} THEN 8
+                        ELSE 6
+                    END as relevance_score
+                FROM employee_events ee
+                JOIN employees e ON ee.employee_id = e.id
+                WHERE ee.id IN ({placeholders}) AND e.chat_id = ? AND e.is_active = 1
+            ''', tuple(name_params + position_params + page_ids + [chat_id]))
+        
+        # Восстанавливаем порядок поиска; расшифровываем только ФИО текущей страницы
+        position = {event_id: index for index, event_id in enumerate(page_ids)}
+        paginated_results = []
+        for result in sorted(rows, key=lambda row: position[row['event_id']]):
             result_dict = dict(result)
             
             try:
-                # Расшифровываем имя для поиска
-                decrypted_name = decrypt_data(result_dict['full_name'])
-                result_dict['full_name'] = decrypted_name
-                
-                # Проверяем соответствие поисковому запросу
-                if (query in decrypted_name.lower() or 
-                    query in result_dict['position'].lower() or 
-                    query in result_dict['event_type'].lower()):
-                    
-                    # Вычисляем релевантность
-                    relevance_score = 1
-                    if query in decrypted_name.lower():
-                        relevance_score = 10
-                    elif query in result_dict['position'].lower():
-                        relevance_score = 8
-                    elif query in result_dict['event_type'].lower():
-                        relevance_score = 6
-                    
-                    result_dict['relevance_score'] = relevance_score
-                    
-                    # Добавляем статус
-                    days_until = result_dict.get('days_until', 0)
-                    if days_until < 0:
-                        result_dict['status'] = 'overdue'
-                        result_dict['status_emoji'] = '🔴'
-                        result_dict['status_text'] = f'просрочено на {abs(int(days_until))} дн.'
-                    elif days_until <= 3:
-                        result_dict['status'] = 'critical'
-                        result_dict['status_emoji'] = '🔴'
-                        result_dict['status_text'] = f'через {int(days_until)} дн. (критично!)'
-                    elif days_until <= 7:
-                        result_dict['status'] = 'urgent'
-                        result_dict['status_emoji'] = '🟠'
-                        result_dict['status_text'] = f'через {int(days_until)} дн. (срочно)'
-                    elif days_until <= 30:
-                        result_dict['status'] = 'upcoming'
-                        result_dict['status_emoji'] = '🟡'
-                        result_dict['status_text'] = f'через {int(days_until)} дн.'
-                    else:
-                        result_dict['status'] = 'planned'
-                        result_dict['status_emoji'] = '🟢'
-                        result_dict['status_text'] = f'через {int(days_until)} дн.'
-                    
-                    # Подсветка совпадений
-                    result_dict['match_highlights'] = self._highlight_matches(result_dict, query)
-                    
-                    matching_results.append(result_dict)
-                    
+                result_dict['full_name'] = decrypt_employee_name(result_dict['employee_id'], result_dict['full_name'])
             except ValueError:
-                # Если не удалось расшифровать, пропускаем
-                continue
-        
-        # Сортируем по релевантности
-        matching_results.sort(key=lambda x: (-x['relevance_score'], x['days_until']))
-        
-        # Применяем пагинацию
-        total_count = len(matching_results)
-        start_idx = page * per_page
-        end_idx = start_idx + per_page
-        paginated_results = matching_results[start_idx:end_idx]
+                result_dict['full_name'] = "Ошибка дешифрации"
+            
+            # Добавляем статус
+            days_until = result_dict.get('days_until', 0)
+            if days_until < 0:
+                result_dict['status'] = 'overdue'
+                result_dict['status_emoji'] = '🔴'
+                result_dict['status_text'] = f'просрочено на {abs(int(days_until))} дн.'
+            elif days_until <= 3:
+                result_dict['status'] = 'critical'
+                result_dict['status_emoji'] = '🔴'
+                result_dict['status_text'] = f'через {int(days_until)} дн. (критично!)'
+            elif days_until <= 7:
+                result_dict['status'] = 'urgent'
+                result_dict['status_emoji'] = '🟠'
+                result_dict['status_text'] = f'через {int(days_until)} дн. (срочно)'
+            elif days_until <= 30:
+                result_dict['status'] = 'upcoming'
+                result_dict['status_emoji'] = '🟡'
+                result_dict['status_text'] = f'через {int(days_until)} дн.'
+            else:
+                result_dict['status'] = 'planned'
+                result_dict['status_emoji'] = '🟢'
+                result_dict['status_text'] = f'через {int(days_until)} дн.'
+            
+            # Подсветка совпадений
+            result_dict['match_highlights'] = self._highlight_matches(result_dict, query)
+            
+            paginated_results.append(result_dict)
         
         return {
             'results': paginated_results,
@@ -399,8 +634,7 @@ class SearchManager:
                 'total_pages': (total_count + per_page - 1) // per_page if total_count > 0 else 0,
                 'has_next': (page + 1) * per_page < total_count,
                 'has_prev': page > 0
-            },
-            'search_suggestions': self._get_search_suggestions(chat_id, query)
+            }
         }
     
     def _highlight_matches(self, result: Dict, query: str) -> List[str]:
@@ -409,12 +643,20 @@ class SearchManager:
         """
         matches = []
         query_lower = query.lower()
+        query_words = _words(query)
+        
+        def has_words(text: str) -> bool:
+            # Как в FTS5: каждое слово запроса - начало одного из слов поля
+            text_words = _words(text)
+            return bool(query_words) and all(
+                any(word.startswith(query_word) for word in text_words) for query_word in query_words
+            )
         
         if query_lower in result['full_name'].lower():
             matches.append('👤 ФИО')
-        if query_lower in result['position'].lower():
+        if has_words(result['position']):
             matches.append('💼 Должность')
-        if query_lower in result['event_type'].lower():
+        if has_words(result['event_type']):
             matches.append('📋 Событие')
         
         return matches
@@ -425,30 +667,34 @@ class SearchManager:
         """
         suggestions = []
         
-        # Получаем похожие ФИО
-        similar_names = self.db.execute_with_retry('''
-            SELECT DISTINCT e.full_name
-            FROM employees e
-            WHERE e.chat_id = ? AND e.is_active = 1
-            AND LOWER(e.full_name) LIKE ?
-            LIMIT 3
-        ''', (chat_id, f"%{query.lower()}%"), fetch="all")
+        # Получаем похожие ФИО (без совпадений в индексе запрос не нужен)
+        name_clause, name_params = self._name_match_clause(chat_id, query)
+        similar_names = []
+        if name_params:
+            similar_names = self.db.execute_with_retry(f'''
+                SELECT DISTINCT e.id, e.full_name
+                FROM employees e
+                WHERE e.chat_id = ? AND e.is_active = 1
+                AND {name_clause}
+                LIMIT 3
+            ''', tuple([chat_id] + name_params), fetch="all")
         
         for name_row in similar_names:
             try:
-                decrypted = decrypt_data(name_row['full_name'])
+                decrypted = decrypt_employee_name(name_row['id'], name_row['full_name'])
                 suggestions.append(f"👤 {decrypted}")
             except ValueError:
                 pass
         
         # Получаем похожие должности
-        similar_positions = self.db.execute_with_retry('''
+        position_clause, position_params = self._fts_match_clause(query, 'position_fts', 'e.id')
+        similar_positions = self.db.execute_with_retry(f'''
             SELECT DISTINCT e.position
             FROM employees e
             WHERE e.chat_id = ? AND e.is_active = 1
-            AND LOWER(e.position) LIKE ?
+            AND {position_clause}
             LIMIT 2
-        ''', (chat_id, f"%{query.lower()}%"), fetch="all")
+        ''', tuple([chat_id] + position_params), fetch="all")
         
         for pos_row in similar_positions:
             suggestions.append(f"💼 {pos_row['position']}")
@@ -540,13 +786,13 @@ class SearchManager:
         
         # Добавляем условие статуса
         if status == 'overdue':
-            base_query += " AND date(ee.next_notification_date) < date('now')"
+            base_query += " AND ee.next_notification_date < date('now')"
         elif status == 'urgent':
-            base_query += " AND date(ee.next_notification_date) BETWEEN date('now') AND date('now', '+7 days')"
+            base_query += " AND ee.next_notification_date BETWEEN date('now') AND date('now', '+7 days')"
         elif status == 'upcoming':
-            base_query += " AND date(ee.next_notification_date) BETWEEN date('now', '+8 days') AND date('now', '+30 days')"
+            base_query += " AND ee.next_notification_date BETWEEN date('now', '+8 days') AND date('now', '+30 days')"
         elif status == 'planned':
-            base_query += " AND date(ee.next_notification_date) > date('now', '+30 days')"
+            base_query += " AND ee.next_notification_date > date('now', '+30 days')"
         
         base_query += " ORDER BY ee.next_notification_date"
         
@@ -557,7 +803,7 @@ class SearchManager:
         for result in results:
             result_dict = dict(result)
             try:
-                result_dict['full_name'] = decrypt_data(result_dict['full_name'])
+                result_dict['full_name'] = decrypt_employee_name(result_dict['employee_id'], result_dict['full_name'])
             except ValueError:
                 result_dict['full_name'] = "Ошибка дешифрации"
             decrypted_results.append(result_dict)
@@ -6,6 +6,7 @@ import logging
 from datetime import datetime, timedelta
 from typing import List, Dict
 from config.constants import AVAILABLE_POSITIONS, POSITION_TEMPLATE_MAPPING
+from core.event_categories import classify_event_type
 
 logger = logging.getLogger(__name__)
 
@@ -169,38 +170,40 @@ class TemplateManager:
         template = self.predefined_templates[template_key]
         base_date = base_date or datetime.now().date()
         
-        try:
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                added_events = 0
+        def insert_template_events(conn) -> int:
+            cursor = conn.cursor()
+            added_events = 0
+            
+            for event in template.events:
+                # Проверяем, нет ли уже такого события
+                cursor.execute(
+                    "SELECT id FROM employee_events WHERE employee_id = ? AND event_type = ?",
+                    (employee_id, event['type'])
+                )
                 
-                for event in template.events:
-                    # Проверяем, нет ли уже такого события
-                    cursor.execute(
-                        "SELECT id FROM employee_events WHERE employee_id = ? AND event_type = ?",
-                        (employee_id, event['type'])
-                    )
+                if not cursor.fetchone():  # Добавляем только если события нет
+                    next_date = base_date + timedelta(days=event['interval_days'])
                     
-                    if not cursor.fetchone():  # Добавляем только если события нет
-                        next_date = base_date + timedelta(days=event['interval_days'])
-                        
-                        cursor.execute('''
-                            INSERT INTO employee_events 
-                            (employee_id, event_type, last_event_date, interval_days, next_notification_date)
-                            VALUES (?, ?, ?, ?, ?)
-                        ''', (
-                            employee_id,
-                            event['type'],
-                            base_date.isoformat(),
-                            event['interval_days'],
-                            next_date.isoformat()
-                        ))
-                        added_events += 1
-                
-                conn.commit()
-                logger.info(f"Applied template {template_key} to employee {employee_id}, added {added_events} events")
-                return True
+                    cursor.execute('''
+                        INSERT INTO employee_events 
+                        (employee_id, event_type, last_event_date, interval_days, next_notification_date, category)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    ''', (
+                        employee_id,
+                        event['type'],
+                        base_date.isoformat(),
+                        event['interval_days'],
+                        next_date.isoformat(),
+                        classify_event_type(event['type'])
+                    ))
+                    added_events += 1
+            
+            return added_events
+        
+        try:
+            added_events = await self.db.transaction(insert_template_events)
+            logger.info(f"Applied template {template_key} to employee {employee_id}, added {added_events} events")
+            return True
                 
         except Exception as e:
             logger.error(f"Error applying template {template_key} to employee {employee_id}: {e}")
@@ -255,7 +258,7 @@ class TemplateManager:
                 'events': events
             })
             
-            self.db.execute_with_retry('''
+            await self.db.execute('''
                 INSERT INTO custom_templates (chat_id, template_name, template_data, created_by)
                 VALUES (?, ?, ?, ?)
             ''', (chat_id, template_name, template_data, created_by))
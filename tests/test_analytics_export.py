@@ -13,6 +13,13 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.database import db_manager
 from managers.export_manager import ExportManager
 
+def _file_size(file) -> int:
+    """Размер файла отчета (указатель возвращается в начало)"""
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(0)
+    return size
+
 async def test_analytics_export():
     """Тестирует функциональность экспорта аналитических отчетов в Excel"""
     
@@ -30,25 +37,25 @@ async def test_analytics_export():
         print("\n📄 Тест 1: Полный аналитический отчет")
         full_report = await export_manager.export_analytics_report(test_chat_id, "full")
         print(f"✅ Полный отчет создан")
-        print(f"📊 Размер файла: {len(full_report.getvalue())} байт")
+        print(f"📊 Размер файла: {_file_size(full_report)} байт")
         
         # Тест 2: Отчет по трендам
         print("\n📈 Тест 2: Отчет по трендам")
         trends_report = await export_manager.export_analytics_report(test_chat_id, "trends")
         print(f"✅ Отчет по трендам создан")
-        print(f"📊 Размер файла: {len(trends_report.getvalue())} байт")
+        print(f"📊 Размер файла: {_file_size(trends_report)} байт")
         
         # Тест 3: Отчет по прогнозам
         print("\n🎯 Тест 3: Отчет по прогнозам")
         forecast_report = await export_manager.export_analytics_report(test_chat_id, "forecast")
         print(f"✅ Отчет по прогнозам создан")
-        print(f"📊 Размер файла: {len(forecast_report.getvalue())} байт")
+        print(f"📊 Размер файла: {_file_size(forecast_report)} байт")
         
         # Тест 4: Отчет по эффективности
         print("\n⚡ Тест 4: Отчет по эффективности")
         efficiency_report = await export_manager.export_analytics_report(test_chat_id, "efficiency")
         print(f"✅ Отчет по эффективности создан")
-        print(f"📊 Размер файла: {len(efficiency_report.getvalue())} байт")
+        print(f"📊 Размер файла: {_file_size(efficiency_report)} байт")
         
         # Тест 5: Экспорт автоматических отчетов
         print("\n📋 Тест 5: Экспорт автоматических отчетов")
@@ -57,7 +64,7 @@ async def test_analytics_export():
         daily_excel = await export_manager.export_automated_report(test_chat_id, "daily")
         if daily_excel:
             print(f"✅ Ежедневный отчет в Excel создан")
-            print(f"📊 Размер файла: {len(daily_excel.getvalue())} байт")
+            print(f"📊 Размер файла: {_file_size(daily_excel)} байт")
         else:
             print("📊 Ежедневный отчет пуст (нет данных)")
         
@@ -65,7 +72,7 @@ async def test_analytics_export():
         weekly_excel = await export_manager.export_automated_report(test_chat_id, "weekly")
         if weekly_excel:
             print(f"✅ Еженедельный отчет в Excel создан")
-            print(f"📊 Размер файла: {len(weekly_excel.getvalue())} байт")
+            print(f"📊 Размер файла: {_file_size(weekly_excel)} байт")
         else:
             print("📊 Еженедельный отчет пуст (нет данных)")
         
@@ -73,7 +80,7 @@ async def test_analytics_export():
         monthly_excel = await export_manager.export_automated_report(test_chat_id, "monthly")
         if monthly_excel:
             print(f"✅ Месячный отчет в Excel создан")
-            print(f"📊 Размер файла: {len(monthly_excel.getvalue())} байт")
+            print(f"📊 Размер файла: {_file_size(monthly_excel)} байт")
         else:
             print("📊 Месячный отчет пуст (нет данных)")
         
@@ -83,7 +90,7 @@ async def test_analytics_export():
         # Сохраняем тестовый файл для проверки
         test_file_path = "/tmp/test_analytics_report.xlsx"
         with open(test_file_path, "wb") as f:
-            f.write(full_report.getvalue())
+            f.write(full_report.read())
         print(f"✅ Тестовый файл сохранен: {test_file_path}")
         
         # Проверяем, что файл создан корректно
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Тест снимка событий для аналитики: один проход по событиям на экран или экспорт
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import traceback
+from datetime import timedelta
+
+# Добавляем родительскую директорию в sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+from core.security import encrypt_data
+from managers.advanced_analytics_manager import AdvancedAnalyticsManager
+from managers.analytics_snapshot import AnalyticsSnapshotCache, _utc_today, shift_months, snapshot_cache
+from managers.export_manager import ExportManager
+
+TEST_CHAT_ID = 5151
+# (тип события, смещение даты от сегодня в днях, интервал)
+EVENTS = [
+    ("Медосмотр", -10, 365), ("Периодический медицинский осмотр", -3, 365),
+    ("Вводный инструктаж", 0, 90), ("Медосмотр", 2, 365), ("обучение по ОТ", 5, 180),
+    ("Аттестация", 12, 365), ("Инструктаж", 40, 90), ("Аттестация", 200, 365),
+]
+
+
+def _seed(db: DatabaseManager):
+    today = _utc_today()
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (TEST_CHAT_ID, 1))
+        employee_id = conn.execute(
+            "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+            (TEST_CHAT_ID, encrypt_data("Иванов Иван"), "Плотник")
+        ).lastrowid
+        for event_type, offset, interval in EVENTS:
+            next_date = today + timedelta(days=offset)
+            conn.execute(
+                '''INSERT INTO employee_events
+                   (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+                   VALUES (?, ?, ?, ?, ?)''',
+                (employee_id, event_type, (next_date - timedelta(days=interval)).isoformat(),
+                 interval, next_date.isoformat())
+            )
+
+
+def _count_event_scans(db: DatabaseManager) -> list:
+    """Подменяет execute_with_retry экземпляра и запоминает выборки событий"""
+    scans = []
+    original = db.execute_with_retry
+
+    def counting(query, params=(), fetch=None):
+        if 'employee_events' in query:
+            scans.append(query)
+        return original(query, params, fetch)
+
+    db.execute_with_retry = counting
+    return scans
+
+
+def _check_views(analytics: AdvancedAnalyticsManager):
+    """Представления, посчитанные из снимка, совпадают с исходными данными"""
+    print("\n📋 Тест 1: Представления из снимка")
+    today = _utc_today()
+
+    trends = analytics.get_trends_analysis(TEST_CHAT_ID, 6)
+    window = [e for e in EVENTS if shift_months(today, -6) <= today + timedelta(days=e[1]) <= shift_months(today, 6)]
+    assert sum(m['total_events'] for m in trends['monthly_stats']) == len(window)
+    assert trends['period_summary']['total_overdue'] == 2
+    # Категории без учета регистра: три медосмотра и три инструктажа/обучения, аттестации - отдельно
+    assert sum(m['medical_events'] for m in trends['monthly_stats']) == 3
+    assert sum(m['training_events'] for m in trends['monthly_stats']) == 3
+
+    forecast = analytics.get_workload_forecast(TEST_CHAT_ID, 7)
+    assert forecast['summary']['total_events'] == 3
+    assert forecast['daily_forecast'][0]['event_types'] == "Вводный инструктаж"
+
+    charts = analytics.get_detailed_timeline_charts(TEST_CHAT_ID)
+    assert charts['daily']['summary']['total_events'] == 5
+    # Недельная диаграмма: события за 4 недели назад и 8 недель вперед
+    assert charts['weekly']['summary']['total_overdue'] == 2
+
+    weekly = analytics.get_weekly_analysis(TEST_CHAT_ID, 8)
+    assert sum(week['total'] for week in weekly.values()) == 7
+    print("✅ Тренды, прогноз, диаграммы и недельный анализ согласованы")
+    return True
+
+
+def _check_single_scan(db: DatabaseManager, scans: list):
+    """Экран прогноза и полный экспорт аналитики - одна выборка событий"""
+    print("\n📋 Тест 2: Одна выборка на экран и экспорт")
+    analytics = AdvancedAnalyticsManager(db)
+
+    snapshot_cache.invalidate(TEST_CHAT_ID)
+    scans.clear()
+    forecast = analytics.get_advanced_workload_forecast(TEST_CHAT_ID)
+    assert len(forecast['forecasts']) == 3
+    assert len(scans) == 1, f"Выборок событий: {len(scans)}"
+
+    snapshot_cache.invalidate(TEST_CHAT_ID)
+    scans.clear()
+    report = asyncio.run(ExportManager(db).export_analytics_report(TEST_CHAT_ID, "full"))
+    assert report.read(4) == b'PK\x03\x04'
+    report.close()
+    assert len(scans) == 1, f"Выборок событий при экспорте: {len(scans)}"
+    print("✅ Прогноз на 3 периода и экспорт из 5 листов читают события один раз")
+    return True
+
+
+def _check_invalidation(db: DatabaseManager):
+    """Изменение данных чата делает новые события видимыми без ручного сброса"""
+    print("\n📋 Тест 3: Актуальность снимка")
+    analytics = AdvancedAnalyticsManager(db)
+    before = analytics.get_workload_forecast(TEST_CHAT_ID, 7)['summary']['total_events']
+
+    with db.get_connection() as conn:
+        conn.execute(
+            '''INSERT INTO employee_events
+               (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+               SELECT id, 'Медосмотр', date('now', '-364 days'), 365, date('now', '+1 days')
+               FROM employees WHERE chat_id = ?''',
+            (TEST_CHAT_ID,)
+        )
+    # Версия данных чата выросла - снимок перечитывается
+    loads = snapshot_cache.stats['loads']
+    assert analytics.get_workload_forecast(TEST_CHAT_ID, 7)['summary']['total_events'] == before + 1
+    assert snapshot_cache.stats['loads'] == loads + 1
+
+    # Без изменений снимок берется из кэша
+    analytics.get_workload_forecast(TEST_CHAT_ID, 14)
+    assert snapshot_cache.stats['loads'] == loads + 1
+    snapshot_cache.invalidate(TEST_CHAT_ID)
+    assert analytics.get_workload_forecast(TEST_CHAT_ID, 7)['summary']['total_events'] == before + 1
+    print(f"✅ Прогноз учитывает новое событие сразу после записи: {before} → {before + 1}")
+    return True
+
+
+def _check_cache_bounds(db: DatabaseManager):
+    """Кэш снимков ограничен по размеру, устаревшие снимки удаляются при обращении"""
+    print("\n📋 Тест 4: Размер кэша снимков")
+    cache = AnalyticsSnapshotCache(max_size=2)
+    for chat_id in (TEST_CHAT_ID, 1, 2):
+        cache.get(db, chat_id)
+    assert list(cache._snapshots) == [(db.db_path, 1), (db.db_path, 2)], list(cache._snapshots)
+    assert cache.stats['evictions'] == 1
+
+    # Недавно использованный снимок не вытесняется
+    cache.get(db, 1)
+    cache.get(db, 3)
+    assert list(cache._snapshots) == [(db.db_path, 1), (db.db_path, 3)]
+
+    expiring = AnalyticsSnapshotCache(ttl=0)
+    expiring.get(db, TEST_CHAT_ID)
+    expiring.get(db, TEST_CHAT_ID)
+    assert expiring.stats['expired'] == 1 and len(expiring._snapshots) == 1
+    print(f"✅ Статистика ограниченного кэша: {cache.stats}")
+    return True
+
+
+def test_analytics_snapshot():
+    """Тестирует расчет аналитики из снимка событий"""
+    print("📸 ТЕСТИРОВАНИЕ СНИМКА СОБЫТИЙ АНАЛИТИКИ")
+    print("=" * 50)
+
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'analytics_snapshot.db'))
+
+    try:
+        _seed(db)
+        scans = _count_event_scans(db)
+        _check_views(AdvancedAnalyticsManager(db))
+        _check_single_scan(db, scans)
+        _check_invalidation(db)
+        _check_cache_bounds(db)
+        print(f"\n📊 Статистика снимков: {snapshot_cache.stats}")
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        snapshot_cache.invalidate()
+        db.close_all()
+
+    print("\n🎉 ВСЕ ТЕСТЫ СНИМКА СОБЫТИЙ ПРОЙДЕНЫ!")
+    return True
+
+
+def main():
+    """Основная функция тестирования"""
+    return test_analytics_snapshot()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Тест асинхронного API базы данных
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+from managers.template_manager import TemplateManager
+
+
+async def test_async_database():
+    """Тестирует fetch_one, fetch_all, execute, transaction и run_sync"""
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'async_test.db')
+    db = DatabaseManager(db_path)
+
+    print("⚡ ТЕСТИРОВАНИЕ АСИНХРОННОГО API БАЗЫ ДАННЫХ")
+    print("=" * 50)
+
+    try:
+        # Тест 1: execute возвращает lastrowid для INSERT
+        print("\n📋 Тест 1: Вставка и выборка")
+        await db.execute(
+            "INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (777, 1)
+        )
+        employee_id = await db.execute(
+            "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+            (777, 'encrypted-name', 'Плотник')
+        )
+        assert employee_id, "execute не вернул lastrowid"
+
+        row = await db.fetch_one("SELECT position FROM employees WHERE id = ?", (employee_id,))
+        rows = await db.fetch_all("SELECT id FROM employees WHERE chat_id = ?", (777,))
+        assert row['position'] == 'Плотник'
+        assert len(rows) == 1
+        print(f"✅ Сотрудник добавлен (ID {employee_id}), выборка работает")
+
+        # Тест 2: transaction откатывает все изменения при ошибке
+        print("\n📋 Тест 2: Откат транзакции")
+
+        def failing_transaction(conn):
+            conn.execute("DELETE FROM employees WHERE id = ?", (employee_id,))
+            raise RuntimeError("forced rollback")
+
+        try:
+            await db.transaction(failing_transaction)
+        except RuntimeError:
+            pass
+        still_there = await db.fetch_one("SELECT id FROM employees WHERE id = ?", (employee_id,))
+        assert still_there is not None, "Транзакция не была откачена"
+        print("✅ Транзакция откатывается при исключении")
+
+        # Тест 3: применение шаблона через транзакцию
+        print("\n📋 Тест 3: Применение шаблона")
+        template_manager = TemplateManager(db)
+        applied = await template_manager.apply_template(employee_id, 'carpenter')
+        events = await db.fetch_all(
+            "SELECT event_type FROM employee_events WHERE employee_id = ?", (employee_id,)
+        )
+        assert applied and len(events) == len(template_manager.predefined_templates['carpenter'].events)
+        print(f"✅ Шаблон применен, событий: {len(events)}")
+
+        # Тест 4: блокирующая работа не останавливает event loop
+        print("\n📋 Тест 4: Отзывчивость event loop")
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker_task = asyncio.create_task(ticker())
+        await db.run_sync(time.sleep, 0.3)
+        ticker_task.cancel()
+        assert ticks >= 10, f"Event loop был заблокирован (тиков: {ticks})"
+        print(f"✅ Event loop продолжал работу: {ticks} тиков за 0.3 с блокирующей работы")
+
+        print("\n🎉 ВСЕ ТЕСТЫ АСИНХРОННОГО API ПРОЙДЕНЫ!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        db.close_all()
+
+
+async def main():
+    """Главная функция тестирования"""
+    success = await test_async_database()
+    return success
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    sys.exit(0 if success else 1)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Тест компактного формата callback_data и маршрутизации callback-запросов по коду действия
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import traceback
+from types import SimpleNamespace
+
+# Отдельная база для теста - до импорта модулей бота
+os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(), 'callback_codec.db')
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.callback_codec import (
+    CALLBACK_SCHEMA, CallbackStash, callback_action, callback_code, callback_pattern, callback_stash
+)
+from core.utils import create_callback_data, parse_callback_data
+from handlers import menu_handlers
+
+# Примеры кнопок с параметрами, как их создают обработчики
+SAMPLES = [
+    ("emp_page", {'page': 3, 'c': 123456}),
+    ("emp_page", {'page': 1, 'c': -987654}),
+    ("save_position", {'id': 42, 'pos_index': 0}),
+    ("select_position", {'position_index': 6}),
+    ("search_filter", {'status': 'overdue', 'c': -77}),
+    ("search_event_type", {'type': 'Медосмотр'}),
+    ("search_event_type", {'type': 'Проверка знаний по охране труда', 'c': 15}),
+    ("text_search_page", {'q': 'Иванов Иван Петрович, плотник', 'p': 2}),
+    ("quick_text_search", {'q': 'маляр'}),
+    ("save_timezone", {'tz': 'Asia/Yekaterinburg'}),
+    ("save_notif_days", {'days': 120}),
+    ("cancel_export", {'job': '3f9a0c12be47'}),
+    ("export", {'format': 'xlsx'}),
+    ("select_template", {'key': 'maintenance_worker'}),
+    ("mark_completed", {'event_id': 2 ** 40}),
+    ("text_search_page", {'q': 'a|b', 'p': 0}),
+    ("text_search_page", {'q': '~tilde'}),
+]
+
+
+class FakeBot:
+    """Бот, запоминающий отправленные сообщения"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.messages.append(text)
+
+
+def _check_round_trip():
+    """Все действия схемы и параметры переживают кодирование"""
+    print("\n📋 Тест 1: Кодирование и декодирование")
+    for action in CALLBACK_SCHEMA:
+        data = create_callback_data(action)
+        assert parse_callback_data(data) == {'action': action}, (action, data)
+        assert callback_action(data) == action
+
+    for action, params in SAMPLES:
+        data = create_callback_data(action, **params)
+        assert len(data.encode('utf-8')) <= 64, data
+        assert not data.startswith('{'), data
+        assert parse_callback_data(data) == dict(params, action=action), (data, parse_callback_data(data))
+
+    # None и пустые параметры опускаются, как и отсутствующие
+    assert create_callback_data("contact_employee", emp_id=None) == create_callback_data("contact_employee")
+    assert parse_callback_data(create_callback_data("emp_page", page=2, c=None)) == {'action': 'emp_page', 'page': 2}
+
+    # Действия и поля вне схемы кодируются прежним JSON
+    data = create_callback_data("emp_page", page=1, extra="x")
+    assert json.loads(data) == {'action': 'emp_page', 'page': 1, 'extra': 'x'}
+    assert parse_callback_data(create_callback_data("new_action", id=5)) == {'action': 'new_action', 'id': 5}
+
+    print(f"✅ {len(CALLBACK_SCHEMA)} действий, {len(SAMPLES)} кнопок с параметрами")
+    return True
+
+
+def _check_stash():
+    """Длинные строки хранятся на сервере, кнопка содержит токен"""
+    print("\n📋 Тест 2: Хранилище длинных значений")
+    query = 'Рабочий по комплексному обслуживанию и ремонту зданий'
+    data = create_callback_data("text_search_page", q=query, p=1)
+    assert query not in data and '~' in data and len(data) < 20, data
+    assert create_callback_data("text_search_page", q=query, p=1) == data
+    assert parse_callback_data(data)['q'] == query
+
+    # После перезапуска (или вытеснения) значение теряется, остальные поля сохраняются
+    stash = CallbackStash(max_size=2)
+    tokens = [stash.put(f"значение номер {i}") for i in range(3)]
+    assert stash.get(tokens[0]) is None and stash.get(tokens[2]) == "значение номер 2"
+    assert stash.stats()['evictions'] == 1
+
+    callback_stash._values.pop(data.split('|')[1][1:])
+    assert parse_callback_data(data) == {'action': 'text_search_page', 'p': 1}
+    print(f"✅ {data}; статистика: {callback_stash.stats()}")
+    return True
+
+
+def _check_legacy_and_patterns():
+    """Старые JSON-кнопки распознаются, фильтры ConversationHandler работают по коду"""
+    print("\n📋 Тест 3: Старые кнопки и фильтры")
+    legacy = '{"action":"emp_page","page":2,"c":-15}'
+    assert parse_callback_data(legacy) == {'action': 'emp_page', 'page': 2, 'c': -15}
+    assert callback_code(legacy) == CALLBACK_SCHEMA['emp_page'][0]
+    assert parse_callback_data('not json') == {} and parse_callback_data('1zz') == {}
+    assert parse_callback_data('1ep|x!') == {}
+
+    add_event = callback_pattern("add_event")
+    assert add_event(create_callback_data("add_event", id=7))
+    assert add_event('{"action":"add_event","id":7}')
+    assert not add_event(create_callback_data("add_event_to_employee", id=7))
+    assert not add_event(create_callback_data("add_employee"))
+    assert callback_pattern("edit_name")(create_callback_data("edit_name", id=3))
+    print("✅ JSON-кнопки и фильтры по коду действия")
+    return True
+
+
+def _press(data: str):
+    async def answer(*args, **kwargs):
+        return True
+
+    update = SimpleNamespace(
+        callback_query=SimpleNamespace(data=data, answer=answer),
+        effective_chat=SimpleNamespace(id=1),
+        effective_user=SimpleNamespace(id=1)
+    )
+    bot = FakeBot()
+    context = SimpleNamespace(bot=bot, user_data={})
+    asyncio.run(menu_handlers.menu_handler(update, context))
+    return bot.messages, context
+
+
+def _check_routing():
+    """Обработчик выбирается по коду действия; неизвестные кнопки получают ответ"""
+    print("\n📋 Тест 4: Маршрутизация")
+    messages, _ = _press(create_callback_data("unknown_action"))
+    assert messages == ["❌ Неизвестная команда"]
+    assert _press("1??")[0] == ["❌ Неизвестная команда"]
+
+    routes = menu_handlers._ROUTES
+    assert routes[callback_code(create_callback_data("dashboard"))].__name__ == 'dashboard_main'
+    assert routes[callback_code(create_callback_data("emp_page"))] is menu_handlers.employees_page
+
+    calls = []
+
+    async def fake_list(update, context):
+        calls.append(dict(context.user_data))
+
+    original = routes[callback_code(create_callback_data("menu"))]
+    routes[callback_code(create_callback_data("menu"))] = fake_list
+    try:
+        _press(create_callback_data("menu"))
+        _press('{"action":"menu"}')
+    finally:
+        routes[callback_code(create_callback_data("menu"))] = original
+    assert len(calls) == 2
+    print(f"✅ Таблица маршрутов: {len(routes)} действий")
+    return True
+
+
+def _check_speed():
+    """Размер кнопок и стоимость кодирования и маршрутизации"""
+    print("\n📋 Тест 5: Размер и скорость")
+    json_size = sum(len(json.dumps(dict(p, action=a), ensure_ascii=False, separators=(',', ':')).encode())
+                    for a, p in SAMPLES)
+    compact_size = sum(len(create_callback_data(a, **p).encode()) for a, p in SAMPLES)
+    assert compact_size < json_size / 2, (compact_size, json_size)
+
+    runs = 20000
+    data = [create_callback_data(a, **p) for a, p in SAMPLES]
+    start = time.perf_counter()
+    for i in range(runs):
+        action, params = SAMPLES[i % len(SAMPLES)]
+        create_callback_data(action, **params)
+    encode = (time.perf_counter() - start) / runs
+
+    start = time.perf_counter()
+    for i in range(runs):
+        parse_callback_data(data[i % len(data)])
+    decode = (time.perf_counter() - start) / runs
+
+    # Маршрутизация: поиск по коду против цепочки сравнений по разобранному JSON
+    routes = menu_handlers._ROUTES
+    actions = list(CALLBACK_SCHEMA)
+    last = actions[-1]
+    compact, legacy = create_callback_data(last), json.dumps({'action': last})
+    start = time.perf_counter()
+    for _ in range(runs):
+        routes.get(callback_code(compact))
+    dispatch = (time.perf_counter() - start) / runs
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        action = json.loads(legacy)['action']
+        for candidate in actions:
+            if candidate == action:
+                break
+    chain = (time.perf_counter() - start) / runs
+    assert dispatch < chain, (dispatch, chain)
+
+    print(f"✅ Размер: JSON {json_size} байт, компактно {compact_size} байт")
+    print(f"✅ Кодирование: {encode * 1e6:.2f} мкс, декодирование: {decode * 1e6:.2f} мкс")
+    print(f"✅ Маршрутизация: таблица {dispatch * 1e6:.2f} мкс, цепочка if/elif {chain * 1e6:.2f} мкс")
+    return True
+
+
+def test_callback_codec():
+    """Тестирует формат callback_data и маршрутизацию"""
+    print("🔘 ТЕСТИРОВАНИЕ ФОРМАТА CALLBACK_DATA")
+    print("=" * 50)
+
+    try:
+        _check_round_trip()
+        _check_stash()
+        _check_legacy_and_patterns()
+        _check_routing()
+        _check_speed()
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        traceback.print_exc()
+        return False
+
+    print("\n🎉 ВСЕ ТЕСТЫ ФОРМАТА CALLBACK_DATA ПРОЙДЕНЫ!")
+    return True
+
+
+def main():
+    """Основная функция тестирования"""
+    return test_callback_codec()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Тест версии данных чата: любая запись в данные чата увеличивает его версию
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import traceback
+from datetime import date
+
+# Добавляем родительскую директорию в sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+from core.security import encrypt_data
+from managers.template_manager import TemplateManager
+
+TEST_CHAT_ID = 8181
+OTHER_CHAT_ID = 8282
+
+
+def _check_write_paths(db: DatabaseManager):
+    """Каждая запись увеличивает версию своего чата и не трогает другой"""
+    print("\n📋 Тест 1: Пути записи")
+
+    def bump_of(action) -> int:
+        before = db.get_chat_data_version(TEST_CHAT_ID), db.get_chat_data_version(OTHER_CHAT_ID)
+        action()
+        after = db.get_chat_data_version(TEST_CHAT_ID), db.get_chat_data_version(OTHER_CHAT_ID)
+        assert after[1] == before[1], "Версия другого чата изменилась"
+        return after[0] - before[0]
+
+    def execute(query, params=()):
+        return lambda: db.execute_with_retry(query, params)
+
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (OTHER_CHAT_ID, 2))
+        conn.execute(
+            "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+            (OTHER_CHAT_ID, encrypt_data("Сидоров Сидор"), "Кладовщик")
+        )
+
+    assert bump_of(execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (TEST_CHAT_ID, 1))) == 1
+    employee_id = db.execute_with_retry(
+        "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+        (TEST_CHAT_ID, encrypt_data("Иванов Иван"), "Сварщик")
+    )
+    assert db.get_chat_data_version(TEST_CHAT_ID) == 2
+
+    paths = {
+        'добавление события': execute(
+            '''INSERT INTO employee_events
+               (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+               VALUES (?, 'Медосмотр', date('now'), 365, date('now', '+365 days'))''', (employee_id,)),
+        'перенос даты события': execute(
+            "UPDATE employee_events SET next_notification_date = date('now', '+30 days') WHERE employee_id = ?",
+            (employee_id,)),
+        'переименование': execute(
+            "UPDATE employees SET full_name = ? WHERE id = ?", (encrypt_data("Иванов Иван Иванович"), employee_id)),
+        'смена должности': execute("UPDATE employees SET position = 'Электрик' WHERE id = ?", (employee_id,)),
+        'настройки чата': execute(
+            "UPDATE chat_settings SET notification_days = 30 WHERE chat_id = ?", (TEST_CHAT_ID,)),
+        'настройки отчетов': execute(
+            '''INSERT OR REPLACE INTO report_settings (chat_id, daily_enabled, weekly_enabled, monthly_enabled)
+               VALUES (?, 1, 0, 0)''', (TEST_CHAT_ID,)),
+        'применение шаблона': lambda: asyncio.run(
+            TemplateManager(db).apply_template(employee_id, 'carpenter', date.today())),
+        'удаление события': execute(
+            "DELETE FROM employee_events WHERE id = (SELECT MIN(id) FROM employee_events WHERE employee_id = ?)",
+            (employee_id,)),
+        'удаление сотрудника': execute("UPDATE employees SET is_active = 0 WHERE id = ?", (employee_id,)),
+    }
+    for name, action in paths.items():
+        bump = bump_of(action)
+        assert bump >= 1, f"Версия не изменилась: {name}"
+        print(f"   ✓ {name}: +{bump}")
+
+    # Служебные колонки не меняют данные чата
+    assert bump_of(execute("UPDATE employees SET sort_key = 'x' WHERE id = ?", (employee_id,))) == 0
+    print(f"✅ {len(paths)} путей записи увеличивают версию, ключ сортировки - нет")
+    return employee_id
+
+
+def _check_hard_delete(db: DatabaseManager, employee_id: int):
+    """Удаление сотрудника вместе с событиями увеличивает версию"""
+    print("\n📋 Тест 2: Удаление сотрудника с событиями")
+    before = db.get_chat_data_version(TEST_CHAT_ID)
+    with db.get_connection() as conn:
+        conn.execute("DELETE FROM employee_events WHERE employee_id = ?", (employee_id,))
+        conn.execute("DELETE FROM employees WHERE id = ?", (employee_id,))
+    after = db.get_chat_data_version(TEST_CHAT_ID)
+    assert after > before
+    assert db.get_chat_data_version(999999) == 0
+    print(f"✅ Версия {before} → {after}, у чата без изменений - 0")
+    return True
+
+
+def test_chat_data_version():
+    """Тестирует версии данных чатов"""
+    print("🔢 ТЕСТИРОВАНИЕ ВЕРСИИ ДАННЫХ ЧАТА")
+    print("=" * 50)
+
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'data_version.db'))
+
+    try:
+        employee_id = _check_write_paths(db)
+        _check_hard_delete(db, employee_id)
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        db.close_all()
+
+    print("\n🎉 ВСЕ ТЕСТЫ ВЕРСИИ ДАННЫХ ПРОЙДЕНЫ!")
+    return True
+
+
+def main():
+    """Основная функция тестирования"""
+    return test_chat_data_version()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Тест материализованных счетчиков событий чата (chat_event_stats)
+"""
+
+import os
+import sys
+import tempfile
+import traceback
+from datetime import date, timedelta
+
+# Добавляем родительскую директорию в sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+from core.security import encrypt_data
+from managers.dashboard_manager import DashboardManager
+from managers.search_manager import SearchManager
+
+TEST_CHAT_ID = 7171
+
+
+def _add_event(conn, employee_id: int, offset: int) -> int:
+    next_date = (date.today() + timedelta(days=offset)).isoformat()
+    return conn.execute(
+        '''INSERT INTO employee_events
+           (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+           VALUES (?, ?, ?, ?, ?)''',
+        (employee_id, "Медосмотр", next_date, 365, next_date)
+    ).lastrowid
+
+
+def _recomputed(db: DatabaseManager) -> dict:
+    """Счетчики, пересчитанные с нуля - эталон для инкрементальных"""
+    with db.get_connection() as conn:
+        stats_date = conn.execute(
+            "SELECT stats_date FROM chat_event_stats WHERE chat_id = ?", (TEST_CHAT_ID,)
+        ).fetchone()['stats_date']
+        conn.execute("SAVEPOINT recompute")
+        db.refresh_chat_event_stats(conn, TEST_CHAT_ID, stats_date)
+        fresh = dict(conn.execute("SELECT * FROM chat_event_stats WHERE chat_id = ?", (TEST_CHAT_ID,)).fetchone())
+        conn.execute("ROLLBACK TO recompute")
+        conn.execute("RELEASE recompute")
+    return fresh
+
+
+def _check_incremental_maintenance(db: DatabaseManager):
+    """Изменения событий обновляют счетчики без пересчета"""
+    print("\n📋 Тест 1: Инкрементальное обновление")
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (TEST_CHAT_ID, 1))
+        first = conn.execute(
+            "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+            (TEST_CHAT_ID, encrypt_data("Иванов Иван"), "Плотник")
+        ).lastrowid
+
+    db.get_chat_event_stats(TEST_CHAT_ID)  # Создает строку счетчиков
+
+    with db.get_connection() as conn:
+        second = conn.execute(
+            "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+            (TEST_CHAT_ID, encrypt_data("Петров Петр"), "Маляр")
+        ).lastrowid
+        event_ids = [_add_event(conn, first, offset) for offset in (-5, 0, 1, 3, 6, 20, 100)]
+        _add_event(conn, second, -1)
+
+    stats = db.get_chat_event_stats(TEST_CHAT_ID)
+    assert stats == _recomputed(db), f"Расхождение после вставки: {stats}"
+    assert (stats['total_employees'], stats['employees_with_events'], stats['total_events']) == (2, 2, 8)
+    assert (stats['overdue'], stats['overdue_days'], stats['critical'], stats['planned']) == (2, 6, 3, 1)
+
+    with db.get_connection() as conn:
+        # Отметка о выполнении переносит дату, удаление уменьшает счетчики
+        conn.execute(
+            "UPDATE employee_events SET next_notification_date = date(next_notification_date, '+365 days') WHERE id = ?",
+            (event_ids[0],)
+        )
+        conn.execute("DELETE FROM employee_events WHERE employee_id = ?", (second,))
+
+    stats = db.get_chat_event_stats(TEST_CHAT_ID)
+    assert stats == _recomputed(db), f"Расхождение после изменения: {stats}"
+    assert (stats['employees_with_events'], stats['overdue']) == (1, 0)
+    print(f"✅ Счетчики совпадают с полным пересчетом: {stats}")
+    return True
+
+
+def _check_employee_changes_invalidate(db: DatabaseManager):
+    """Деактивация сотрудника сбрасывает строку чата, чтение пересчитывает ее"""
+    print("\n📋 Тест 2: Изменения сотрудников")
+    with db.get_connection() as conn:
+        conn.execute(
+            "UPDATE employees SET is_active = 0 WHERE id = (SELECT MIN(id) FROM employees WHERE chat_id = ?)",
+            (TEST_CHAT_ID,)
+        )
+
+    stats = db.get_chat_event_stats(TEST_CHAT_ID)
+    assert (stats['total_employees'], stats['total_events']) == (1, 0), stats
+    print("✅ Неактивные сотрудники исключены из счетчиков")
+    return True
+
+
+def _check_warm_read_is_lookup(db_path: str):
+    """Повторное чтение не агрегирует события"""
+    print("\n📋 Тест 3: Чтение без пересчета")
+    db = DatabaseManager(db_path, max_connections=1)
+    try:
+        db.get_chat_event_stats(TEST_CHAT_ID)
+        statements = []
+        with db.get_connection() as conn:
+            conn.set_trace_callback(statements.append)
+
+        DashboardManager(db).get_overview_statistics(TEST_CHAT_ID)
+        SearchManager(db).get_events_statistics(TEST_CHAT_ID)
+
+        with db.get_connection() as conn:
+            conn.set_trace_callback(None)
+        # Разбивка по срокам (критичные, срочные, ...) не должна считаться заново
+        aggregates = [sql for sql in statements if "date('now', '+3 days')" in sql]
+        assert not aggregates, f"Выполнены агрегаты по срокам: {aggregates}"
+        print(f"✅ Запросов при открытии дашборда и поиска: {len(statements)}, агрегатов по срокам нет")
+    finally:
+        db.close_all()
+    return True
+
+
+def _check_roll_forward(db: DatabaseManager):
+    """Смена дня пересчитывает сроки относительно новой даты"""
+    print("\n📋 Тест 4: Переход через полночь")
+    with db.get_connection() as conn:
+        conn.execute("UPDATE employees SET is_active = 1 WHERE chat_id = ?", (TEST_CHAT_ID,))
+    db.get_chat_event_stats(TEST_CHAT_ID)
+
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    with db.get_connection() as conn:
+        db.refresh_chat_event_stats(conn, TEST_CHAT_ID, yesterday)
+        before = dict(conn.execute("SELECT * FROM chat_event_stats WHERE chat_id = ?", (TEST_CHAT_ID,)).fetchone())
+
+    assert db.roll_forward_chat_event_stats() == 1
+    assert db.roll_forward_chat_event_stats() == 0
+    after = db.get_chat_event_stats(TEST_CHAT_ID)
+    # Событие "завтра" относительно вчерашней даты стало сегодняшним
+    assert before['due_tomorrow'] == after['due_today'] == 1
+    print(f"✅ Счетчики пересчитаны на {after['stats_date']}")
+    return True
+
+
+def test_chat_event_stats():
+    """Тестирует поддержку и чтение счетчиков chat_event_stats"""
+    print("🧮 ТЕСТИРОВАНИЕ СЧЕТЧИКОВ СОБЫТИЙ ЧАТА")
+    print("=" * 50)
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'chat_stats.db')
+    db = DatabaseManager(db_path)
+
+    try:
+        _check_incremental_maintenance(db)
+        _check_employee_changes_invalidate(db)
+        _check_warm_read_is_lookup(db_path)
+        _check_roll_forward(db)
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        db.close_all()
+
+    print("\n🎉 ВСЕ ТЕСТЫ СЧЕТЧИКОВ СОБЫТИЙ ПРОЙДЕНЫ!")
+    return True
+
+
+def main():
+    """Основная функция тестирования"""
+    return test_chat_event_stats()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
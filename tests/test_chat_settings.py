@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Тест реестра настроек чатов: проверка прав без запросов к базе и сброс при изменении настроек
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from types import SimpleNamespace
+
+# Отдельная база для теста - до импорта модулей бота
+os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(), 'chat_settings.db')
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.chat_settings import ChatSettingsRegistry
+from core.database import db_manager
+from core.security import is_admin
+from core.utils import create_callback_data
+from handlers import reports_handlers, settings_handlers
+from managers.automated_reports_manager import AutomatedReportsManager
+
+TEST_CHAT_ID = 5151
+NEW_CHAT_ID = 5252
+ADMIN_ID = 51
+
+
+class FakeBot:
+    """Бот, запоминающий отправленные сообщения"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.messages.append(text)
+
+
+def _press(handler, action: str, **params):
+    """Нажимает кнопку с callback-данными action от имени администратора"""
+    async def answer(*args, **kwargs):
+        return True
+
+    update = SimpleNamespace(
+        callback_query=SimpleNamespace(data=create_callback_data(action, **params), answer=answer),
+        effective_chat=SimpleNamespace(id=TEST_CHAT_ID),
+        effective_user=SimpleNamespace(id=ADMIN_ID)
+    )
+    bot = FakeBot()
+    asyncio.run(handler(update, SimpleNamespace(bot=bot)))
+    return bot.messages
+
+
+def _count_loads(action) -> int:
+    """Число загрузок настроек из базы во время action"""
+    loads = db_manager.chat_settings.loads
+    action()
+    return db_manager.chat_settings.loads - loads
+
+
+async def _lookups():
+    """Проверки прав из цикла событий; возвращает время 10000 проверок и потоки загрузок"""
+    registry = db_manager.chat_settings
+    load_threads = []
+    original_get = registry.get
+
+    def recording_get(chat_id):
+        load_threads.append(threading.current_thread())
+        return original_get(chat_id)
+
+    registry.get = recording_get
+    try:
+        start = time.perf_counter()
+        for _ in range(10000):
+            assert await is_admin(TEST_CHAT_ID, ADMIN_ID)
+        elapsed = time.perf_counter() - start
+        assert not await is_admin(TEST_CHAT_ID, ADMIN_ID + 1)
+
+        # Чат без настроек тоже запоминается до /start
+        assert not await is_admin(NEW_CHAT_ID, ADMIN_ID) and not await is_admin(NEW_CHAT_ID, ADMIN_ID)
+        db_manager.execute_with_retry(
+            "INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (NEW_CHAT_ID, ADMIN_ID)
+        )
+        registry.invalidate(NEW_CHAT_ID)
+        assert await is_admin(NEW_CHAT_ID, ADMIN_ID)
+    finally:
+        del registry.get
+    return elapsed, load_threads
+
+
+def _check_lookups():
+    """После первой загрузки проверка прав не обращается к базе, загрузка - вне цикла событий"""
+    print("\n📋 Тест 1: Проверка прав")
+    db_manager.execute_with_retry(
+        "INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (TEST_CHAT_ID, ADMIN_ID)
+    )
+    registry = db_manager.chat_settings
+    loads = registry.loads
+
+    elapsed, load_threads = asyncio.run(_lookups())
+    # Загрузки: чат администратора, новый чат до и после /start
+    assert registry.loads == loads + 3, registry.stats()
+    assert len(load_threads) == 3
+    assert all(thread is not threading.main_thread() for thread in load_threads), load_threads
+    print(f"✅ 10000 проверок за {elapsed * 1000:.1f} мс, загрузок: {registry.loads - loads} (в пуле потоков)")
+    return True
+
+
+def _check_settings_handlers():
+    """Сохранение часового пояса и дней уведомлений сразу видно в реестре"""
+    print("\n📋 Тест 2: Настройки чата")
+    settings = db_manager.chat_settings.get(TEST_CHAT_ID)
+    assert settings.timezone == 'Europe/Moscow' and settings.notification_days == 90
+
+    _press(settings_handlers.save_timezone, "save_timezone", tz="Asia/Novosibirsk")
+    _press(settings_handlers.save_notification_days, "save_notif_days", days=30)
+    settings = db_manager.chat_settings.get(TEST_CHAT_ID)
+    assert settings.timezone == 'Asia/Novosibirsk' and settings.notification_days == 30, settings
+
+    messages = _press(settings_handlers.set_timezone, "set_timezone")
+    assert "Asia/Novosibirsk" in messages[-1]
+    assert _count_loads(lambda: _press(settings_handlers.set_notification_days, "set_notification_days")) == 0
+    print(f"✅ {settings}")
+    return True
+
+
+def _check_report_settings():
+    """Настройки отчетов читаются один раз и сбрасываются переключателями"""
+    print("\n📋 Тест 3: Настройки отчетов")
+    reports = AutomatedReportsManager(db_manager)
+    settings = reports.get_report_settings(TEST_CHAT_ID)
+    assert settings['daily_enabled'] and settings['weekly_enabled']
+
+    # Изменение копии не портит реестр
+    settings['daily_enabled'] = False
+    assert _count_loads(lambda: reports.get_report_settings(TEST_CHAT_ID)) == 0
+    assert reports.get_report_settings(TEST_CHAT_ID)['daily_enabled']
+
+    _press(reports_handlers.toggle_daily_reports, "toggle_daily_reports")
+    _press(reports_handlers.toggle_weekly_reports, "toggle_weekly_reports")
+    settings = reports.get_report_settings(TEST_CHAT_ID)
+    assert not settings['daily_enabled'] and not settings['weekly_enabled'] and settings['monthly_enabled']
+
+    row = db_manager.execute_with_retry(
+        "SELECT daily_enabled, weekly_enabled FROM report_settings WHERE chat_id = ?", (TEST_CHAT_ID,), fetch="one"
+    )
+    assert not row['daily_enabled'] and not row['weekly_enabled']
+    print(f"✅ Статистика реестра: {db_manager.chat_settings.stats()}")
+    return True
+
+
+def _check_bounded():
+    """Незнакомые чаты вытесняют давно не использованные, а не растят реестр"""
+    print("\n📋 Тест 4: Ограничение размера реестра")
+    registry = ChatSettingsRegistry(db_manager, max_size=3)
+    assert registry.is_admin(TEST_CHAT_ID, ADMIN_ID)
+
+    for chat_id in range(-1000, -1100, -1):
+        assert registry.get(chat_id) is None
+        assert registry.is_admin(TEST_CHAT_ID, ADMIN_ID)  # Используемый чат не вытесняется
+
+    stats = registry.stats()
+    assert stats['chats'] == 3 and stats['evictions'] == 98, stats
+    assert registry.loads == 101, stats
+    print(f"✅ 100 незнакомых чатов, в реестре {stats['chats']}: {stats}")
+    return True
+
+
+def test_chat_settings():
+    """Тестирует реестр настроек чатов"""
+    print("⚙️ ТЕСТИРОВАНИЕ РЕЕСТРА НАСТРОЕК ЧАТОВ")
+    print("=" * 50)
+
+    try:
+        _check_lookups()
+        _check_settings_handlers()
+        _check_report_settings()
+        _check_bounded()
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        traceback.print_exc()
+        return False
+
+    print("\n🎉 ВСЕ ТЕСТЫ РЕЕСТРА НАСТРОЕК ПРОЙДЕНЫ!")
+    return True
+
+
+def main():
+    """Основная функция тестирования"""
+    return test_chat_settings()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
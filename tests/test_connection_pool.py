@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Тест пула соединений DatabaseManager
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import traceback
+
+# Добавляем родительскую директорию в sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+
+
+def _make_manager(max_connections: int = 3) -> DatabaseManager:
+    """Создает менеджер с временной базой данных"""
+    db_path = os.path.join(tempfile.mkdtemp(), 'pool_test.db')
+    manager = DatabaseManager(db_path, max_connections=max_connections)
+    manager.pool_timeout = 5.0
+    return manager
+
+
+def test_connection_reuse():
+    """Соединения возвращаются в пул и переиспользуются"""
+    print("\n📋 Тест 1: Переиспользование соединений")
+    db = _make_manager()
+
+    with db.get_connection() as conn:
+        first_id = id(conn)
+    with db.get_connection() as conn:
+        second_id = id(conn)
+
+    for _ in range(20):
+        db.execute_with_retry("SELECT COUNT(*) FROM employees", fetch="one")
+
+    stats = db.get_pool_stats()
+    assert first_id == second_id, "Соединение не было переиспользовано"
+    assert stats['size'] == 1, f"Ожидалось 1 соединение, создано {stats['size']}"
+    assert stats['in_use'] == 0
+    assert stats['hit_rate'] > 90
+    print(f"✅ Создано соединений: {stats['size']}, hit rate: {stats['hit_rate']}%")
+    db.close_all()
+    return True
+
+
+def test_transaction_semantics():
+    """Блок with фиксирует изменения или откатывает их при ошибке"""
+    print("\n📋 Тест 2: Фиксация и откат транзакций")
+    db = _make_manager()
+
+    with db.get_connection() as conn:
+        conn.execute(
+            "INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (1, 100)
+        )
+
+    try:
+        with db.get_connection() as conn:
+            conn.execute(
+                "INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (2, 200)
+            )
+            raise RuntimeError("forced rollback")
+    except RuntimeError:
+        pass
+
+    rows = db.execute_with_retry("SELECT chat_id FROM chat_settings", fetch="all")
+    assert [row['chat_id'] for row in rows] == [1], "Откат транзакции не сработал"
+    print("✅ Коммит и откат работают корректно")
+    db.close_all()
+    return True
+
+
+def test_bounded_pool_under_load():
+    """Пул не превышает лимит соединений при параллельной нагрузке"""
+    print("\n📋 Тест 3: Ограничение размера пула под нагрузкой")
+    db = _make_manager(max_connections=2)
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(25):
+                with db.get_connection() as conn:
+                    conn.execute("SELECT COUNT(*) FROM employee_events").fetchone()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = db.get_pool_stats()
+    assert not errors, f"Ошибки в потоках: {errors}"
+    assert stats['size'] <= 2, f"Превышен лимит пула: {stats['size']}"
+    assert stats['checkouts'] >= 150
+    print(f"✅ Выдач: {stats['checkouts']}, размер пула: {stats['size']}, "
+          f"ожиданий: {stats['waits']}, среднее ожидание: {stats['avg_wait_time'] * 1000:.2f} мс")
+    db.close_all()
+    return True
+
+
+def test_unhealthy_connection_replaced():
+    """Закрытое соединение отбраковывается при выдаче"""
+    print("\n📋 Тест 4: Проверка работоспособности соединений")
+    db = _make_manager()
+
+    with db.get_connection() as conn:
+        broken = conn
+    broken.close()
+
+    with db.get_connection() as conn:
+        assert conn is not broken
+        conn.execute("SELECT 1").fetchone()
+
+    stats = db.get_pool_stats()
+    assert stats['health_check_failures'] == 1
+    assert stats['size'] == 1
+    print("✅ Неработающее соединение заменено новым")
+    db.close_all()
+    return True
+
+
+def test_backup_includes_wal():
+    """Резервная копия содержит транзакции, еще не перенесенные из -wal"""
+    print("\n📋 Тест 5: Резервная копия")
+    db = _make_manager()
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (1, 1)")
+    # Соединение пула открыто: запись лежит в файле -wal
+    assert os.path.getsize(f"{db.db_path}-wal") > 0
+
+    backup_path = db.create_backup()
+    assert backup_path and not os.path.exists(f"{backup_path}-wal")
+    backup = sqlite3.connect(backup_path)
+    try:
+        assert backup.execute("SELECT admin_id FROM chat_settings WHERE chat_id = 1").fetchone() == (1,)
+        assert backup.execute("PRAGMA integrity_check").fetchone() == ("ok",)
+    finally:
+        backup.close()
+    print("✅ Копия снята через backup API и содержит последнюю транзакцию")
+    db.close_all()
+    return True
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🧪 ТЕСТИРОВАНИЕ ПУЛА СОЕДИНЕНИЙ")
+    print("=" * 50)
+
+    tests = [
+        test_connection_reuse,
+        test_transaction_semantics,
+        test_bounded_pool_under_load,
+        test_unhealthy_connection_replaced,
+        test_backup_includes_wal,
+    ]
+
+    for test_func in tests:
+        try:
+            test_func()
+        except Exception as e:
+            print(f"❌ Ошибка в тестировании: {e}")
+            traceback.print_exc()
+            return False
+
+    print("\n🎉 ВСЕ ТЕСТЫ ПУЛА СОЕДИНЕНИЙ ПРОЙДЕНЫ!")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Тест категорий событий: классификация при записи, заполнение существующих строк
+и группировка по индексированной колонке category
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import traceback
+from datetime import date, timedelta
+
+# Отдельная база для теста - до импорта модулей бота
+os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(), 'event_categories.db')
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.constants import EventCategory
+from core import event_categories
+from core.database import DatabaseManager, db_manager
+from core.event_categories import EventCategoryClassifier, classify_event_type, event_classifier
+from core.security import encrypt_data
+from managers.template_manager import TemplateManager
+
+TEST_CHAT_ID = 8181
+BULK_CHAT_ID = 8282
+template_manager = TemplateManager(db_manager)
+
+
+def _add_employee(conn, chat_id: int, name: str = "Иванов Иван") -> int:
+    return conn.execute(
+        "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+        (chat_id, encrypt_data(name), "Плотник")
+    ).lastrowid
+
+
+def _add_event(conn, employee_id: int, event_type: str, days: int = 30) -> int:
+    """Вставка в обход приложения - категория остается пустой"""
+    next_date = date.today() + timedelta(days=days)
+    return conn.execute(
+        '''INSERT INTO employee_events
+           (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+           VALUES (?, ?, ?, 365, ?)''',
+        (employee_id, event_type, (next_date - timedelta(days=365)).isoformat(), next_date.isoformat())
+    ).lastrowid
+
+
+def _categories(db: DatabaseManager) -> dict:
+    rows = db.execute_with_retry("SELECT event_type, category FROM employee_events", fetch="all")
+    return {row['event_type']: row['category'] for row in rows}
+
+
+def _check_classifier():
+    """Правила без учета регистра, типы событий шаблонов"""
+    print("\n📋 Тест 1: Классификатор")
+    cases = {
+        "Медосмотр": EventCategory.MEDICAL, "ПЕРИОДИЧЕСКИЙ МЕДИЦИНСКИЙ ОСМОТР": EventCategory.MEDICAL,
+        "Вводный инструктаж": EventCategory.TRAINING, "обучение по ОТ": EventCategory.TRAINING,
+        "Проверка знаний  электробезопасности": EventCategory.KNOWLEDGE_CHECK,
+        "Аттестация": EventCategory.KNOWLEDGE_CHECK, "Поверка манометра": EventCategory.OTHER,
+        "": EventCategory.OTHER, None: EventCategory.OTHER,
+    }
+    for event_type, category in cases.items():
+        assert classify_event_type(event_type) == category.value, (event_type, classify_event_type(event_type))
+
+    template_types = {event['type'] for template in template_manager.predefined_templates.values()
+                      for event in template.events}
+    assert all(classify_event_type(t) != EventCategory.OTHER.value for t in template_types)
+
+    # Собственные правила
+    custom = EventCategoryClassifier(rules=[(EventCategory.TRAINING, ('осмотр',))])
+    assert custom.classify("Медицинский осмотр") == EventCategory.TRAINING.value
+    assert custom.classify("Вводный инструктаж") == EventCategory.OTHER.value
+    print(f"✅ {len(cases)} типов по правилам, {len(template_types)} типов шаблонов с категорией")
+    return True
+
+
+def _check_write_paths():
+    """Категория записывается вместе с событием, старые строки заполняются"""
+    print("\n📋 Тест 2: Запись и заполнение категорий")
+    with db_manager.get_connection() as conn:
+        conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (TEST_CHAT_ID, 1))
+        employee_id = _add_employee(conn, TEST_CHAT_ID)
+        _add_event(conn, employee_id, "Медосмотр")
+        _add_event(conn, employee_id, "Инструктаж на рабочем месте")
+
+    assert asyncio.run(template_manager.apply_template(employee_id, 'carpenter'))
+    categories = _categories(db_manager)
+    template_types = [event['type'] for event in template_manager.predefined_templates['carpenter'].events]
+    assert all(categories[t] == classify_event_type(t) for t in template_types)
+    assert categories["Медосмотр"] is None and categories["Инструктаж на рабочем месте"] is None
+
+    version = db_manager.get_chat_data_version(TEST_CHAT_ID)
+    assert db_manager.backfill_event_categories() == 2
+    assert db_manager.backfill_event_categories() == 0
+    # Категория выводится из типа: заполнение не сбрасывает кэши чата
+    assert db_manager.get_chat_data_version(TEST_CHAT_ID) == version
+    categories = _categories(db_manager)
+    assert categories["Медосмотр"] == EventCategory.MEDICAL.value
+    assert categories["Инструктаж на рабочем месте"] == EventCategory.TRAINING.value
+
+    # После изменения правил --all пересчитывает все события
+    original = event_classifier.rules
+    event_classifier.rules = [(EventCategory.MEDICAL.value, ('инструктаж',))]
+    try:
+        assert event_categories.main(['--all']) == 0
+        assert _categories(db_manager)["Инструктаж на рабочем месте"] == EventCategory.MEDICAL.value
+    finally:
+        event_classifier.rules = original
+    assert db_manager.backfill_event_categories(reclassify=True) > 0
+    assert all(category == classify_event_type(t) for t, category in _categories(db_manager).items())
+    assert db_manager.backfill_event_categories(reclassify=True) == 0
+    print("✅ Шаблоны, заполнение пустых категорий и пересчет всех")
+    return True
+
+
+def _check_migration():
+    """База без колонки category получает колонку, индекс и категории при открытии"""
+    print("\n📋 Тест 3: Миграция существующей базы")
+    path = os.path.join(tempfile.mkdtemp(), 'legacy.db')
+    db = DatabaseManager(path, max_connections=1)
+    with db.get_connection() as conn:
+        conn.execute("DROP INDEX idx_events_employee_category")
+        conn.execute("ALTER TABLE employee_events DROP COLUMN category")
+        conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (1, 1)")
+        employee_id = _add_employee(conn, 1)
+        conn.execute(
+            '''INSERT INTO employee_events
+               (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+               VALUES (?, 'Медицинский осмотр', date('now'), 365, date('now', '+365 days'))''',
+            (employee_id,)
+        )
+    db.close_all()
+
+    db = DatabaseManager(path, max_connections=1)
+    assert _categories(db) == {"Медицинский осмотр": EventCategory.MEDICAL.value}
+    indexes = db.execute_with_retry("PRAGMA index_list(employee_events)", fetch="all")
+    assert 'idx_events_employee_category' in {row['name'] for row in indexes}
+    db.close_all()
+    print("✅ Колонка добавлена и заполнена")
+    return True
+
+
+def _unicode_lower(value):
+    """LOWER с поддержкой кириллицы для прежнего сравнения подстрок (встроенный - только ASCII)"""
+    return value.lower() if isinstance(value, str) else value
+
+
+def _check_group_by():
+    """Разбивка по категориям - группировка по индексу быстрее сравнения подстрок"""
+    print("\n📋 Тест 4: Группировка по категориям")
+    types = ["Медицинский осмотр", "Инструктаж по охране труда", "Проверка знаний ОТ",
+             "Обучение работам на высоте", "Поверка инструмента"]
+    with db_manager.get_connection() as conn:
+        conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (BULK_CHAT_ID, 1))
+        for i in range(2000):
+            employee_id = _add_employee(conn, BULK_CHAT_ID, f"Сотрудник {i}")
+            for j, event_type in enumerate(types):
+                conn.execute(
+                    '''INSERT INTO employee_events
+                       (employee_id, event_type, last_event_date, interval_days, next_notification_date, category)
+                       VALUES (?, ?, date('now'), 365, date('now', ?), ?)''',
+                    (employee_id, event_type, f"+{(i + j) % 60} days", classify_event_type(event_type))
+                )
+
+    where = '''FROM employee_events ee JOIN employees e ON ee.employee_id = e.id
+               WHERE e.chat_id = ? AND e.is_active = 1
+               AND ee.next_notification_date >= date('now') AND ee.next_notification_date < date('now', '+30 days')'''
+    grouped = f"SELECT ee.category, COUNT(*) AS count {where} GROUP BY ee.category"
+    # Прежний способ: сравнение подстрок в каждом агрегате (с приведением регистра кириллицы)
+    like = f'''SELECT COUNT(CASE WHEN unicode_lower(ee.event_type) LIKE '%медицинск%' THEN 1 END) AS medical,
+                      COUNT(CASE WHEN unicode_lower(ee.event_type) LIKE '%инструктаж%'
+                                   OR unicode_lower(ee.event_type) LIKE '%обучени%' THEN 1 END) AS training {where}'''
+
+    plan = " ".join(row['detail'] for row in db_manager.execute_with_retry(
+        f"EXPLAIN QUERY PLAN {grouped}", (BULK_CHAT_ID,), fetch="all"))
+    assert "COVERING INDEX idx_events_employee_category" in plan, plan
+
+    with db_manager.get_connection() as conn:
+        conn.create_function("unicode_lower", 1, _unicode_lower, deterministic=True)
+
+        def timed(sql, runs=20):
+            start = time.perf_counter()
+            for _ in range(runs):
+                rows = conn.execute(sql, (BULK_CHAT_ID,)).fetchall()
+            return (time.perf_counter() - start) / runs, rows
+
+        grouped_time, rows = timed(grouped)
+        like_time, (like_row,) = timed(like)
+    counts = {row['category']: row['count'] for row in rows}
+    assert counts[EventCategory.MEDICAL.value] == like_row['medical'], (counts, dict(like_row))
+    assert counts[EventCategory.TRAINING.value] == like_row['training'], (counts, dict(like_row))
+    assert set(counts) == {category.value for category in EventCategory}, counts
+    assert grouped_time < like_time, (grouped_time, like_time)
+    print(f"✅ GROUP BY category: {grouped_time * 1000:.2f} мс, LIKE в агрегатах: {like_time * 1000:.2f} мс")
+    return True
+
+
+def test_event_categories():
+    """Тестирует категории событий"""
+    print("🏷️ ТЕСТИРОВАНИЕ КАТЕГОРИЙ СОБЫТИЙ")
+    print("=" * 50)
+
+    try:
+        _check_classifier()
+        _check_write_paths()
+        _check_migration()
+        _check_group_by()
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        traceback.print_exc()
+        return False
+
+    print("\n🎉 ВСЕ ТЕСТЫ КАТЕГОРИЙ СОБЫТИЙ ПРОЙДЕНЫ!")
+    return True
+
+
+def main():
+    """Основная функция тестирования"""
+    return test_event_categories()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
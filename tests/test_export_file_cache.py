@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Тест кэша file_id экспорта: повторный экспорт неизмененных данных не генерирует файл заново
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import traceback
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+# Отдельная база для теста - до импорта модулей бота
+os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(), 'export_file_cache.db')
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import db_manager
+from core.jobs import JobRunner
+from core.security import encrypt_data
+from core.utils import create_callback_data
+from handlers.export_handlers import export_file_cache, handle_export
+from managers.export_manager import ExportFileCache
+
+TEST_CHAT_ID = 7171
+ADMIN_ID = 71
+
+
+class FakeMessage:
+    """Сообщение о прогрессе: запоминает последний текст"""
+
+    def __init__(self, text):
+        self.text = text
+
+    async def edit_text(self, text, **kwargs):
+        self.text = text
+
+
+class FakeBot:
+    """Бот, запоминающий отправленные документы и выдающий им file_id"""
+
+    def __init__(self):
+        self.documents = []
+        self.messages = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        message = FakeMessage(text)
+        self.messages.append(message)
+        return message
+
+    async def send_document(self, chat_id, document, **kwargs):
+        uploaded = not isinstance(document, str)
+        self.documents.append('upload' if uploaded else document)
+        file_id = f"file-{len(self.documents)}" if uploaded else document
+        return SimpleNamespace(document=SimpleNamespace(file_id=file_id))
+
+
+def _make_context(bot: FakeBot, runner: JobRunner):
+    tasks = []
+    application = SimpleNamespace(
+        bot_data={'job_runner': runner},
+        create_task=lambda coroutine, update=None: tasks.append(asyncio.ensure_future(coroutine))
+    )
+    return SimpleNamespace(bot=bot, application=application), tasks
+
+
+def _make_update(file_format: str):
+    async def answer(*args, **kwargs):
+        return True
+
+    return SimpleNamespace(
+        callback_query=SimpleNamespace(data=create_callback_data("export", format=file_format), answer=answer),
+        effective_chat=SimpleNamespace(id=TEST_CHAT_ID),
+        effective_user=SimpleNamespace(id=ADMIN_ID)
+    )
+
+
+def _seed() -> int:
+    with db_manager.get_connection() as conn:
+        conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (TEST_CHAT_ID, ADMIN_ID))
+        employee_id = conn.execute(
+            "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+            (TEST_CHAT_ID, encrypt_data("Петров Петр"), "Маляр")
+        ).lastrowid
+        conn.execute(
+            '''INSERT INTO employee_events
+               (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+               VALUES (?, 'Медосмотр', ?, 365, ?)''',
+            (employee_id, date.today().isoformat(), (date.today() + timedelta(days=20)).isoformat())
+        )
+    return employee_id
+
+
+def _check_cache_key(employee_id: int):
+    """Ключ кэша меняется при любой записи в данные чата и только при ней"""
+    print("\n📋 Тест 1: Ключ кэша и версия данных")
+    key = lambda: asyncio.run(export_file_cache.key(TEST_CHAT_ID, "events", "xlsx"))
+    keys = [key()]
+    assert key() == keys[0]
+
+    changes = [
+        ("UPDATE employee_events SET next_notification_date = date(next_notification_date, '+1 day') "
+         "WHERE employee_id = ?", (employee_id,)),
+        ("UPDATE employees SET full_name = ? WHERE id = ?", (encrypt_data("Петров Петр"), employee_id)),
+        ("UPDATE employees SET position = 'Штукатур' WHERE id = ?", (employee_id,)),
+    ]
+    for query, params in changes:
+        db_manager.execute_with_retry(query, params)
+        keys.append(key())
+
+    assert len(set(keys)) == len(keys), keys
+    print(f"✅ {len(keys)} различных ключей для {len(changes)} изменений")
+    return True
+
+
+def _check_eviction():
+    """Новая версия вытесняет старую, размер кэша ограничен"""
+    print("\n📋 Тест 2: Вытеснение")
+    cache = ExportFileCache(db_manager, max_size=3)
+    cache.put((1, 'events', 'xlsx', 'v1', 'd'), 'a')
+    cache.put((1, 'events', 'xlsx', 'v2', 'd'), 'b')
+    assert cache.get((1, 'events', 'xlsx', 'v1', 'd')) is None
+    assert cache.get((1, 'events', 'xlsx', 'v2', 'd')) == 'b'
+
+    for chat_id in (2, 3, 4):
+        cache.put((chat_id, 'events', 'csv', 'v1', 'd'), str(chat_id))
+    assert cache.get((1, 'events', 'xlsx', 'v2', 'd')) is None
+    assert cache.get((4, 'events', 'csv', 'v1', 'd')) == '4'
+    print(f"✅ Статистика: {cache.stats}")
+    return True
+
+
+def _check_resend_by_file_id():
+    """Второй экспорт тех же данных уходит по file_id без задачи в пуле"""
+    print("\n📋 Тест 3: Повторная отправка по file_id")
+    runner = JobRunner(max_workers=1)
+
+    async def export(bot):
+        context, tasks = _make_context(bot, runner)
+        await handle_export(_make_update("csv"), context)
+        await asyncio.gather(*tasks)
+
+    try:
+        bot = FakeBot()
+        asyncio.run(export(bot))
+        asyncio.run(export(bot))
+        assert bot.documents == ['upload', 'file-1'], bot.documents
+        assert runner.stats['submitted'] == 1
+        assert bot.messages[-1].text.startswith("✅")
+
+        # Изменение данных - новый файл
+        db_manager.execute_with_retry(
+            "UPDATE employee_events SET interval_days = 180 WHERE employee_id IN "
+            "(SELECT id FROM employees WHERE chat_id = ?)", (TEST_CHAT_ID,)
+        )
+        asyncio.run(export(bot))
+        assert bot.documents[-1] == 'upload' and runner.stats['submitted'] == 2
+    finally:
+        runner.shutdown()
+
+    print(f"✅ Отправки: {bot.documents}, задач в пуле: {runner.stats['submitted']}, "
+          f"кэш: {export_file_cache.stats}")
+    return True
+
+
+def test_export_file_cache():
+    """Тестирует кэш file_id файлов экспорта"""
+    print("📎 ТЕСТИРОВАНИЕ КЭША FILE_ID ЭКСПОРТА")
+    print("=" * 50)
+
+    try:
+        employee_id = _seed()
+        _check_cache_key(employee_id)
+        _check_eviction()
+        _check_resend_by_file_id()
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        traceback.print_exc()
+        return False
+
+    print("\n🎉 ВСЕ ТЕСТЫ КЭША FILE_ID ПРОЙДЕНЫ!")
+    return True
+
+
+def main():
+    """Основная функция тестирования"""
+    return test_export_file_cache()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
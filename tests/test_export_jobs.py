@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Тест фоновых задач экспорта в пуле процессов: прогресс, отмена, лимит на чат
+"""
+
+import asyncio
+import csv
+import io
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from datetime import date, timedelta
+
+# Добавляем родительскую директорию в sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+from core.jobs import JobCancelled, JobLimitExceeded, JobRunner
+from core.security import encrypt_data
+from managers.export_jobs import analytics_report_job, export_events_job
+
+SMALL_CHAT_ID = 6161
+LARGE_CHAT_ID = 6262
+
+
+def _seed(db: DatabaseManager, chat_id: int, employees: int, events_per_employee: int):
+    today = date.today()
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (chat_id, 1))
+        for i in range(employees):
+            employee_id = conn.execute(
+                "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+                (chat_id, encrypt_data(f"Сотрудник {chat_id}-{i:03d}"), "Монтажник")
+            ).lastrowid
+            conn.executemany(
+                '''INSERT INTO employee_events
+                   (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+                   VALUES (?, ?, ?, ?, ?)''',
+                [(employee_id, f"Проверка № {k}", today.isoformat(), 180,
+                  (today + timedelta(days=(i + k) % 300 - 20)).isoformat())
+                 for k in range(events_per_employee)]
+            )
+
+
+def _check_progress_and_result(runner: JobRunner, db_path: str):
+    """Задача сообщает растущий прогресс и возвращает готовый файл"""
+    print("\n📋 Тест 1: Прогресс и результат")
+
+    async def scenario():
+        seen = []
+
+        async def on_progress(percent):
+            seen.append(percent)
+
+        job = runner.submit(LARGE_CHAT_ID, export_events_job, db_path, LARGE_CHAT_ID, "csv")
+        path = await runner.wait(job, on_progress, interval=0.05)
+        return path, seen
+
+    path, seen = asyncio.run(scenario())
+    try:
+        with open(path, 'rb') as file:
+            rows = list(csv.reader(io.StringIO(file.read().decode('utf-8-sig'), newline=''), delimiter=';'))
+    finally:
+        os.remove(path)
+
+    assert len(rows) == 300 * 40 + 1, len(rows)
+    assert seen == sorted(seen) and seen[-1] > 0, seen
+    assert runner.active_jobs(LARGE_CHAT_ID) == 0
+    print(f"✅ {len(rows) - 1} строк, прогресс: {seen}")
+    return True
+
+
+def _check_chat_limit(runner: JobRunner, db_path: str):
+    """Вторая задача того же чата отклоняется, другой чат не ждет"""
+    print("\n📋 Тест 2: Лимит задач на чат")
+
+    async def scenario():
+        first = runner.submit(SMALL_CHAT_ID, export_events_job, db_path, SMALL_CHAT_ID, "xlsx")
+        try:
+            runner.submit(SMALL_CHAT_ID, analytics_report_job, db_path, SMALL_CHAT_ID)
+            raise AssertionError("Ожидался отказ по лимиту чата")
+        except JobLimitExceeded:
+            pass
+        other = runner.submit(LARGE_CHAT_ID, analytics_report_job, db_path, LARGE_CHAT_ID)
+        return await asyncio.gather(runner.wait(first), runner.wait(other))
+
+    paths = asyncio.run(scenario())
+    for path in paths:
+        with open(path, 'rb') as file:
+            assert file.read(4) == b'PK\x03\x04'
+        os.remove(path)
+    assert runner.stats['rejected'] == 1 and runner.active_jobs(SMALL_CHAT_ID) == 0
+    print("✅ Повторный экспорт отклонен, экспорт и отчет двух чатов выполнены параллельно")
+    return True
+
+
+def _check_cancel(runner: JobRunner, db_path: str):
+    """Отмена прерывает задачу и освобождает лимит чата"""
+    print("\n📋 Тест 3: Отмена")
+
+    async def scenario():
+        job = runner.submit(LARGE_CHAT_ID, export_events_job, db_path, LARGE_CHAT_ID, "xlsx")
+
+        async def on_progress(percent):
+            if percent > 0:
+                assert runner.cancel(job.job_id, LARGE_CHAT_ID)
+
+        # Отмена из другого чата игнорируется
+        assert not runner.cancel(job.job_id, SMALL_CHAT_ID)
+        try:
+            await runner.wait(job, on_progress, interval=0.02)
+        except JobCancelled:
+            return True
+        return False
+
+    assert asyncio.run(scenario()), "Задача не была отменена"
+    assert runner.active_jobs(LARGE_CHAT_ID) == 0 and runner.stats['cancelled'] == 1
+    print("✅ Экспорт отменен, чат может запустить новый")
+    return True
+
+
+def _check_loop_responsive(runner: JobRunner, db_path: str):
+    """Во время экспорта event loop продолжает обрабатывать другие задачи"""
+    print("\n📋 Тест 4: Отзывчивость event loop")
+
+    async def scenario():
+        job = runner.submit(LARGE_CHAT_ID, export_events_job, db_path, LARGE_CHAT_ID, "xlsx")
+        waiting = asyncio.ensure_future(runner.wait(job))
+        max_gap = 0.0
+        last = time.perf_counter()
+        while not waiting.done():
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            max_gap = max(max_gap, now - last)
+            last = now
+        os.remove(waiting.result())
+        return max_gap
+
+    max_gap = asyncio.run(scenario())
+    assert max_gap < 0.2, f"Event loop блокировался на {max_gap:.3f} с"
+    print(f"✅ Максимальная пауза event loop: {max_gap * 1000:.0f} мс")
+    return True
+
+
+def _check_worker_imports():
+    """Процесс пула импортирует задачи без создания глобального менеджера базы"""
+    print("\n📋 Тест 5: Импорт в процессе пула")
+    default_db = os.path.join(tempfile.mkdtemp(), 'default.db')
+    probe = (
+        "import threading, core.database, managers.export_jobs; "
+        "print('db_manager' in vars(core.database), threading.active_count())"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", probe], cwd=root, capture_output=True, text=True, check=True,
+        env=dict(os.environ, DB_PATH=default_db)
+    )
+    created, threads = result.stdout.split()
+    assert created == "False", result.stdout
+    assert not os.path.exists(default_db)
+    print(f"✅ База по умолчанию не открыта, потоков: {threads}")
+    return True
+
+
+def _check_read_only(db: DatabaseManager, schema_version: int):
+    """Процессы пула открывают базу только на чтение и не выполняют миграции"""
+    print("\n📋 Тест 6: База только на чтение")
+    current = db.execute_with_retry("PRAGMA schema_version", fetch="one")[0]
+    assert current == schema_version, (schema_version, current)
+
+    reader = DatabaseManager(db.db_path, max_connections=1, read_only=True)
+    try:
+        assert reader.get_chat_event_stats(SMALL_CHAT_ID)['total_events'] == 100
+        try:
+            reader.execute_with_retry("DELETE FROM employee_events")
+        except sqlite3.OperationalError:
+            pass
+        else:
+            raise AssertionError("Запись через соединение только на чтение")
+    finally:
+        reader.close_all()
+    print(f"✅ Схема не изменилась (schema_version {current}), запись отклонена")
+    return True
+
+
+def test_export_jobs():
+    """Тестирует фоновые задачи экспорта"""
+    print("⚙️ ТЕСТИРОВАНИЕ ФОНОВЫХ ЗАДАЧ ЭКСПОРТА")
+    print("=" * 50)
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'export_jobs.db')
+    db = DatabaseManager(db_path)
+    runner = JobRunner(max_workers=2, per_chat=1)
+
+    try:
+        _seed(db, SMALL_CHAT_ID, 20, 5)
+        _seed(db, LARGE_CHAT_ID, 300, 40)
+        schema_version = db.execute_with_retry("PRAGMA schema_version", fetch="one")[0]
+        _check_progress_and_result(runner, db_path)
+        _check_chat_limit(runner, db_path)
+        _check_cancel(runner, db_path)
+        _check_loop_responsive(runner, db_path)
+        _check_worker_imports()
+        _check_read_only(db, schema_version)
+        print(f"\n📊 Статистика задач: {runner.stats}")
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        runner.shutdown()
+        db.close_all()
+
+    print("\n🎉 ВСЕ ТЕСТЫ ФОНОВЫХ ЗАДАЧ ЭКСПОРТА ПРОЙДЕНЫ!")
+    return True
+
+
+def main():
+    """Основная функция тестирования"""
+    return test_export_jobs()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Тест полнотекстового поиска FTS5 по типам событий и должностям
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import traceback
+from datetime import date, timedelta
+
+# Отдельная база для теста - до импорта модулей бота
+os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(), 'fts_search.db')
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager, db_manager
+from core.security import encrypt_data
+from managers.search_manager import SearchManager
+
+TEST_CHAT_ID = 7171
+BULK_CHAT_ID = 7272
+search_manager = SearchManager(db_manager)
+
+
+def _fts(index: str, query: str) -> set:
+    """ID строк, найденных в индексе"""
+    rows = db_manager.execute_with_retry(
+        f"SELECT rowid FROM {index} WHERE {index} MATCH ?", (SearchManager._fts_query(query),), fetch="all"
+    )
+    return {row['rowid'] for row in rows}
+
+
+def _add_employee(conn, chat_id: int, name: str, position: str) -> int:
+    return conn.execute(
+        "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+        (chat_id, encrypt_data(name), position)
+    ).lastrowid
+
+
+def _add_event(conn, employee_id: int, event_type: str, days: int = 30) -> int:
+    next_date = date.today() + timedelta(days=days)
+    return conn.execute(
+        '''INSERT INTO employee_events
+           (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+           VALUES (?, ?, ?, 365, ?)''',
+        (employee_id, event_type, (next_date - timedelta(days=365)).isoformat(), next_date.isoformat())
+    ).lastrowid
+
+
+def _check_sync():
+    """Триггеры поддерживают индексы при вставке, изменении и удалении"""
+    print("\n📋 Тест 1: Синхронизация индексов")
+    with db_manager.get_connection() as conn:
+        conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (TEST_CHAT_ID, 1))
+        employee_id = _add_employee(conn, TEST_CHAT_ID, "Иванов Иван", "Плотник")
+        event_id = _add_event(conn, employee_id, "Медосмотр")
+
+    assert _fts('event_type_fts', "медосмотр") == {event_id}
+    assert _fts('position_fts', "плотник") == {employee_id}
+
+    db_manager.execute_with_retry("UPDATE employee_events SET event_type = 'Инструктаж' WHERE id = ?", (event_id,))
+    db_manager.execute_with_retry("UPDATE employees SET position = 'Маляр' WHERE id = ?", (employee_id,))
+    assert not _fts('event_type_fts', "медосмотр") and _fts('event_type_fts', "инструктаж") == {event_id}
+    assert not _fts('position_fts', "плотник") and _fts('position_fts', "маляр") == {employee_id}
+
+    db_manager.execute_with_retry("DELETE FROM employee_events WHERE id = ?", (event_id,))
+    assert not _fts('event_type_fts', "инструктаж")
+
+    for index in ('event_type_fts', 'position_fts'):
+        db_manager.execute_with_retry(f"INSERT INTO {index}({index}) VALUES ('integrity-check')")
+    print("✅ Индексы совпадают с таблицами после INSERT, UPDATE и DELETE")
+    return True
+
+
+def _check_matching():
+    """Регистр кириллицы, начала слов и спецсимволы в запросе"""
+    print("\n📋 Тест 2: Сопоставление слов")
+    with db_manager.get_connection() as conn:
+        employee_id = _add_employee(conn, TEST_CHAT_ID, "Петров Петр", "Старший мастер")
+        medical = _add_event(conn, employee_id, "Медицинский осмотр")
+        tanks = _add_event(conn, employee_id, "Проверка ёмкостей")
+
+    assert _fts('event_type_fts', "МЕДИЦИНСКИЙ") == {medical}
+    assert _fts('event_type_fts', "мед осм") == {medical}
+    assert not _fts('event_type_fts', "медицинская")
+    assert _fts('event_type_fts', "ёмкост") == {tanks} == _fts('event_type_fts', "ЁМКОСТЕЙ")
+    assert _fts('position_fts', "МАСТ") >= {employee_id}
+
+    # Синтаксис FTS5 в запросе - обычные слова
+    assert SearchManager._fts_query('осмотр" OR (*') == '"осмотр"* "or"*'
+    assert SearchManager._fts_query('!!! ---') is None
+
+    async def search(query):
+        return await search_manager.smart_text_search(TEST_CHAT_ID, query)
+
+    results = asyncio.run(search("старш"))
+    assert results['pagination']['total_count'] == 2
+    assert all('💼 Должность' in row['match_highlights'] for row in results['results'])
+    assert asyncio.run(search("!!!"))['pagination']['total_count'] == 0
+    assert asyncio.run(search_manager.search_events(TEST_CHAT_ID, "ёмкостей"))['pagination']['total_count'] == 1
+    assert [row['full_name'] for row in search_manager.search_employees(TEST_CHAT_ID, "маляр")] == ["Иванов Иван"]
+    print("✅ Поиск без учета регистра и по началу слов")
+    return True
+
+
+def _check_ranking():
+    """Совпадения по должности выше, внутри группы - bm25"""
+    print("\n📋 Тест 3: Ранжирование")
+    with db_manager.get_connection() as conn:
+        worker = _add_employee(conn, TEST_CHAT_ID, "Сидоров Сидор", "Дворник")
+        long_type = _add_event(conn, worker, "Плановый периодический осмотр работников участка", days=1)
+        short_type = _add_event(conn, worker, "Осмотр", days=200)
+        inspector = _add_employee(conn, TEST_CHAT_ID, "Кузнецов Кузьма", "Осмотрщик")
+        by_position = _add_event(conn, inspector, "Инструктаж", days=300)
+
+    ids = asyncio.run(search_manager._find_text_search_ids(TEST_CHAT_ID, "осмотр"))
+    assert ids[0] == by_position, ids
+    assert ids.index(short_type) < ids.index(long_type), ids
+    print(f"✅ Порядок: {ids}")
+    return True
+
+
+def _check_rebuild():
+    """База без индексов получает их при открытии, с уже имеющимися строками"""
+    print("\n📋 Тест 4: Построение индексов для существующей базы")
+    path = os.path.join(tempfile.mkdtemp(), 'legacy.db')
+    db = DatabaseManager(path, max_connections=1)
+    with db.get_connection() as conn:
+        for name in ('event_type_fts', 'position_fts'):
+            for suffix in ('insert', 'delete', 'update'):
+                conn.execute(f"DROP TRIGGER trg_{name}_{suffix}")
+            conn.execute(f"DROP TABLE {name}")
+        conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (1, 1)")
+        employee_id = _add_employee(conn, 1, "Старый Сотрудник", "Электрик")
+        _add_event(conn, employee_id, "Проверка электробезопасности")
+    db.close_all()
+
+    db = DatabaseManager(path, max_connections=1)
+    results = asyncio.run(SearchManager(db).smart_text_search(1, "электро"))
+    assert results['pagination']['total_count'] == 1
+    db.close_all()
+    print("✅ Индексы построены для строк, добавленных до их появления")
+    return True
+
+
+def _unicode_lower(value):
+    """LOWER с поддержкой кириллицы для прежнего сравнения подстрок (встроенный - только ASCII)"""
+    return value.lower() if isinstance(value, str) else value
+
+
+def _check_speed():
+    """Поиск по индексу быстрее сравнения подстрок по всем событиям чата"""
+    print("\n📋 Тест 5: Скорость")
+    types = ["Медицинский осмотр", "Инструктаж по охране труда", "Проверка знаний",
+             "Обучение пожарной безопасности", "Аттестация"]
+    with db_manager.get_connection() as conn:
+        conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (BULK_CHAT_ID, 1))
+        for i in range(2000):
+            employee_id = _add_employee(conn, BULK_CHAT_ID, f"Сотрудник {i}", "Плотник")
+            for j in range(5):
+                _add_event(conn, employee_id, types[j] if i % 100 else f"{types[j]} высотника", days=i % 365)
+
+    join = "FROM employee_events ee JOIN employees e ON ee.employee_id = e.id"
+    with db_manager.get_connection() as conn:
+        conn.create_function("unicode_lower", 1, _unicode_lower, deterministic=True)
+
+        def timed(sql, param, runs=20):
+            start = time.perf_counter()
+            for _ in range(runs):
+                count = conn.execute(sql, (param, BULK_CHAT_ID)).fetchone()['count']
+            return (time.perf_counter() - start) / runs, count
+
+        scan, scan_count = timed(
+            f"SELECT COUNT(*) AS count {join} WHERE instr(unicode_lower(ee.event_type), ?) > 0 AND e.chat_id = ?",
+            "высотник"
+        )
+        fts, fts_count = timed(
+            f"SELECT COUNT(*) AS count {join} WHERE ee.id IN "
+            "(SELECT rowid FROM event_type_fts WHERE event_type_fts MATCH ?) AND e.chat_id = ?",
+            SearchManager._fts_query("высотник")
+        )
+    assert scan_count == fts_count == 100, (scan_count, fts_count)
+    assert fts < scan, (fts, scan)
+    print(f"✅ Сравнение подстрок: {scan * 1000:.2f} мс, FTS5: {fts * 1000:.2f} мс")
+    return True
+
+
+def test_fts_search():
+    """Тестирует полнотекстовый поиск"""
+    print("🔤 ТЕСТИРОВАНИЕ ПОЛНОТЕКСТОВОГО ПОИСКА")
+    print("=" * 50)
+
+    try:
+        _check_sync()
+        _check_matching()
+        _check_ranking()
+        _check_rebuild()
+        _check_speed()
+    except (Exception, sqlite3.Error) as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        traceback.print_exc()
+        return False
+
+    print("\n🎉 ВСЕ ТЕСТЫ ПОЛНОТЕКСТОВОГО ПОИСКА ПРОЙДЕНЫ!")
+    return True
+
+
+def main():
+    """Основная функция тестирования"""
+    return test_fts_search()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Тест постраничной навигации по ключу: список сотрудников и поиск событий
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+# Отдельная база для теста - до импорта модулей бота
+os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(), 'keyset.db')
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from types import SimpleNamespace
+
+from config.settings import BotConfig
+from core.database import db_manager
+from core.security import encrypt_data, name_sort_key
+from core.utils import make_page_cursor
+from handlers.employee_handlers import _fetch_employee_page, list_employees
+from managers.search_manager import SearchManager
+
+TEST_CHAT_ID = 8181
+NAMES = ["Яковлев Ян", "Борисов Борис", "Андреев Андрей", "Иванов Иван", "Борисова Анна",
+         "Егоров Егор", "Власов Влас", "Григорьев Гриша", "Жуков Жора", "Абрамов Абрам", "Ершов Ерш"]
+
+
+def _seed():
+    with db_manager.get_connection() as conn:
+        conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (TEST_CHAT_ID, 1))
+        for i, full_name in enumerate(NAMES):
+            employee_id = conn.execute(
+                "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+                (TEST_CHAT_ID, encrypt_data(full_name), "Плотник")
+            ).lastrowid
+            db_manager.index_employee_name(conn, employee_id, full_name)
+            next_date = (date.today() + timedelta(days=i % 3)).isoformat()
+            conn.execute(
+                '''INSERT INTO employee_events
+                   (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+                   VALUES (?, ?, ?, ?, ?)''',
+                (employee_id, "Медосмотр", next_date, 365, next_date)
+            )
+
+
+async def test_keyset_pagination():
+    """Тестирует переходы по страницам вперед и назад"""
+
+    print("📄 ТЕСТИРОВАНИЕ ПОСТРАНИЧНОЙ НАВИГАЦИИ ПО КЛЮЧУ")
+    print("=" * 50)
+
+    try:
+        _seed()
+
+        # Тест 1: список сотрудников упорядочен по алфавиту и проходится целиком
+        print("\n📋 Тест 1: Список сотрудников")
+        pages, cursor = [], None
+        while True:
+            employees, has_next, has_prev, _ = await _fetch_employee_page(TEST_CHAT_ID, cursor, 4)
+            pages.append([row['id'] for row in employees])
+            assert has_prev == (len(pages) > 1)
+            if not has_next:
+                break
+            cursor = make_page_cursor(employees[-1]['id'])
+
+        # По умолчанию ФИО не хранится в открытом виде: ключ пустой, страницы идут по ID
+        ordered_ids = [employee_id for page in pages for employee_id in page]
+        assert ordered_ids == list(range(1, len(NAMES) + 1)), f"Неверный порядок: {ordered_ids}"
+        assert [len(page) for page in pages] == [4, 4, 3]
+        assert db_manager.execute_with_retry(
+            "SELECT COUNT(*) AS count FROM employees WHERE sort_key != ''", fetch="one")['count'] == 0
+
+        # Назад с последней страницы - та же предыдущая страница
+        employees, has_next, has_prev, _ = await _fetch_employee_page(
+            TEST_CHAT_ID, make_page_cursor(pages[2][0], forward=False), 4
+        )
+        assert [row['id'] for row in employees] == pages[1] and has_next and has_prev
+
+        # Внутри страницы сотрудники выводятся по алфавиту после расшифровки
+        class FakeBot:
+            def __init__(self):
+                self.texts = []
+
+            async def send_message(self, chat_id, text, **kwargs):
+                self.texts.append(text)
+
+        async def answer(*args, **kwargs):
+            return True
+
+        bot = FakeBot()
+        update = SimpleNamespace(
+            message=None, callback_query=SimpleNamespace(answer=answer),
+            effective_chat=SimpleNamespace(id=TEST_CHAT_ID), effective_user=SimpleNamespace(id=1)
+        )
+        await list_employees(update, SimpleNamespace(bot=bot, user_data={}))
+        shown = [line[2:].split(" (")[0] for line in bot.texts[-1].split("\n")[1:]]
+        assert shown == sorted(NAMES[:BotConfig.EMPLOYEES_PER_PAGE]), shown
+        print(f"✅ Страницы: {pages}; первая страница списка по алфавиту")
+
+        # Открытый префикс ФИО включается явно: тогда порядок алфавитный по префиксу
+        BotConfig.NAME_SORT_KEY_LENGTH = 3
+        try:
+            with db_manager.get_connection() as conn:
+                for employee_id, full_name in enumerate(NAMES, start=1):
+                    db_manager.index_employee_name(conn, employee_id, full_name)
+            assert name_sort_key("Борисов Борис") == "бор"
+            pages, cursor = [], None
+            while True:
+                employees, has_next, _, _ = await _fetch_employee_page(TEST_CHAT_ID, cursor, 4)
+                pages.append([row['id'] for row in employees])
+                if not has_next:
+                    break
+                cursor = make_page_cursor(employees[-1]['id'])
+            expected = sorted(range(1, len(NAMES) + 1), key=lambda i: (NAMES[i - 1].lower()[:3], i))
+            assert [employee_id for page in pages for employee_id in page] == expected
+        finally:
+            BotConfig.NAME_SORT_KEY_LENGTH = 0
+        print("✅ С NAME_SORT_KEY_LENGTH=3 список упорядочен по префиксу ФИО")
+
+        # Тест 2: поиск событий по курсору
+        print("\n📋 Тест 2: Поиск событий")
+        search_manager = SearchManager(db_manager)
+        # Номер страницы передается вместе с курсором, как в кнопках; база считает только итог
+        counts = []
+        fetch_one = db_manager.fetch_one
+
+        async def counting_fetch_one(query, params=()):
+            if 'COUNT(' in query:
+                counts.append(query)
+            return await fetch_one(query, params)
+
+        db_manager.fetch_one = counting_fetch_one
+        seen, cursor, page, page_numbers = [], None, 0, []
+        while True:
+            results = await search_manager.search_events(TEST_CHAT_ID, "", page=page, per_page=5, cursor=cursor)
+            pagination = results['pagination']
+            seen.extend(event['event_id'] for event in results['results'])
+            page_numbers.append(pagination['current_page'])
+            if not pagination['has_next']:
+                break
+            cursor, page = pagination['next_cursor'], pagination['current_page'] + 1
+        del db_manager.fetch_one
+        assert len(counts) == len(page_numbers), counts
+
+        dates = [event['next_notification_date'] for event in (await search_manager.search_events(
+            TEST_CHAT_ID, "", per_page=len(NAMES)))['results']]
+        assert sorted(seen) == list(range(1, len(NAMES) + 1)) and len(seen) == len(set(seen))
+        assert dates == sorted(dates)
+        assert page_numbers == [0, 1, 2]
+
+        back = await search_manager.search_events(TEST_CHAT_ID, "", page=pagination['current_page'] - 1,
+                                                  per_page=5, cursor=pagination['prev_cursor'])
+        assert [event['event_id'] for event in back['results']] == seen[5:10]
+        assert back['pagination']['current_page'] == 1
+        print(f"✅ Все {len(seen)} событий пройдены без повторов, номера страниц: {page_numbers}")
+
+        # Тест 3: курсор удаленной строки возвращает к первой странице
+        print("\n📋 Тест 3: Устаревший курсор")
+        results = await search_manager.search_events(TEST_CHAT_ID, "", page=3, per_page=5, cursor=99999)
+        assert results['pagination']['current_page'] == 0 and not results['pagination']['has_prev']
+        print("✅ Устаревший курсор открывает первую страницу")
+
+        # Тест 4: план запроса страницы сотрудников использует индекс без сортировки
+        print("\n📋 Тест 4: План запроса")
+        with db_manager.get_connection() as conn:
+            plan = [row['detail'] for row in conn.execute(
+                '''EXPLAIN QUERY PLAN SELECT id, full_name, position FROM employees
+                   WHERE chat_id = ? AND is_active = 1 AND (sort_key, id) > (?, ?)
+                   ORDER BY sort_key ASC, id ASC LIMIT ?''',
+                (TEST_CHAT_ID, "бор", 2, 11)
+            )]
+        assert any("idx_employees_chat_sort" in step for step in plan), plan
+        assert not any("TEMP B-TREE" in step for step in plan), plan
+        print(f"✅ {'; '.join(plan)}")
+
+        print("\n🎉 ВСЕ ТЕСТЫ ПОСТРАНИЧНОЙ НАВИГАЦИИ ПРОЙДЕНЫ!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        db_manager.close_all()
+
+
+async def main():
+    """Главная функция тестирования"""
+    success = await test_keyset_pagination()
+    return success
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    sys.exit(0 if success else 1)
@@ -3,6 +3,7 @@
 Скрипт тестирования модульной архитектуры Telegram бота
 """
 
+import asyncio
 import os
 import sys
 import importlib
@@ -92,7 +93,8 @@ def test_database_connection():
             else:
                 print(f"  ❌ Таблица {table} отсутствует")
         
-        # Очищаем тестовую БД
+        # Очищаем тестовую БД (после закрытия соединений файлы -wal/-shm удаляются)
+        db.close_all()
         if os.path.exists('test_db.db'):
             os.remove('test_db.db')
             
@@ -190,6 +192,7 @@ def test_managers():
         print("  ✅ SearchManager инициализирован")
         
         # Очистка
+        db.close_all()
         if os.path.exists('test_managers.db'):
             os.remove('test_managers.db')
             
@@ -257,7 +260,7 @@ def test_security():
         
         # Тестируем функцию is_admin (должна корректно обрабатывать параметры)
         try:
-            is_admin(12345, 67890)  # Тестовые ID
+            asyncio.run(is_admin(12345, 67890))  # Тестовые ID
             print("  ✅ Функция is_admin работает")
         except Exception as e:
             print(f"  ❌ Ошибка is_admin: {e}")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Тест кэша расшифрованных ФИО
+"""
+
+import os
+import sys
+import traceback
+from unittest import mock
+
+# Добавляем родительскую директорию в sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core.security as security
+from core.security import (
+    DecryptedNameCache, decrypt_employee_name, encrypt_data, invalidate_employee_name, name_cache
+)
+
+
+def test_repeated_views_skip_decryption():
+    """Повторные обращения к одному имени не вызывают Fernet"""
+    print("\n📋 Тест 1: Повторные расшифровки")
+    name_cache.clear()
+    encrypted = encrypt_data("Иванов Иван")
+
+    with mock.patch.object(security, 'decrypt_data', wraps=security.decrypt_data) as spy:
+        for _ in range(5):
+            assert decrypt_employee_name(1, encrypted) == "Иванов Иван"
+        assert spy.call_count == 1, f"Ожидалась 1 расшифровка, выполнено {spy.call_count}"
+
+    stats = name_cache.stats()
+    assert stats['hits'] >= 4
+    print(f"✅ 5 обращений, 1 расшифровка, hit rate: {stats['hit_rate']}%")
+    return True
+
+
+def test_invalidation_and_stale_ciphertext():
+    """Переименование сбрасывает кэш, новый шифртекст не отдает старое имя"""
+    print("\n📋 Тест 2: Инвалидация")
+    name_cache.clear()
+    old_encrypted = encrypt_data("Петров Петр")
+    new_encrypted = encrypt_data("Сидоров Петр")
+
+    assert decrypt_employee_name(2, old_encrypted) == "Петров Петр"
+    # Имя изменено в базе без явной инвалидации - шифртекст не совпадает
+    assert decrypt_employee_name(2, new_encrypted) == "Сидоров Петр"
+
+    invalidate_employee_name(2)
+    assert name_cache.stats()['size'] == 0
+    print("✅ Устаревшие и удаленные имена не возвращаются из кэша")
+    return True
+
+
+def test_lru_eviction():
+    """Кэш ограничен по размеру и вытесняет давно неиспользуемые записи"""
+    print("\n📋 Тест 3: Вытеснение LRU")
+    cache = DecryptedNameCache(max_size=2)
+    cache.put(1, "c1", "Имя 1")
+    cache.put(2, "c2", "Имя 2")
+    assert cache.get(1, "c1") == "Имя 1"  # Запись 1 становится самой свежей
+    cache.put(3, "c3", "Имя 3")
+
+    assert cache.get(2, "c2") is None
+    assert cache.get(1, "c1") == "Имя 1"
+    assert cache.stats()['evictions'] == 1
+    print("✅ Вытеснена наименее используемая запись")
+    return True
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🧪 ТЕСТИРОВАНИЕ КЭША РАСШИФРОВАННЫХ ФИО")
+    print("=" * 50)
+
+    tests = [
+        test_repeated_views_skip_decryption,
+        test_invalidation_and_stale_ciphertext,
+        test_lru_eviction,
+    ]
+
+    for test_func in tests:
+        try:
+            test_func()
+        except Exception as e:
+            print(f"❌ Ошибка в тестировании: {e}")
+            traceback.print_exc()
+            return False
+
+    print("\n🎉 ВСЕ ТЕСТЫ КЭША ФИО ПРОЙДЕНЫ!")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
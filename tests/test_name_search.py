@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Тест поиска по зашифрованным ФИО через слепой индекс
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+from core.security import encrypt_data, name_index_tokens, name_query_tokens
+from managers.search_manager import SearchManager
+
+TEST_CHAT_ID = 4242
+
+
+def _add_employee(db: DatabaseManager, full_name: str, position: str, event_type: str) -> int:
+    """Добавляет сотрудника с одним событием так же, как это делают обработчики"""
+    def insert(conn):
+        cursor = conn.execute(
+            "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+            (TEST_CHAT_ID, encrypt_data(full_name), position)
+        )
+        employee_id = cursor.lastrowid
+        db.index_employee_name(conn, employee_id, full_name)
+        next_date = (datetime.now() + timedelta(days=20)).date().isoformat()
+        conn.execute(
+            '''INSERT INTO employee_events
+               (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+               VALUES (?, ?, ?, ?, ?)''',
+            (employee_id, event_type, datetime.now().date().isoformat(), 365, next_date)
+        )
+        return employee_id
+
+    with db.get_connection() as conn:
+        return insert(conn)
+
+
+async def test_name_search():
+    """Тестирует поиск по ФИО без расшифровки всех строк"""
+
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'name_search.db'))
+    search_manager = SearchManager(db)
+
+    print("🔐 ТЕСТИРОВАНИЕ ПОИСКА ПО ЗАШИФРОВАННЫМ ФИО")
+    print("=" * 50)
+
+    try:
+        ivanov = _add_employee(db, "Иванов Иван Иванович", "Плотник", "Медицинский осмотр")
+        petrova = _add_employee(db, "Петрова Анна Сергеевна", "Маляр", "Инструктаж электробезопасности")
+
+        # Тест 1: токены не содержат открытого текста и детерминированы
+        print("\n📋 Тест 1: Токены слепого индекса")
+        tokens = name_index_tokens("Иванов Иван")
+        assert tokens == name_index_tokens("иванов  ИВАН")
+        assert not any("иван" in token for token in tokens)
+        assert set(name_query_tokens("ван")) <= set(tokens)
+        print(f"✅ Токенов для имени: {len(tokens)}")
+
+        # Тест 2: поиск по части фамилии
+        print("\n📋 Тест 2: Поиск по подстроке ФИО")
+        results = await search_manager.smart_text_search(TEST_CHAT_ID, "ванов")
+        assert results['pagination']['total_count'] == 1
+        first = results['results'][0]
+        assert first['employee_id'] == ivanov
+        assert first['full_name'] == "Иванов Иван Иванович"
+        assert first['relevance_score'] == 10
+        print(f"✅ Найден: {first['full_name']} ({', '.join(first['match_highlights'])})")
+
+        # Тест 3: поиск по должности и типу события с учетом регистра кириллицы
+        print("\n📋 Тест 3: Поиск по должности и событию")
+        by_position = await search_manager.smart_text_search(TEST_CHAT_ID, "МАЛЯР")
+        by_event = await search_manager.smart_text_search(TEST_CHAT_ID, "медицинский")
+        assert [r['employee_id'] for r in by_position['results']] == [petrova]
+        assert [r['employee_id'] for r in by_event['results']] == [ivanov]
+        print("✅ Должность и тип события находятся без учета регистра")
+
+        # Тест 4: поиск сотрудников и подсказки
+        print("\n📋 Тест 4: Поиск сотрудников и подсказки")
+        employees = search_manager.search_employees(TEST_CHAT_ID, "анна")
+        suggestions = search_manager._get_search_suggestions(TEST_CHAT_ID, "петр")
+        assert [e['id'] for e in employees] == [petrova]
+        assert "👤 Петрова Анна Сергеевна" in suggestions
+        print(f"✅ Подсказки: {suggestions}")
+
+        # Тест 5: переименование и удаление обновляют индекс
+        print("\n📋 Тест 5: Обновление индекса")
+        with db.get_connection() as conn:
+            conn.execute(
+                "UPDATE employees SET full_name = ? WHERE id = ?",
+                (encrypt_data("Сидоров Петр"), ivanov)
+            )
+            db.index_employee_name(conn, ivanov, "Сидоров Петр")
+        assert (await search_manager.smart_text_search(TEST_CHAT_ID, "иванов"))['pagination']['total_count'] == 0
+        assert len(search_manager.search_employees(TEST_CHAT_ID, "сидор")) == 1
+
+        with db.get_connection() as conn:
+            conn.execute("DELETE FROM employees WHERE id = ?", (petrova,))
+        orphan_tokens = db.execute_with_retry(
+            "SELECT COUNT(*) as count FROM employee_name_index WHERE employee_id = ?",
+            (petrova,), fetch="one"
+        )['count']
+        assert orphan_tokens == 0
+        print("✅ Переименование и удаление отражаются в индексе")
+
+        # Тест 6: ложные срабатывания индекса отсекаются, сотрудники - по алфавиту
+        print("\n📋 Тест 6: Проверка совпадений и сортировка")
+        _add_employee(db, "Яковлев Иван", "Плотник", "Медицинский осмотр")
+        _add_employee(db, "Иванова Анна", "Плотник", "Медицинский осмотр")
+        # Все триграммы "ванна" есть в "Иванова Анна", но не в одном слове
+        assert set(name_query_tokens("ванна")) <= set(name_index_tokens("Иванова Анна"))
+        assert (await search_manager.smart_text_search(TEST_CHAT_ID, "ванна"))['pagination']['total_count'] == 0
+        assert (await search_manager.search_events(TEST_CHAT_ID, "ванна"))['pagination']['total_count'] == 0
+        assert search_manager.search_employees(TEST_CHAT_ID, "ванна") == []
+        assert [e['full_name'] for e in search_manager.search_employees(TEST_CHAT_ID, "ВАНОВА")] == ["Иванова Анна"]
+
+        names = [e['full_name'] for e in search_manager.search_employees(TEST_CHAT_ID, "плотник")]
+        assert names == ["Иванова Анна", "Сидоров Петр", "Яковлев Иван"], names
+        print(f"✅ Ложное совпадение отсечено, порядок: {names}")
+
+        print("\n🎉 ВСЕ ТЕСТЫ ПОИСКА ПО ФИО ПРОЙДЕНЫ!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        db.close_all()
+
+
+async def main():
+    """Главная функция тестирования"""
+    success = await test_name_search()
+    return success
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    sys.exit(0 if success else 1)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Тест диспетчера рассылки: параллельность, лимиты скорости и повторы
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram.error import Forbidden, RetryAfter, TimedOut
+
+from core.dispatcher import MessageDispatcher, OutgoingMessage, TokenBucket
+
+
+class RecordingBot:
+    """Бот-заглушка: запоминает отправленные сообщения и имитирует задержку сети"""
+
+    def __init__(self, latency: float = 0.05, failures: dict = None):
+        self.latency = latency
+        self.failures = failures or {}  # chat_id -> список исключений по попыткам
+        self.sent = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def send_message(self, chat_id, text, parse_mode=None, reply_markup=None):
+        pending = self.failures.get(chat_id)
+        if pending:
+            raise pending.pop(0)
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            self.sent.append((chat_id, text, time.monotonic()))
+        finally:
+            self.in_flight -= 1
+
+
+async def test_notification_dispatcher():
+    """Тестирует MessageDispatcher на пакете уведомлений"""
+
+    print("📨 ТЕСТИРОВАНИЕ ДИСПЕТЧЕРА РАССЫЛКИ")
+    print("=" * 50)
+
+    try:
+        # Тест 1: чаты обрабатываются параллельно
+        print("\n📋 Тест 1: Параллельная отправка")
+        bot = RecordingBot(latency=0.1)
+        dispatcher = MessageDispatcher(bot, max_concurrency=5, global_rate=1000, private_chat_rate=1000)
+        messages = [OutgoingMessage(chat_id=chat_id, text=f"msg {chat_id}") for chat_id in range(1, 21)]
+        stats = await dispatcher.dispatch(messages)
+
+        assert stats.sent == 20 and stats.failed == 0
+        assert bot.max_in_flight == 5, f"Ожидалось 5 параллельных отправок, было {bot.max_in_flight}"
+        # Последовательно 20 * 0.1 = 2 сек, параллельно по 5 - около 0.4 сек
+        assert stats.duration < 1.0, f"Рассылка заняла {stats.duration:.2f} с"
+        print(f"✅ {stats.sent} сообщений за {stats.duration:.2f} с: {stats.as_dict()['throughput']} msg/s")
+
+        # Тест 2: лимит на чат и порядок сообщений в чате
+        print("\n📋 Тест 2: Лимит на чат")
+        bot = RecordingBot(latency=0)
+        dispatcher = MessageDispatcher(bot, global_rate=1000, private_chat_rate=10)
+        messages = [OutgoingMessage(chat_id=1, text=str(i)) for i in range(5)]
+        stats = await dispatcher.dispatch(messages)
+
+        assert [text for _, text, _ in bot.sent] == ["0", "1", "2", "3", "4"]
+        assert stats.duration >= 0.35, f"Лимит чата не соблюден: {stats.duration:.2f} с"
+        print(f"✅ 5 сообщений в один чат по порядку за {stats.duration:.2f} с")
+
+        # Тест 3: глобальный лимит
+        print("\n📋 Тест 3: Глобальный лимит")
+        bucket = TokenBucket(rate=20, capacity=1)
+        started = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        elapsed = time.monotonic() - started
+        assert elapsed >= 0.24, f"Токен-бакет пропустил запросы слишком быстро: {elapsed:.2f} с"
+        print(f"✅ 6 токенов при 20/с выданы за {elapsed:.2f} с")
+
+        # Тест 4: RetryAfter, сетевые ошибки и отказ чата
+        print("\n📋 Тест 4: Повторы и ошибки")
+        bot = RecordingBot(latency=0, failures={
+            1: [RetryAfter(1)],
+            2: [TimedOut()],
+            3: [Forbidden("bot was blocked by the user")],
+        })
+        dispatcher = MessageDispatcher(bot, global_rate=1000, private_chat_rate=1000, max_retries=2)
+        messages = [OutgoingMessage(chat_id=chat_id, text="x", tag=chat_id) for chat_id in (1, 2, 3, 4)]
+        stats = await dispatcher.dispatch(messages)
+
+        assert stats.sent == 3 and stats.failed == 1
+        assert stats.flood_waits == 1 and stats.retries == 2
+        assert sorted(stats.delivered_tags) == [1, 2, 4]
+        assert stats.duration >= 1.0, "Пауза RetryAfter не соблюдена"
+        print(f"✅ Статистика: {stats.as_dict()}")
+
+        # Тест 5: число бакетов чатов ограничено, лимит активного чата сохраняется
+        print("\n📋 Тест 5: Бакеты чатов")
+        bot = RecordingBot(latency=0)
+        dispatcher = MessageDispatcher(bot, global_rate=100000, private_chat_rate=1000, max_chat_buckets=100)
+        for start in range(0, 1000, 100):
+            await dispatcher.dispatch([OutgoingMessage(chat_id=chat_id, text="x")
+                                       for chat_id in range(start + 1, start + 101)])
+        assert len(bot.sent) == 1000
+        assert len(dispatcher._chat_buckets) <= 100, len(dispatcher._chat_buckets)
+        assert dispatcher.bucket_evictions >= 900
+
+        # Бакет, токен которого еще не восстановился, не вытесняется
+        slow = MessageDispatcher(bot, global_rate=100000, private_chat_rate=1, max_chat_buckets=1)
+        await slow.dispatch([OutgoingMessage(chat_id=-1, text="x")])
+        busy = slow._chat_bucket(-1)
+        slow._chat_bucket(2)
+        assert slow._chat_bucket(-1) is busy and slow.bucket_evictions == 0
+        assert len(slow._chat_buckets) == 2
+        print(f"✅ Бакетов: {len(dispatcher._chat_buckets)}, вытеснено: {dispatcher.bucket_evictions}")
+
+        print("\n🎉 ВСЕ ТЕСТЫ ДИСПЕТЧЕРА РАССЫЛКИ ПРОЙДЕНЫ!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+async def main():
+    """Главная функция тестирования"""
+    success = await test_notification_dispatcher()
+    return success
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    sys.exit(0 if success else 1)
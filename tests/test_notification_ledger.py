@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Тест журнала уведомлений: повторные запуски рассылки не дублируют отправки,
+критичные события эскалируются одной сводкой на чат
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+# Отдельная база для теста - до импорта модулей бота
+os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(), 'ledger.db')
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram.error import Forbidden
+
+from core.database import db_manager
+from core.dispatcher import MessageDispatcher
+from core.security import encrypt_data
+from main import enhanced_send_notifications
+
+TEST_CHAT_ID = 6161
+ADMIN_ID = 100
+USER_ID = 200
+
+
+class RecordingBot:
+    """Бот-заглушка: запоминает отправленные сообщения или отказывает в доставке"""
+
+    def __init__(self, blocked: bool = False, blocked_chats=()):
+        self.blocked = blocked
+        self.blocked_chats = set(blocked_chats)
+        self.sent = []
+
+    async def send_message(self, chat_id, text, parse_mode=None, reply_markup=None):
+        if self.blocked or chat_id in self.blocked_chats:
+            raise Forbidden("bot was blocked by the user")
+        self.sent.append((chat_id, text))
+
+
+def _make_context(bot: RecordingBot):
+    """Контекст задачи с диспетчером без задержек"""
+    dispatcher = MessageDispatcher(bot, global_rate=1000, private_chat_rate=1000)
+    return SimpleNamespace(bot=bot, application=SimpleNamespace(bot_data={'message_dispatcher': dispatcher}))
+
+
+def _seed():
+    """Сотрудник с критичным, предупреждающим и не требующим уведомления событиями"""
+    with db_manager.get_connection() as conn:
+        conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (TEST_CHAT_ID, ADMIN_ID))
+        employee_id = conn.execute(
+            "INSERT INTO employees (chat_id, user_id, full_name, position) VALUES (?, ?, ?, ?)",
+            (TEST_CHAT_ID, USER_ID, encrypt_data("Иванов Иван"), "Плотник")
+        ).lastrowid
+        for event_type, offset in (("Медосмотр", 2), ("Инструктаж", 30), ("Аттестация", 10)):
+            next_date = date.today() + timedelta(days=offset)
+            conn.execute(
+                '''INSERT INTO employee_events
+                   (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+                   VALUES (?, ?, ?, ?, ?)''',
+                (employee_id, event_type, (next_date - timedelta(days=365)).isoformat(), 365,
+                 next_date.isoformat())
+            )
+
+
+def _ledger():
+    return db_manager.execute_with_retry(
+        "SELECT notification_type, recipient, status FROM notification_history WHERE sent_on = ? "
+        "ORDER BY notification_type, recipient",
+        (date.today().isoformat(),), fetch="all"
+    )
+
+
+async def test_notification_ledger():
+    """Тестирует идемпотентность рассылки"""
+
+    print("📒 ТЕСТИРОВАНИЕ ЖУРНАЛА УВЕДОМЛЕНИЙ")
+    print("=" * 50)
+
+    try:
+        _seed()
+
+        # Тест 1: недоставленные уведомления помечаются и не блокируют повтор
+        print("\n📋 Тест 1: Неудачная доставка")
+        blocked_bot = RecordingBot(blocked=True)
+        await enhanced_send_notifications(_make_context(blocked_bot))
+        assert [tuple(row) for row in _ledger()] == [
+            ('admin_digest', 'admin', 'failed'), ('critical', 'employee', 'failed'),
+            ('warning', 'admin', 'failed'), ('warning', 'employee', 'failed')
+        ]
+        print("✅ Недоставленные уведомления записаны со статусом failed")
+
+        # Тест 2: первая успешная рассылка
+        print("\n📋 Тест 2: Первая рассылка")
+        bot = RecordingBot()
+        await enhanced_send_notifications(_make_context(bot))
+        # Критичное: сотрудник и сводка администратору; предупреждение: сотрудник, админ
+        assert len(bot.sent) == 4, f"Ожидалось 4 сообщения, отправлено {len(bot.sent)}"
+        assert not any("[👨‍💼 ADMIN]" in text and "Медосмотр" in text for _, text in bot.sent)
+        assert [tuple(row) for row in _ledger()] == [
+            ('admin_digest', 'admin', 'sent'), ('critical', 'employee', 'sent'),
+            ('warning', 'admin', 'sent'), ('warning', 'employee', 'sent')
+        ]
+        print(f"✅ Отправлено сообщений: {len(bot.sent)}, журнал: {[tuple(row) for row in _ledger()]}")
+
+        # Тест 3: повторные запуски в тот же день ничего не отправляют
+        print("\n📋 Тест 3: Повторные запуски")
+        bot = RecordingBot()
+        await enhanced_send_notifications(_make_context(bot))
+        await enhanced_send_notifications(_make_context(bot))
+        assert bot.sent == [], f"Повторная отправка: {bot.sent}"
+        assert len(_ledger()) == 4
+        print("✅ Повторные запуски идемпотентны")
+
+        # Тест 4: параллельные запуски не дублируют отправку
+        print("\n📋 Тест 4: Параллельные запуски")
+        db_manager.execute_with_retry("DELETE FROM notification_history")
+        bot = RecordingBot()
+        await asyncio.gather(
+            enhanced_send_notifications(_make_context(bot)),
+            enhanced_send_notifications(_make_context(bot))
+        )
+        assert len(bot.sent) == 4, f"Ожидалось 4 сообщения, отправлено {len(bot.sent)}"
+        print("✅ Параллельные запуски отправили каждое уведомление один раз")
+
+        # Тест 5: критичные события чата эскалируются одной сводкой
+        print("\n📋 Тест 5: Сводка эскалаций")
+        with db_manager.get_connection() as conn:
+            employee_id = conn.execute("SELECT id FROM employees WHERE chat_id = ?", (TEST_CHAT_ID,)).fetchone()['id']
+            for event_type, offset in (("Инструктаж по охране труда", 0), ("Проверка знаний", -3)):
+                next_date = date.today() + timedelta(days=offset)
+                conn.execute(
+                    '''INSERT INTO employee_events
+                       (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+                       VALUES (?, ?, ?, ?, ?)''',
+                    (employee_id, event_type, (next_date - timedelta(days=365)).isoformat(), 365,
+                     next_date.isoformat())
+                )
+            conn.execute("DELETE FROM notification_history")
+        bot = RecordingBot()
+        await enhanced_send_notifications(_make_context(bot))
+
+        digests = [text for chat_id, text in bot.sent if "ЭСКАЛАЦИЯ" in text]
+        assert len(digests) == 1, f"Ожидалась одна сводка, отправлено {len(digests)}"
+        admin_messages = [text for chat_id, text in bot.sent if chat_id == ADMIN_ID]
+        assert "ЭСКАЛАЦИЯ" in admin_messages[-1], "Сводка идет после уведомлений администратору"
+        assert all(name in digests[0] for name in ("Медосмотр", "Инструктаж по охране труда", "Проверка знаний"))
+        # 3 критичных и 1 предупреждение сотруднику, предупреждение и сводка админу
+        assert len(bot.sent) == 6, f"Ожидалось 6 сообщений, отправлено {len(bot.sent)}"
+        assert [chat_id for chat_id, text in bot.sent].count(ADMIN_ID) == 2, bot.sent
+        digest_rows = [row for row in _ledger() if row['notification_type'] == 'admin_digest']
+        assert len(digest_rows) == 3 and all(row['status'] == 'sent' for row in digest_rows)
+
+        # Сводка записана в журнал: повторный запуск (например, после перезапуска) ее не шлет
+        bot = RecordingBot()
+        await enhanced_send_notifications(_make_context(bot))
+        assert bot.sent == [], f"Повторная отправка: {bot.sent}"
+        print("✅ 3 критичных события - одна сводка администратору вместо отдельных сообщений")
+
+        # Тест 6: брошенный резерв (сбой до отметки доставки) выбирается заново
+        print("\n📋 Тест 6: Брошенные резервы")
+        critical_rows = """UPDATE notification_history SET status = 'pending', sent_date = datetime('now', ?)
+                           WHERE event_id = (SELECT id FROM employee_events WHERE event_type = 'Медосмотр')"""
+        db_manager.execute_with_retry(critical_rows, ('-1 minute',))
+        bot = RecordingBot()
+        await enhanced_send_notifications(_make_context(bot))
+        assert bot.sent == [], f"Свежий резерв отправлен повторно: {bot.sent}"
+
+        db_manager.execute_with_retry(critical_rows, ('-1 hour',))
+        await enhanced_send_notifications(_make_context(bot))
+        # Сотрудник и сводка с одним событием
+        assert [chat_id for chat_id, text in bot.sent] == [USER_ID, ADMIN_ID], bot.sent
+        assert "ЭСКАЛАЦИЯ" in bot.sent[-1][1] and "Медосмотр" in bot.sent[-1][1]
+        assert all(status == 'sent' for _, _, status in _ledger())
+        print("✅ Резерв старше NOTIFICATION_CLAIM_TIMEOUT отправлен, свежий - нет")
+
+        # Тест 7: сбой доставки администратору не повторяет уведомление сотруднику
+        print("\n📋 Тест 7: Доставка по получателям")
+        db_manager.execute_with_retry("DELETE FROM notification_history")
+        bot = RecordingBot(blocked_chats={ADMIN_ID})
+        await enhanced_send_notifications(_make_context(bot))
+        assert [chat_id for chat_id, text in bot.sent] == [USER_ID] * 4, bot.sent
+
+        bot = RecordingBot()
+        await enhanced_send_notifications(_make_context(bot))
+        # Только администратору: предупреждение и сводка
+        assert [chat_id for chat_id, text in bot.sent] == [ADMIN_ID] * 2, bot.sent
+        assert all(status == 'sent' for _, _, status in _ledger())
+        print("✅ Повторно отправлено только недоставленное администратору")
+
+        print("\n🎉 ВСЕ ТЕСТЫ ЖУРНАЛА УВЕДОМЛЕНИЙ ПРОЙДЕНЫ!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        db_manager.close_all()
+
+
+async def main():
+    """Главная функция тестирования"""
+    success = await test_notification_ledger()
+    return success
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    sys.exit(0 if success else 1)
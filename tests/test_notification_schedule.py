@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Тест расписания уведомлений: колонка next_send_on и индексированная выборка задачи рассылки
+"""
+
+import os
+import sys
+import tempfile
+import time
+import traceback
+from datetime import date, timedelta
+
+# Отдельная база для теста - до импорта модулей бота
+os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(), 'notification_schedule.db')
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager, db_manager
+from core.security import encrypt_data
+from managers.notification_manager import NotificationManager
+
+TEST_CHAT_ID = 9191
+BULK_CHAT_ID = 9292
+NOTIFICATION_DAYS = 90
+notification_manager = NotificationManager(db_manager)
+
+# Выборка задачи рассылки (без журнала уведомлений)
+DUE_QUERY = '''
+    SELECT ee.id FROM employee_events ee
+    JOIN employees e ON ee.employee_id = e.id
+    JOIN chat_settings cs ON e.chat_id = cs.chat_id
+    WHERE ee.next_send_on = ? AND e.is_active = 1 AND e.chat_id = ?
+    AND ee.next_notification_date <= date(?, '+' || cs.notification_days || ' days')
+'''
+# Прежняя выборка: все события окна, отбор дней рассылки - в Python
+WINDOW_QUERY = '''
+    SELECT ee.id, ee.next_notification_date FROM employee_events ee
+    JOIN employees e ON ee.employee_id = e.id
+    JOIN chat_settings cs ON e.chat_id = cs.chat_id
+    WHERE e.is_active = 1 AND e.chat_id = ?
+    AND ee.next_notification_date BETWEEN date(?, '-7 days') AND date(?, '+' || cs.notification_days || ' days')
+'''
+
+
+def _add_chat(conn, chat_id: int) -> int:
+    conn.execute(
+        "INSERT INTO chat_settings (chat_id, admin_id, notification_days) VALUES (?, ?, ?)",
+        (chat_id, 1, NOTIFICATION_DAYS)
+    )
+    return conn.execute(
+        "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+        (chat_id, encrypt_data("Иванов Иван"), "Плотник")
+    ).lastrowid
+
+
+def _add_event(conn, employee_id: int, next_date: date) -> int:
+    return conn.execute(
+        '''INSERT INTO employee_events
+           (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+           VALUES (?, 'Медосмотр', ?, 365, ?)''',
+        (employee_id, (next_date - timedelta(days=365)).isoformat(), next_date.isoformat())
+    ).lastrowid
+
+
+def _expected(event_dates: dict, day: date) -> set:
+    """Отбор прежней задачи: окно выборки и проверка NotificationManager"""
+    due = set()
+    for event_id, event_date in event_dates.items():
+        days_until = (event_date - day).days
+        if -7 <= days_until <= NOTIFICATION_DAYS:
+            level = notification_manager.get_notification_level(days_until)
+            if notification_manager.should_send_notification(level, days_until):
+                due.add(event_id)
+    return due
+
+
+def _due(db: DatabaseManager, chat_id: int, day: date) -> set:
+    db.refresh_notification_schedule(day.isoformat())
+    rows = db.execute_with_retry(DUE_QUERY, (day.isoformat(), chat_id, day.isoformat()), fetch="all")
+    return {row['id'] for row in rows}
+
+
+def _check_schedule():
+    """По дням выборка совпадает с прежним отбором, в том числе после пропущенных дней"""
+    print("\n📋 Тест 1: Дни рассылки")
+    today = date.today()
+    with db_manager.get_connection() as conn:
+        employee_id = _add_chat(conn, TEST_CHAT_ID)
+        event_dates = {}
+        for offset in range(-12, 130):
+            next_date = today + timedelta(days=offset)
+            event_dates[_add_event(conn, employee_id, next_date)] = next_date
+
+    sent = 0
+    # Дни 40-44 пропущены (бот не работал): пропущенные уведомления не догоняются
+    for shift in [*range(0, 40), *range(45, 140)]:
+        day = today + timedelta(days=shift)
+        due = _due(db_manager, TEST_CHAT_ID, day)
+        assert due == _expected(event_dates, day), (shift, sorted(due ^ _expected(event_dates, day)))
+        # Повторный запуск в тот же день выбирает то же самое
+        assert _due(db_manager, TEST_CHAT_ID, day) == due
+        sent += len(due)
+
+    rows = db_manager.execute_with_retry(
+        "SELECT next_send_on FROM employee_events WHERE employee_id IN "
+        "(SELECT id FROM employees WHERE chat_id = ?)", (TEST_CHAT_ID,), fetch="all"
+    )
+    assert all(row['next_send_on'] is None for row in rows)
+    print(f"✅ {len(event_dates)} событий, {sent} уведомлений за 135 дней совпадают с прежним отбором")
+    return True
+
+
+def _check_date_changes():
+    """Изменение даты события пересчитывает день рассылки, перенос не меняет версию данных"""
+    print("\n📋 Тест 2: Изменение даты события")
+    today = date.today()
+    with db_manager.get_connection() as conn:
+        employee_id = conn.execute("SELECT id FROM employees WHERE chat_id = ?", (TEST_CHAT_ID,)).fetchone()['id']
+        event_id = _add_event(conn, employee_id, today + timedelta(days=2))
+
+    next_send = lambda: db_manager.execute_with_retry(
+        "SELECT next_send_on FROM employee_events WHERE id = ?", (event_id,), fetch="one"
+    )['next_send_on']
+    assert next_send() <= today.isoformat()
+
+    # Событие пройдено: следующее через год, первое уведомление за 90 дней
+    next_date = today + timedelta(days=365)
+    db_manager.execute_with_retry(
+        "UPDATE employee_events SET last_event_date = ?, next_notification_date = ? WHERE id = ?",
+        (today.isoformat(), next_date.isoformat(), event_id)
+    )
+    assert next_send() == (next_date - timedelta(days=90)).isoformat()
+
+    db_manager.execute_with_retry(
+        "UPDATE employee_events SET next_notification_date = ? WHERE id = ?",
+        ((today + timedelta(days=20)).isoformat(), event_id)
+    )
+    assert next_send() == (today + timedelta(days=13)).isoformat()
+
+    version = db_manager.get_chat_data_version(TEST_CHAT_ID)
+    assert _due(db_manager, TEST_CHAT_ID, today + timedelta(days=13)) == {event_id}
+    assert db_manager.get_chat_data_version(TEST_CHAT_ID) == version
+    print("✅ День рассылки следует за датой события")
+    return True
+
+
+def _check_migration():
+    """База без колонки next_send_on получает колонку и расписание при открытии"""
+    print("\n📋 Тест 3: Миграция существующей базы")
+    path = os.path.join(tempfile.mkdtemp(), 'legacy.db')
+    today = date.today()
+    db = DatabaseManager(path, max_connections=1)
+    with db.get_connection() as conn:
+        conn.execute("DROP INDEX idx_events_next_send")
+        for suffix in ('insert', 'update'):
+            conn.execute(f"DROP TRIGGER trg_events_{suffix}_next_send")
+        conn.execute("ALTER TABLE employee_events DROP COLUMN next_send_on")
+        employee_id = _add_chat(conn, 1)
+        event_dates = {_add_event(conn, employee_id, today + timedelta(days=offset)): today + timedelta(days=offset)
+                       for offset in (-3, 0, 7, 30, 45, 90, 200)}
+    db.close_all()
+
+    db = DatabaseManager(path, max_connections=1)
+    assert _due(db, 1, today) == _expected(event_dates, today)
+    db.close_all()
+    print("✅ Расписание заполнено для существующих событий")
+    return True
+
+
+def _check_speed():
+    """Выборка по индексу возвращает только нужные строки и быстрее окна дат"""
+    print("\n📋 Тест 4: Выборка задачи")
+    today = date.today()
+    with db_manager.get_connection() as conn:
+        employee_id = _add_chat(conn, BULK_CHAT_ID)
+        event_dates = {}
+        for i in range(20000):
+            next_date = today + timedelta(days=i % 400 - 30)
+            event_dates[_add_event(conn, employee_id, next_date)] = next_date
+    db_manager.refresh_notification_schedule(today.isoformat())
+
+    plan = " ".join(row['detail'] for row in db_manager.execute_with_retry(
+        f"EXPLAIN QUERY PLAN {DUE_QUERY}", (today.isoformat(), BULK_CHAT_ID, today.isoformat()), fetch="all"))
+    assert "idx_events_next_send" in plan, plan
+
+    def window():
+        rows = db_manager.execute_with_retry(WINDOW_QUERY, (BULK_CHAT_ID, today.isoformat(), today.isoformat()),
+                                             fetch="all")
+        due = set()
+        for row in rows:
+            days_until = (date.fromisoformat(row['next_notification_date']) - today).days
+            if notification_manager.should_send_notification(
+                    notification_manager.get_notification_level(days_until), days_until):
+                due.add(row['id'])
+        return due, len(rows)
+
+    def timed(func, runs=10):
+        start = time.perf_counter()
+        for _ in range(runs):
+            result = func()
+        return (time.perf_counter() - start) / runs, result
+
+    window_time, (window_due, scanned) = timed(window)
+    indexed_time, indexed_due = timed(lambda: _due(db_manager, BULK_CHAT_ID, today))
+    assert indexed_due == window_due == _expected(event_dates, today)
+    assert indexed_time < window_time, (indexed_time, window_time)
+    print(f"✅ Окно дат: {scanned} строк, {window_time * 1000:.2f} мс; "
+          f"next_send_on: {len(indexed_due)} строк, {indexed_time * 1000:.2f} мс")
+    return True
+
+
+def test_notification_schedule():
+    """Тестирует расписание уведомлений"""
+    print("⏰ ТЕСТИРОВАНИЕ РАСПИСАНИЯ УВЕДОМЛЕНИЙ")
+    print("=" * 50)
+
+    try:
+        _check_schedule()
+        _check_date_changes()
+        _check_migration()
+        _check_speed()
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        traceback.print_exc()
+        return False
+
+    print("\n🎉 ВСЕ ТЕСТЫ РАСПИСАНИЯ УВЕДОМЛЕНИЙ ПРОЙДЕНЫ!")
+    return True
+
+
+def main():
+    """Основная функция тестирования"""
+    return test_notification_schedule()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
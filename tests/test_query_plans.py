@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Регрессионный тест планов запросов: горячие запросы не должны
+сканировать таблицы employees и employee_events целиком
+"""
+
+import asyncio
+import os
+import re
+import sys
+import tempfile
+from datetime import date, timedelta
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+from core.security import encrypt_data
+from managers.advanced_analytics_manager import AdvancedAnalyticsManager
+from managers.automated_reports_manager import AutomatedReportsManager
+from managers.dashboard_manager import DashboardManager
+from managers.search_manager import SearchManager
+
+TEST_CHAT_ID = 5151
+# Полный проход по таблице сотрудников или событий (в т.ч. по всему индексу)
+FULL_SCAN_RE = re.compile(r"\bSCAN (e|ee|employees|employee_events)\b")
+# Функция над индексируемой колонкой в условии делает предикат неиндексируемым
+NON_SARGABLE_RE = re.compile(
+    r"\b\w+\(\s*(?:ee\.)?(?:next_notification_date|last_event_date)\s*\)\s*(?:<|>|=|BETWEEN)",
+    re.IGNORECASE
+)
+
+
+def _seed(db: DatabaseManager):
+    """Заполняет базу несколькими чатами, чтобы фильтр по чату был избирательным"""
+    with db.get_connection() as conn:
+        for chat_id in (TEST_CHAT_ID, TEST_CHAT_ID + 1):
+            conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (chat_id, 1))
+            for i in range(5):
+                full_name = f"Сотрудник {chat_id} {i}"
+                employee_id = conn.execute(
+                    "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+                    (chat_id, encrypt_data(full_name), "Плотник")
+                ).lastrowid
+                db.index_employee_name(conn, employee_id, full_name)
+                for offset in (-10, 2, 20, 120):
+                    next_date = date.today() + timedelta(days=offset + i)
+                    conn.execute(
+                        '''INSERT INTO employee_events
+                           (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+                           VALUES (?, ?, ?, ?, ?)''',
+                        (employee_id, "Медицинский осмотр",
+                         (next_date - timedelta(days=365)).isoformat(), 365, next_date.isoformat())
+                    )
+
+
+async def _run_hot_paths(db: DatabaseManager):
+    """Вызывает методы менеджеров, чьи запросы выполняются чаще всего"""
+    search = SearchManager(db)
+    dashboard = DashboardManager(db)
+    analytics = AdvancedAnalyticsManager(db)
+    reports = AutomatedReportsManager(db)
+
+    await search.smart_text_search(TEST_CHAT_ID, "сотрудник")
+    await search.smart_text_search(TEST_CHAT_ID, "осмотр", {'status': 'overdue'})
+    await search.search_events(TEST_CHAT_ID, "", {'status': 'urgent'})
+    search.get_events_statistics(TEST_CHAT_ID)
+    search.get_events_by_status(TEST_CHAT_ID, 'overdue')
+
+    dashboard.get_overview_statistics(TEST_CHAT_ID)
+    dashboard.get_performance_metrics(TEST_CHAT_ID)
+    dashboard.get_alerts_and_recommendations(TEST_CHAT_ID)
+
+    analytics.get_workload_forecast(TEST_CHAT_ID, 30)
+    analytics.get_efficiency_metrics(TEST_CHAT_ID)
+
+    await reports._generate_daily_summary(TEST_CHAT_ID)
+
+
+async def test_query_plans():
+    """Проверяет, что горячие запросы используют индексы"""
+
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'query_plans.db'), max_connections=1)
+
+    print("🔎 ТЕСТИРОВАНИЕ ПЛАНОВ ЗАПРОСОВ")
+    print("=" * 50)
+
+    try:
+        _seed(db)
+
+        # Единственное соединение пула записывает все выполняемые запросы
+        statements = []
+        with db.get_connection() as conn:
+            conn.set_trace_callback(statements.append)
+
+        await _run_hot_paths(db)
+
+        with db.get_connection() as conn:
+            conn.set_trace_callback(None)
+            hot_queries = {
+                sql.strip() for sql in statements
+                if re.match(r"\s*(WITH|SELECT)\b", sql, re.IGNORECASE)
+                and re.search(r"\bemployee(s|_events)\b", sql)
+            }
+            assert hot_queries, "Не перехвачено ни одного запроса"
+
+            offenders = []
+            for sql in sorted(hot_queries):
+                plan = [row['detail'] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+                if any(FULL_SCAN_RE.search(step) for step in plan) or NON_SARGABLE_RE.search(sql):
+                    offenders.append((sql, plan))
+
+        for sql, plan in offenders:
+            print(f"\n❌ Неиндексируемый запрос:\n{sql}\n" + "\n".join(f"   {step}" for step in plan))
+
+        assert not offenders, f"{len(offenders)} запросов не используют индексы"
+        print(f"✅ Проверено запросов: {len(hot_queries)}, полных сканирований нет")
+
+        print("\n🎉 ВСЕ ТЕСТЫ ПЛАНОВ ЗАПРОСОВ ПРОЙДЕНЫ!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        db.close_all()
+
+
+async def main():
+    """Главная функция тестирования"""
+    success = await test_query_plans()
+    return success
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    sys.exit(0 if success else 1)
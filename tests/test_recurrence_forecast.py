@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Тест прогноза нагрузки с учетом повторений событий в горизонте
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import traceback
+from collections import Counter
+from datetime import date, timedelta
+
+# Добавляем родительскую директорию в sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+from core.security import encrypt_data
+from managers.advanced_analytics_manager import AdvancedAnalyticsManager
+from managers.analytics_snapshot import AnalyticsSnapshot, _utc_today, snapshot_cache
+
+TEST_CHAT_ID = 4141
+
+
+def _brute_force(rows, start: date, end: date) -> Counter:
+    """Эталон: повторения каждого события по одному"""
+    counts = Counter()
+    for next_date, _, interval, _, _ in rows:
+        day = date.fromisoformat(next_date)
+        while day <= end:
+            if day >= start:
+                counts[day] += 1
+            if not interval:
+                break
+            day += timedelta(days=interval)
+    return counts
+
+
+def _check_short_intervals(db: DatabaseManager):
+    """Еженедельное событие дает все повторения в 90-дневном прогнозе"""
+    print("\n📋 Тест 1: Повторения в горизонте")
+    today = _utc_today()
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (TEST_CHAT_ID, 1))
+        employee_id = conn.execute(
+            "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+            (TEST_CHAT_ID, encrypt_data("Иванов Иван"), "Крановщик")
+        ).lastrowid
+        # Еженедельный осмотр, просроченный ежемесячный, ежегодный за горизонтом
+        for event_type, offset, interval in (("Осмотр крана", 0, 7), ("Проверка СИЗ", -10, 30),
+                                             ("Аттестация", 120, 365)):
+            next_date = today + timedelta(days=offset)
+            conn.execute(
+                '''INSERT INTO employee_events
+                   (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+                   VALUES (?, ?, ?, ?, ?)''',
+                (employee_id, event_type, (next_date - timedelta(days=interval)).isoformat(),
+                 interval, next_date.isoformat())
+            )
+
+    forecast = AdvancedAnalyticsManager(db).get_workload_forecast(TEST_CHAT_ID, 90)
+    # 13 еженедельных (дни 0..84) и 3 ежемесячных (дни 20, 50, 80)
+    assert forecast['summary']['total_events'] == 16, forecast['summary']
+    assert sum(week['events_count'] for week in forecast['weekly_load']) == 16
+    first_monthly = (today + timedelta(days=20)).isoformat()
+    assert any(day['event_date'] == first_monthly and day['event_types'] == "Проверка СИЗ"
+               for day in forecast['daily_forecast'])
+    print(f"✅ 90 дней: {forecast['summary']['total_events']} повторений, "
+          f"{len(forecast['weekly_load'])} недель с нагрузкой")
+    return True
+
+
+def _check_matches_brute_force():
+    """Групповое развертывание совпадает с поштучным"""
+    print("\n📋 Тест 2: Сверка с поштучным развертыванием")
+    random.seed(42)
+    today = date.today()
+    rows = []
+    for _ in range(2000):
+        interval = random.choice([0, 1, 7, 30, 45, 90, 365])
+        next_date = today + timedelta(days=random.randint(-100, 400))
+        rows.append((next_date.isoformat(), None, interval, "Событие", "Должность"))
+    rows.sort()
+
+    end = today + timedelta(days=365)
+    projection = AnalyticsSnapshot(TEST_CHAT_ID, today, rows).project_occurrences(today, end)
+    expected = _brute_force(rows, today, end)
+    assert {day: count for day, count, _, _ in projection.days()} == dict(expected)
+    assert projection.total == sum(expected.values())
+    print(f"✅ {projection.total} повторений совпадают по дням")
+    return True
+
+
+def _check_year_ahead_speed():
+    """Прогноз на год для 100 000 событий укладывается в обработку callback"""
+    print("\n📋 Тест 3: Производительность")
+    random.seed(7)
+    today = date.today()
+    rows = sorted(
+        ((today + timedelta(days=random.randint(-60, 400))).isoformat(), None,
+         random.randint(1, 400), random.choice(["Медосмотр", "Инструктаж"]), "Плотник")
+        for _ in range(100000)
+    )
+    snapshot = AnalyticsSnapshot(TEST_CHAT_ID, today, rows)
+
+    started = time.perf_counter()
+    projection = snapshot.project_occurrences(today, today + timedelta(days=365))
+    days, weeks = list(projection.days()), projection.weekly()
+    elapsed = time.perf_counter() - started
+
+    assert len(days) == 366 and weeks
+    assert elapsed < 1.0, f"Прогноз занял {elapsed:.2f} с"
+    print(f"✅ {projection.total} повторений за {elapsed * 1000:.0f} мс")
+    return True
+
+
+def test_recurrence_forecast():
+    """Тестирует развертывание повторений событий в прогнозе нагрузки"""
+    print("🔁 ТЕСТИРОВАНИЕ ПРОГНОЗА С ПОВТОРЕНИЯМИ")
+    print("=" * 50)
+
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'recurrence.db'))
+
+    try:
+        _check_short_intervals(db)
+        _check_matches_brute_force()
+        _check_year_ahead_speed()
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        snapshot_cache.invalidate()
+        db.close_all()
+
+    print("\n🎉 ВСЕ ТЕСТЫ ПРОГНОЗА С ПОВТОРЕНИЯМИ ПРОЙДЕНЫ!")
+    return True
+
+
+def main():
+    """Основная функция тестирования"""
+    return test_recurrence_forecast()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Тест кэша экранов: повторный переход на экран не выполняет запросов и отрисовки
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import traceback
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+# Отдельная база для теста - до импорта модулей бота
+os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(), 'screen_cache.db')
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import InlineKeyboardMarkup
+
+from core.database import DatabaseManager, db_manager
+from core.screen_cache import ScreenCache, screen_cache
+from core.security import encrypt_data
+from core.utils import create_callback_data
+from handlers import analytics_handlers, dashboard_handlers, reports_handlers
+
+TEST_CHAT_ID = 9191
+ADMIN_ID = 91
+
+
+class FakeBot:
+    """Бот, запоминающий отправленные сообщения"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.messages.append((text, kwargs.get('reply_markup')))
+
+
+class CallCounter:
+    """Обертка метода менеджера, считающая вызовы"""
+
+    def __init__(self, owner, name):
+        self.calls = 0
+        self._method = getattr(owner, name)
+        setattr(owner, name, self)
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self._method(*args, **kwargs)
+
+
+def _make_update(action: str, **params):
+    async def answer(*args, **kwargs):
+        return True
+
+    return SimpleNamespace(
+        callback_query=SimpleNamespace(data=create_callback_data(action, **params), answer=answer),
+        effective_chat=SimpleNamespace(id=TEST_CHAT_ID),
+        effective_user=SimpleNamespace(id=ADMIN_ID)
+    )
+
+
+def _show(handler, action: str, **params):
+    """Открывает экран и возвращает отправленные текст и клавиатуру"""
+    bot = FakeBot()
+    asyncio.run(handler(_make_update(action, **params), SimpleNamespace(bot=bot)))
+    return bot.messages[-1]
+
+
+def _seed() -> int:
+    today = date.today()
+    with db_manager.get_connection() as conn:
+        conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (TEST_CHAT_ID, ADMIN_ID))
+        for i in range(12):
+            employee_id = conn.execute(
+                "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+                (TEST_CHAT_ID, encrypt_data(f"Сотрудник {i:02d}"), "Слесарь" if i % 2 else "Токарь")
+            ).lastrowid
+            conn.executemany(
+                '''INSERT INTO employee_events
+                   (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+                   VALUES (?, ?, ?, 365, ?)''',
+                [(employee_id, event_type, today.isoformat(), (today + timedelta(days=i * 7 - 20)).isoformat())
+                 for event_type in ('Медосмотр', 'Инструктаж')]
+            )
+    return employee_id
+
+
+def _check_revisit():
+    """Повторный переход отдает тот же экран без запросов аналитики"""
+    print("\n📋 Тест 1: Повторный переход на экран")
+    overview = CallCounter(dashboard_handlers.dashboard_manager, 'get_overview_statistics')
+    trends = CallCounter(analytics_handlers.advanced_analytics_manager, 'get_trends_analysis')
+
+    first = _show(dashboard_handlers.dashboard_main, "dashboard")
+    assert isinstance(first[1], InlineKeyboardMarkup)
+    hits = screen_cache.hits
+    second = _show(dashboard_handlers.dashboard_main, "dashboard")
+    assert second[0] is first[0] and second[1] is first[1]
+    assert overview.calls == 1 and screen_cache.hits == hits + 1
+
+    # Другой экран на тех же данных использует свою запись
+    _show(dashboard_handlers.dashboard_analytics, "dashboard_analytics")
+    _show(dashboard_handlers.dashboard_analytics, "dashboard_analytics")
+    assert overview.calls == 2
+
+    for _ in range(3):
+        _show(analytics_handlers.analytics_trends, "analytics_trends")
+    assert trends.calls == 1
+    print(f"✅ Запросов статистики: {overview.calls}, трендов: {trends.calls}; {screen_cache.stats()}")
+    return True
+
+
+def _check_params():
+    """Страницы и периоды - разные экраны"""
+    print("\n📋 Тест 2: Параметры экрана")
+    analysis = CallCounter(dashboard_handlers.dashboard_manager, 'get_employee_analysis')
+    page0 = _show(dashboard_handlers.dashboard_employees, "dashboard_employees", page=0)
+    page1 = _show(dashboard_handlers.dashboard_employees, "dashboard_employees", page=1)
+    assert page0[0] != page1[0] and "Страница 2" in page1[0]
+    assert _show(dashboard_handlers.dashboard_employees, "dashboard_employees", page=0)[0] is page0[0]
+    assert analysis.calls == 2
+
+    short = _show(analytics_handlers.forecast_short, "forecast_short")
+    long = _show(analytics_handlers.forecast_long, "forecast_long")
+    assert short[0] != long[0]
+    assert _show(analytics_handlers.forecast_short, "forecast_short")[0] is short[0]
+    print(f"✅ Запросов анализа сотрудников: {analysis.calls} на 3 перехода")
+    return True
+
+
+def _check_invalidation(employee_id: int):
+    """Изменение данных или настроек чата перерисовывает экран"""
+    print("\n📋 Тест 3: Сброс при изменении данных")
+    before = _show(dashboard_handlers.dashboard_main, "dashboard")
+    db_manager.execute_with_retry(
+        '''INSERT INTO employee_events
+           (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+           VALUES (?, 'Аттестация', date('now'), 365, date('now', '-1 day'))''', (employee_id,)
+    )
+    after = _show(dashboard_handlers.dashboard_main, "dashboard")
+    assert after[0] is not before[0]
+    assert "Всего событий: 25" in after[0], after[0]
+
+    # Переключение отчетов сразу видно на экране настроек
+    settings = _show(reports_handlers.reports_settings, "reports_settings")
+    assert "Ежедневные ❌" in str(settings[1].to_dict())
+    toggled = _show(reports_handlers.toggle_daily_reports, "toggle_daily_reports")
+    assert "Ежедневные ✅" in str(toggled[1].to_dict())
+    print("✅ Новое событие и смена настроек отчетов видны сразу")
+    return True
+
+
+def _check_key_and_eviction():
+    """Ключ содержит локальную дату чата; устаревшие и старые экраны вытесняются"""
+    print("\n📋 Тест 4: Ключ и вытеснение")
+    db_manager.execute_with_retry(
+        "UPDATE chat_settings SET timezone = 'Pacific/Kiritimati' WHERE chat_id = ?", (TEST_CHAT_ID,)
+    )
+    db_manager.chat_settings.invalidate(TEST_CHAT_ID)
+    key = asyncio.run(screen_cache.key(TEST_CHAT_ID, "dashboard_employees", page=1))
+    assert key[:3] == (TEST_CHAT_ID, "dashboard_employees", (('page', 1),))
+    assert key[3] == db_manager.get_chat_data_version(TEST_CHAT_ID)
+    assert key[4] == DatabaseManager._local_date('Pacific/Kiritimati')
+
+    cache = ScreenCache(db_manager, max_size=3)
+    markup = InlineKeyboardMarkup([])
+    cache.put((1, 'dashboard_main', (), 1, 'd'), ('v1', markup))
+    cache.put((1, 'dashboard_main', (), 2, 'd'), ('v2', markup))
+    assert cache.get((1, 'dashboard_main', (), 1, 'd')) is None
+    for chat_id in (2, 3, 4):
+        cache.put((chat_id, 'dashboard_main', (), 1, 'd'), (str(chat_id), markup))
+    assert cache.get((1, 'dashboard_main', (), 2, 'd')) is None
+    assert cache.get((4, 'dashboard_main', (), 1, 'd'))[0] == '4'
+    stats = cache.stats()
+    assert stats['size'] == 3 and stats['evictions'] == 1
+    print(f"✅ Статистика: {stats}")
+    return True
+
+
+def _check_speed():
+    """Экран из кэша отдается быстрее, чем строится заново"""
+    print("\n📋 Тест 5: Скорость")
+
+    async def timed(runs: int):
+        start = time.perf_counter()
+        for _ in range(runs):
+            await screen_cache.render(TEST_CHAT_ID, "analytics_summary", analytics_handlers._render_analytics_summary)
+        return (time.perf_counter() - start) / runs
+
+    screen_cache.invalidate(TEST_CHAT_ID)
+    miss = asyncio.run(timed(1))
+    hit = asyncio.run(timed(20))
+    assert hit < miss, (hit, miss)
+    print(f"✅ Построение: {miss * 1000:.1f} мс, из кэша: {hit * 1000:.2f} мс")
+    return True
+
+
+def test_screen_cache():
+    """Тестирует кэш отрисованных экранов"""
+    print("🖼️ ТЕСТИРОВАНИЕ КЭША ЭКРАНОВ")
+    print("=" * 50)
+
+    try:
+        employee_id = _seed()
+        _check_revisit()
+        _check_params()
+        _check_invalidation(employee_id)
+        _check_key_and_eviction()
+        _check_speed()
+        print(f"\n📊 Статистика кэша экранов: {screen_cache.stats()}")
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        traceback.print_exc()
+        return False
+
+    print("\n🎉 ВСЕ ТЕСТЫ КЭША ЭКРАНОВ ПРОЙДЕНЫ!")
+    return True
+
+
+def main():
+    """Основная функция тестирования"""
+    return test_screen_cache()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Тест сессий текстового поиска: перелистывание страниц без повторного поиска
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import traceback
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+# Отдельная база для теста - до импорта модулей бота
+os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(), 'search_sessions.db')
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import db_manager
+from core.search_sessions import SearchSessionStore, search_sessions
+from core.security import encrypt_data
+from core.utils import create_callback_data, parse_callback_data
+from handlers import search_handlers
+
+TEST_CHAT_ID = 6161
+OTHER_CHAT_ID = 6262
+ADMIN_ID = 61
+EMPLOYEES = 200
+
+
+class FakeBot:
+    """Бот, запоминающий отправленные сообщения"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.messages.append((text, kwargs.get('reply_markup')))
+
+
+class CallCounter:
+    """Обертка метода менеджера, считающая вызовы"""
+
+    def __init__(self, owner, name):
+        self.calls = 0
+        self._method = getattr(owner, name)
+        setattr(owner, name, self)
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self._method(*args, **kwargs)
+
+
+def _press(handler, data: str, chat_id: int = TEST_CHAT_ID):
+    """Нажимает кнопку и возвращает последнее сообщение (текст, клавиатура)"""
+    async def answer(*args, **kwargs):
+        return True
+
+    update = SimpleNamespace(
+        callback_query=SimpleNamespace(data=data, answer=answer),
+        effective_chat=SimpleNamespace(id=chat_id),
+        effective_user=SimpleNamespace(id=ADMIN_ID)
+    )
+    bot = FakeBot()
+    asyncio.run(handler(update, SimpleNamespace(bot=bot, user_data={})))
+    return bot.messages[-1]
+
+
+def _button(markup, label: str) -> str:
+    """Возвращает callback_data кнопки по началу подписи"""
+    for row in markup.inline_keyboard:
+        for button in row:
+            if button.text.startswith(label):
+                return button.callback_data
+    raise AssertionError(f"Кнопка {label} не найдена")
+
+
+def _seed():
+    today = date.today()
+    with db_manager.get_connection() as conn:
+        for chat_id in (TEST_CHAT_ID, OTHER_CHAT_ID):
+            conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (chat_id, ADMIN_ID))
+        for i in range(EMPLOYEES):
+            full_name = f"Сотрудник {i:03d}"
+            employee_id = conn.execute(
+                "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+                (TEST_CHAT_ID, encrypt_data(full_name), "Плотник" if i % 2 else "Маляр")
+            ).lastrowid
+            db_manager.index_employee_name(conn, employee_id, full_name)
+            conn.execute(
+                '''INSERT INTO employee_events
+                   (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+                   VALUES (?, 'Медосмотр', ?, 365, ?)''',
+                (employee_id, today.isoformat(), (today + timedelta(days=i - 10)).isoformat())
+            )
+    return employee_id
+
+
+def _check_paging():
+    """Следующие страницы читаются из сессии без поиска и подсказок"""
+    print("\n📋 Тест 1: Перелистывание страниц")
+    manager = search_handlers.search_manager
+    find = CallCounter(manager, '_find_text_search_ids')
+    suggest = CallCounter(manager, '_get_search_suggestions')
+
+    first = _press(search_handlers.quick_text_search, create_callback_data("quick_text_search", q="маляр"))
+    assert "Найдено 100 событий" in first[0] and "Страница 1 из 20" in first[0], first[0]
+    assert find.calls == 1 and suggest.calls == 0
+
+    page = first
+    for number in range(2, 5):
+        page = _press(search_handlers.text_search_page, _button(page[1], "След"))
+        assert f"Страница {number} из 20" in page[0] and "маляр" in page[0]
+    back = _press(search_handlers.text_search_page, _button(page[1], "⬅️"))
+    assert "Страница 3 из 20" in back[0]
+    assert find.calls == 1 and suggest.calls == 0, (find.calls, suggest.calls)
+
+    # Подсказки считаются один раз - для пустого результата
+    empty = _press(search_handlers.quick_text_search, create_callback_data("quick_text_search", q="электрик"))
+    assert "Ничего не найдено" in empty[0] and suggest.calls == 1
+    print(f"✅ Поисков: {find.calls}, подсказок: {suggest.calls}; {search_sessions.stats()}")
+    return True
+
+
+def _check_stale_sessions(employee_id: int):
+    """Изменение данных, истечение сессии и чужой чат приводят к повторному поиску"""
+    print("\n📋 Тест 2: Устаревшие сессии")
+    manager = search_handlers.search_manager
+    find = manager._find_text_search_ids
+    first = _press(search_handlers.quick_text_search, create_callback_data("quick_text_search", q="плотник"))
+    next_page = _button(first[1], "След")
+    calls = find.calls
+
+    db_manager.execute_with_retry(
+        '''INSERT INTO employee_events
+           (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+           VALUES (?, 'Инструктаж', date('now'), 180, date('now', '+5 days'))''', (employee_id,)
+    )
+    page = _press(search_handlers.text_search_page, next_page)
+    assert find.calls == calls + 1 and "Найдено 101 событий" in page[0], page[0]
+
+    # Сессия другого чата не выдается
+    session_id = parse_callback_data(_button(page[1], "След"))['s']
+    assert search_sessions.get(session_id, OTHER_CHAT_ID) is None
+    assert search_sessions.get(session_id, TEST_CHAT_ID) is not None
+
+    # Без сессии - повторный поиск по запросу из кнопки; без запроса - сообщение
+    search_sessions.invalidate(TEST_CHAT_ID)
+    page = _press(search_handlers.text_search_page, next_page)
+    assert find.calls == calls + 2 and "Страница 2" in page[0]
+    lost = _press(search_handlers.text_search_page, create_callback_data("text_search_page", p=1, s=session_id))
+    assert "параметры поиска потеряны" in lost[0]
+
+    store = SearchSessionStore(max_size=2, ttl=0.05)
+    sessions = [store.create(TEST_CHAT_ID, str(i), [i], [], 0) for i in range(3)]
+    assert store.get(sessions[0].session_id, TEST_CHAT_ID) is None
+    assert store.get(sessions[2].session_id, TEST_CHAT_ID).event_ids == (2,)
+    time.sleep(0.06)
+    assert store.get(sessions[2].session_id, TEST_CHAT_ID) is None
+    stats = store.stats()
+    assert stats['evictions'] == 1 and stats['size'] == 1 and stats['misses'] == 2, stats
+    print(f"✅ Статистика: {stats}")
+    return True
+
+
+def _check_speed():
+    """Страница из сессии быстрее полного поиска"""
+    print("\n📋 Тест 3: Скорость")
+    manager = search_handlers.search_manager
+
+    async def timed(runs: int):
+        start = time.perf_counter()
+        for _ in range(runs):
+            await manager.smart_text_search(TEST_CHAT_ID, "сотрудник", page=10, per_page=5)
+        search = (time.perf_counter() - start) / runs
+
+        session = await manager.open_text_search(TEST_CHAT_ID, "сотрудник")
+        start = time.perf_counter()
+        for _ in range(runs):
+            await manager.get_text_search_page(session, 10, per_page=5)
+        paged = (time.perf_counter() - start) / runs
+
+        expected = await manager.smart_text_search(TEST_CHAT_ID, "сотрудник", page=10, per_page=5)
+        actual = await manager.get_text_search_page(session, 10, per_page=5)
+        assert [r['event_id'] for r in actual['results']] == [r['event_id'] for r in expected['results']]
+        assert actual['pagination'] == expected['pagination']
+        return search, paged
+
+    search, paged = asyncio.run(timed(20))
+    assert paged < search, (paged, search)
+    print(f"✅ Полный поиск: {search * 1000:.2f} мс, страница из сессии: {paged * 1000:.2f} мс")
+    return True
+
+
+def test_search_sessions():
+    """Тестирует сессии текстового поиска"""
+    print("🔎 ТЕСТИРОВАНИЕ СЕССИЙ ТЕКСТОВОГО ПОИСКА")
+    print("=" * 50)
+
+    try:
+        employee_id = _seed()
+        _check_paging()
+        _check_stale_sessions(employee_id)
+        _check_speed()
+        print(f"\n📊 Статистика сессий: {search_sessions.stats()}")
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        traceback.print_exc()
+        return False
+
+    print("\n🎉 ВСЕ ТЕСТЫ СЕССИЙ ПОИСКА ПРОЙДЕНЫ!")
+    return True
+
+
+def main():
+    """Основная функция тестирования"""
+    return test_search_sessions()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
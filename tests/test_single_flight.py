@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Тест объединения одновременных одинаковых запросов дашборда и аналитики
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+# Добавляем родительскую директорию в sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+from core.security import encrypt_data
+from core.singleflight import get_single_flight_stats
+from managers.advanced_analytics_manager import AdvancedAnalyticsManager
+from managers.dashboard_manager import DashboardManager
+
+TEST_CHAT_ID = 9191
+OTHER_CHAT_ID = 9292
+
+
+def _count_queries(db: DatabaseManager) -> list:
+    """Подменяет execute_with_retry экземпляра: считает запросы и замедляет их"""
+    queries = []
+    original = db.execute_with_retry
+
+    def counting(query, params=(), fetch=None):
+        queries.append(query)
+        time.sleep(0.02)  # Расчет должен длиться, пока приходят повторные запросы
+        return original(query, params, fetch)
+
+    db.execute_with_retry = counting
+    return queries
+
+
+def _seed(db: DatabaseManager):
+    with db.get_connection() as conn:
+        for chat_id in (TEST_CHAT_ID, OTHER_CHAT_ID):
+            conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (chat_id, 1))
+            employee_id = conn.execute(
+                "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+                (chat_id, encrypt_data("Иванов Иван"), "Плотник")
+            ).lastrowid
+            conn.execute(
+                '''INSERT INTO employee_events
+                   (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+                   VALUES (?, ?, date('now', '-360 days'), 365, date('now', '+5 days'))''',
+                (employee_id, "Медосмотр")
+            )
+
+
+async def _check_concurrent_calls_coalesce(db: DatabaseManager, queries: list):
+    """Пять одновременных открытий дашборда - один расчет"""
+    print("\n📋 Тест 1: Одновременные запросы дашборда")
+    dashboard = DashboardManager(db)
+
+    queries.clear()
+    dashboard.get_overview_statistics(TEST_CHAT_ID)
+    single_run = len(queries)
+    queries.clear()
+
+    results = await asyncio.gather(*[
+        db.run_sync(dashboard.get_overview_statistics, TEST_CHAT_ID) for _ in range(5)
+    ])
+    assert len(queries) == single_run, f"Запросов {len(queries)}, ожидалось {single_run}"
+    assert all(result == results[0] for result in results)
+    assert len({id(result) for result in results}) == 5, "Ожидающие должны получать копии результата"
+    print(f"✅ 5 запросов выполнили {len(queries)} SQL-запросов вместо {single_run * 5}")
+
+    # Завершенный вызов не кешируется: следующий запрос считает заново
+    queries.clear()
+    await db.run_sync(dashboard.get_overview_statistics, TEST_CHAT_ID)
+    assert len(queries) == single_run
+    print("✅ После завершения расчета данные считаются заново")
+    return True
+
+
+async def _check_keys_are_separate(db: DatabaseManager, queries: list):
+    """Разные чаты и аргументы не объединяются"""
+    print("\n📋 Тест 2: Разные ключи")
+    dashboard = DashboardManager(db)
+    analytics = AdvancedAnalyticsManager(db)
+
+    queries.clear()
+    dashboard.get_timeline_analysis(TEST_CHAT_ID, 12)
+    single_run = len(queries)
+    queries.clear()
+
+    await asyncio.gather(
+        db.run_sync(dashboard.get_timeline_analysis, TEST_CHAT_ID, 12),
+        db.run_sync(dashboard.get_timeline_analysis, TEST_CHAT_ID, 12),
+        db.run_sync(dashboard.get_timeline_analysis, TEST_CHAT_ID, 6),
+        db.run_sync(dashboard.get_timeline_analysis, OTHER_CHAT_ID, 12),
+    )
+    assert len(queries) == single_run * 3, f"Запросов {len(queries)}, ожидалось {single_run * 3}"
+
+    # Аргумент-словарь тоже участвует в ключе
+    periods = {'week': 7, 'month': 30}
+    forecasts = await asyncio.gather(*[
+        db.run_sync(analytics.get_advanced_workload_forecast, TEST_CHAT_ID, periods) for _ in range(3)
+    ])
+    assert all(forecast == forecasts[0] for forecast in forecasts)
+    print("✅ Каждый уникальный (чат, метод, аргументы) считается отдельно")
+    return True
+
+
+async def _check_errors_are_shared(db: DatabaseManager):
+    """Ошибку расчета получают все ожидающие, следующий вызов выполняется заново"""
+    print("\n📋 Тест 3: Ошибка расчета")
+    dashboard = DashboardManager(db)
+    original = db.get_chat_event_stats
+    calls = []
+
+    def failing(chat_id):
+        calls.append(chat_id)
+        time.sleep(0.05)
+        raise RuntimeError("database is locked")
+
+    db.get_chat_event_stats = failing
+    results = await asyncio.gather(*[
+        db.run_sync(dashboard.get_overview_statistics, TEST_CHAT_ID) for _ in range(3)
+    ], return_exceptions=True)
+    db.get_chat_event_stats = original
+
+    assert len(calls) == 1, f"Расчетов {len(calls)}"
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert dashboard.get_overview_statistics(TEST_CHAT_ID)['main']['total_events'] == 1
+    print("✅ Ошибка передана всем ожидающим, повторный вызов успешен")
+    return True
+
+
+async def _check_waiters_free_executor():
+    """Ожидающие запросы не занимают потоки пула базы данных"""
+    print("\n📋 Тест 4: Пул потоков при всплеске запросов")
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'single_flight_pool.db'), max_connections=2)
+    try:
+        _seed(db)
+        dashboard = DashboardManager(db)
+
+        # Расчет стоит, пока посторонний запрос не выполнится
+        release = threading.Event()
+        original_stats = db.get_chat_event_stats
+
+        def blocking_stats(chat_id):
+            release.wait(5)
+            return original_stats(chat_id)
+
+        db.get_chat_event_stats = blocking_stats
+
+        submitted = []
+        original_submit = db._executor.submit
+
+        def counting_submit(fn, *args, **kwargs):
+            submitted.append(fn)
+            return original_submit(fn, *args, **kwargs)
+
+        db._executor.submit = counting_submit
+        burst = asyncio.gather(*[
+            db.run_sync(dashboard.get_overview_statistics, TEST_CHAT_ID) for _ in range(6)
+        ])
+        await asyncio.sleep(0)
+
+        # Второй поток пула свободен: посторонний запрос выполняется во время расчета
+        try:
+            row = await asyncio.wait_for(db.fetch_one("SELECT 1"), timeout=1)
+        finally:
+            release.set()
+        assert row[0] == 1
+        results = await burst
+        db._executor.submit = original_submit
+
+        assert len(submitted) == 2, f"В пул отправлено {len(submitted)} вызовов"
+        assert all(result == results[0] for result in results)
+        assert len({id(result) for result in results}) == 6
+        print("✅ 6 одинаковых запросов заняли один поток, пул доступен другим запросам")
+    finally:
+        db.close_all()
+    return True
+
+
+def test_single_flight():
+    """Тестирует объединение одновременных вызовов менеджеров"""
+    print("🛫 ТЕСТИРОВАНИЕ ОБЪЕДИНЕНИЯ ЗАПРОСОВ")
+    print("=" * 50)
+
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'single_flight.db'))
+
+    async def run_checks():
+        _seed(db)
+        queries = _count_queries(db)
+        await _check_concurrent_calls_coalesce(db, queries)
+        await _check_keys_are_separate(db, queries)
+        await _check_errors_are_shared(db)
+        await _check_waiters_free_executor()
+
+    try:
+        asyncio.run(run_checks())
+        stats = get_single_flight_stats()
+        assert stats['in_flight'] == 0
+        print(f"\n📊 Статистика: {stats}")
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        db.close_all()
+
+    print("\n🎉 ВСЕ ТЕСТЫ ОБЪЕДИНЕНИЯ ЗАПРОСОВ ПРОЙДЕНЫ!")
+    return True
+
+
+def main():
+    """Основная функция тестирования"""
+    return test_single_flight()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Тест потокового экспорта в CSV: пачки из курсора пишутся сразу во временный файл
+"""
+
+import asyncio
+import csv
+import io
+import os
+import sys
+import tempfile
+import tracemalloc
+import traceback
+from datetime import date, timedelta
+
+# Добавляем родительскую директорию в sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import BotConfig
+from core.database import DatabaseManager
+from core.security import encrypt_data
+from managers.export_manager import EVENTS_EXPORT_QUERY, ExportManager
+
+TEST_CHAT_ID = 3131
+EMPLOYEES = 200
+EVENTS_PER_EMPLOYEE = 100
+
+
+def _seed(db: DatabaseManager):
+    today = date.today()
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (TEST_CHAT_ID, 1))
+        for i in range(EMPLOYEES):
+            employee_id = conn.execute(
+                "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+                (TEST_CHAT_ID, encrypt_data(f"Сотрудник Номер {i:03d}"), "Слесарь механосборочных работ")
+            ).lastrowid
+            conn.executemany(
+                '''INSERT INTO employee_events
+                   (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+                   VALUES (?, ?, ?, ?, ?)''',
+                [(employee_id, f"Периодическая проверка знаний № {k}", today.isoformat(), 365,
+                  (today + timedelta(days=(i + k) % 400 - 30)).isoformat())
+                 for k in range(EVENTS_PER_EMPLOYEE)]
+            )
+
+
+def _read_csv(file) -> list:
+    content = file.read().decode('utf-8-sig')
+    return list(csv.reader(io.StringIO(content, newline=''), delimiter=';'))
+
+
+def _check_content(db: DatabaseManager):
+    """CSV содержит все события с расшифрованными ФИО"""
+    print("\n📋 Тест 1: Содержимое CSV")
+    exporter = ExportManager(db)
+    file = asyncio.run(exporter.export_all_events(TEST_CHAT_ID, "csv"))
+    try:
+        rows = _read_csv(file)
+    finally:
+        file.close()
+
+    assert rows[0][0] == 'ФИО' and len(rows) == EMPLOYEES * EVENTS_PER_EMPLOYEE + 1
+    assert {row[0] for row in rows[1:]} == {f"Сотрудник Номер {i:03d}" for i in range(EMPLOYEES)}
+    dates = [row[4] for row in rows[1:]]
+    assert dates == sorted(dates)
+
+    overdue = asyncio.run(exporter.export_overdue_events(TEST_CHAT_ID, "csv"))
+    try:
+        overdue_rows = _read_csv(overdue)
+    finally:
+        overdue.close()
+    assert len(overdue_rows) > 1 and all(int(row[6]) > 0 for row in overdue_rows[1:])
+    print(f"✅ {len(rows) - 1} событий и {len(overdue_rows) - 1} просроченных выгружены")
+    return True
+
+
+def _export_peak(exporter: ExportManager, db: DatabaseManager, query: str):
+    """Размер CSV и пик выделенной памяти при его записи"""
+    tracemalloc.start()
+    try:
+        file = exporter._export_to_csv(db.iter_batches(query, (TEST_CHAT_ID,)))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    file.seek(0, io.SEEK_END)
+    size = file.tell()
+    file.close()
+    return size, peak
+
+
+def _check_flat_memory(db: DatabaseManager):
+    """Пик памяти определяется размером пачки, а не объемом чата"""
+    print("\n📋 Тест 2: Пиковая память")
+    exporter = ExportManager(db)
+    spool_size = BotConfig.EXPORT_SPOOL_MAX_SIZE
+    BotConfig.EXPORT_SPOOL_MAX_SIZE = 256 * 1024
+    try:
+        # Прогрев: кэш ФИО и соединение пула не должны влиять на замер
+        _export_peak(exporter, db, EVENTS_EXPORT_QUERY)
+        small_size, small_peak = _export_peak(exporter, db, EVENTS_EXPORT_QUERY.rstrip() + " LIMIT 4000")
+        size, peak = _export_peak(exporter, db, EVENTS_EXPORT_QUERY)
+    finally:
+        BotConfig.EXPORT_SPOOL_MAX_SIZE = spool_size
+
+    assert size > 4 * small_size, (size, small_size)
+    # Файл в 5 раз больше - пик памяти почти тот же
+    assert peak < small_peak * 1.5, f"Пик памяти {peak} против {small_peak}"
+    assert peak < size / 2, f"Пик памяти {peak} при файле {size}"
+    print(f"✅ Файл {small_size / 1024:.0f} КБ → пик {small_peak / 1024:.0f} КБ, "
+          f"файл {size / 1024:.0f} КБ → пик {peak / 1024:.0f} КБ")
+    return True
+
+
+def _check_connection_released(db: DatabaseManager):
+    """Прерванный экспорт возвращает соединение в пул"""
+    print("\n📋 Тест 3: Освобождение соединения")
+    exporter = ExportManager(db)
+
+    def failing_rows(event, decrypted_name):
+        raise RuntimeError("disk full")
+
+    batches = db.iter_batches(EVENTS_EXPORT_QUERY, (TEST_CHAT_ID,))
+    try:
+        exporter._write_csv(batches, ['ФИО'], failing_rows)
+        raise AssertionError("Ожидалась ошибка записи")
+    except RuntimeError:
+        pass
+
+    stats = db.get_pool_stats()
+    assert stats['idle'] == stats['size'], stats
+    print(f"✅ Соединения в пуле: {stats['idle']}/{stats['size']}")
+    return True
+
+
+def test_streaming_export():
+    """Тестирует потоковый экспорт CSV"""
+    print("🌊 ТЕСТИРОВАНИЕ ПОТОКОВОГО ЭКСПОРТА")
+    print("=" * 50)
+
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'streaming_export.db'))
+
+    try:
+        _seed(db)
+        _check_content(db)
+        _check_flat_memory(db)
+        _check_connection_released(db)
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        db.close_all()
+
+    print("\n🎉 ВСЕ ТЕСТЫ ПОТОКОВОГО ЭКСПОРТА ПРОЙДЕНЫ!")
+    return True
+
+
+def main():
+    """Основная функция тестирования"""
+    return test_streaming_export()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Тест экспорта в Excel в режиме constant_memory: строки пишутся во временный файл,
+статистика считается в том же проходе
+"""
+
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import tracemalloc
+import traceback
+import zipfile
+from collections import Counter
+from datetime import date, timedelta
+
+import openpyxl
+
+# Добавляем родительскую директорию в sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import BotConfig
+from core.database import DatabaseManager
+from core.security import encrypt_data
+from managers.analytics_snapshot import snapshot_cache
+from managers.export_manager import EVENTS_EXPORT_QUERY, ExportManager
+
+TEST_CHAT_ID = 3232
+EMPLOYEES = 150
+EVENTS_PER_EMPLOYEE = 40
+EVENT_TYPES = ["Медосмотр", "Инструктаж по охране труда", "Аттестация"]
+
+
+def _seed(db: DatabaseManager):
+    today = date.today()
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO chat_settings (chat_id, admin_id) VALUES (?, ?)", (TEST_CHAT_ID, 1))
+        for i in range(EMPLOYEES):
+            employee_id = conn.execute(
+                "INSERT INTO employees (chat_id, full_name, position) VALUES (?, ?, ?)",
+                (TEST_CHAT_ID, encrypt_data(f"Сотрудник Номер {i:03d}"), "Электрогазосварщик")
+            ).lastrowid
+            conn.executemany(
+                '''INSERT INTO employee_events
+                   (employee_id, event_type, last_event_date, interval_days, next_notification_date)
+                   VALUES (?, ?, ?, ?, ?)''',
+                [(employee_id, EVENT_TYPES[k % len(EVENT_TYPES)], today.isoformat(), 365,
+                  (today + timedelta(days=(i + k) % 200 - 40)).isoformat())
+                 for k in range(EVENTS_PER_EMPLOYEE)]
+            )
+
+
+def _read_sheets(file) -> dict:
+    try:
+        workbook = openpyxl.load_workbook(file, read_only=True)
+        return {sheet.title: list(sheet.iter_rows(values_only=True)) for sheet in workbook.worksheets}
+    finally:
+        file.close()
+
+
+def _check_events_workbook(db: DatabaseManager):
+    """Лист событий полный, статистика посчитана по тем же строкам"""
+    print("\n📋 Тест 1: Лист событий и статистика")
+    file = asyncio.run(ExportManager(db).export_all_events(TEST_CHAT_ID, "xlsx"))
+    sheets = _read_sheets(file)
+
+    events = sheets['События']
+    total = EMPLOYEES * EVENTS_PER_EMPLOYEE
+    assert events[0][0] == 'ФИО' and len(events) == total + 1, len(events)
+    assert {row[0] for row in events[1:]} == {f"Сотрудник Номер {i:03d}" for i in range(EMPLOYEES)}
+
+    stats = {row[0]: row[1] for row in sheets['Статистика'] if row and row[0]}
+    assert stats['Всего событий:'] == total, stats
+    assert stats['Уникальных сотрудников:'] == EMPLOYEES, stats
+    statuses = {row[6] for row in events[1:]}
+    assert sum(stats[status] for status in statuses) == total
+    type_counts = Counter(row[2] for row in events[1:])
+    assert all(stats[event_type] == count for event_type, count in type_counts.items()), type_counts
+    print(f"✅ {total} событий, {EMPLOYEES} сотрудников, статусы: {', '.join(sorted(statuses))}")
+    return True
+
+
+def _check_overdue_workbook(db: DatabaseManager):
+    """Просроченные события и итоговая строка"""
+    print("\n📋 Тест 2: Лист просроченных событий")
+    file = asyncio.run(ExportManager(db).export_overdue_events(TEST_CHAT_ID, "xlsx"))
+    rows = [row for row in _read_sheets(file)['Просроченные события'] if any(row)]
+
+    overdue = rows[1:-1]
+    assert overdue and all(row[6] > 0 for row in overdue)
+    assert rows[-1][0].endswith(f"Всего просроченных событий: {len(overdue)}"), rows[-1][0]
+    print(f"✅ {len(overdue)} просроченных событий и итоговая строка")
+    return True
+
+
+def _export_peak(exporter: ExportManager, db: DatabaseManager, query: str):
+    """Размер книги и пик выделенной памяти при ее записи"""
+    tracemalloc.start()
+    try:
+        file = exporter._export_to_xlsx(db.iter_batches(query, (TEST_CHAT_ID,)))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    file.seek(0, io.SEEK_END)
+    size = file.tell()
+    file.close()
+    return size, peak
+
+
+def _check_flat_memory(db: DatabaseManager):
+    """Пик памяти не растет вместе с числом строк"""
+    print("\n📋 Тест 3: Пиковая память")
+    exporter = ExportManager(db)
+    spool_size = BotConfig.EXPORT_SPOOL_MAX_SIZE
+    BotConfig.EXPORT_SPOOL_MAX_SIZE = 64 * 1024
+    try:
+        # Прогрев: кэш ФИО и соединение пула не должны влиять на замер
+        _export_peak(exporter, db, EVENTS_EXPORT_QUERY)
+        small_size, small_peak = _export_peak(exporter, db, EVENTS_EXPORT_QUERY.rstrip() + " LIMIT 1000")
+        size, peak = _export_peak(exporter, db, EVENTS_EXPORT_QUERY)
+    finally:
+        BotConfig.EXPORT_SPOOL_MAX_SIZE = spool_size
+
+    assert size > 4 * small_size, (size, small_size)
+    # Строк в 6 раз больше - пик памяти почти тот же
+    assert peak < small_peak * 1.5, f"Пик памяти {peak} против {small_peak}"
+    print(f"✅ Книга {small_size / 1024:.0f} КБ → пик {small_peak / 1024:.0f} КБ, "
+          f"книга {size / 1024:.0f} КБ → пик {peak / 1024:.0f} КБ")
+    return True
+
+
+def _check_analytics_report(db: DatabaseManager):
+    """Аналитический отчет собирается в режиме constant_memory"""
+    print("\n📋 Тест 4: Аналитический отчет")
+    file = asyncio.run(ExportManager(db).export_analytics_report(TEST_CHAT_ID, "full"))
+    try:
+        with zipfile.ZipFile(file) as archive:
+            sheets = [name for name in archive.namelist() if name.startswith('xl/worksheets/sheet')]
+            # Строки constant_memory пишутся без таблицы общих строк
+            assert 'xl/sharedStrings.xml' not in archive.namelist()
+    finally:
+        file.close()
+    assert len(sheets) == 5, sheets
+    print(f"✅ Отчет из {len(sheets)} листов")
+    return True
+
+
+def test_xlsx_export():
+    """Тестирует экспорт в Excel с постоянным расходом памяти"""
+    print("📗 ТЕСТИРОВАНИЕ ЭКСПОРТА В EXCEL")
+    print("=" * 50)
+
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'xlsx_export.db'))
+
+    try:
+        _seed(db)
+        _check_events_workbook(db)
+        _check_overdue_workbook(db)
+        _check_flat_memory(db)
+        _check_analytics_report(db)
+    except Exception as e:
+        print(f"❌ Ошибка в тестировании: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        snapshot_cache.invalidate()
+        db.close_all()
+
+    print("\n🎉 ВСЕ ТЕСТЫ ЭКСПОРТА В EXCEL ПРОЙДЕНЫ!")
+    return True
+
+
+def main():
+    """Основная функция тестирования"""
+    return test_xlsx_export()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)